@@ -1,8 +1,27 @@
 from google.adk.agents import Agent
 # Assuming tools.py is in the same directory or accessible in PYTHONPATH
-from .tools.tools import process_contract_document, detect_contract_breaches, calculate_contract_penalties
+from .tools import async_tools, pipeline, reanalysis
+from .tools import tools as sync_tools
 from .config import settings # Import the settings object
 
+# The async variants keep one session's model calls from blocking the others.
+if settings.async_tools.enabled:
+    contract_tools = [
+        async_tools.analyze_contract,
+        async_tools.process_contract_document,
+        async_tools.detect_contract_breaches,
+        async_tools.calculate_contract_penalties,
+        async_tools.reanalyze_contract_document,
+    ]
+else:
+    contract_tools = [
+        pipeline.analyze_contract,
+        sync_tools.process_contract_document,
+        sync_tools.detect_contract_breaches,
+        sync_tools.calculate_contract_penalties,
+        reanalysis.reanalyze_contract_document,
+    ]
+
 # Define the main contract analysis agent
 root_agent = Agent(
     name=settings.agent_settings.name,
@@ -19,13 +38,34 @@ root_agent = Agent(
         "your first step is to use the 'process_contract_document' tool to analyze it. "
         "The 'pdf_file_path' parameter for this tool should be the reference to the provided contract. "
         "After processing, present the summary and extracted data to the user. "
+        "The tools keep full results on the server and return handles instead: "
+        "'process_contract_document' returns a 'contract_handle' and 'detect_contract_breaches' returns a "
+        "'breach_report_handle'. To run breach detection or penalty calculation, pass these handles "
+        "('contract_handle', and 'breach_report_handle' for penalties) rather than copying the extracted data "
+        "or the breach report into the arguments. If a tool reports an unknown or expired handle, process the "
+        "contract again. "
         "Then, inform the user that they can request 'breach detection' or 'penalty calculation' next. "
-        "Await further instructions from the user to invoke those subsequent tools."
+        "Await further instructions from the user to invoke those subsequent tools. "
+        "When the user asks for a full or complete analysis of a contract, or for breaches and "
+        "penalties straight away, call the 'analyze_contract' tool once instead; it extracts the data, "
+        "detects breaches and calculates penalties in a single call. "
+        "When the user asks which contracts contain a clause, term or phrase (for example "
+        "'which contracts have a termination for convenience clause'), use the "
+        "'search_contract_clauses' tool; it searches every contract processed so far without "
+        "re-processing them. Put exact phrases in double quotes in the query. "
+        "When the user asks which contracts start or expire in a period (for example 'contracts expiring "
+        "in the next 90 days in Berlin time'), use the 'find_contracts_by_date' tool with 'within_days' or "
+        "'start_date'/'end_date' and, if the user names a place or timezone, the matching IANA 'timezone' "
+        "(e.g. 'Europe/Berlin'). "
+        "When the user provides an amended or new version of a contract that was analyzed before, "
+        "use the 'reanalyze_contract_document' tool with the same 'contract_id' as before; it re-extracts "
+        "only the changed clauses and reports which fields, breach findings and penalties changed."
     ),
     tools=[
-        process_contract_document,
-        detect_contract_breaches,
-        calculate_contract_penalties
+        *contract_tools,
+        # Local index lookups, fast enough to run on the event loop.
+        sync_tools.search_contract_clauses,
+        sync_tools.find_contracts_by_date,
     ],
     # enable_reflection=True # Optional: for more advanced agent behaviors if needed
 )
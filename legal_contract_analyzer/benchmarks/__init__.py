@@ -0,0 +1,2 @@
+# This file makes the 'benchmarks' directory a Python package.
+# Run the suite with: python -m legal_contract_analyzer.benchmarks.run --help
@@ -0,0 +1,161 @@
+"""Write and scan benchmark for the columnar analytics store.
+
+Writes synthetic analyses (structured_data, a breach_report of --rules
+findings and a penalty_summary item per breached rule) until --findings
+findings are stored, then times aggregate queries on a freshly opened store:
+
+- contracts failing each rule;
+- contracts failing one rule;
+- finding status counts;
+- penalty totals by breach type.
+
+    python -m legal_contract_analyzer.benchmarks.analytics_scan --findings 1000000 --rules 20
+
+--compare-json also writes the same analyses as JSONL and times answering the
+"failing one rule" question by reloading the result dicts, for comparison.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Optional
+
+import numpy as np
+
+from ..shared_libraries.analytics_store import AnalyticsStore, AnalyticsWriter
+from ..shared_libraries.rule_engine import INSUFFICIENT_DATA, MET, NOT_MET
+
+_STATUSES = (MET, MET, MET, NOT_MET, INSUFFICIENT_DATA)
+
+
+def _synthetic_analysis(number: int, rules: int, rng: random.Random) -> dict:
+    breach_report = []
+    penalty_items = []
+    for rule in range(rules):
+        status = rng.choice(_STATUSES)
+        rule_id = f"rule_{rule:03d}"
+        breach_report.append({
+            "rule_id": rule_id,
+            "rule_description": f"Synthetic rule {rule}",
+            "status": status,
+            "details": f"{status} by clause {rng.randint(1, 40)}.",
+        })
+        if status == NOT_MET:
+            penalty_items.append({
+                "breach_type_or_clause": rule_id,
+                "penalty_description": "Late delivery credit",
+                "calculated_amount_formula": "monthly_fee * 0.05",
+                "conditions_for_penalty": "Breach not cured within 30 days",
+                "notes": "",
+                "calculated_amount": round(rng.uniform(100, 10_000), 2),
+            })
+    return {
+        "contract_id": f"/contracts/synthetic_{number:07d}.pdf",
+        "structured_data": {
+            "effective_date": "2024-01-01",
+            "expiration_date": f"2026-{rng.randint(1, 12):02d}-28",
+            "parties": [{"name": "Party A Inc.", "role": "Provider"}, {"name": f"Client {number % 500}", "role": "Client"}],
+            "financial_terms": "Client pays $10,000 USD monthly.",
+            "governing_law": rng.choice(("State of California", "State of New York", "England and Wales")),
+        },
+        "breach_report": breach_report,
+        "penalty_summary": {"penalty_summary": penalty_items},
+    }
+
+
+def _timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, round((time.perf_counter() - started) * 1000.0, 3)
+
+
+def run_analytics_benchmark(directory: str, findings: int, rules: int, seed: int = 0,
+                            compare_json: bool = False) -> dict:
+    rng = random.Random(seed)
+    contracts = max(1, findings // rules)
+    json_path = os.path.join(directory, "results.jsonl")
+    json_file = open(json_path, "w", encoding="utf-8") if compare_json else None
+    started = time.perf_counter()
+    with AnalyticsWriter(os.path.join(directory, "store")) as writer:
+        for number in range(contracts):
+            analysis = _synthetic_analysis(number, rules, rng)
+            writer.add(analysis["contract_id"], analysis["structured_data"], analysis["breach_report"],
+                       analysis["penalty_summary"])
+            if json_file is not None:
+                json_file.write(json.dumps(analysis) + "\n")
+    write_seconds = time.perf_counter() - started
+    if json_file is not None:
+        json_file.close()
+
+    store, open_ms = _timed(AnalyticsStore, os.path.join(directory, "store"))
+    findings_table = store.table("findings")
+
+    def failing_one_rule(rule_id: str = "rule_000") -> int:
+        mask = findings_table["rule_id"].equals(rule_id) & findings_table["status"].equals(NOT_MET)
+        return int(np.unique(findings_table["contract_id"].codes[mask]).size)
+
+    by_rule, by_rule_ms = _timed(store.contracts_by_rule)
+    one_rule, one_rule_ms = _timed(failing_one_rule)
+    statuses, statuses_ms = _timed(findings_table["status"].value_counts)
+    penalties, penalties_ms = _timed(store.penalty_totals)
+    results = {
+        "config": {"findings": contracts * rules, "contracts": contracts, "rules": rules, "seed": seed},
+        "write": {
+            "seconds": round(write_seconds, 3),
+            "findings_per_second": round(contracts * rules / write_seconds),
+            "store_bytes": sum(os.path.getsize(os.path.join(root, name))
+                               for root, _, names in os.walk(os.path.join(directory, "store")) for name in names),
+        },
+        "query_ms": {
+            "open": open_ms,
+            "contracts_failing_each_rule": by_rule_ms,
+            "contracts_failing_one_rule": one_rule_ms,
+            "finding_status_counts": statuses_ms,
+            "penalty_totals": penalties_ms,
+        },
+        "answers": {
+            "contracts_failing_rule_000": one_rule,
+            "finding_status_counts": statuses,
+            "penalty_breach_types": len(penalties),
+        },
+    }
+    assert by_rule.get("rule_000", 0) == one_rule
+
+    if compare_json:
+        def failing_one_rule_from_json(rule_id: str = "rule_000") -> int:
+            with open(json_path, "r", encoding="utf-8") as f:
+                return sum(
+                    any(finding["rule_id"] == rule_id and finding["status"] == NOT_MET
+                        for finding in json.loads(line)["breach_report"])
+                    for line in f
+                )
+        from_json, json_ms = _timed(failing_one_rule_from_json)
+        assert from_json == one_rule
+        results["query_ms"]["contracts_failing_one_rule_from_json"] = json_ms
+    return results
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the columnar analytics store.")
+    parser.add_argument("--findings", type=int, default=1_000_000, help="Breach findings to write")
+    parser.add_argument("--rules", type=int, default=20, help="Findings per contract")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare-json", action="store_true", help="Also time the same query over JSONL results")
+    parser.add_argument("--output", default=None, help="Also write the results JSON to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="contract_analytics_") as directory:
+        results = run_analytics_benchmark(directory, args.findings, args.rules, args.seed, args.compare_json)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
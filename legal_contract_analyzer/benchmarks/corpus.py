@@ -0,0 +1,204 @@
+"""Synthetic contract PDFs for benchmarking.
+
+`write_synthetic_pdf` writes a valid text-layer PDF (standard Type1 font) with one
+FlateDecode content stream per page, the layout `pdf_stream.iter_pdf_pages`
+reads. Page text is a sequence of numbered clauses drawn from
+`CLAUSE_LIBRARY` according to a clause mix, e.g. {"financial": 3, "boilerplate": 1},
+so benchmarks can vary how much of a contract is penalty or termination language.
+Output is fully determined by the seed.
+"""
+
+import os
+import random
+import textwrap
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+CLAUSE_LIBRARY: Dict[str, List[str]] = {
+    "financial": [
+        "Client shall pay Provider ${amount} USD monthly, due on the first business day of each month.",
+        "Invoices are payable within {days} days of receipt. All amounts are exclusive of applicable taxes.",
+        "The total contract value shall not exceed ${amount} USD without a written change order.",
+    ],
+    "termination": [
+        "Either party may terminate this Agreement for convenience upon {days} days prior written notice.",
+        "Either party may terminate this Agreement immediately if the other party materially breaches it "
+        "and fails to cure the breach within {days} days of written notice.",
+        "Upon termination, Client shall pay all fees accrued up to the effective date of termination.",
+    ],
+    "penalty": [
+        "A late fee of {percent}% of the outstanding monthly amount applies if payment is not received "
+        "within {days} days of the due date.",
+        "For each day of delay in delivery, Provider shall pay liquidated damages of {percent}% of the "
+        "contract value, capped at ${amount} USD.",
+        "Service credits of {percent}% of the monthly fee apply for each full hour of unavailability "
+        "beyond the agreed service level.",
+    ],
+    "confidentiality": [
+        "Each party shall keep the other party's Confidential Information secret and use it only to "
+        "perform this Agreement, for {years} years after termination.",
+        "Confidential Information excludes information that is or becomes public through no fault of "
+        "the receiving party.",
+    ],
+    "renewal": [
+        "This Agreement renews automatically for successive periods of {years} year(s) unless either "
+        "party gives notice of non-renewal at least {days} days before the end of the current term.",
+    ],
+    "governing_law": [
+        "This Agreement is governed by the laws of the State of California, without regard to its "
+        "conflict of laws principles.",
+        "The courts of San Francisco County shall have exclusive jurisdiction over any dispute.",
+    ],
+    "boilerplate": [
+        "Notices shall be in writing and delivered by hand, by courier or by email to the addresses "
+        "set out above.",
+        "This Agreement constitutes the entire agreement between the parties and supersedes all prior "
+        "agreements relating to its subject matter.",
+        "No failure or delay in exercising any right shall operate as a waiver of that right.",
+        "If any provision is held invalid, the remaining provisions shall continue in full force.",
+    ],
+}
+
+DEFAULT_CLAUSE_MIX: Dict[str, float] = {
+    "financial": 2, "termination": 2, "penalty": 2, "confidentiality": 1,
+    "renewal": 1, "governing_law": 1, "boilerplate": 4,
+}
+
+_HEADINGS = {
+    "financial": "Fees and Payment",
+    "termination": "Termination",
+    "penalty": "Late Payment and Liquidated Damages",
+    "confidentiality": "Confidentiality",
+    "renewal": "Term and Renewal",
+    "governing_law": "Governing Law",
+    "boilerplate": "General",
+}
+
+LINES_PER_PAGE = 56
+CHARACTERS_PER_LINE = 90
+
+
+def parse_clause_mix(text: str) -> Dict[str, float]:
+    """Parses "financial=3,penalty=1" into a clause mix. Unknown kinds raise ValueError."""
+    mix = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        kind, _, weight = item.partition("=")
+        if kind not in CLAUSE_LIBRARY:
+            raise ValueError(f"Unknown clause kind {kind!r}; expected one of {sorted(CLAUSE_LIBRARY)}")
+        mix[kind] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("A clause mix needs at least one kind with a positive weight")
+    return mix
+
+
+def _clause_lines(number: int, kind: str, rng: random.Random) -> List[str]:
+    sentences = rng.sample(CLAUSE_LIBRARY[kind], k=min(len(CLAUSE_LIBRARY[kind]), rng.randint(1, 3)))
+    body = " ".join(sentence.format(
+        amount=f"{rng.randrange(1, 500) * 1000:,}",
+        days=rng.choice((5, 10, 15, 30, 60, 90)),
+        percent=rng.choice((0.5, 1, 2, 5, 10)),
+        years=rng.randint(1, 5),
+    ) for sentence in sentences)
+    lines = [f"{number}. {_HEADINGS[kind]}"]
+    lines.extend(textwrap.wrap(body, CHARACTERS_PER_LINE))
+    lines.append("")
+    return lines
+
+
+def iter_synthetic_pages(pages: int, clause_mix: Optional[Dict[str, float]] = None,
+                         seed: int = 0) -> Iterable[List[str]]:
+    """Yields the lines of each page of a synthetic contract."""
+    rng = random.Random(seed)
+    mix = clause_mix or DEFAULT_CLAUSE_MIX
+    kinds, weights = list(mix), list(mix.values())
+    header = [
+        "MASTER SERVICES AGREEMENT",
+        "",
+        f"This Agreement is made effective as of 2024-01-01 and expires on 2025-12-31, between "
+        f"Party A Inc. (Provider) and Party B Ltd. (Client). Reference SYN-{seed:06d}.",
+        "",
+    ]
+    pending: List[str] = []
+    for line in header:
+        pending.extend(textwrap.wrap(line, CHARACTERS_PER_LINE) or [""])
+    number = 1
+    for _ in range(pages):
+        while len(pending) < LINES_PER_PAGE:
+            pending.extend(_clause_lines(number, rng.choices(kinds, weights)[0], rng))
+            number += 1
+        yield pending[:LINES_PER_PAGE]
+        pending = pending[LINES_PER_PAGE:]
+
+
+def _escape_pdf_string(text: str) -> bytes:
+    data = text.encode("latin-1", errors="replace")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _content_stream(lines: List[str]) -> bytes:
+    parts = [b"BT /F1 10 Tf 12 TL 56 780 Td"]
+    for line in lines:
+        parts.append(b"(" + _escape_pdf_string(line) + b") Tj T*")
+    parts.append(b"ET")
+    return b"\n".join(parts)
+
+
+def write_synthetic_pdf(pdf_file_path: str, pages: int, clause_mix: Optional[Dict[str, float]] = None,
+                        seed: int = 0) -> str:
+    """
+    Writes a synthetic contract PDF and returns its path.
+
+    Args:
+        pdf_file_path (str): Where to write the PDF.
+        pages (int): Number of pages, at least 1.
+        clause_mix (dict, optional): Relative weights of CLAUSE_LIBRARY kinds. Defaults to DEFAULT_CLAUSE_MIX.
+        seed (int): Seed for clause selection and wording.
+    """
+    if pages < 1:
+        raise ValueError("A synthetic contract needs at least one page")
+    # Object numbers: 1 catalog, 2 page tree, 3 font, then a page and its content stream per page.
+    page_ids = [4 + 2 * index for index in range(pages)]
+    offsets = []
+    with open(pdf_file_path, "wb") as f:
+        def write_object(number: int, body: bytes, stream: Optional[bytes] = None) -> None:
+            offsets.append(f.tell())
+            f.write(f"{number} 0 obj\n".encode("ascii") + body)
+            if stream is not None:
+                f.write(b"\nstream\n" + stream + b"\nendstream")
+            f.write(b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+        write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode("ascii"))
+        write_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        for page_id, lines in zip(page_ids, iter_synthetic_pages(pages, clause_mix, seed)):
+            write_object(page_id, (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>"
+            ).encode("ascii"))
+            data = zlib.compress(_content_stream(lines))
+            write_object(page_id + 1, f"<< /Length {len(data)} /Filter /FlateDecode >>".encode("ascii"), data)
+
+        xref_offset = f.tell()
+        f.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode("ascii"))
+        for offset in offsets:
+            f.write(f"{offset:010d} 00000 n \n".encode("ascii"))
+        f.write(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode("ascii"))
+    return pdf_file_path
+
+
+def generate_corpus(directory: str, page_counts: Iterable[int], contracts_per_size: int = 1,
+                    clause_mix: Optional[Dict[str, float]] = None, seed: int = 0) -> List[str]:
+    """
+    Writes `contracts_per_size` synthetic PDFs for every page count and returns their paths.
+
+    Files are named synthetic_<pages>p_<n>.pdf and rewritten on every call.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for pages in page_counts:
+        for index in range(contracts_per_size):
+            path = os.path.join(directory, f"synthetic_{pages:03d}p_{index:02d}.pdf")
+            paths.append(write_synthetic_pdf(path, pages, clause_mix, seed=seed * 100_003 + pages * 101 + index))
+    return paths
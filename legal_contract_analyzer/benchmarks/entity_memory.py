@@ -0,0 +1,98 @@
+"""Memory benchmark: contract analyses held as dicts versus entity records.
+
+Holds --contracts synthetic analyses (structured_data, a breach_report of
+--rules findings and a penalty_summary item per breached rule) in one
+in-process list, first as the dicts the tools exchange and then as
+ContractRecord, BreachFinding and PenaltyItem records, and reports the bytes
+allocated per contract for each (measured with tracemalloc) and the size of
+the records' binary encoding.
+
+    python -m legal_contract_analyzer.benchmarks.entity_memory --contracts 100000 --rules 10
+
+Every analysis is decoded from its own JSON text, as results read back from
+a model response or a cache file are, so the dicts do not share strings the
+way literals in one process would.
+"""
+
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+from ..entities import BreachFinding, ContractRecord, PenaltyItem
+from .analytics_scan import _synthetic_analysis
+
+
+def _as_dicts(analysis: dict) -> tuple:
+    return analysis["structured_data"], analysis["breach_report"], analysis["penalty_summary"]["penalty_summary"]
+
+
+def _as_records(analysis: dict) -> tuple:
+    return (
+        ContractRecord.from_dict(analysis["structured_data"], analysis["contract_id"]),
+        tuple(BreachFinding.from_dict(finding) for finding in analysis["breach_report"]),
+        tuple(PenaltyItem.from_dict(item) for item in analysis["penalty_summary"]["penalty_summary"]),
+    )
+
+
+def _held_bytes(contracts: int, rules: int, seed: int, convert: Callable[[dict], tuple]) -> tuple:
+    """Returns (bytes still allocated once every analysis is held, seconds taken, the held list)."""
+    rng = random.Random(seed)
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        held = [convert(json.loads(json.dumps(_synthetic_analysis(number, rules, rng)))) for number in range(contracts)]
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return current, time.perf_counter() - started, held
+
+
+def run_entity_memory_benchmark(contracts: int = 100_000, rules: int = 10, seed: int = 0) -> dict:
+    """
+    Returns:
+        dict: config, per-representation bytes_per_contract and build seconds,
+            binary_bytes_per_contract for the records, and the records'
+            memory as a share of the dicts' (reduction is one minus it).
+    """
+    dict_bytes, dict_seconds, held = _held_bytes(contracts, rules, seed, _as_dicts)
+    del held
+    record_bytes, record_seconds, held = _held_bytes(contracts, rules, seed, _as_records)
+    binary_bytes = sum(
+        len(record.to_bytes()) + sum(len(finding.to_bytes()) for finding in findings)
+        + sum(len(item.to_bytes()) for item in items)
+        for record, findings, items in held
+    )
+    return {
+        "config": {"contracts": contracts, "rules": rules, "seed": seed},
+        "dicts": {"bytes_per_contract": round(dict_bytes / contracts), "build_seconds": round(dict_seconds, 3)},
+        "records": {"bytes_per_contract": round(record_bytes / contracts), "build_seconds": round(record_seconds, 3)},
+        "binary_bytes_per_contract": round(binary_bytes / contracts),
+        "records_to_dicts_ratio": round(record_bytes / dict_bytes, 3) if dict_bytes else 0.0,
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare the memory of dict and entity record analyses.")
+    parser.add_argument("--contracts", type=int, default=100_000, help="Analyses held in memory")
+    parser.add_argument("--rules", type=int, default=10, help="Breach findings per contract")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Also write the results JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run_entity_memory_benchmark(args.contracts, args.rules, args.seed)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
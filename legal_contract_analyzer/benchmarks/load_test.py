@@ -0,0 +1,124 @@
+"""Concurrent-session load test: synchronous tools versus their async variants.
+
+Runs `--sessions` simulated agent sessions at once on one event loop, the way
+ADK serves them. Each session analyses one synthetic contract end to end
+(process, breach detection, penalties) against a FakeLLMBackend. In "sync"
+mode the tools from tools.py are called directly on the loop, as ADK does for
+plain functions, so sessions queue behind each other's model calls; in
+"async" mode the tools from async_tools.py are awaited.
+
+    python -m legal_contract_analyzer.benchmarks.load_test --sessions 50 --profile flash
+
+Reports wall time, sessions per second and p50/p99 session latency (from the
+moment all sessions arrive to each one's completion) for each mode, and the
+async speedup.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+from ..config import settings
+from ..shared_libraries.llm_backends import set_llm_backend
+from ..tools import async_tools, tools
+from .corpus import generate_corpus
+from .run import LATENCY_PROFILES, _percentiles_ms, make_fake_backend
+
+MODES = ("sync", "async")
+
+
+async def _sync_session(pdf_file_path: str) -> None:
+    processed = tools.process_contract_document(pdf_file_path, use_cache=False)
+    breaches = tools.detect_contract_breaches(processed["structured_data"])
+    tools.calculate_contract_penalties(processed["structured_data"], breaches["breach_report"])
+
+
+async def _async_session(pdf_file_path: str) -> None:
+    processed = await async_tools.process_contract_document(pdf_file_path, use_cache=False)
+    breaches = await async_tools.detect_contract_breaches(processed["structured_data"])
+    await async_tools.calculate_contract_penalties(processed["structured_data"], breaches["breach_report"])
+
+
+async def _run_sessions(mode: str, pdf_file_paths: List[str], sessions: int) -> dict:
+    session = _sync_session if mode == "sync" else _async_session
+    latencies = []
+    # Every session arrives at once, so latency includes time spent waiting for the loop.
+    started = time.perf_counter()
+
+    async def _timed(pdf_file_path: str) -> None:
+        await session(pdf_file_path)
+        latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(_timed(pdf_file_paths[i % len(pdf_file_paths)]) for i in range(sessions)))
+    elapsed = time.perf_counter() - started
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "sessions_per_second": round(sessions / elapsed, 3) if elapsed > 0 else 0.0,
+        "session_latency": _percentiles_ms(latencies),
+    }
+
+
+def run_load_test(pdf_file_paths: List[str], sessions: int = 50, profile: str = "flash",
+                  time_scale: float = 1.0, seed: int = 0, modes=MODES) -> dict:
+    """
+    Runs `sessions` concurrent sessions in each mode, bypassing the result cache
+    and the clause and near-duplicate indexes so every session does the full work.
+
+    Returns:
+        dict: config, a result per mode and, when both modes ran, async_speedup
+            (sync wall time divided by async wall time).
+    """
+    index_enabled = settings.clause_index.enabled
+    near_duplicates_enabled = settings.near_duplicates.enabled
+    settings.clause_index.enabled = False
+    settings.near_duplicates.enabled = False
+    results = {"config": {"sessions": sessions, "profile": profile, "time_scale": time_scale,
+                          "contracts": len(pdf_file_paths),
+                          "max_concurrent_calls": settings.async_tools.max_concurrent_calls}}
+    try:
+        for mode in modes:
+            previous_backend = set_llm_backend(make_fake_backend(profile, time_scale, seed))
+            try:
+                results[mode] = asyncio.run(_run_sessions(mode, pdf_file_paths, sessions))
+            finally:
+                set_llm_backend(previous_backend)
+    finally:
+        settings.clause_index.enabled = index_enabled
+        settings.near_duplicates.enabled = near_duplicates_enabled
+        async_tools.shutdown_tool_executor()
+    if "sync" in results and "async" in results and results["async"]["elapsed_seconds"] > 0:
+        results["async_speedup"] = round(results["sync"]["elapsed_seconds"] / results["async"]["elapsed_seconds"], 2)
+    return results
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare the sync and async tools under concurrent sessions.")
+    parser.add_argument("--sessions", type=int, default=50, help="Concurrent sessions per mode")
+    parser.add_argument("--pages", default="1,10", help="Comma-separated page counts of the contracts")
+    parser.add_argument("--contracts-per-size", type=int, default=2, help="Contracts generated per page count")
+    parser.add_argument("--profile", choices=sorted(LATENCY_PROFILES), default="flash", help="Fake model latency profile")
+    parser.add_argument("--time-scale", type=float, default=0.2, help="Multiplier applied to all fake latencies")
+    parser.add_argument("--mode", choices=MODES, default=None, help="Run only one mode")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the corpus and the fake backend")
+    parser.add_argument("--output", default=None, help="Also write the results JSON to this file")
+    args = parser.parse_args(argv)
+
+    page_counts = [int(value) for value in args.pages.split(",") if value.strip()]
+    with tempfile.TemporaryDirectory(prefix="contract_load_") as corpus_dir:
+        paths = generate_corpus(corpus_dir, page_counts, args.contracts_per_size, seed=args.seed)
+        results = run_load_test(paths, args.sessions, args.profile, args.time_scale, args.seed,
+                                modes=(args.mode,) if args.mode else MODES)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""Tunes the extraction model-routing thresholds against a labeled evaluation set.
+
+An evaluation set is a JSONL file with one labeled contract per line:
+
+    {"pdf_file_path": "/data/eval/acme-nda.pdf",
+     "expected": {"effective_date": "2024-01-01", "parties": ["Acme Corp", "Globex"], "governing_law": "California"}}
+
+A field counts as correct when every expected value (each item, for lists)
+appears, case-insensitively, in the extracted value.
+
+For every combination of --confidence and --completeness thresholds, each
+contract is extracted with routing on: fast model first, escalating to the
+strong one. The run is scored for:
+
+- field accuracy;
+- escalation rate;
+- per-contract latency (p50/p99);
+- model cost, from settings.model_routing.prices.
+
+Fast-only and strong-only runs are the reference points. The recommendation
+is the cheapest setting whose accuracy is within --max-accuracy-loss of
+strong-only.
+
+Without --eval-set, a synthetic set is generated; its labels are the values
+the synthetic contracts state. The fake backend's per-model profiles stand in
+for the quality and speed gap between the models (--fast-dropout,
+--strong-dropout, --strong-latency-scale). Pass --live to send the calls to
+the configured backend instead.
+
+    python -m legal_contract_analyzer.benchmarks.routing_eval --contracts 40 --confidence 0.3,0.5,0.7 --completeness 0.4,0.6,0.8
+"""
+
+import argparse
+import itertools
+import json
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from ..config import settings
+from ..shared_libraries.llm_backends import EXTRACTION_TASK, set_llm_backend
+from ..shared_libraries.model_router import ROUTE_STATS, stage_models
+from ..tools import tools
+from .corpus import generate_corpus
+from .run import LATENCY_PROFILES, _percentiles_ms, make_fake_backend
+
+# What every synthetic contract states (see corpus.iter_synthetic_pages) and the simulated model extracts.
+SYNTHETIC_LABELS = {
+    "effective_date": "2024-01-01",
+    "expiration_date": "2025-12-31",
+    "parties": ["Party A Inc.", "Party B Ltd."],
+    "financial_terms": "10,000",
+    "governing_law": "California",
+    "renewal_terms": "one-year",
+    "termination_clauses": "material breach",
+    "penalty_clauses": "1.5%",
+}
+
+
+def load_eval_set(path: str) -> List[dict]:
+    """Reads a JSONL evaluation set of {"pdf_file_path", "expected"} entries."""
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "pdf_file_path" not in entry or not isinstance(entry.get("expected"), dict):
+                raise ValueError(f"{path}:{number}: expected pdf_file_path and an expected dict")
+            entries.append(entry)
+    return entries
+
+
+def field_correct(expected, actual) -> bool:
+    """Whether every expected value (each item, for lists) appears in the extracted value."""
+    if actual in (None, "", [], {}):
+        return False
+    text = (actual if isinstance(actual, str) else json.dumps(actual)).lower()
+    values = expected if isinstance(expected, list) else [expected]
+    return all(str(value).lower() in text for value in values)
+
+
+def accuracy(expected: Dict[str, object], structured_data: dict) -> float:
+    if not expected:
+        return 1.0
+    return sum(field_correct(value, structured_data.get(field)) for field, value in expected.items()) / len(expected)
+
+
+def _run(eval_set: List[dict]) -> dict:
+    """Extracts every contract with the current routing settings and scores the run."""
+    ROUTE_STATS.reset()
+    latencies = []
+    scores = []
+    failures = 0
+    for entry in eval_set:
+        started = time.perf_counter()
+        result = tools.process_contract_document(entry["pdf_file_path"], use_cache=False)
+        latencies.append(time.perf_counter() - started)
+        if result["status"] != "success":
+            failures += 1
+            scores.append(0.0)
+            continue
+        scores.append(accuracy(entry["expected"], result["structured_data"]))
+    stage = ROUTE_STATS.summary().get(EXTRACTION_TASK, {"routes": {}, "escalation_rate": 0.0})
+    cost = sum(route["cost_usd"] for route in stage["routes"].values())
+    return {
+        "accuracy": round(sum(scores) / len(scores), 4) if scores else 0.0,
+        "escalation_rate": stage["escalation_rate"],
+        "latency": _percentiles_ms(latencies),
+        "cost_usd": round(cost, 6),
+        "cost_per_contract_usd": round(cost / len(eval_set), 8) if eval_set else 0.0,
+        "failures": failures,
+        "routes": {route: values["count"] for route, values in stage["routes"].items()},
+    }
+
+
+def evaluate_routing(eval_set: List[dict], confidence_thresholds: List[float], completeness_thresholds: List[float],
+                     max_accuracy_loss: float = 0.01) -> dict:
+    """
+    Sweeps the extraction thresholds over the evaluation set with the active backend.
+
+    The result cache and the clause, date and near-duplicate indexes are
+    bypassed so every contract is extracted, and the routing settings are
+    restored afterwards.
+
+    Returns:
+        dict: models, references (fast_only and strong_only runs), sweep (one run
+            per threshold pair) and recommended (the cheapest run within
+            max_accuracy_loss of strong-only accuracy, or None).
+    """
+    stage = settings.model_routing.extraction
+    saved_stage = stage.model_copy()
+    saved_enabled = (settings.model_routing.enabled, settings.clause_index.enabled,
+                     settings.date_index.enabled, settings.near_duplicates.enabled)
+    settings.model_routing.enabled = True
+    settings.clause_index.enabled = settings.date_index.enabled = settings.near_duplicates.enabled = False
+    try:
+        models = stage_models(EXTRACTION_TASK)
+        if len(models) < 2:
+            raise ValueError("settings.model_routing.extraction needs a strong_model different from the fast one")
+        fast, strong = models
+        references = {}
+        stage.strong_model = None
+        references["fast_only"] = _run(eval_set)
+        stage.fast_model = strong
+        references["strong_only"] = _run(eval_set)
+        stage.fast_model, stage.strong_model = fast, strong
+
+        sweep = []
+        for confidence, completeness in itertools.product(confidence_thresholds, completeness_thresholds):
+            stage.min_confidence, stage.min_completeness = confidence, completeness
+            sweep.append({"min_confidence": confidence, "min_completeness": completeness, **_run(eval_set)})
+    finally:
+        for name, value in saved_stage.model_dump().items():
+            setattr(stage, name, value)
+        (settings.model_routing.enabled, settings.clause_index.enabled,
+         settings.date_index.enabled, settings.near_duplicates.enabled) = saved_enabled
+
+    target = references["strong_only"]["accuracy"] - max_accuracy_loss
+    eligible = [run for run in sweep if run["accuracy"] >= target]
+    recommended = min(eligible, key=lambda run: (run["cost_usd"], run["latency"]["p50_ms"])) if eligible else None
+    return {"models": {"fast": fast, "strong": strong}, "references": references, "sweep": sweep,
+            "recommended": recommended}
+
+
+def _floats(text: str) -> List[float]:
+    return [float(value) for value in text.split(",") if value.strip()]
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tune extraction routing thresholds against a labeled set.")
+    parser.add_argument("--eval-set", default=None, help="JSONL file of {pdf_file_path, expected} entries")
+    parser.add_argument("--contracts", type=int, default=20, help="Synthetic contracts when no --eval-set is given")
+    parser.add_argument("--pages", type=int, default=3, help="Pages per synthetic contract")
+    parser.add_argument("--confidence", default="0.3,0.5,0.7", help="Comma-separated min_confidence values")
+    parser.add_argument("--completeness", default="0.4,0.6,0.8", help="Comma-separated min_completeness values")
+    parser.add_argument("--max-accuracy-loss", type=float, default=0.01, help="Allowed accuracy below strong-only")
+    parser.add_argument("--live", action="store_true", help="Use the configured backend instead of the fake one")
+    parser.add_argument("--profile", choices=sorted(LATENCY_PROFILES), default="flash", help="Fake model latency profile")
+    parser.add_argument("--time-scale", type=float, default=0.02, help="Multiplier applied to all fake latencies")
+    parser.add_argument("--fast-dropout", type=float, default=0.15, help="Fake fast model: chance each field is missed")
+    parser.add_argument("--strong-dropout", type=float, default=0.01, help="Fake strong model: chance each field is missed")
+    parser.add_argument("--strong-latency-scale", type=float, default=2.5, help="Fake strong model: latency multiplier")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the corpus and the fake backend")
+    parser.add_argument("--output", default=None, help="Also write the results JSON to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="contract_routing_") as corpus_dir:
+        if args.eval_set:
+            eval_set = load_eval_set(args.eval_set)
+        else:
+            paths = generate_corpus(corpus_dir, [args.pages], args.contracts, seed=args.seed)
+            eval_set = [{"pdf_file_path": path, "expected": SYNTHETIC_LABELS} for path in paths]
+
+        previous_backend = None
+        if not args.live:
+            fast, strong = stage_models(EXTRACTION_TASK)[0], settings.model_routing.extraction.strong_model
+            backend = make_fake_backend(args.profile, args.time_scale, args.seed)
+            backend.model_profiles = {
+                fast: {"field_dropout": args.fast_dropout},
+                strong: {"field_dropout": args.strong_dropout, "latency_scale": args.strong_latency_scale},
+            }
+            previous_backend = set_llm_backend(backend)
+        try:
+            results = evaluate_routing(eval_set, _floats(args.confidence), _floats(args.completeness),
+                                       args.max_accuracy_loss)
+        finally:
+            if previous_backend is not None:
+                set_llm_backend(previous_backend)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""End-to-end benchmark of the three contract analysis tools.
+
+Generates a synthetic corpus (see corpus.py), runs process_contract_document,
+detect_contract_breaches and calculate_contract_penalties on every contract
+against a FakeLLMBackend with a latency profile, and reports per-stage p50/p99
+latency, per-stage peak traced memory and contracts per second.
+
+    python -m legal_contract_analyzer.benchmarks.run --pages 1,10,50,200,500 --profile flash
+    python -m legal_contract_analyzer.benchmarks.run --update-baseline
+
+The run fails (exit code 1) when a metric is worse than the stored baseline by
+more than the tolerance. Baselines only compare runs with the same
+configuration; record one per machine with --update-baseline.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..config import settings
+from ..shared_libraries.instrumentation import METRICS
+from ..shared_libraries.llm_backends import FakeLLMBackend, set_llm_backend
+from ..tools.tools import calculate_contract_penalties, detect_contract_breaches, process_contract_document
+from .corpus import DEFAULT_CLAUSE_MIX, generate_corpus, parse_clause_mix
+
+STAGES = ("process", "breach", "penalty")
+
+# Fixed latency per call plus prompt- and response-size dependent time, loosely
+# modelled on hosted Gemini models. Use time_scale to shrink them for quick runs.
+LATENCY_PROFILES: Dict[str, dict] = {
+    "instant": {"latency_seconds": 0.0, "jitter_seconds": 0.0,
+                "input_tokens_per_second": 0.0, "output_tokens_per_second": 0.0},
+    "flash": {"latency_seconds": 0.35, "jitter_seconds": 0.1,
+              "input_tokens_per_second": 40000.0, "output_tokens_per_second": 250.0},
+    "pro": {"latency_seconds": 0.9, "jitter_seconds": 0.3,
+            "input_tokens_per_second": 15000.0, "output_tokens_per_second": 80.0},
+}
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def make_fake_backend(profile: str, time_scale: float = 1.0, seed: int = 0) -> FakeLLMBackend:
+    """Builds a FakeLLMBackend for a LATENCY_PROFILES entry, with all delays multiplied by time_scale."""
+    values = LATENCY_PROFILES[profile]
+    speedup = 1.0 / time_scale if time_scale > 0 else 0.0
+    return FakeLLMBackend(
+        latency_seconds=values["latency_seconds"] * time_scale,
+        jitter_seconds=values["jitter_seconds"] * time_scale,
+        input_tokens_per_second=values["input_tokens_per_second"] * speedup,
+        output_tokens_per_second=values["output_tokens_per_second"] * speedup,
+        seed=seed,
+    )
+
+
+def _run_pipeline(pdf_file_path: str, trace_memory: bool = False) -> Dict[str, float]:
+    """Runs the three tools on one contract; returns seconds (or peak bytes) per stage."""
+    measurements = {}
+
+    def _measure(stage: str, function, *args):
+        if trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - started
+        if trace_memory:
+            measurements[stage] = tracemalloc.get_traced_memory()[1] - baseline
+        else:
+            measurements[stage] = elapsed
+        if result.get("status") != "success":
+            raise RuntimeError(f"{stage} failed for {pdf_file_path}: {result.get('error_message')}")
+        return result
+
+    processed = _measure("process", process_contract_document, pdf_file_path, False)
+    breaches = _measure("breach", detect_contract_breaches, processed["structured_data"])
+    _measure("penalty", calculate_contract_penalties, processed["structured_data"], breaches["breach_report"])
+    return measurements
+
+
+def _percentiles_ms(seconds: List[float]) -> dict:
+    values = np.asarray(seconds) * 1000.0
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "mean_ms": round(float(values.mean()), 3),
+    }
+
+
+def run_benchmark(pdf_file_paths: List[str], profile: str = "flash", time_scale: float = 1.0,
+                  repeats: int = 1, measure_memory: bool = True, seed: int = 0) -> dict:
+    """
+    Benchmarks the tool pipeline on the given contracts.
+
+    Contracts are processed sequentially, bypassing the result cache and the
+    clause and near-duplicate indexes, so every run does the full work. Memory
+    is measured in a separate pass with tracemalloc, so tracing does not
+    distort the latencies.
+
+    Returns:
+        dict: stages (p50/p99/mean latency per stage and in total), by_pages (the
+            same per page count), contracts_per_second, peak_memory_mib per stage,
+            stage_breakdown (instrumented sub-stage timings), llm_calls and failures.
+    """
+    backend = make_fake_backend(profile, time_scale, seed)
+    previous_backend = set_llm_backend(backend)
+    index_enabled = settings.clause_index.enabled
+    near_duplicates_enabled = settings.near_duplicates.enabled
+    settings.clause_index.enabled = False
+    settings.near_duplicates.enabled = False
+    try:
+        latencies = {stage: [] for stage in STAGES + ("total",)}
+        by_pages: Dict[int, Dict[str, List[float]]] = {}
+        failures = []
+        completed = 0
+        METRICS.reset()
+        started = time.perf_counter()
+        for _ in range(repeats):
+            for path in pdf_file_paths:
+                try:
+                    measurements = _run_pipeline(path)
+                except RuntimeError as e:
+                    failures.append(str(e))
+                    continue
+                completed += 1
+                measurements["total"] = sum(measurements[stage] for stage in STAGES)
+                page_latencies = by_pages.setdefault(_page_count(path), {stage: [] for stage in latencies})
+                for stage, seconds in measurements.items():
+                    latencies[stage].append(seconds)
+                    page_latencies[stage].append(seconds)
+        elapsed = time.perf_counter() - started
+        llm_calls = backend.calls
+        stage_breakdown = METRICS.summary()["stages"]
+
+        peak_memory = {}
+        if measure_memory and completed:
+            tracemalloc.start()
+            try:
+                for path in pdf_file_paths:
+                    try:
+                        peaks = _run_pipeline(path, trace_memory=True)
+                    except RuntimeError:
+                        continue
+                    for stage, peak in peaks.items():
+                        peak_memory[stage] = max(peak_memory.get(stage, 0), peak)
+            finally:
+                tracemalloc.stop()
+
+        return {
+            "config": {
+                "profile": profile,
+                "time_scale": time_scale,
+                "repeats": repeats,
+                "contracts": len(pdf_file_paths),
+                "page_counts": sorted({_page_count(path) for path in pdf_file_paths}),
+                "chunk_token_budget": settings.ingestion.chunk_token_budget,
+            },
+            "completed": completed,
+            "failures": failures,
+            "elapsed_seconds": round(elapsed, 3),
+            "contracts_per_second": round(completed / elapsed, 3) if elapsed > 0 else 0.0,
+            "llm_calls": llm_calls,
+            "stages": {stage: _percentiles_ms(values) for stage, values in latencies.items() if values},
+            "by_pages": {
+                str(pages): {stage: _percentiles_ms(values) for stage, values in stages.items()}
+                for pages, stages in sorted(by_pages.items())
+            },
+            "stage_breakdown": stage_breakdown,
+            "peak_memory_mib": {stage: round(peak / (1024 * 1024), 3) for stage, peak in peak_memory.items()},
+        }
+    finally:
+        settings.clause_index.enabled = index_enabled
+        settings.near_duplicates.enabled = near_duplicates_enabled
+        set_llm_backend(previous_backend)
+
+
+def _page_count(pdf_file_path: str) -> int:
+    # generate_corpus names files synthetic_<pages>p_<n>.pdf; other files count as 0.
+    name = os.path.basename(pdf_file_path)
+    try:
+        return int(name.split("_")[1].rstrip("p"))
+    except (IndexError, ValueError):
+        return 0
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float = 0.25,
+                        min_delta_ms: float = 2.0, min_delta_mib: float = 0.5) -> List[str]:
+    """
+    Lists the metrics in `results` that regressed past `baseline`.
+
+    Latency and memory may grow, and throughput may drop, by `tolerance` (a
+    fraction) before counting as a regression. Differences smaller than the
+    absolute minimums are ignored as noise.
+    """
+    regressions = []
+    if results["failures"]:
+        regressions.append(f"{len(results['failures'])} contract(s) failed")
+    for stage, metrics in baseline.get("stages", {}).items():
+        current = results["stages"].get(stage)
+        if current is None:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            limit = max(metrics[metric] * (1 + tolerance), metrics[metric] + min_delta_ms)
+            if current[metric] > limit:
+                regressions.append(f"{stage} {metric}: {current[metric]:.3f} > {limit:.3f} "
+                                   f"(baseline {metrics[metric]:.3f})")
+    for stage, mib in baseline.get("peak_memory_mib", {}).items():
+        current = results["peak_memory_mib"].get(stage)
+        if current is None:
+            continue
+        limit = max(mib * (1 + tolerance), mib + min_delta_mib)
+        if current > limit:
+            regressions.append(f"{stage} peak memory: {current:.3f} MiB > {limit:.3f} MiB (baseline {mib:.3f})")
+    floor = baseline.get("contracts_per_second", 0.0) * (1 - tolerance)
+    if results["contracts_per_second"] < floor:
+        regressions.append(f"contracts_per_second: {results['contracts_per_second']:.3f} < {floor:.3f} "
+                           f"(baseline {baseline['contracts_per_second']:.3f})")
+    return regressions
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the contract analysis tools on a synthetic corpus.")
+    parser.add_argument("--pages", default="1,10,50,200,500", help="Comma-separated page counts")
+    parser.add_argument("--contracts-per-size", type=int, default=2, help="Contracts generated per page count")
+    parser.add_argument("--mix", default=None,
+                        help="Clause mix, e.g. financial=3,penalty=2,boilerplate=1 (default: %s)"
+                             % ",".join(f"{k}={v:g}" for k, v in DEFAULT_CLAUSE_MIX.items()))
+    parser.add_argument("--profile", choices=sorted(LATENCY_PROFILES), default="flash", help="Fake model latency profile")
+    parser.add_argument("--time-scale", type=float, default=0.05, help="Multiplier applied to all fake latencies")
+    parser.add_argument("--repeats", type=int, default=1, help="Passes over the corpus")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the corpus and the fake backend")
+    parser.add_argument("--corpus-dir", default=None, help="Keep the generated PDFs here (default: a temp dir)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--output", default=None, help="Also write the results JSON to this file")
+    args = parser.parse_args(argv)
+
+    page_counts = [int(value) for value in args.pages.split(",") if value.strip()]
+    clause_mix = parse_clause_mix(args.mix) if args.mix else None
+
+    with tempfile.TemporaryDirectory(prefix="contract_bench_") as temp_dir:
+        corpus_dir = args.corpus_dir or temp_dir
+        paths = generate_corpus(corpus_dir, page_counts, args.contracts_per_size, clause_mix, args.seed)
+        results = run_benchmark(paths, args.profile, args.time_scale, args.repeats,
+                                measure_memory=not args.no_memory, seed=args.seed)
+    results["config"]["clause_mix"] = clause_mix or DEFAULT_CLAUSE_MIX
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 1 if results["failures"] else 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one.")
+        return 1 if results["failures"] else 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("config") != results["config"]:
+        print("Baseline was recorded with a different configuration; not comparing. "
+              "Re-record it with --update-baseline.")
+        return 2
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    if not regressions:
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,7 +15,7 @@
 
 import os
 import logging
-from typing import Optional # Changed from | None for broader Python compatibility if needed, though | is fine for 3.10+
+from typing import Dict, List, Optional # Changed from | None for broader Python compatibility if needed, though | is fine for 3.10+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import BaseModel, Field
 
@@ -31,6 +31,160 @@ class AgentModelSettings(BaseModel):
     model: str = Field(default="gemini-2.0-flash-001") # Keeping flash as per example, can be changed
 
 
+class StageModelSettings(BaseModel):
+    """Models and escalation thresholds for one pipeline stage."""
+    fast_model: Optional[str] = Field(default=None) # Tried first; None means agent_settings.model
+    strong_model: Optional[str] = Field(default="gemini-2.5-pro") # Escalation target; None never escalates
+    min_confidence: float = Field(default=0.5) # Escalate below this data_quality_assessment confidence (extraction only)
+    min_completeness: float = Field(default=0.5) # Escalate below this share of output schema fields filled
+
+
+class ModelPrice(BaseModel):
+    """List price of a model, in USD per million tokens."""
+    input_per_million_tokens: float = Field(default=0.0)
+    output_per_million_tokens: float = Field(default=0.0)
+
+
+class ModelRoutingSettings(BaseModel):
+    """Per-stage model routing: a fast model first, a stronger one when its result is not good enough."""
+    enabled: bool = Field(default=True) # False sends every stage to agent_settings.model
+    extraction: StageModelSettings = Field(default_factory=StageModelSettings)
+    breach_detection: StageModelSettings = Field(default_factory=StageModelSettings)
+    penalty_calculation: StageModelSettings = Field(default_factory=StageModelSettings)
+    prices: Dict[str, ModelPrice] = Field(default_factory=lambda: { # Models missing here are recorded at zero cost
+        "gemini-2.0-flash-001": ModelPrice(input_per_million_tokens=0.10, output_per_million_tokens=0.40),
+        "gemini-2.5-pro": ModelPrice(input_per_million_tokens=1.25, output_per_million_tokens=10.0),
+    })
+
+
+class ResultCacheSettings(BaseModel):
+    """On-disk cache for process_contract_document results."""
+    enabled: bool = Field(default=True) # Set to False to always re-run OCR and extraction
+    directory: str = Field(
+        default=os.path.join(os.path.expanduser("~"), ".cache", "legal_contract_analyzer", "results")
+    )
+    max_size_bytes: int = Field(default=512 * 1024 * 1024) # Oldest entries are evicted beyond this
+    max_age_seconds: int = Field(default=30 * 24 * 60 * 60) # Entries older than this are treated as misses
+
+
+class BatchSettings(BaseModel):
+    """Defaults for bulk contract ingestion."""
+    max_workers: Optional[int] = Field(default=None) # PDF reading processes; None means os.cpu_count()
+    max_concurrent_llm_calls: int = Field(default=8) # Extraction requests in flight at once
+
+
+class IngestionSettings(BaseModel):
+    """Controls how contract text is split before extraction."""
+    chunk_token_budget: int = Field(default=8000) # Maximum estimated tokens of contract text per extraction call
+
+
+class AsyncToolSettings(BaseModel):
+    """Limits for the async tool variants served by root_agent."""
+    enabled: bool = Field(default=True) # False registers the synchronous tools on root_agent instead
+    max_concurrent_calls: int = Field(default=64) # Tool calls running at once across all sessions, one thread each
+
+
+class ClauseIndexSettings(BaseModel):
+    """Full-text clause index built from every processed contract."""
+    enabled: bool = Field(default=True)
+    db_path: str = Field(
+        default=os.path.join(os.path.expanduser("~"), ".cache", "legal_contract_analyzer", "clauses.sqlite3")
+    )
+
+
+class DateIndexSettings(BaseModel):
+    """Effective/expiration date index over processed contracts, for portfolio date queries."""
+    enabled: bool = Field(default=True)
+    db_path: str = Field(
+        default=os.path.join(os.path.expanduser("~"), ".cache", "legal_contract_analyzer", "dates.sqlite3")
+    )
+    timezone: str = Field(default="UTC") # Timestamps are indexed as their calendar date in this IANA timezone
+
+
+class NearDuplicateSettings(BaseModel):
+    """MinHash/LSH index for reusing the extraction of templated contracts."""
+    enabled: bool = Field(default=True)
+    db_path: str = Field(
+        default=os.path.join(os.path.expanduser("~"), ".cache", "legal_contract_analyzer", "near_duplicates.sqlite3")
+    )
+    similarity_threshold: float = Field(default=0.8) # Estimated shingle Jaccard similarity needed to reuse an extraction
+    num_permutations: int = Field(default=128) # MinHash signature length; longer is more accurate and slower
+    shingle_words: int = Field(default=5) # Words per shingle
+
+
+class JobQueueSettings(BaseModel):
+    """Durable job queue for analyses that must survive worker crashes and restarts."""
+    db_path: str = Field(
+        default=os.path.join(os.path.expanduser("~"), ".cache", "legal_contract_analyzer", "jobs.sqlite3")
+    )
+    workers: Optional[int] = Field(default=None) # Worker processes; None means os.cpu_count()
+    jobs_per_worker: int = Field(default=4) # Jobs each worker process runs at once, so their model calls overlap
+    max_queued_jobs: int = Field(default=10_000) # Bulk submissions are refused or wait beyond this; interactive ones never
+    max_attempts: int = Field(default=3) # A job that fails this many times stays failed
+    lease_seconds: float = Field(default=600.0) # Workers renew their leases every third of this; a job not renewed for this long is taken back
+    poll_interval_seconds: float = Field(default=0.5) # Idle workers and waiting submitters check the queue this often
+
+
+class AnalyticsStoreSettings(BaseModel):
+    """Columnar, memory-mappable store of analysis results for aggregate queries."""
+    directory: str = Field(
+        default=os.path.join(os.path.expanduser("~"), ".cache", "legal_contract_analyzer", "analytics")
+    )
+    flush_rows: int = Field(default=50_000) # Buffered rows (of any table) written to disk per commit
+
+
+class VersionStoreSettings(BaseModel):
+    """Where prior contract versions are kept for incremental re-analysis."""
+    directory: str = Field(
+        default=os.path.join(os.path.expanduser("~"), ".cache", "legal_contract_analyzer", "versions")
+    )
+
+
+class LLMClientSettings(BaseModel):
+    """Shared HTTP client used for Gemini calls when enabled."""
+    enabled: bool = Field(default=False) # False keeps the offline simulated backend
+    base_url: str = Field(default="https://generativelanguage.googleapis.com")
+    path_template: str = Field(default="/v1beta/models/{model}:generateContent")
+    requests_per_minute: float = Field(default=300) # 0 disables the request limit
+    tokens_per_minute: float = Field(default=1_000_000) # 0 disables the token limit
+    output_token_reserve: int = Field(default=1024) # Output tokens budgeted per request
+    max_retries: int = Field(default=5)
+    backoff_base_seconds: float = Field(default=0.5)
+    backoff_max_seconds: float = Field(default=30.0)
+    pool_size: int = Field(default=16) # Maximum concurrent connections
+    timeout_seconds: float = Field(default=120.0)
+
+
+class LLMResponseSettings(BaseModel):
+    """How model responses are read and validated."""
+    streaming: bool = Field(default=True) # Validate responses while they stream and stop bad ones early
+    max_attempts: int = Field(default=2) # Calls per request when a response is malformed or off-schema
+
+
+class ArtifactStoreSettings(BaseModel):
+    """In-memory, per-session store behind the handles the tools return to the agent."""
+    max_sessions: int = Field(default=1000) # Least recently used sessions are dropped beyond this
+    max_bytes_per_session: int = Field(default=64 * 1024 * 1024)
+    idle_seconds: float = Field(default=4 * 60 * 60) # Sessions unused for this long are dropped
+
+
+class InstrumentationSettings(BaseModel):
+    """Timing spans, counters and per-request traces for the tools."""
+    enabled: bool = Field(default=True) # False turns every span and counter into a no-op
+    trace_history: int = Field(default=100) # Completed request traces kept in memory
+    log_traces: bool = Field(default=False) # Log every completed trace at DEBUG level
+    duration_buckets_seconds: List[float] = Field(
+        default=[0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+    )
+
+
+class BreachRuleSettings(BaseModel):
+    """Where detect_contract_breaches loads its declarative rules from."""
+    rules_file: str = Field(
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "breach_rules.json")
+    )
+
+
 class Config(BaseSettings):
     """Configuration settings for the Legal Contract Analysis agent."""
 
@@ -44,6 +198,22 @@ class Config(BaseSettings):
     )
 
     agent_settings: AgentModelSettings = Field(default_factory=AgentModelSettings)
+    model_routing: ModelRoutingSettings = Field(default_factory=ModelRoutingSettings)
+    result_cache: ResultCacheSettings = Field(default_factory=ResultCacheSettings)
+    batch: BatchSettings = Field(default_factory=BatchSettings)
+    async_tools: AsyncToolSettings = Field(default_factory=AsyncToolSettings)
+    ingestion: IngestionSettings = Field(default_factory=IngestionSettings)
+    breach_rules: BreachRuleSettings = Field(default_factory=BreachRuleSettings)
+    clause_index: ClauseIndexSettings = Field(default_factory=ClauseIndexSettings)
+    date_index: DateIndexSettings = Field(default_factory=DateIndexSettings)
+    near_duplicates: NearDuplicateSettings = Field(default_factory=NearDuplicateSettings)
+    llm_client: LLMClientSettings = Field(default_factory=LLMClientSettings)
+    llm_responses: LLMResponseSettings = Field(default_factory=LLMResponseSettings)
+    version_store: VersionStoreSettings = Field(default_factory=VersionStoreSettings)
+    job_queue: JobQueueSettings = Field(default_factory=JobQueueSettings)
+    analytics_store: AnalyticsStoreSettings = Field(default_factory=AnalyticsStoreSettings)
+    instrumentation: InstrumentationSettings = Field(default_factory=InstrumentationSettings)
+    artifact_store: ArtifactStoreSettings = Field(default_factory=ArtifactStoreSettings)
     app_name: str = "LegalContractAnalysisApp"
 
     # These will be loaded from .env due to env_prefix="GOOGLE_"
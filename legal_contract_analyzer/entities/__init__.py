@@ -1,2 +1,5 @@
 # This file makes the 'entities' directory a Python package.
-# You can define or import Pydantic models for your data structures here later.
\ No newline at end of file
+# It holds the typed records contract data travels in between the tools.
+from .records import BreachFinding, ContractRecord, Party, PenaltyItem
+
+__all__ = ["BreachFinding", "ContractRecord", "Party", "PenaltyItem"]
@@ -0,0 +1,72 @@
+"""Minimal binary encoding helpers shared by the entity records.
+
+Strings are length-prefixed UTF-8 with a LEB128 varint length, optional dates
+are a varint of the proleptic Gregorian ordinal (0 meaning None) and optional
+floats are a presence byte followed by a little-endian double.
+"""
+
+import datetime
+import struct
+from typing import Optional, Tuple
+
+_DOUBLE = struct.Struct("<d")
+
+
+def write_varint(out: bytearray, value: int) -> None:
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, offset
+        shift += 7
+
+
+def write_str(out: bytearray, value: Optional[str]) -> None:
+    encoded = (value or "").encode("utf-8")
+    write_varint(out, len(encoded))
+    out += encoded
+
+
+def read_str(data: bytes, offset: int) -> Tuple[str, int]:
+    length, offset = read_varint(data, offset)
+    end = offset + length
+    return bytes(data[offset:end]).decode("utf-8"), end
+
+
+def write_date(out: bytearray, value: Optional[datetime.date]) -> None:
+    write_varint(out, value.toordinal() if value else 0)
+
+
+def read_date(data: bytes, offset: int) -> Tuple[Optional[datetime.date], int]:
+    ordinal, offset = read_varint(data, offset)
+    return (datetime.date.fromordinal(ordinal) if ordinal else None), offset
+
+
+def write_optional_float(out: bytearray, value: Optional[float]) -> None:
+    if value is None:
+        out.append(0)
+    else:
+        out.append(1)
+        out += _DOUBLE.pack(value)
+
+
+def read_optional_float(data: bytes, offset: int) -> Tuple[Optional[float], int]:
+    present = data[offset]
+    offset += 1
+    if not present:
+        return None, offset
+    return _DOUBLE.unpack_from(data, offset)[0], offset + _DOUBLE.size
@@ -0,0 +1,386 @@
+"""Slotted, typed records for contract data passed between the tools.
+
+The tools' ADK-facing signatures still take and return plain dicts, but every
+tool also accepts these records: `ContractRecord` and `Party` expose a
+read-only mapping interface (`get`, `[]`, `in`, `keys`) over their fields, so
+code written against `structured_data` dicts works on them unchanged.
+
+Dates are stored as `datetime.date`; a date the model returned in a form that
+does not parse as ISO 8601 is kept verbatim in `extra` under its original key.
+Short, highly repeated strings (roles, statuses, governing law) are interned.
+"""
+
+import datetime
+import json
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import _codec
+
+_FORMAT_VERSION = 1
+_DATE_FIELDS = ("effective_date", "expiration_date")
+_TEXT_FIELDS = ("financial_terms", "governing_law", "renewal_terms", "termination_clauses", "penalty_clauses")
+
+
+def _intern(value: Optional[str]) -> str:
+    return sys.intern(value) if value else ""
+
+
+def _to_date(value) -> Optional[datetime.date]:
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.date.fromisoformat(value.strip())
+        except ValueError:
+            return None
+    return None
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+_MISSING = object()
+
+
+class _MappingView:
+    """
+    Read-only dict-style access to a record's non-empty fields.
+
+    Subclasses implement `keys` and `get` over their slots; everything else is
+    built on those two, so no lookup materialises the `to_dict()` form.
+    """
+
+    __slots__ = ()
+
+    def keys(self) -> List[str]:
+        raise NotImplementedError
+
+    def get(self, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(key, self[key]) for key in self.keys()]
+
+
+_PARTY_FIELDS = ("name", "role", "address", "contact")
+
+
+@dataclass(slots=True)
+class Party(_MappingView):
+    """A party to the contract."""
+
+    name: str = ""
+    role: str = ""
+    address: str = ""
+    contact: str = ""
+
+    @classmethod
+    def from_dict(cls, data) -> "Party":
+        if isinstance(data, Party):
+            return data
+        if not isinstance(data, dict):
+            return cls(name=_text(data))
+        return cls(
+            name=_text(data.get("name")),
+            role=_intern(_text(data.get("role"))),
+            address=_text(data.get("address")),
+            contact=_text(data.get("contact")),
+        )
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "role": self.role, "address": self.address, "contact": self.contact}
+
+    def keys(self) -> List[str]:
+        return list(_PARTY_FIELDS)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in _PARTY_FIELDS else default
+
+    def _write(self, out: bytearray) -> None:
+        for value in (self.name, self.role, self.address, self.contact):
+            _codec.write_str(out, value)
+
+    @classmethod
+    def _read(cls, data: bytes, offset: int) -> Tuple["Party", int]:
+        values = []
+        for _ in range(4):
+            value, offset = _codec.read_str(data, offset)
+            values.append(value)
+        return cls(values[0], _intern(values[1]), values[2], values[3]), offset
+
+
+@dataclass(slots=True)
+class ContractRecord(_MappingView):
+    """
+    The structured data extracted from one contract.
+
+    Fields the extraction prompt asks for get typed attributes; anything else
+    the model returns is kept in `extra` so `to_dict()` round-trips.
+    """
+
+    contract_id: str = ""
+    effective_date: Optional[datetime.date] = None
+    expiration_date: Optional[datetime.date] = None
+    parties: Tuple[Party, ...] = ()
+    financial_terms: str = ""
+    governing_law: str = ""
+    renewal_terms: str = ""
+    termination_clauses: str = ""
+    penalty_clauses: str = ""
+    extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, structured_data, contract_id: str = "") -> "ContractRecord":
+        """Builds a record from a `structured_data` dict (or returns an existing record)."""
+        if isinstance(structured_data, ContractRecord):
+            return structured_data
+        data = dict(structured_data or {})
+        extra = {}
+        dates = {}
+        for key in _DATE_FIELDS:
+            raw = data.pop(key, None)
+            dates[key] = _to_date(raw)
+            if dates[key] is None and raw not in (None, ""):
+                extra[key] = raw # Unparseable date; keep what the model said
+        parties = data.pop("parties", None)
+        if isinstance(parties, list):
+            parties = tuple(Party.from_dict(party) for party in parties)
+        elif parties not in (None, "", []):
+            extra["parties"] = parties
+            parties = ()
+        else:
+            parties = ()
+        texts = {}
+        for key in _TEXT_FIELDS:
+            value = data.pop(key, None)
+            if value is None or isinstance(value, str):
+                texts[key] = value or ""
+            else:
+                extra[key] = value # Structured value, e.g. a list of clauses
+                texts[key] = ""
+        texts["governing_law"] = _intern(texts["governing_law"])
+        extra.update(data)
+        return cls(
+            contract_id=contract_id,
+            effective_date=dates["effective_date"],
+            expiration_date=dates["expiration_date"],
+            parties=parties,
+            extra=extra or None,
+            **texts,
+        )
+
+    def keys(self) -> List[str]:
+        """The keys of `to_dict()`, in the same order, without building it."""
+        keys = [key for key in _DATE_FIELDS if getattr(self, key)]
+        if self.parties:
+            keys.append("parties")
+        keys.extend(key for key in _TEXT_FIELDS if getattr(self, key))
+        if self.extra:
+            keys.extend(key for key in self.extra if key not in keys)
+        return keys
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """dict.get over the `structured_data` view without building the whole dict."""
+        if key in _DATE_FIELDS:
+            value = getattr(self, key)
+            if value:
+                return value.isoformat()
+        elif key == "parties":
+            if self.parties:
+                return list(self.parties)
+        elif key in _TEXT_FIELDS:
+            value = getattr(self, key)
+            if value:
+                return value
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        return default
+
+    def to_dict(self) -> dict:
+        """Returns the record as a `structured_data` dict, omitting empty fields."""
+        result: Dict[str, Any] = {}
+        if self.effective_date:
+            result["effective_date"] = self.effective_date.isoformat()
+        if self.expiration_date:
+            result["expiration_date"] = self.expiration_date.isoformat()
+        if self.parties:
+            result["parties"] = [party.to_dict() for party in self.parties]
+        for key in _TEXT_FIELDS:
+            value = getattr(self, key)
+            if value:
+                result[key] = value
+        if self.extra:
+            for key, value in self.extra.items():
+                result.setdefault(key, value)
+        return result
+
+    def to_bytes(self) -> bytes:
+        """Encodes the record in a compact binary form; see `from_bytes`."""
+        out = bytearray((_FORMAT_VERSION,))
+        _codec.write_str(out, self.contract_id)
+        _codec.write_date(out, self.effective_date)
+        _codec.write_date(out, self.expiration_date)
+        _codec.write_varint(out, len(self.parties))
+        for party in self.parties:
+            party._write(out)
+        for key in _TEXT_FIELDS:
+            _codec.write_str(out, getattr(self, key))
+        _codec.write_str(out, json.dumps(self.extra, separators=(",", ":"), default=str) if self.extra else "")
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ContractRecord":
+        if not data or data[0] != _FORMAT_VERSION:
+            raise ValueError("Unsupported ContractRecord encoding")
+        offset = 1
+        contract_id, offset = _codec.read_str(data, offset)
+        effective_date, offset = _codec.read_date(data, offset)
+        expiration_date, offset = _codec.read_date(data, offset)
+        count, offset = _codec.read_varint(data, offset)
+        parties = []
+        for _ in range(count):
+            party, offset = Party._read(data, offset)
+            parties.append(party)
+        texts = []
+        for _ in range(5):
+            value, offset = _codec.read_str(data, offset)
+            texts.append(value)
+        extra, offset = _codec.read_str(data, offset)
+        return cls(
+            contract_id=contract_id,
+            effective_date=effective_date,
+            expiration_date=expiration_date,
+            parties=tuple(parties),
+            financial_terms=texts[0],
+            governing_law=_intern(texts[1]),
+            renewal_terms=texts[2],
+            termination_clauses=texts[3],
+            penalty_clauses=texts[4],
+            extra=json.loads(extra) if extra else None,
+        )
+
+
+@dataclass(slots=True)
+class BreachFinding:
+    """One entry of a breach report."""
+
+    rule_id: str
+    rule_description: str = ""
+    status: str = ""
+    details: str = ""
+
+    @classmethod
+    def from_dict(cls, data) -> "BreachFinding":
+        if isinstance(data, BreachFinding):
+            return data
+        return cls(
+            rule_id=_intern(_text(data.get("rule_id"))),
+            rule_description=_intern(_text(data.get("rule_description"))),
+            status=_intern(_text(data.get("status"))),
+            details=_text(data.get("details")),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "rule_id": self.rule_id,
+            "rule_description": self.rule_description,
+            "status": self.status,
+            "details": self.details,
+        }
+
+    def to_bytes(self) -> bytes:
+        out = bytearray((_FORMAT_VERSION,))
+        for value in (self.rule_id, self.rule_description, self.status, self.details):
+            _codec.write_str(out, value)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BreachFinding":
+        if not data or data[0] != _FORMAT_VERSION:
+            raise ValueError("Unsupported BreachFinding encoding")
+        offset = 1
+        values = []
+        for _ in range(4):
+            value, offset = _codec.read_str(data, offset)
+            values.append(value)
+        return cls(_intern(values[0]), _intern(values[1]), _intern(values[2]), values[3])
+
+
+@dataclass(slots=True)
+class PenaltyItem:
+    """One entry of a penalty summary."""
+
+    breach_type_or_clause: str = ""
+    penalty_description: str = ""
+    calculated_amount_formula: str = ""
+    conditions_for_penalty: str = ""
+    notes: str = ""
+    calculated_amount: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data) -> "PenaltyItem":
+        if isinstance(data, PenaltyItem):
+            return data
+        amount = data.get("calculated_amount")
+        return cls(
+            breach_type_or_clause=_intern(_text(data.get("breach_type_or_clause"))),
+            penalty_description=_text(data.get("penalty_description")),
+            calculated_amount_formula=_intern(_text(data.get("calculated_amount_formula"))),
+            conditions_for_penalty=_text(data.get("conditions_for_penalty")),
+            notes=_text(data.get("notes")),
+            calculated_amount=float(amount) if isinstance(amount, (int, float)) else None,
+        )
+
+    def to_dict(self) -> dict:
+        result = {
+            "breach_type_or_clause": self.breach_type_or_clause,
+            "penalty_description": self.penalty_description,
+            "calculated_amount_formula": self.calculated_amount_formula,
+            "conditions_for_penalty": self.conditions_for_penalty,
+            "notes": self.notes,
+        }
+        if self.calculated_amount is not None:
+            result["calculated_amount"] = self.calculated_amount
+        return result
+
+    def to_bytes(self) -> bytes:
+        out = bytearray((_FORMAT_VERSION,))
+        for value in (self.breach_type_or_clause, self.penalty_description, self.calculated_amount_formula,
+                      self.conditions_for_penalty, self.notes):
+            _codec.write_str(out, value)
+        _codec.write_optional_float(out, self.calculated_amount)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "PenaltyItem":
+        if not data or data[0] != _FORMAT_VERSION:
+            raise ValueError("Unsupported PenaltyItem encoding")
+        offset = 1
+        values = []
+        for _ in range(5):
+            value, offset = _codec.read_str(data, offset)
+            values.append(value)
+        amount, offset = _codec.read_optional_float(data, offset)
+        return cls(_intern(values[0]), values[1], _intern(values[2]), values[3], values[4], amount)
@@ -1,11 +1,347 @@
-# This file will store complex or reusable prompts for LLM interactions.
+# This file stores the prompts the tools send to the LLM, as a registry of
+# versioned, precompiled templates.
+#
+# Every template is split into a fixed instruction prefix and a variable
+# suffix. The prefix never contains contract data, so consecutive calls share
+# a byte-identical leading segment and model-side context/prefix caching can
+# reuse it. Structured data in the suffix is serialized with `compact_json`,
+# which is deterministic and has no indentation.
+#
+# Usage:
+#     from ..prompts import EXTRACTION_PROMPT
+#     prompt = EXTRACTION_PROMPT.render(chunk_note="", contract_text=text)
 
-# Example structure for a prompt:
-# PROCESS_CONTRACT_PROMPT = """
-# Given the following contract text:
-# {contract_text}
-# Please extract the following key data points:
-# ...
-# """
+import json
+import string
+import textwrap
+import threading
+from typing import Dict, List, Optional, Tuple
 
-# You can then import these prompts into your tools.py file.
\ No newline at end of file
+# Rough characters-per-token ratio for English legal text with Gemini tokenizers.
+# Used for local budgeting only; it errs on the side of overestimating.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of model tokens in `text` without calling the model."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _json_default(value):
+    # Entity records serialize as their dict form; dates and anything else as str.
+    to_dict = getattr(value, "to_dict", None)
+    return to_dict() if to_dict is not None else str(value)
+
+
+def compact_json(value) -> str:
+    """Serializes `value` deterministically with no insignificant whitespace."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_json_default)
+
+
+class PromptSizeStats:
+    """Thread-safe running totals of rendered prompt sizes, per template."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, int]] = {}
+
+    def record(self, template: "PromptTemplate", variable_text_length: int) -> None:
+        variable_tokens = (variable_text_length + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+        with self._lock:
+            totals = self._totals.setdefault(template.name, {"calls": 0, "variable_tokens": 0})
+            totals["calls"] += 1
+            totals["variable_tokens"] += variable_tokens
+
+    def report(self) -> Dict[str, dict]:
+        """
+        Returns per-template prompt sizes in estimated tokens.
+
+        `prefix_tokens` is the fixed, cacheable instruction segment sent with every
+        call; `avg_variable_tokens` is the contract-specific part. The share of
+        input tokens eligible for prefix caching is `cacheable_ratio`.
+        """
+        with self._lock:
+            snapshot = {name: dict(totals) for name, totals in self._totals.items()}
+        report = {}
+        for name, totals in snapshot.items():
+            template = PROMPT_REGISTRY[name]
+            calls = totals["calls"]
+            total_tokens = calls * template.prefix_tokens + totals["variable_tokens"]
+            report[name] = {
+                "version": template.version,
+                "calls": calls,
+                "prefix_tokens": template.prefix_tokens,
+                "avg_variable_tokens": totals["variable_tokens"] / calls if calls else 0.0,
+                "avg_total_tokens": total_tokens / calls if calls else 0.0,
+                "total_tokens": total_tokens,
+                "cacheable_ratio": (calls * template.prefix_tokens) / total_tokens if total_tokens else 0.0,
+            }
+        return report
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+
+PROMPT_STATS = PromptSizeStats()
+
+
+class PromptTemplate:
+    """
+    A versioned prompt: fixed instruction prefix plus a variable suffix.
+
+    The suffix is a `str.format`-style template parsed once at construction.
+    Dict and list values are serialized with `compact_json` when rendered.
+
+    Args:
+        name (str): Registry key; the name of the tool that sends the prompt.
+        version (str): Bump whenever the wording changes in a way that affects output.
+        prefix (str): Fixed instructions. Must not contain any replacement fields.
+        suffix (str): Variable part, e.g. "Contract Text:\\n{contract_text}".
+        output_schema (dict, optional): Schema the response must match, in the subset
+            of JSON Schema understood by shared_libraries.json_stream.
+    """
+
+    __slots__ = ("name", "version", "prefix", "prefix_tokens", "fields", "output_schema", "_pieces")
+
+    def __init__(self, name: str, version: str, prefix: str, suffix: str, output_schema: Optional[dict] = None):
+        self.name = name
+        self.version = version
+        self.output_schema = output_schema
+        self.prefix = textwrap.dedent(prefix).strip() + "\n\n"
+        self.prefix_tokens = estimate_tokens(self.prefix)
+        pieces: List[Tuple[str, Optional[str]]] = []
+        for literal, field, format_spec, conversion in string.Formatter().parse(textwrap.dedent(suffix).strip()):
+            if format_spec or conversion:
+                raise ValueError(f"Prompt {name}: format specs and conversions are not supported")
+            pieces.append((literal, field))
+        self._pieces = tuple(pieces)
+        self.fields = frozenset(field for _, field in pieces if field)
+
+    def _variable_text(self, variables: dict) -> str:
+        parts = []
+        for literal, field in self._pieces:
+            parts.append(literal)
+            if field:
+                value = variables[field]
+                parts.append(value if isinstance(value, str) else compact_json(value))
+        return "".join(parts)
+
+    def render(self, **variables) -> str:
+        """Renders the prompt. Raises KeyError if a field is missing."""
+        variable_text = self._variable_text(variables)
+        PROMPT_STATS.record(self, len(variable_text))
+        return self.prefix + variable_text
+
+    def token_estimate(self, **variables) -> int:
+        """Estimates the tokens of the rendered prompt without rendering it or recording it in PROMPT_STATS."""
+        return self.prefix_tokens + estimate_tokens(self._variable_text(variables))
+
+
+PROMPT_REGISTRY: Dict[str, PromptTemplate] = {}
+
+
+def register_prompt(template: PromptTemplate) -> PromptTemplate:
+    """Adds a template to the registry. Names must be unique."""
+    if template.name in PROMPT_REGISTRY:
+        raise ValueError(f"Prompt {template.name} is already registered")
+    PROMPT_REGISTRY[template.name] = template
+    return template
+
+
+def get_prompt(name: str) -> PromptTemplate:
+    return PROMPT_REGISTRY[name]
+
+
+_TEXT = {"type": ["string", "null"]}
+# Free-text contract terms; models sometimes itemize them as lists or objects.
+_ANY_TEXT = {"type": ["string", "array", "object", "null"]}
+
+EXTRACTION_OUTPUT_SCHEMA = {
+    "type": "object",
+    "required": ["structured_data"],
+    "properties": {
+        "structured_data": {
+            "type": "object",
+            "properties": {
+                "effective_date": _TEXT,
+                "expiration_date": _TEXT,
+                "parties": {
+                    "type": ["array", "null"],
+                    "items": {
+                        "type": "object",
+                        "properties": {"name": _TEXT, "role": _TEXT, "address": _TEXT, "contact": _TEXT},
+                    },
+                },
+                "financial_terms": _ANY_TEXT,
+                "governing_law": _ANY_TEXT,
+                "renewal_terms": _ANY_TEXT,
+                "termination_clauses": _ANY_TEXT,
+                "penalty_clauses": _ANY_TEXT,
+            },
+        },
+        "data_quality_assessment": _TEXT,
+        "summary": _TEXT,
+    },
+}
+
+BREACH_OUTPUT_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "required": ["rule_id", "status"],
+        "properties": {
+            "rule_id": {"type": "string"},
+            "rule_description": _TEXT,
+            "status": {"type": "string", "enum": ["Met", "Not Met", "Insufficient Data"]},
+            "details": _TEXT,
+        },
+    },
+}
+
+PENALTY_OUTPUT_SCHEMA = {
+    "type": "object",
+    "required": ["penalty_summary"],
+    "properties": {
+        "penalty_summary": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "breach_type_or_clause": _TEXT,
+                    "penalty_description": _TEXT,
+                    "calculated_amount_formula": _TEXT,
+                    "conditions_for_penalty": _TEXT,
+                    "notes": _TEXT,
+                },
+            },
+        },
+        "overall_notes": _TEXT,
+    },
+}
+
+EXTRACTION_PROMPT = register_prompt(PromptTemplate(
+    name="process_contract_document",
+    version="4",
+    prefix="""
+    Given the contract text at the end of this prompt, please extract the specified key data points
+    and provide a concise summary. Also, assess the quality of the data extraction.
+    The text may be one part of a longer contract; extract only what this part states.
+
+    Key Data Points to Extract:
+    - Effective Date:
+    - Expiration Date:
+    - Involved Parties (Names, Roles, Addresses, Contacts):
+    - Financial Amounts/Terms:
+    - Specific Conditions:
+    - Renewal Terms:
+    - Termination Clauses:
+    - Penalty Clauses:
+    - Non-compliance Mentions:
+    - Governing Law:
+    - Any other significant clauses or terms.
+
+    Data Quality Assessment:
+    Please provide a brief assessment of how completely and accurately you were able to
+    extract the requested data points. Note any ambiguities or missing information.
+
+    Summary:
+    Provide a concise summary of the contract's main purpose and key terms.
+
+    Output Format (JSON-like):
+    {
+      "structured_data": {
+        "effective_date": "YYYY-MM-DD",
+        "expiration_date": "YYYY-MM-DD",
+        "parties": [{ "name": "", "role": "", "address": "", "contact": "" }],
+        "financial_terms": "",
+        "governing_law": "",
+        "renewal_terms": "",
+        "termination_clauses": "",
+        "penalty_clauses": ""
+      },
+      "data_quality_assessment": "...",
+      "summary": "..."
+    }
+    """,
+    suffix="""
+    Contract Text{chunk_note}:
+    {contract_text}
+    """,
+    output_schema=EXTRACTION_OUTPUT_SCHEMA,
+))
+
+BREACH_PROMPT = register_prompt(PromptTemplate(
+    name="detect_contract_breaches",
+    version="2",
+    prefix="""
+    Given the extracted contract data and the breach detection rules at the end of this prompt,
+    which could not be decided from the structured fields alone, please analyze the contract
+    data against each rule and report whether the condition is:
+    - "Met": The rule is satisfied by the contract data.
+    - "Not Met": The rule is not satisfied, indicating a potential breach or missing information.
+    - "Insufficient Data": The contract data does not provide enough information to determine compliance with the rule.
+
+    For each rule, provide a brief 'details' string explaining your finding.
+
+    Output Format (JSON-like list of rule analyses):
+    [
+      {
+        "rule_id": "expiration_date_exists",
+        "rule_description": "Contract must have an expiration date.",
+        "status": "Met/Not Met/Insufficient Data",
+        "details": "..."
+      },
+      // ... analysis for other rules
+    ]
+    """,
+    suffix="""
+    Rules for breach detection:
+    {breach_rules}
+
+    Extracted contract data:
+    {extracted_contract_data}
+    """,
+    output_schema=BREACH_OUTPUT_SCHEMA,
+))
+
+PENALTY_PROMPT = register_prompt(PromptTemplate(
+    name="calculate_contract_penalties",
+    version="2",
+    prefix="""
+    Given the extracted contract data and optional breach report at the end of this prompt,
+    please review the contract data, especially any clauses related to penalties, late fees,
+    or consequences for non-compliance. If a breach report is provided, focus on penalties
+    related to those identified breaches.
+
+    Identify and, if possible, quantify any penalty amounts or calculation formulas described.
+    If direct calculation isn't possible from the provided text, describe the nature of the
+    penalties and any conditions mentioned for their application. Write each formula as an
+    arithmetic expression over named variables such as monthly_amount, contract_value or days_late.
+
+    Output Format (JSON-like):
+    {
+      "penalty_summary": [ // Could be a list if multiple penalties are found
+        {
+          "breach_type_or_clause": "e.g., Late Delivery, Confidentiality Breach",
+          "penalty_description": "e.g., 1% of contract value per day of delay",
+          "calculated_amount_formula": "e.g., 0.01 * contract_value * days_late",
+          "conditions_for_penalty": "e.g., If delay exceeds 5 business days",
+          "notes": "e.g., Ambiguity in clause X, requires legal interpretation"
+        }
+      ],
+      "overall_notes": "Any general observations about penalties in the contract."
+    }
+    """,
+    suffix="""
+    Extracted contract data:
+    {extracted_contract_data}
+
+    Breach report:
+    {breach_report}
+    """,
+    output_schema=PENALTY_OUTPUT_SCHEMA,
+))
+
+# Part of the result cache key, so stale extractions are not reused after a prompt change.
+EXTRACTION_PROMPT_VERSION = EXTRACTION_PROMPT.version
@@ -0,0 +1,464 @@
+"""Columnar on-disk store of analysis results, scanned with NumPy through memory maps.
+
+Three tables are kept, one row per:
+
+- contracts: a contract's structured_data;
+- findings: a breach_report entry;
+- penalties: a penalty_summary item.
+
+Each column is its own file under <directory>/<table>/, one fixed-width value
+per row:
+
+- Strings are dictionary-encoded: uint32 codes in <column>.bin. Each distinct
+  value is stored once, UTF-8, in <column>.dict, with its end offset in
+  <column>.dict_offsets.
+- Dates are int32 proleptic ordinals, with 0 for a missing date.
+- Amounts are float64, with NaN for a missing amount.
+
+Writes are incremental. `AnalyticsWriter` buffers rows and appends them to
+the column files, then commits the new row counts by atomically replacing
+_meta.json. Readers only look at committed rows, so they can read while a
+writer appends. A writer that crashes leaves at most an uncommitted tail,
+which the next writer truncates. Only one writer can be open at a time.
+
+    with AnalyticsWriter(directory) as writer:
+        writer.add(contract_id, structured_data, breach_report, penalty_summary)
+
+    store = AnalyticsStore(directory)
+    findings = store.table("findings")
+    failing = findings["rule_id"].equals("termination_clauses_included") & findings["status"].equals("Not Met")
+    contracts = np.unique(findings["contract_id"].codes[failing]).size
+
+A reader opens in constant time. A column is memory-mapped when first
+accessed, and a dictionary is decoded only when a value has to be looked up
+or returned.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from ..config import settings
+from ..entities.records import BreachFinding, ContractRecord, PenaltyItem
+from .rule_engine import NOT_MET
+
+try:
+    import fcntl
+except ImportError: # Windows: the single-writer rule is not enforced
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_FORMAT_VERSION = 1
+_META_FILE = "_meta.json"
+_LOCK_FILE = "_writer.lock"
+
+STRING = "string"
+DATE = "date"
+INT = "int32"
+FLOAT = "float64"
+
+_DTYPES = {STRING: np.dtype("<u4"), DATE: np.dtype("<i4"), INT: np.dtype("<i4"), FLOAT: np.dtype("<f8")}
+_OFFSET_DTYPE = np.dtype("<u8")
+_EPOCH_ORDINAL = 719163 # datetime.date(1970, 1, 1).toordinal()
+
+TABLES: Dict[str, Sequence[tuple]] = {
+    "contracts": (
+        ("contract_id", STRING),
+        ("effective_date", DATE),
+        ("expiration_date", DATE),
+        ("governing_law", STRING),
+        ("financial_terms", STRING),
+        ("renewal_terms", STRING),
+        ("termination_clauses", STRING),
+        ("penalty_clauses", STRING),
+        ("party_names", STRING), # "; "-joined
+        ("party_count", INT),
+        ("analyzed_at", FLOAT), # Unix time the row was added
+    ),
+    "findings": (
+        ("contract_id", STRING),
+        ("rule_id", STRING),
+        ("rule_description", STRING),
+        ("status", STRING),
+        ("details", STRING),
+    ),
+    "penalties": (
+        ("contract_id", STRING),
+        ("breach_type_or_clause", STRING),
+        ("penalty_description", STRING),
+        ("calculated_amount_formula", STRING),
+        ("conditions_for_penalty", STRING),
+        ("notes", STRING),
+        ("calculated_amount", FLOAT),
+    ),
+}
+
+
+def ordinals_to_datetime64(ordinals: np.ndarray) -> np.ndarray:
+    """Converts a date column to datetime64[D], with NaT for missing dates."""
+    days = np.asarray(ordinals, dtype=np.int64) - _EPOCH_ORDINAL
+    dates = days.astype("datetime64[D]")
+    dates[np.asarray(ordinals) == 0] = np.datetime64("NaT")
+    return dates
+
+
+def _empty_meta() -> dict:
+    return {
+        "format_version": _FORMAT_VERSION,
+        "tables": {
+            table: {
+                "rows": 0,
+                "dictionaries": {name: {"size": 0, "bytes": 0} for name, kind in columns if kind == STRING},
+            }
+            for table, columns in TABLES.items()
+        },
+        "cursors": {},
+    }
+
+
+def _read_meta(directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, _META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return _empty_meta()
+    if meta.get("format_version") != _FORMAT_VERSION:
+        raise ValueError(f"Unsupported analytics store format in {directory}: {meta.get('format_version')}")
+    return meta
+
+
+def _column_path(directory: str, table: str, column: str, suffix: str = ".bin") -> str:
+    return os.path.join(directory, table, column + suffix)
+
+
+def _map(path: str, dtype: np.dtype, length: int) -> np.ndarray:
+    if length == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(length,))
+
+
+def _decode_dictionary(directory: str, table: str, column: str, size: int, byte_count: int) -> List[str]:
+    if size == 0:
+        return []
+    offsets = np.fromfile(_column_path(directory, table, column, ".dict_offsets"), dtype=_OFFSET_DTYPE, count=size)
+    with open(_column_path(directory, table, column, ".dict"), "rb") as f:
+        blob = f.read(byte_count)
+    starts = [0] + offsets[:-1].tolist()
+    return [blob[start:end].decode("utf-8") for start, end in zip(starts, offsets.tolist())]
+
+
+class AnalyticsWriter:
+    """
+    Appends analysis results to the store at `directory`, committing every `flush_rows` buffered rows.
+
+    Holds an exclusive lock on the store until closed.
+    """
+
+    def __init__(self, directory: Optional[str] = None, flush_rows: Optional[int] = None):
+        self.directory = directory or settings.analytics_store.directory
+        self.flush_rows = flush_rows or settings.analytics_store.flush_rows
+        for table in TABLES:
+            os.makedirs(os.path.join(self.directory, table), exist_ok=True)
+        self._lock_file = open(os.path.join(self.directory, _LOCK_FILE), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._lock_file.close()
+                raise RuntimeError(f"Another writer has the analytics store at {self.directory} open.")
+        self._meta = _read_meta(self.directory)
+        self._truncate_uncommitted()
+        self._lookups: Dict[tuple, Dict[str, int]] = {}
+        self._buffers = {table: {name: [] for name, _ in columns} for table, columns in TABLES.items()}
+        self._buffered = 0
+
+    def _truncate_uncommitted(self) -> None:
+        """Drops whatever a crashed writer appended after the last commit."""
+        for table, columns in TABLES.items():
+            state = self._meta["tables"][table]
+            for name, kind in columns:
+                path = _column_path(self.directory, table, name)
+                with open(path, "ab") as f:
+                    f.truncate(state["rows"] * _DTYPES[kind].itemsize)
+                if kind == STRING:
+                    dictionary = state["dictionaries"][name]
+                    with open(_column_path(self.directory, table, name, ".dict"), "ab") as f:
+                        f.truncate(dictionary["bytes"])
+                    with open(_column_path(self.directory, table, name, ".dict_offsets"), "ab") as f:
+                        f.truncate(dictionary["size"] * _OFFSET_DTYPE.itemsize)
+
+    def _lookup(self, table: str, column: str) -> Dict[str, int]:
+        lookup = self._lookups.get((table, column))
+        if lookup is None:
+            dictionary = self._meta["tables"][table]["dictionaries"][column]
+            values = _decode_dictionary(self.directory, table, column, dictionary["size"], dictionary["bytes"])
+            lookup = self._lookups[(table, column)] = {value: code for code, value in enumerate(values)}
+        return lookup
+
+    @property
+    def cursors(self) -> Dict[str, object]:
+        """Positions committed with flush(cursors=...), e.g. the last exported job id."""
+        return dict(self._meta["cursors"])
+
+    def add(self, contract_id: str, structured_data, breach_report: Optional[Iterable] = None,
+            penalty_summary=None) -> None:
+        """
+        Buffers one analysed contract.
+
+        Args:
+            contract_id (str): Key shared by the contract's rows, e.g. the PDF path.
+            structured_data: process_contract_document's structured_data, or a ContractRecord.
+            breach_report (list, optional): breach_report entries, or BreachFinding records.
+            penalty_summary (optional): calculate_contract_penalties' penalty_summary (the dict
+                holding a "penalty_summary" list), the list itself, or PenaltyItem records.
+        """
+        record = ContractRecord.from_dict(structured_data or {}, contract_id=contract_id)
+        contracts = self._buffers["contracts"]
+        contracts["contract_id"].append(contract_id)
+        contracts["effective_date"].append(record.effective_date.toordinal() if record.effective_date else 0)
+        contracts["expiration_date"].append(record.expiration_date.toordinal() if record.expiration_date else 0)
+        for name in ("governing_law", "financial_terms", "renewal_terms", "termination_clauses", "penalty_clauses"):
+            contracts[name].append(getattr(record, name))
+        contracts["party_names"].append("; ".join(party.name for party in record.parties if party.name))
+        contracts["party_count"].append(len(record.parties))
+        contracts["analyzed_at"].append(time.time())
+        added = 1
+
+        findings = self._buffers["findings"]
+        for entry in breach_report or ():
+            finding = BreachFinding.from_dict(entry)
+            findings["contract_id"].append(contract_id)
+            findings["rule_id"].append(finding.rule_id)
+            findings["rule_description"].append(finding.rule_description)
+            findings["status"].append(finding.status)
+            findings["details"].append(finding.details)
+            added += 1
+
+        if isinstance(penalty_summary, dict):
+            penalty_summary = penalty_summary.get("penalty_summary")
+        penalties = self._buffers["penalties"]
+        for entry in penalty_summary or ():
+            item = PenaltyItem.from_dict(entry)
+            penalties["contract_id"].append(contract_id)
+            for name in ("breach_type_or_clause", "penalty_description", "calculated_amount_formula",
+                         "conditions_for_penalty", "notes"):
+                penalties[name].append(getattr(item, name))
+            penalties["calculated_amount"].append(np.nan if item.calculated_amount is None else item.calculated_amount)
+            added += 1
+
+        self._buffered += added
+        if self._buffered >= self.flush_rows:
+            self.flush()
+
+    def flush(self, cursors: Optional[Dict[str, object]] = None) -> None:
+        """Appends the buffered rows and commits them, with `cursors` if given, in one step."""
+        for table, columns in TABLES.items():
+            buffers = self._buffers[table]
+            rows = len(buffers[columns[0][0]])
+            if not rows:
+                continue
+            state = self._meta["tables"][table]
+            for name, kind in columns:
+                values = buffers[name]
+                if kind == STRING:
+                    values = self._append_dictionary(table, name, values, state["dictionaries"][name])
+                with open(_column_path(self.directory, table, name), "ab") as f:
+                    np.asarray(values, dtype=_DTYPES[kind]).tofile(f)
+                buffers[name] = []
+            state["rows"] += rows
+        if cursors:
+            self._meta["cursors"].update(cursors)
+        self._commit()
+        self._buffered = 0
+
+    def _append_dictionary(self, table: str, column: str, values: List[str], dictionary: dict) -> np.ndarray:
+        """Returns the codes of `values`, appending the values not seen before to the column's dictionary."""
+        lookup = self._lookup(table, column)
+        codes = np.empty(len(values), dtype=_DTYPES[STRING])
+        new_values = []
+        for position, value in enumerate(values):
+            size = len(lookup)
+            code = codes[position] = lookup.setdefault(value, size)
+            if code == size:
+                new_values.append(value.encode("utf-8"))
+        if new_values:
+            ends = dictionary["bytes"] + np.cumsum([len(value) for value in new_values], dtype=_OFFSET_DTYPE)
+            with open(_column_path(self.directory, table, column, ".dict"), "ab") as f:
+                f.write(b"".join(new_values))
+            with open(_column_path(self.directory, table, column, ".dict_offsets"), "ab") as f:
+                ends.tofile(f)
+            dictionary["size"] += len(new_values)
+            dictionary["bytes"] = int(ends[-1])
+        return codes
+
+    def _commit(self) -> None:
+        path = os.path.join(self.directory, _META_FILE)
+        temporary = path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self._meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+
+    def close(self) -> None:
+        if self._lock_file.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._lock_file.close() # Releases the lock
+
+    def __enter__(self) -> "AnalyticsWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.close()
+        return False
+
+
+class DictionaryColumn:
+    """A dictionary-encoded string column: `codes` is a uint32 array indexing `values`."""
+
+    def __init__(self, codes: np.ndarray, load_values):
+        self.codes = codes
+        self._load_values = load_values
+        self._values: Optional[List[str]] = None
+        self._lookup: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def values(self) -> List[str]:
+        """The distinct values, in code order."""
+        if self._values is None:
+            self._values = self._load_values()
+        return self._values
+
+    def code(self, value: str) -> int:
+        """The code of `value`, or -1 if it never occurs."""
+        if self._lookup is None:
+            self._lookup = {item: code for code, item in enumerate(self.values)}
+        return self._lookup.get(value, -1)
+
+    def equals(self, value: str) -> np.ndarray:
+        """Boolean mask of the rows equal to `value`."""
+        code = self.code(value)
+        if code < 0:
+            return np.zeros(len(self.codes), dtype=bool)
+        return self.codes == code
+
+    def isin(self, values: Iterable[str]) -> np.ndarray:
+        """Boolean mask of the rows equal to any of `values`."""
+        codes = [code for code in (self.code(value) for value in values) if code >= 0]
+        return np.isin(self.codes, np.asarray(codes, dtype=self.codes.dtype))
+
+    def decode(self, codes: Iterable[int]) -> List[str]:
+        values = self.values
+        return [values[code] for code in codes]
+
+    def value_counts(self, where: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """Rows per value, optionally only among the rows selected by the mask `where`."""
+        codes = self.codes if where is None else self.codes[where]
+        counts = np.bincount(codes, minlength=0)
+        present = np.flatnonzero(counts)
+        return dict(zip(self.decode(present), counts[present].tolist()))
+
+
+class AnalyticsTable:
+    """One table of a store snapshot. Columns are memory-mapped on first access."""
+
+    def __init__(self, directory: str, name: str, state: dict):
+        self.directory = directory
+        self.name = name
+        self.kinds = dict(TABLES[name])
+        self._rows = state["rows"]
+        self._dictionaries = state["dictionaries"]
+        self._columns = {}
+
+    def __len__(self) -> int:
+        return self._rows
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.kinds)
+
+    def __getitem__(self, column: str):
+        """A DictionaryColumn for strings; a NumPy array (memory-mapped) otherwise."""
+        loaded = self._columns.get(column)
+        if loaded is None:
+            kind = self.kinds[column] # KeyError for unknown columns
+            data = _map(_column_path(self.directory, self.name, column), _DTYPES[kind], self._rows)
+            if kind == STRING:
+                dictionary = self._dictionaries[column]
+                data = DictionaryColumn(data, lambda: _decode_dictionary(
+                    self.directory, self.name, column, dictionary["size"], dictionary["bytes"]
+                ))
+            loaded = self._columns[column] = data
+        return loaded
+
+    def rows(self, where: Optional[np.ndarray] = None, limit: Optional[int] = None) -> List[dict]:
+        """Materialises rows as dicts: all of them, or those selected by a mask or index array."""
+        indexes = np.arange(self._rows) if where is None else np.asarray(where)
+        if indexes.dtype == bool:
+            indexes = np.flatnonzero(indexes)
+        indexes = indexes[:limit]
+        columns = {}
+        for column, kind in self.kinds.items():
+            data = self[column]
+            if kind == STRING:
+                columns[column] = data.decode(data.codes[indexes].tolist())
+            elif kind == DATE:
+                columns[column] = [str(value) if value == value else None
+                                   for value in ordinals_to_datetime64(data[indexes])]
+            else:
+                columns[column] = data[indexes].tolist()
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+class AnalyticsStore:
+    """
+    Read-only snapshot of the store at `directory`, as of the last commit before it was opened.
+
+    Open a new one to see rows written since.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or settings.analytics_store.directory
+        meta = _read_meta(self.directory)
+        self.cursors = meta["cursors"]
+        self._tables = {name: AnalyticsTable(self.directory, name, state) for name, state in meta["tables"].items()}
+
+    def table(self, name: str) -> AnalyticsTable:
+        return self._tables[name]
+
+    def contracts_by_rule(self, status: str = NOT_MET) -> Dict[str, int]:
+        """Distinct contracts per rule with a finding in `status`, e.g. how many contracts fail each rule."""
+        findings = self.table("findings")
+        mask = findings["status"].equals(status)
+        rule_codes = findings["rule_id"].codes[mask].astype(np.uint64)
+        contract_codes = findings["contract_id"].codes[mask].astype(np.uint64)
+        pairs = np.unique((rule_codes << np.uint64(32)) | contract_codes)
+        counts = np.bincount((pairs >> np.uint64(32)).astype(np.int64))
+        present = np.flatnonzero(counts)
+        return dict(zip(findings["rule_id"].decode(present), counts[present].tolist()))
+
+    def penalty_totals(self) -> Dict[str, dict]:
+        """Per breach type: penalty items, items with a calculated amount, and the sum of those amounts."""
+        penalties = self.table("penalties")
+        codes = penalties["breach_type_or_clause"].codes
+        amounts = np.asarray(penalties["calculated_amount"])
+        known = ~np.isnan(amounts)
+        items = np.bincount(codes)
+        calculated = np.bincount(codes[known], minlength=len(items))
+        totals = np.bincount(codes[known], weights=amounts[known], minlength=len(items))
+        present = np.flatnonzero(items)
+        return {
+            breach_type: {"items": int(items[code]), "calculated": int(calculated[code]), "total": float(totals[code])}
+            for breach_type, code in zip(penalties["breach_type_or_clause"].decode(present), present)
+        }
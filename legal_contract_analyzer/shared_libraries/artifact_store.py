@@ -0,0 +1,129 @@
+"""Session-scoped store for bulky tool results.
+
+When the tools run under the agent they keep full results (extracted text,
+structured data, breach reports) here and return a short handle such as
+"contract-3f2a9c1e5b7d" instead. Later tools in the same session accept the
+handle and load the data locally, so the model never has to carry or copy it
+through its context.
+
+Handles are content-addressed (the same result always gets the same handle)
+and only resolve within the session that created them. Sessions are dropped
+after `idle_seconds` without use or, least recently used first, when more than
+`max_sessions` are live. Within a session, the least recently used artifacts
+are dropped once it holds more than `max_bytes_per_session`.
+"""
+
+import collections
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, Optional
+
+from ..config import settings
+
+
+class ArtifactNotFoundError(KeyError):
+    """Raised when a handle is unknown, expired, or belongs to another session."""
+
+
+class _Session:
+    __slots__ = ("artifacts", "size_bytes", "last_used")
+
+    def __init__(self):
+        self.artifacts: "collections.OrderedDict[str, tuple]" = collections.OrderedDict() # handle -> (value, size)
+        self.size_bytes = 0
+        self.last_used = time.monotonic()
+
+
+class ArtifactStore:
+    """Thread-safe, in-memory, per-session artifact store."""
+
+    def __init__(self, max_sessions: int, max_bytes_per_session: int, idle_seconds: float):
+        self.max_sessions = max_sessions
+        self.max_bytes_per_session = max_bytes_per_session
+        self.idle_seconds = idle_seconds
+        self._sessions: "collections.OrderedDict[str, _Session]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, session_id: str, kind: str, value: dict) -> str:
+        """
+        Stores `value` for the session and returns its handle.
+
+        Args:
+            session_id (str): The ADK session id.
+            kind (str): Prefix of the handle, e.g. "contract" or "breaches".
+            value (dict): JSON-serializable data.
+        """
+        encoded = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+        handle = f"{kind}-{hashlib.sha256(encoded).hexdigest()[:12]}"
+        with self._lock:
+            self._expire_idle()
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _Session()
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            session.last_used = time.monotonic()
+            previous = session.artifacts.pop(handle, None)
+            if previous is not None:
+                session.size_bytes -= previous[1]
+            session.artifacts[handle] = (value, len(encoded))
+            session.size_bytes += len(encoded)
+            # Never evict the artifact just stored, even if it alone exceeds the budget.
+            while session.size_bytes > self.max_bytes_per_session and len(session.artifacts) > 1:
+                _, (_, size) = session.artifacts.popitem(last=False)
+                session.size_bytes -= size
+        return handle
+
+    def get(self, session_id: str, handle: str) -> dict:
+        """Returns the artifact behind `handle`. Raises ArtifactNotFoundError if there is none."""
+        with self._lock:
+            self._expire_idle()
+            session = self._sessions.get(session_id)
+            if session is None or handle not in session.artifacts:
+                raise ArtifactNotFoundError(handle)
+            self._sessions.move_to_end(session_id)
+            session.artifacts.move_to_end(handle)
+            session.last_used = time.monotonic()
+            return session.artifacts[handle][0]
+
+    def drop_session(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "artifacts": sum(len(s.artifacts) for s in self._sessions.values()),
+                "size_bytes": sum(s.size_bytes for s in self._sessions.values()),
+            }
+
+    def _expire_idle(self) -> None:
+        # Sessions are kept in last-used order, so expired ones are at the front.
+        cutoff = time.monotonic() - self.idle_seconds
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used >= cutoff:
+                break
+            del self._sessions[session_id]
+
+
+_artifact_store: Optional[ArtifactStore] = None
+_artifact_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Returns the process-wide store configured by settings.artifact_store."""
+    global _artifact_store
+    with _artifact_store_lock:
+        if _artifact_store is None:
+            store_settings = settings.artifact_store
+            _artifact_store = ArtifactStore(
+                max_sessions=store_settings.max_sessions,
+                max_bytes_per_session=store_settings.max_bytes_per_session,
+                idle_seconds=store_settings.idle_seconds,
+            )
+    return _artifact_store
@@ -0,0 +1,202 @@
+"""Persistent full-text index over the clauses of processed contracts.
+
+Every processed contract's `extracted_text` is segmented into clauses and
+stored in a SQLite FTS5 table, so keyword and phrase questions across the whole
+corpus ("termination for convenience") are answered locally, without
+re-processing documents or calling a model. Documents are keyed by the SHA-256
+of their text; re-indexing an unchanged document is a no-op.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from ..config import settings
+from .pdf_stream import split_clauses
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    pdf_file_path TEXT NOT NULL,
+    clause_count INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS clauses USING fts5(
+    doc_id UNINDEXED,
+    clause_number UNINDEXED,
+    heading,
+    body,
+    tokenize = 'porter unicode61'
+);
+"""
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_MAX_HEADING_CHARS = 120
+
+
+def segment_clauses(text: str) -> List[dict]:
+    """Splits contract text into numbered clauses with a short heading (their first line)."""
+    segments = []
+    for clause in split_clauses(text):
+        body = clause.strip()
+        if not body:
+            continue
+        heading = body.split("\n", 1)[0][:_MAX_HEADING_CHARS]
+        segments.append({"clause_number": len(segments) + 1, "heading": heading, "body": body})
+    return segments
+
+
+def build_match_query(query: str, mode: str = "all") -> str:
+    """
+    Turns free text into a safe FTS5 MATCH expression.
+
+    Double-quoted parts of `query` are kept as phrases; the remaining words are
+    quoted individually so FTS5 operators in user input are treated as text.
+
+    Args:
+        query (str): e.g. 'termination "for convenience"'.
+        mode (str): "all" requires every term, "any" requires at least one,
+            "phrase" treats the whole query as a single phrase.
+    """
+    if mode == "phrase":
+        words = _WORD.findall(query)
+        return '"' + " ".join(words) + '"' if words else ""
+    terms = []
+    for index, part in enumerate(query.split('"')):
+        words = _WORD.findall(part)
+        if not words:
+            continue
+        if index % 2: # Inside double quotes
+            terms.append('"' + " ".join(words) + '"')
+        else:
+            terms.extend(f'"{word}"' for word in words)
+    return (" OR " if mode == "any" else " AND ").join(terms)
+
+
+class ClauseIndex:
+    """SQLite FTS5 clause index. Safe to share between threads; each thread gets its own connection."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def document_id(extracted_text: str) -> str:
+        return hashlib.sha256(extracted_text.encode("utf-8")).hexdigest()
+
+    def add_document(self, pdf_file_path: str, extracted_text: str) -> str:
+        """
+        Indexes a document's clauses, replacing any earlier entry for the same path.
+
+        Returns:
+            str: The document id.
+        """
+        doc_id = self.document_id(extracted_text)
+        connection = self._connection()
+        with connection:
+            existing = connection.execute(
+                "SELECT doc_id FROM documents WHERE pdf_file_path = ?", (pdf_file_path,)
+            ).fetchall()
+            if any(row[0] == doc_id for row in existing):
+                return doc_id
+            for (old_id,) in existing:
+                connection.execute("DELETE FROM clauses WHERE doc_id = ?", (old_id,))
+                connection.execute("DELETE FROM documents WHERE doc_id = ?", (old_id,))
+            if connection.execute("SELECT 1 FROM documents WHERE doc_id = ?", (doc_id,)).fetchone():
+                # Same text already indexed under another path; just point it at the latest path.
+                connection.execute("UPDATE documents SET pdf_file_path = ?, indexed_at = ? WHERE doc_id = ?",
+                                   (pdf_file_path, time.time(), doc_id))
+                return doc_id
+            segments = segment_clauses(extracted_text)
+            connection.executemany(
+                "INSERT INTO clauses (doc_id, clause_number, heading, body) VALUES (?, ?, ?, ?)",
+                [(doc_id, s["clause_number"], s["heading"], s["body"]) for s in segments],
+            )
+            connection.execute(
+                "INSERT INTO documents (doc_id, pdf_file_path, clause_count, indexed_at) VALUES (?, ?, ?, ?)",
+                (doc_id, pdf_file_path, len(segments), time.time()),
+            )
+        logger.info("Indexed %d clauses from %s", len(segments), pdf_file_path)
+        return doc_id
+
+    def remove_document(self, doc_id: str) -> None:
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM clauses WHERE doc_id = ?", (doc_id,))
+            connection.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+
+    def search(self, query: str, limit: int = 10, mode: str = "all") -> List[dict]:
+        """
+        Finds the clauses best matching `query`, ranked by BM25.
+
+        Args:
+            query (str): Keywords and/or "quoted phrases".
+            limit (int): Maximum number of clauses to return.
+            mode (str): "all", "any" or "phrase"; see build_match_query.
+
+        Returns:
+            list: Dicts with doc_id, pdf_file_path, clause_number, heading, snippet and score.
+        """
+        match = build_match_query(query, mode)
+        if not match:
+            return []
+        rows = self._connection().execute(
+            """
+            SELECT c.doc_id, d.pdf_file_path, c.clause_number, c.heading,
+                   snippet(clauses, 3, '[', ']', ' ... ', 24), bm25(clauses)
+            FROM clauses AS c JOIN documents AS d ON d.doc_id = c.doc_id
+            WHERE clauses MATCH ?
+            ORDER BY bm25(clauses)
+            LIMIT ?
+            """,
+            (match, limit),
+        ).fetchall()
+        return [
+            {
+                "doc_id": doc_id,
+                "pdf_file_path": pdf_file_path,
+                "clause_number": int(clause_number),
+                "heading": heading,
+                "snippet": snippet,
+                "score": round(-score, 4), # bm25() is lower-is-better; flip it so higher is better
+            }
+            for doc_id, pdf_file_path, clause_number, heading, snippet, score in rows
+        ]
+
+    def document_count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+
+_clause_index: Optional[ClauseIndex] = None
+_clause_index_lock = threading.Lock()
+
+
+def get_clause_index() -> Optional[ClauseIndex]:
+    """Returns the process-wide clause index, or None when disabled in settings.clause_index."""
+    global _clause_index
+    if not settings.clause_index.enabled:
+        return None
+    with _clause_index_lock:
+        if _clause_index is None:
+            _clause_index = ClauseIndex(settings.clause_index.db_path)
+    return _clause_index
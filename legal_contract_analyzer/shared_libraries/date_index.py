@@ -0,0 +1,287 @@
+"""Persistent index of the effective and expiration dates of processed contracts.
+
+Portfolio questions such as "which contracts expire in the next 90 days" are
+answered from memory: for each date field the index keeps the contracts
+sorted by date (a parallel pair of an `array` of proleptic ordinals and a list
+of contract ids), so a range query is two bisects plus a slice. Inserts and
+updates go into the arrays in place.
+
+SQLite is the source of truth. The arrays are built from it when the index is
+opened and rebuilt when another process commits to the same database.
+
+Dates are calendar dates. Timestamps (e.g. "2025-03-31T23:30:00-05:00") are
+normalized to the calendar date they fall on in the index's timezone
+(settings.date_index.timezone); relative queries ("next 90 days") start from
+today's date in the timezone the caller asks for.
+"""
+
+import bisect
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from zoneinfo import ZoneInfo
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+DATE_FIELDS = ("effective_date", "expiration_date")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contract_dates (
+    contract_id TEXT PRIMARY KEY,
+    effective_date INTEGER,
+    expiration_date INTEGER,
+    indexed_at REAL NOT NULL
+);
+"""
+
+DateLike = Union[datetime.date, datetime.datetime, str]
+
+
+def normalize_date(value, timezone: datetime.tzinfo) -> Optional[datetime.date]:
+    """
+    Returns the calendar date of `value` in `timezone`, or None if it is not a date.
+
+    Plain dates ("2025-03-31") are taken as they are. Timestamps are converted
+    to `timezone` first; naive timestamps are assumed to already be in it.
+    """
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return None
+        try:
+            if len(text) <= 10:
+                return datetime.date.fromisoformat(text)
+            value = datetime.datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone)
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return None
+
+
+class _SortedDates:
+    """Contract ids sorted by (date ordinal, contract id)."""
+
+    __slots__ = ("ordinals", "contract_ids")
+
+    def __init__(self, pairs: Iterable[Tuple[int, str]] = ()):
+        pairs = sorted(pairs)
+        self.ordinals = array("l", (ordinal for ordinal, _ in pairs))
+        self.contract_ids = [contract_id for _, contract_id in pairs]
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def insert(self, ordinal: int, contract_id: str) -> None:
+        low = bisect.bisect_left(self.ordinals, ordinal)
+        high = bisect.bisect_right(self.ordinals, ordinal)
+        position = bisect.bisect_left(self.contract_ids, contract_id, low, high)
+        self.ordinals.insert(position, ordinal)
+        self.contract_ids.insert(position, contract_id)
+
+    def remove(self, ordinal: int, contract_id: str) -> None:
+        low = bisect.bisect_left(self.ordinals, ordinal)
+        high = bisect.bisect_right(self.ordinals, ordinal)
+        position = bisect.bisect_left(self.contract_ids, contract_id, low, high)
+        if position < high and self.contract_ids[position] == contract_id:
+            del self.ordinals[position]
+            del self.contract_ids[position]
+
+    def span(self, start: Optional[int], end: Optional[int]) -> Tuple[int, int]:
+        """Positions [low, high) of the entries with start <= ordinal <= end."""
+        low = 0 if start is None else bisect.bisect_left(self.ordinals, start)
+        high = len(self.ordinals) if end is None else bisect.bisect_right(self.ordinals, end)
+        return low, max(low, high)
+
+
+class ContractDateIndex:
+    """
+    Sorted in-memory date index over processed contracts, persisted in SQLite.
+
+    Thread-safe. Contract ids are the keys used by the other stores, i.e. the
+    PDF path for contracts processed by process_contract_document.
+    """
+
+    def __init__(self, db_path: str, timezone: str = "UTC"):
+        self.db_path = db_path
+        self.timezone = ZoneInfo(timezone)
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+        self._records: Dict[str, Tuple[Optional[int], Optional[int]]] = {}
+        self._sorted: Dict[str, _SortedDates] = {}
+        self._data_version = None
+        with self._lock:
+            self._reload()
+
+    def _reload(self) -> None:
+        started = time.perf_counter()
+        rows = self._connection.execute(
+            "SELECT contract_id, effective_date, expiration_date FROM contract_dates"
+        ).fetchall()
+        self._records = {contract_id: (effective, expiration) for contract_id, effective, expiration in rows}
+        self._sorted = {
+            field: _SortedDates(
+                (dates[position], contract_id)
+                for contract_id, dates in self._records.items()
+                if dates[position] is not None
+            )
+            for position, field in enumerate(DATE_FIELDS)
+        }
+        self._data_version = self._current_data_version()
+        logger.debug("Loaded %d contracts into the date index in %.3fs", len(rows), time.perf_counter() - started)
+
+    def _current_data_version(self) -> int:
+        return self._connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync(self) -> None:
+        # data_version only changes when another connection commits.
+        if self._current_data_version() != self._data_version:
+            self._reload()
+
+    def _ordinals(self, structured_data) -> Tuple[Optional[int], Optional[int]]:
+        dates = (normalize_date(structured_data.get(field), self.timezone) for field in DATE_FIELDS)
+        return tuple(date.toordinal() if date else None for date in dates)
+
+    def _apply(self, contract_id: str, ordinals: Tuple[Optional[int], Optional[int]]) -> None:
+        previous = self._records.get(contract_id, (None, None))
+        for position, field in enumerate(DATE_FIELDS):
+            if previous[position] == ordinals[position]:
+                continue
+            if previous[position] is not None:
+                self._sorted[field].remove(previous[position], contract_id)
+            if ordinals[position] is not None:
+                self._sorted[field].insert(ordinals[position], contract_id)
+        self._records[contract_id] = ordinals
+
+    def add(self, contract_id: str, structured_data) -> None:
+        """Indexes (or re-indexes) a contract's dates from its structured_data dict or ContractRecord."""
+        self.add_many([(contract_id, structured_data)])
+
+    def add_many(self, contracts: Iterable[Tuple[str, object]]) -> int:
+        """
+        Indexes many (contract_id, structured_data) pairs in one transaction.
+
+        Large loads rebuild the sorted arrays once instead of inserting one by one.
+
+        Returns:
+            int: The number of contracts written.
+        """
+        rows = [(contract_id, *self._ordinals(data)) for contract_id, data in contracts]
+        if not rows:
+            return 0
+        now = time.time()
+        with self._lock:
+            self._sync()
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO contract_dates (contract_id, effective_date, expiration_date, indexed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(contract_id, effective, expiration, now) for contract_id, effective, expiration in rows],
+                )
+            if len(rows) > max(64, len(self._records) // 16):
+                self._reload()
+            else:
+                for contract_id, effective, expiration in rows:
+                    self._apply(contract_id, (effective, expiration))
+        return len(rows)
+
+    def remove(self, contract_id: str) -> None:
+        with self._lock:
+            self._sync()
+            with self._connection:
+                self._connection.execute("DELETE FROM contract_dates WHERE contract_id = ?", (contract_id,))
+            if contract_id in self._records:
+                self._apply(contract_id, (None, None))
+                del self._records[contract_id]
+
+    def query(self, field: str, start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+              limit: Optional[int] = None) -> Tuple[int, List[dict]]:
+        """
+        Finds the contracts whose `field` falls between `start` and `end`, inclusive.
+
+        Args:
+            field (str): "effective_date" or "expiration_date".
+            start, end (date, datetime or ISO string, optional): Range bounds; None leaves that side open.
+                Timestamps are normalized to the index's timezone.
+            limit (int, optional): Maximum number of contracts to return, earliest first.
+
+        Returns:
+            tuple: (number of matching contracts, up to `limit` dicts with contract_id,
+                effective_date and expiration_date as ISO strings or None).
+        """
+        if field not in DATE_FIELDS:
+            raise ValueError(f"Unknown date field: {field}. Expected one of {', '.join(DATE_FIELDS)}.")
+        bounds = []
+        for bound in (start, end):
+            if bound is None:
+                bounds.append(None)
+                continue
+            date = normalize_date(bound, self.timezone)
+            if date is None:
+                raise ValueError(f"Not a date: {bound!r}")
+            bounds.append(date.toordinal())
+        with self._lock:
+            self._sync()
+            dates = self._sorted[field]
+            low, high = dates.span(*bounds)
+            stop = high if limit is None else min(high, low + max(0, limit))
+            contract_ids = dates.contract_ids[low:stop]
+            records = [(contract_id, self._records[contract_id]) for contract_id in contract_ids]
+        return high - low, [
+            {
+                "contract_id": contract_id,
+                **{
+                    name: datetime.date.fromordinal(ordinal).isoformat() if ordinal is not None else None
+                    for name, ordinal in zip(DATE_FIELDS, ordinals)
+                },
+            }
+            for contract_id, ordinals in records
+        ]
+
+    def within_days(self, field: str, days: int, timezone: Optional[str] = None,
+                    now: Optional[datetime.datetime] = None, limit: Optional[int] = None) -> Tuple[int, List[dict]]:
+        """
+        Finds the contracts whose `field` falls from today through `days` days from today
+        (or from `days` days ago through today, for negative `days`).
+
+        "Today" is the current date in `timezone` (an IANA name such as
+        "Europe/Berlin"; defaults to the index's timezone).
+        """
+        zone = ZoneInfo(timezone) if timezone else self.timezone
+        today = (now or datetime.datetime.now(datetime.timezone.utc)).astimezone(zone).date()
+        other = today + datetime.timedelta(days=days)
+        return self.query(field, min(today, other), max(today, other), limit)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._records)
+
+
+_date_index: Optional[ContractDateIndex] = None
+_date_index_lock = threading.Lock()
+
+
+def get_date_index() -> Optional[ContractDateIndex]:
+    """Returns the process-wide date index, or None when disabled in settings.date_index."""
+    global _date_index
+    if not settings.date_index.enabled:
+        return None
+    with _date_index_lock:
+        if _date_index is None:
+            _date_index = ContractDateIndex(settings.date_index.db_path, settings.date_index.timezone)
+    return _date_index
@@ -0,0 +1,126 @@
+"""Local fake of the Gemini generateContent endpoint, for tests and load experiments.
+
+    with FakeLLMServer(latency_seconds=0.2, throttle_rate=0.1) as server:
+        client = LLMClient(server.url, requests_per_minute=600)
+        client.generate("...", "gemini-2.0-flash-001")
+        print(server.request_count)
+
+The server answers every POST ending in ":generateContent" after the configured
+latency. A fraction of requests (`throttle_rate`) gets HTTP 429 with a
+Retry-After header, and `failure_rate` gets HTTP 503. Responses are keep-alive.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+
+def _default_responder(prompt: str, model: str) -> str:
+    return json.dumps({"echo_characters": len(prompt), "model": model})
+
+
+class FakeLLMServer:
+    """
+    Threaded HTTP server imitating the generateContent API.
+
+    Args:
+        latency_seconds (float): Delay before every response.
+        throttle_rate (float): Probability of answering 429.
+        failure_rate (float): Probability of answering 503.
+        retry_after_seconds (float): Value of the Retry-After header on 429s.
+        responder (callable, optional): (prompt, model) -> response text.
+        seed (int, optional): Seed for the throttle/failure draws.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0, throttle_rate: float = 0.0, failure_rate: float = 0.0,
+                 retry_after_seconds: float = 0.05, responder: Optional[Callable[[str, str], str]] = None,
+                 seed: Optional[int] = None, host: str = "127.0.0.1", port: int = 0):
+        self.latency_seconds = latency_seconds
+        self.throttle_rate = throttle_rate
+        self.failure_rate = failure_rate
+        self.retry_after_seconds = retry_after_seconds
+        self.responder = responder or _default_responder
+        self.request_count = 0
+        self.throttled_count = 0
+        self.failed_count = 0
+        self.prompts = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # Keep-alive, so the client's connection pool is exercised
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: dict, extra_headers: Optional[dict] = None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (extra_headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.endswith(":generateContent"):
+                    self._send(404, {"error": {"code": 404, "message": "Not found"}})
+                    return
+                model = self.path.rsplit("/", 1)[-1].split(":", 1)[0]
+                prompt = "".join(
+                    part.get("text", "") for content in request.get("contents", []) for part in content.get("parts", [])
+                )
+                with fake._lock:
+                    fake.request_count += 1
+                    fake.prompts.append(prompt)
+                    draw = fake._random.random()
+                time.sleep(fake.latency_seconds)
+                if draw < fake.throttle_rate:
+                    with fake._lock:
+                        fake.throttled_count += 1
+                    self._send(429, {"error": {"code": 429, "message": "Resource exhausted"}},
+                               {"Retry-After": str(fake.retry_after_seconds)})
+                    return
+                if draw < fake.throttle_rate + fake.failure_rate:
+                    with fake._lock:
+                        fake.failed_count += 1
+                    self._send(503, {"error": {"code": 503, "message": "Unavailable"}})
+                    return
+                text = fake.responder(prompt, model)
+                self._send(200, {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]})
+
+        return Handler
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,386 @@
+"""Lightweight timing spans, counters and per-request traces for the tools.
+
+    with trace("process_contract_document"):
+        with span("prompt_build"):
+            prompt = EXTRACTION_PROMPT.render(...)
+        count("llm_input_tokens_total", estimate_tokens(prompt), task="extraction")
+
+Every span feeds a duration histogram in the process-wide `METRICS` registry,
+labelled by stage, and is also appended to the trace of the request it runs
+in. `METRICS.to_prometheus()` renders everything in the Prometheus text
+exposition format; `recent_traces()` returns the last completed traces.
+
+When settings.instrumentation.enabled is false (or after `set_enabled(False)`)
+`span` and `trace` return a shared no-op context manager and `count` returns
+immediately, so the hot path pays one global lookup per call.
+"""
+
+import bisect
+import collections
+import contextvars
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "contract_analyzer_"
+STAGE_DURATION = "stage_duration_seconds"
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> _LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: _LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _summary_key(key: _LabelKey) -> str:
+    return ",".join(f"{name}={value}" for name, value in key) or "total"
+
+
+class _Histogram:
+    __slots__ = ("bucket_counts", "count", "total")
+
+    def __init__(self, bucket_count: int):
+        self.bucket_counts = [0] * (bucket_count + 1) # Last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+
+
+def _histogram_summary(histogram: _Histogram) -> dict:
+    return {
+        "count": histogram.count,
+        "total_seconds": round(histogram.total, 6),
+        "mean_seconds": round(histogram.total / histogram.count, 6) if histogram.count else 0.0,
+    }
+
+
+class MetricsRegistry:
+    """
+    Thread-safe in-process store of counters and duration histograms.
+
+    Args:
+        buckets (list): Upper bounds, in seconds, of the histogram buckets.
+    """
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = sorted(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[_LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[_LabelKey, _Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(len(self.buckets))
+            histogram.bucket_counts[index] += 1
+            histogram.count += 1
+            histogram.total += seconds
+
+    def counter_value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0.0)
+
+    def cache_hit_ratios(self) -> Dict[str, float]:
+        """Hit ratio per cache, from the cache_requests_total{cache, outcome} counter."""
+        totals: Dict[str, List[float]] = {}
+        with self._lock:
+            for key, value in self._counters.get("cache_requests_total", {}).items():
+                labels = dict(key)
+                hits_and_total = totals.setdefault(labels.get("cache", ""), [0.0, 0.0])
+                hits_and_total[1] += value
+                if labels.get("outcome") == "hit":
+                    hits_and_total[0] += value
+        return {cache: hits / total for cache, (hits, total) in totals.items() if total}
+
+    def summary(self) -> dict:
+        """
+        Returns a JSON-friendly view of the registry.
+
+        Stage durations are summarised as count, total and mean seconds per
+        stage; other histograms (e.g. model_route_seconds) the same way per
+        label set. Counters are listed per label set; cache hit ratios are
+        derived from the counters.
+        """
+        with self._lock:
+            stages = {
+                dict(key).get("stage", ""): _histogram_summary(histogram)
+                for key, histogram in self._histograms.get(STAGE_DURATION, {}).items()
+            }
+            histograms = {
+                name: {_summary_key(key): _histogram_summary(histogram) for key, histogram in series.items()}
+                for name, series in self._histograms.items() if name != STAGE_DURATION
+            }
+            counters = {
+                name: {_summary_key(key): value for key, value in series.items()}
+                for name, series in self._counters.items()
+            }
+        return {"stages": stages, "histograms": histograms, "counters": counters,
+                "cache_hit_ratios": self.cache_hit_ratios()}
+
+    def to_prometheus(self) -> str:
+        """Renders every metric in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                metric = METRIC_PREFIX + name
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{metric}{_format_labels(key)} {value:g}")
+            for name in sorted(self._histograms):
+                metric = METRIC_PREFIX + name
+                lines.append(f"# TYPE {metric} histogram")
+                for key, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, bucket_count in zip(itertools.chain(self.buckets, ["+Inf"]), histogram.bucket_counts):
+                        cumulative += bucket_count
+                        le = bound if isinstance(bound, str) else f"{bound:g}"
+                        lines.append(f"{metric}_bucket{_format_labels(key, (('le', le),))} {cumulative}")
+                    lines.append(f"{metric}_sum{_format_labels(key)} {histogram.total:.6f}")
+                    lines.append(f"{metric}_count{_format_labels(key)} {histogram.count}")
+        ratios = self.cache_hit_ratios()
+        if ratios:
+            metric = METRIC_PREFIX + "cache_hit_ratio"
+            lines.append(f"# TYPE {metric} gauge")
+            for cache, ratio in sorted(ratios.items()):
+                lines.append(f"{metric}{_format_labels((('cache', cache),))} {ratio:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+class Trace:
+    """The spans recorded while serving one tool request."""
+
+    __slots__ = ("trace_id", "name", "started_at", "_started", "duration_ms", "spans", "_lock")
+
+    def __init__(self, trace_id: int, name: str):
+        self.trace_id = trace_id
+        self.name = name
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.spans: List[dict] = []
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, parent: Optional[str], started: float, seconds: float, attributes: dict) -> None:
+        record = {
+            "name": name,
+            "parent": parent,
+            "start_ms": round((started - self._started) * 1000.0, 3),
+            "duration_ms": round(seconds * 1000.0, 3),
+        }
+        if attributes:
+            record["attributes"] = attributes
+        with self._lock:
+            self.spans.append(record)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": spans,
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_span", default=None)
+
+
+class _NoOp:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attributes) -> None:
+        pass
+
+
+_NOOP = _NoOp()
+
+
+class _Span:
+    __slots__ = ("name", "attributes", "_started", "_token")
+
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+
+    def set(self, **attributes) -> None:
+        """Adds attributes (e.g. page counts) to the span's trace record."""
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "_Span":
+        self._token = _current_span.set(self.name)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        seconds = time.perf_counter() - self._started
+        _current_span.reset(self._token)
+        _record_span(self.name, self._started, seconds, self.attributes, error=exc_type is not None)
+        return False
+
+
+class _TraceScope:
+    __slots__ = ("name", "trace", "_trace_token", "_span")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> Trace:
+        self.trace = Trace(next(_trace_ids), self.name)
+        self._trace_token = _current_trace.set(self.trace)
+        self._span = _Span(self.name, {})
+        self._span.__enter__()
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._span.__exit__(exc_type, exc, tb)
+        _current_trace.reset(self._trace_token)
+        self.trace.duration_ms = round((time.perf_counter() - self.trace._started) * 1000.0, 3)
+        with _recent_lock:
+            _recent_traces.append(self.trace)
+        if settings.instrumentation.log_traces:
+            logger.debug("Trace %s: %s", self.name, self.trace.as_dict())
+        return False
+
+
+def _record_span(name: str, started: float, seconds: float, attributes: dict, error: bool = False) -> None:
+    METRICS.observe(STAGE_DURATION, seconds, stage=name)
+    if error:
+        METRICS.inc("stage_errors_total", stage=name)
+    current = _current_trace.get()
+    if current is not None:
+        current.add_span(name, _current_span.get(), started, seconds, attributes)
+
+
+_enabled = settings.instrumentation.enabled
+_trace_ids = itertools.count(1)
+_recent_traces: "collections.deque[Trace]" = collections.deque(maxlen=max(1, settings.instrumentation.trace_history))
+_recent_lock = threading.Lock()
+
+METRICS = MetricsRegistry(settings.instrumentation.duration_buckets_seconds)
+
+
+def set_enabled(enabled: bool) -> bool:
+    """Turns instrumentation on or off at runtime and returns the previous state."""
+    global _enabled
+    previous, _enabled = _enabled, enabled
+    return previous
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def span(name: str, **attributes):
+    """Times a stage (e.g. "model_call") as a context manager."""
+    if not _enabled:
+        return _NOOP
+    return _Span(name, attributes)
+
+
+def trace(name: str):
+    """
+    Records one request as a trace, as a context manager yielding the Trace.
+
+    Inside an enclosing trace, this is just a span, so tools called from other
+    tools end up in their caller's trace.
+    """
+    if not _enabled:
+        return _NOOP
+    if _current_trace.get() is not None:
+        return _Span(name, {})
+    return _TraceScope(name)
+
+
+def count(name: str, value: float = 1.0, **labels) -> None:
+    """Adds `value` to the counter `name` with the given labels."""
+    if _enabled:
+        METRICS.inc(name, value, **labels)
+
+
+def record_duration(name: str, seconds: float, **attributes) -> None:
+    """Records a stage timed by the caller, e.g. time accumulated across a generator's steps."""
+    if _enabled:
+        _record_span(name, time.perf_counter() - seconds, seconds, attributes)
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    """Records a duration in the histogram `name` with its own labels, e.g. latency per model route."""
+    if _enabled:
+        METRICS.observe(name, seconds, **labels)
+
+
+def timed_iter(name: str, iterable: Iterable) -> Iterator:
+    """
+    Yields from `iterable`, recording the time spent producing items as one `name` span.
+
+    Time the consumer spends between items is not counted.
+    """
+    if not _enabled:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    seconds = 0.0
+    items = 0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                seconds += time.perf_counter() - started
+                break
+            seconds += time.perf_counter() - started
+            items += 1
+            yield item
+    finally:
+        record_duration(name, seconds, items=items)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def recent_traces(limit: Optional[int] = None) -> List[dict]:
+    """Returns the most recently completed traces, newest last."""
+    with _recent_lock:
+        traces = list(_recent_traces)
+    if limit is not None:
+        traces = traces[-limit:]
+    return [t.as_dict() for t in traces]
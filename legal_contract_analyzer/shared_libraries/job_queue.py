@@ -0,0 +1,426 @@
+"""Durable SQLite job queue for contract analyses.
+
+A job analyses one PDF contract in three stages: "process", "breach" and
+"penalty" (process_contract_document, detect_contract_breaches and
+calculate_contract_penalties). Each stage's result is committed as soon as it
+finishes, so a job interrupted by a crash or a restart resumes at the stage
+after the last finished one instead of starting over.
+
+    queue = get_job_queue()
+    job_id = queue.submit("/contracts/acme-msa.pdf", priority=PRIORITY_INTERACTIVE)
+    job = queue.wait(job_id)        # job["results"]["penalty"]["penalty_summary"]
+
+Jobs are claimed highest priority first, then oldest first, so interactive
+requests (PRIORITY_INTERACTIVE) overtake the rest of a bulk import
+(PRIORITY_BULK). A claim is a lease that the worker keeps renewing while it
+runs the job. `recover` takes back the jobs whose lease ran out or whose
+worker process on this host is gone. A job that fails, or loses its worker,
+settings.job_queue.max_attempts times stays failed, keeping its last error.
+
+Backpressure: once settings.job_queue.max_queued_jobs jobs are waiting,
+`submit` raises QueueFullError, or blocks with `wait=True`. Interactive jobs
+are always admitted.
+
+The worker processes that run the jobs are in tools/jobs.py.
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..config import settings
+from .instrumentation import count
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("process", "breach", "penalty")
+
+PRIORITY_BULK = 0
+PRIORITY_INTERACTIVE = 100
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pdf_file_path TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    use_cache INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    last_stage TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires_at REAL,
+    error_message TEXT,
+    submitted_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_state ON jobs (state, priority DESC, job_id);
+CREATE TABLE IF NOT EXISTS stage_results (
+    job_id INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    result TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (job_id, stage)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS completions (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL
+);
+"""
+
+_JOB_COLUMNS = "job_id, pdf_file_path, priority, use_cache, state, last_stage, attempts, error_message"
+
+
+class QueueFullError(RuntimeError):
+    """Raised by JobQueue.submit when too many jobs are already waiting."""
+
+
+class LeaseLostError(RuntimeError):
+    """Raised when a worker reports on a job that is no longer leased to it (it was requeued)."""
+
+
+@dataclass
+class Job:
+    """A claimed job, as handed to a worker."""
+    job_id: int
+    pdf_file_path: str
+    priority: int
+    use_cache: bool
+    state: str
+    last_stage: Optional[str]
+    attempts: int
+    error_message: Optional[str] = None
+
+    @property
+    def remaining_stages(self) -> Tuple[str, ...]:
+        if self.last_stage is None:
+            return STAGES
+        return STAGES[STAGES.index(self.last_stage) + 1:]
+
+
+def worker_id() -> str:
+    """Identifies the calling thread as a lease holder: host, process id and thread id."""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError: # Exists, owned by someone else
+        return True
+    return True
+
+
+class JobQueue:
+    """SQLite-backed priority job queue. Safe to share between threads and processes."""
+
+    def __init__(self, db_path: str, max_queued_jobs: int = 10_000, max_attempts: int = 3,
+                 lease_seconds: float = 600.0, poll_interval_seconds: float = 0.5):
+        self.db_path = db_path
+        self.max_queued_jobs = max_queued_jobs
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit mode: writes take the lock up front in _write, so concurrent
+            # claims cannot both pick the same job.
+            connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _write(self):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def depth(self) -> int:
+        """Number of jobs waiting to be claimed."""
+        return self._connection().execute("SELECT COUNT(*) FROM jobs WHERE state = ?", (QUEUED,)).fetchone()[0]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each state."""
+        rows = self._connection().execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return {**{state: 0 for state in (QUEUED, RUNNING, DONE, FAILED)}, **dict(rows)}
+
+    def submit(self, pdf_file_path: str, priority: int = PRIORITY_BULK, use_cache: bool = True,
+               wait: bool = False, timeout: Optional[float] = None) -> int:
+        """
+        Queues the analysis of one contract and returns its job id.
+
+        Raises:
+            QueueFullError: If the queue is full and `wait` is false, or it is
+                still full after `timeout` seconds.
+        """
+        return self.submit_many([pdf_file_path], priority, use_cache, wait=wait, timeout=timeout)[0]
+
+    def submit_many(self, pdf_file_paths: Iterable[str], priority: int = PRIORITY_BULK, use_cache: bool = True,
+                    wait: bool = True, timeout: Optional[float] = None) -> List[int]:
+        """
+        Queues many contracts, as many per transaction as the queue has room for.
+
+        With `wait` (the default here), a bulk import keeps pace with the workers
+        instead of growing the queue without bound.
+
+        Raises:
+            QueueFullError: As for submit. Jobs queued before the error stay queued.
+        """
+        paths = list(pdf_file_paths)
+        job_ids = []
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(job_ids) < len(paths):
+            with self._write() as connection:
+                if priority >= PRIORITY_INTERACTIVE:
+                    room = len(paths) - len(job_ids)
+                else:
+                    depth = connection.execute("SELECT COUNT(*) FROM jobs WHERE state = ?", (QUEUED,)).fetchone()[0]
+                    room = min(len(paths) - len(job_ids), self.max_queued_jobs - depth)
+                now = time.time()
+                for pdf_file_path in paths[len(job_ids):len(job_ids) + max(room, 0)]:
+                    cursor = connection.execute(
+                        "INSERT INTO jobs (pdf_file_path, priority, use_cache, state, submitted_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (pdf_file_path, priority, int(use_cache), QUEUED, now, now),
+                    )
+                    job_ids.append(cursor.lastrowid)
+            if room > 0:
+                count("jobs_submitted_total", room, priority=priority)
+                continue
+            if not wait or (deadline is not None and time.monotonic() >= deadline):
+                count("jobs_rejected_total", len(paths) - len(job_ids), priority=priority)
+                raise QueueFullError(f"{self.max_queued_jobs} jobs are already queued; try again later.")
+            time.sleep(self.poll_interval_seconds)
+        return job_ids
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Leases the next job to `worker`, or returns None when nothing is queued."""
+        with self._write() as connection:
+            row = connection.execute(
+                f"SELECT {_JOB_COLUMNS} FROM jobs WHERE state = ? ORDER BY priority DESC, job_id LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            connection.execute(
+                "UPDATE jobs SET state = ?, worker = ?, lease_expires_at = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE job_id = ?",
+                (RUNNING, worker, now + self.lease_seconds, now, row[0]),
+            )
+        job = Job(row[0], row[1], row[2], bool(row[3]), RUNNING, row[5], row[6] + 1, row[7])
+        count("jobs_claimed_total", priority=job.priority, resumed=job.last_stage is not None)
+        return job
+
+    def finish_stage(self, job: Job, worker: str, stage: str, result: dict) -> None:
+        """
+        Commits a stage's result and renews the lease; the last stage completes the job.
+
+        Raises:
+            LeaseLostError: If the job was requeued since `worker` claimed it.
+        """
+        now = time.time()
+        state = DONE if stage == STAGES[-1] else RUNNING
+        with self._write() as connection:
+            updated = connection.execute(
+                "UPDATE jobs SET state = ?, last_stage = ?, lease_expires_at = ?, updated_at = ? "
+                "WHERE job_id = ? AND state = ? AND worker = ?",
+                (state, stage, now + self.lease_seconds, now, job.job_id, RUNNING, worker),
+            ).rowcount
+            if not updated:
+                raise LeaseLostError(f"Job {job.job_id} is no longer leased to {worker}.")
+            connection.execute(
+                "INSERT OR REPLACE INTO stage_results (job_id, stage, result, finished_at) VALUES (?, ?, ?, ?)",
+                (job.job_id, stage, json.dumps(result), now),
+            )
+            if state == DONE:
+                connection.execute("INSERT INTO completions (job_id) VALUES (?)", (job.job_id,))
+        job.last_stage, job.state = stage, state
+        count("job_stages_total", stage=stage, outcome="success")
+
+    def fail(self, job: Job, worker: str, error_message: str) -> str:
+        """
+        Records a failed attempt: the job is queued again, or failed for good after max_attempts.
+
+        Finished stages are kept, so a retry resumes after them. Returns the job's new state.
+        """
+        state = FAILED if job.attempts >= self.max_attempts else QUEUED
+        with self._write() as connection:
+            connection.execute(
+                "UPDATE jobs SET state = ?, worker = NULL, lease_expires_at = NULL, error_message = ?, updated_at = ? "
+                "WHERE job_id = ? AND state = ? AND worker = ?",
+                (state, error_message, time.time(), job.job_id, RUNNING, worker),
+            )
+        job.state, job.error_message = state, error_message
+        count("job_stages_total", stage=job.remaining_stages[0] if job.remaining_stages else "", outcome="error")
+        return state
+
+    def release(self, job: Job, worker: str) -> None:
+        """Hands an unfinished job back to the queue without using up an attempt, e.g. on shutdown."""
+        with self._write() as connection:
+            connection.execute(
+                "UPDATE jobs SET state = ?, worker = NULL, lease_expires_at = NULL, attempts = attempts - 1, "
+                "updated_at = ? WHERE job_id = ? AND state = ? AND worker = ?",
+                (QUEUED, time.time(), job.job_id, RUNNING, worker),
+            )
+        job.state = QUEUED
+
+    def renew(self, job: Job, worker: str) -> bool:
+        """Extends the lease of a job `worker` is still running. Returns False if the lease was lost."""
+        now = time.time()
+        with self._write() as connection:
+            return bool(connection.execute(
+                "UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE job_id = ? AND state = ? AND worker = ?",
+                (now + self.lease_seconds, now, job.job_id, RUNNING, worker),
+            ).rowcount)
+
+    def recover(self) -> int:
+        """
+        Takes back running jobs whose lease expired or whose worker process on this host has exited.
+
+        Such a job is queued again, or failed for good if it has used up
+        max_attempts: a contract that keeps killing its worker (out of memory,
+        a crash in the PDF reader) is not retried forever. Workers renew their
+        leases while a stage runs (see renew), so an expired lease means the
+        worker is gone or hung, not that a stage is slow.
+
+        Call it when workers start and periodically while they run. Returns the number of jobs taken back.
+        """
+        host = socket.gethostname()
+        now = time.time()
+        with self._write() as connection:
+            rows = connection.execute(
+                "SELECT job_id, worker, lease_expires_at, attempts FROM jobs WHERE state = ?", (RUNNING,)
+            ).fetchall()
+            updates = []
+            for job_id, worker, lease_expires_at, attempts in rows:
+                worker_host, _, rest = (worker or "").partition(":")
+                pid = rest.partition(":")[0]
+                if worker_host == host and pid.isdigit() and not _process_alive(int(pid)):
+                    error_message = f"Worker {worker} exited while running the job."
+                elif (lease_expires_at or 0) < now:
+                    error_message = f"Lease of worker {worker} expired while running the job."
+                else:
+                    continue
+                state = FAILED if attempts >= self.max_attempts else QUEUED
+                updates.append((state, error_message, now, job_id))
+            connection.executemany(
+                "UPDATE jobs SET state = ?, worker = NULL, lease_expires_at = NULL, error_message = ?, updated_at = ? "
+                "WHERE job_id = ?",
+                updates,
+            )
+        if updates:
+            failed = [job_id for state, _, _, job_id in updates if state == FAILED]
+            logger.warning("Took back %d job(s) abandoned by their workers: %s; failed for good: %s",
+                           len(updates), [job_id for *_, job_id in updates], failed)
+            count("jobs_recovered_total", len(updates) - len(failed))
+            if failed:
+                count("jobs_failed_total", len(failed), reason="worker_lost")
+        return len(updates)
+
+    def retry_failed(self) -> int:
+        """Queues every failed job again with a fresh attempt budget. Returns how many were queued."""
+        with self._write() as connection:
+            return connection.execute(
+                "UPDATE jobs SET state = ?, attempts = 0, updated_at = ? WHERE state = ?", (QUEUED, time.time(), FAILED)
+            ).rowcount
+
+    def stage_results(self, job_id: int) -> Dict[str, dict]:
+        """The results of a job's finished stages, keyed by stage."""
+        rows = self._connection().execute(
+            "SELECT stage, result FROM stage_results WHERE job_id = ?", (job_id,)
+        ).fetchall()
+        return {stage: json.loads(result) for stage, result in rows}
+
+    def get(self, job_id: int) -> Optional[dict]:
+        """A job's state and the results of its finished stages, or None for an unknown id."""
+        row = self._connection().execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "pdf_file_path": row[1],
+            "priority": row[2],
+            "state": row[4],
+            "last_stage": row[5],
+            "attempts": row[6],
+            "error_message": row[7],
+            "results": self.stage_results(job_id),
+        }
+
+    def completed_since(self, seq: int = 0, limit: int = 500) -> List[Tuple[int, dict]]:
+        """
+        Jobs completed after completion number `seq`, in completion order, as (seq, job) pairs (see get).
+
+        Completion numbers only grow, so a consumer that stores the last seq it
+        processed sees every job exactly once.
+        """
+        rows = self._connection().execute(
+            "SELECT seq, job_id FROM completions WHERE seq > ? ORDER BY seq LIMIT ?", (seq, limit)
+        ).fetchall()
+        return [(completed_seq, self.get(job_id)) for completed_seq, job_id in rows]
+
+    def wait(self, job_id: int, timeout: Optional[float] = None) -> Optional[dict]:
+        """
+        Polls until a job is done or failed and returns it (see get).
+
+        Returns the job in its current state if `timeout` seconds pass first,
+        or None for an unknown id.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["state"] in (DONE, FAILED):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(self.poll_interval_seconds)
+
+
+def open_job_queue(db_path: Optional[str] = None) -> JobQueue:
+    """Opens the queue at `db_path` (default settings.job_queue.db_path) with the limits in settings.job_queue."""
+    config = settings.job_queue
+    return JobQueue(
+        db_path or config.db_path,
+        max_queued_jobs=config.max_queued_jobs,
+        max_attempts=config.max_attempts,
+        lease_seconds=config.lease_seconds,
+        poll_interval_seconds=config.poll_interval_seconds,
+    )
+
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Returns the process-wide job queue at settings.job_queue.db_path."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = open_job_queue()
+    return _job_queue
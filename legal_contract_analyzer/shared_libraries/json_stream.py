@@ -0,0 +1,341 @@
+"""Incremental parser and schema validator for streamed LLM JSON responses.
+
+    parser = StreamingJSONParser(EXTRACTION_PROMPT.output_schema)
+    for piece in backend.stream(task, prompt, payload):
+        parser.feed(piece)          # Raises ResponseSchemaError as soon as the output goes wrong
+    value = parser.close()
+
+Every value is checked against the schema as soon as its first character
+arrives (an object where a list was expected, a number where a string was
+expected), enum values and required fields as soon as the value or object is
+complete. A structural error therefore stops the generation at the point it
+happens rather than after the model has finished.
+
+The defects the prompts' "JSON-like" examples invite are repaired on the fly
+and counted in `repairs`: trailing commas, `//` and `/* */` comments, and
+markdown code fences around the value. Raw newlines inside strings are accepted.
+
+Schemas are a small subset of JSON Schema: "type" (a name or a list of names),
+"properties", "required", "additionalProperties" (False forbids unknown
+keys), "items" and "enum".
+"""
+
+import json
+import re
+import time
+from typing import Dict, List, Optional
+
+_NUMBER = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?")
+_LITERALS = {"t": ("true", True), "f": ("false", False), "n": ("null", None)}
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+_WHITESPACE = " \t\r\n"
+_KINDS = {"{": "object", "[": "array", '"': "string", "t": "boolean", "f": "boolean", "n": "null"}
+
+
+class ResponseSchemaError(ValueError):
+    """Raised when a response is not valid JSON (after repairs) or does not match its schema."""
+
+    def __init__(self, message: str, path: str = "$", position: int = 0):
+        super().__init__(f"{message} at {path} (character {position})")
+        self.path = path
+        self.position = position
+
+
+class _Frame:
+    __slots__ = ("kind", "value", "schema", "path", "state", "key")
+
+    def __init__(self, kind: str, schema: Optional[dict], path: str):
+        self.kind = kind
+        self.value = {} if kind == "object" else []
+        self.schema = schema
+        self.path = path
+        self.state = "first" # first, key, colon, value, comma
+        self.key: Optional[str] = None
+
+
+def _type_names(schema: Optional[dict]):
+    names = (schema or {}).get("type")
+    if names is None:
+        return None
+    return (names,) if isinstance(names, str) else tuple(names)
+
+
+class StreamingJSONParser:
+    """
+    Consumes a JSON document in arbitrary pieces and validates it against `schema` as it goes.
+
+    Attributes:
+        first_field_seconds (float): Seconds from construction until the first
+            top-level field (or list item) was complete; None until then.
+        parse_seconds (float): Time spent inside feed and close.
+        repairs (dict): Count of each repair applied, e.g. {"trailing_comma": 1}.
+        characters (int): Characters consumed so far.
+    """
+
+    def __init__(self, schema: Optional[dict] = None):
+        self.schema = schema
+        self.started = time.perf_counter()
+        self.first_field_seconds: Optional[float] = None
+        self.parse_seconds = 0.0
+        self.repairs: Dict[str, int] = {}
+        self.characters = 0
+        self._buffer = ""
+        self._pos = 0
+        self._offset = 0 # Characters dropped from the front of the buffer
+        self._string_scan = 0 # Absolute position to resume looking for a closing quote
+        self._stack: List[_Frame] = []
+        self._done = False
+        self._final = False
+        self._result = None
+
+    def feed(self, text: str) -> None:
+        """Consumes the next piece of the response. Raises ResponseSchemaError on the first error."""
+        started = time.perf_counter()
+        self.characters += len(text)
+        self._buffer += text
+        try:
+            self._run()
+        finally:
+            self.parse_seconds += time.perf_counter() - started
+
+    def close(self):
+        """Finishes parsing and returns the value. Raises ResponseSchemaError if the response is incomplete."""
+        started = time.perf_counter()
+        self._final = True
+        try:
+            self._run()
+            if not self._done:
+                self._fail("Response ended early" if self._stack or self.characters else "Empty response")
+            return self._result
+        finally:
+            self.parse_seconds += time.perf_counter() - started
+
+    # Errors and repairs
+
+    def _path(self) -> str:
+        if not self._stack:
+            return "$"
+        frame = self._stack[-1]
+        if frame.kind == "object" and frame.key is not None and frame.state == "value":
+            return f"{frame.path}.{frame.key}"
+        if frame.kind == "array" and frame.state in ("first", "value"):
+            return f"{frame.path}[{len(frame.value)}]"
+        return frame.path
+
+    def _fail(self, message: str, path: Optional[str] = None):
+        raise ResponseSchemaError(message, path or self._path(), self._offset + self._pos)
+
+    def _repair(self, name: str) -> None:
+        self.repairs[name] = self.repairs.get(name, 0) + 1
+
+    # Scanning
+
+    def _run(self) -> None:
+        while self._skip_insignificant():
+            if self._done:
+                self._fail("Unexpected text after the JSON value")
+            if not self._step():
+                break
+        if self._pos:
+            self._buffer = self._buffer[self._pos:]
+            self._offset += self._pos
+            self._pos = 0
+
+    def _skip_insignificant(self) -> bool:
+        """Skips whitespace, comments and code fences. Returns False when more input is needed."""
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+            if char in _WHITESPACE:
+                self._pos += 1
+            elif char == "/":
+                if self._pos + 1 >= len(buffer):
+                    if not self._final:
+                        return False
+                    self._fail("Unexpected '/'")
+                marker = buffer[self._pos + 1]
+                if marker == "/":
+                    end = buffer.find("\n", self._pos + 2)
+                    if end == -1 and not self._final:
+                        return False
+                    self._pos = len(buffer) if end == -1 else end + 1
+                elif marker == "*":
+                    end = buffer.find("*/", self._pos + 2)
+                    if end == -1:
+                        if not self._final:
+                            return False
+                        self._fail("Unterminated comment")
+                    self._pos = end + 2
+                else:
+                    self._fail("Unexpected '/'")
+                self._repair("comment")
+            elif char == "`" and (self._done or not self._stack):
+                if not buffer.startswith("```", self._pos):
+                    if len(buffer) - self._pos < 3 and not self._final:
+                        return False
+                    self._fail("Unexpected '`'")
+                end = buffer.find("\n", self._pos + 3)
+                if end == -1 and not self._final:
+                    return False
+                self._pos = len(buffer) if end == -1 else end + 1
+                self._repair("code_fence")
+            else:
+                return True
+        return False
+
+    def _scan_string(self):
+        """Returns the decoded string starting at the current position, or None if it is incomplete."""
+        buffer = self._buffer
+        start = self._pos
+        index = max(start + 1, self._string_scan - self._offset)
+        while True:
+            end = buffer.find('"', index)
+            if end == -1:
+                self._string_scan = self._offset + len(buffer)
+                if self._final:
+                    self._fail("Unterminated string")
+                return None
+            backslashes = 0
+            while buffer[end - 1 - backslashes] == "\\":
+                backslashes += 1
+            if backslashes % 2 == 0:
+                break
+            index = end + 1
+        try:
+            value = json.loads(buffer[start:end + 1], strict=False)
+        except ValueError:
+            self._fail("Invalid string escape")
+        self._pos = end + 1
+        self._string_scan = 0
+        return value
+
+    def _step(self) -> bool:
+        """Consumes one token. Returns False when the token is not complete yet."""
+        char = self._buffer[self._pos]
+        frame = self._stack[-1] if self._stack else None
+        if frame is None or frame.state == "value" or (frame.kind == "array" and frame.state == "first"):
+            if frame is not None and frame.kind == "array" and char == "]":
+                if frame.state == "value":
+                    self._repair("trailing_comma")
+                self._pos += 1
+                self._close_frame()
+                return True
+            return self._start_value(char, frame)
+        if frame.state in ("first", "key"):
+            if char == "}":
+                if frame.state == "key":
+                    self._repair("trailing_comma")
+                self._pos += 1
+                self._close_frame()
+                return True
+            if char != '"':
+                self._fail("Expected a field name")
+            key = self._scan_string()
+            if key is None:
+                return False
+            properties = (frame.schema or {}).get("properties") or {}
+            if (frame.schema or {}).get("additionalProperties") is False and key not in properties:
+                self._fail(f"Unexpected field '{key}'", frame.path)
+            frame.key = key
+            frame.state = "colon"
+            return True
+        if frame.state == "colon":
+            if char != ":":
+                self._fail("Expected ':'")
+            self._pos += 1
+            frame.state = "value"
+            return True
+        # frame.state == "comma"
+        if char == ",":
+            self._pos += 1
+            frame.state = "key" if frame.kind == "object" else "value"
+            return True
+        if char == ("}" if frame.kind == "object" else "]"):
+            self._pos += 1
+            self._close_frame()
+            return True
+        self._fail(f"Expected ',' or '{'}' if frame.kind == 'object' else ']'}'")
+
+    def _child_schema(self, frame: Optional[_Frame]) -> Optional[dict]:
+        if frame is None:
+            return self.schema
+        if frame.schema is None:
+            return None
+        if frame.kind == "array":
+            return frame.schema.get("items")
+        properties = frame.schema.get("properties") or {}
+        if frame.key in properties:
+            return properties[frame.key]
+        additional = frame.schema.get("additionalProperties")
+        return additional if isinstance(additional, dict) else None
+
+    def _start_value(self, char: str, frame: Optional[_Frame]) -> bool:
+        schema = self._child_schema(frame)
+        kind = _KINDS.get(char) or ("number" if char == "-" or char.isdigit() else None)
+        if kind is None:
+            self._fail(f"Unexpected character {char!r}")
+        allowed = _type_names(schema)
+        if allowed is not None and kind not in allowed and not (kind == "number" and "integer" in allowed):
+            self._fail(f"Expected {' or '.join(allowed)}, got {kind}")
+
+        if kind in ("object", "array"):
+            self._pos += 1
+            self._stack.append(_Frame(kind, schema, self._path()))
+            return True
+        if kind == "string":
+            value = self._scan_string()
+            if value is None:
+                return False
+        elif kind == "number":
+            match = _NUMBER.match(self._buffer, self._pos)
+            if match is None:
+                if len(self._buffer) - self._pos < 2 and not self._final:
+                    return False
+                self._fail("Invalid number")
+            if not self._final and all(c in _NUMBER_CHARS for c in self._buffer[match.end():]):
+                return False # The number may go on in the next piece
+            text = match.group()
+            value = float(text) if any(c in text for c in ".eE") else int(text)
+            self._pos = match.end()
+        else:
+            literal, value = _LITERALS[char]
+            available = self._buffer[self._pos:self._pos + len(literal)]
+            if available != literal:
+                if literal.startswith(available) and not self._final:
+                    return False
+                self._fail(f"Invalid literal, expected {literal}")
+            self._pos += len(literal)
+        if schema and "enum" in schema and value not in schema["enum"]:
+            self._fail(f"{value!r} is not one of {schema['enum']}")
+        self._complete_value(value)
+        return True
+
+    def _close_frame(self) -> None:
+        frame = self._stack.pop()
+        if frame.kind == "object" and frame.schema:
+            missing = [name for name in frame.schema.get("required") or () if name not in frame.value]
+            if missing:
+                self._fail(f"Missing required field(s) {', '.join(missing)}", frame.path)
+        self._complete_value(frame.value)
+
+    def _complete_value(self, value) -> None:
+        if not self._stack:
+            self._done = True
+            self._result = value
+            return
+        frame = self._stack[-1]
+        if frame.kind == "object":
+            frame.value[frame.key] = value
+            frame.key = None
+        else:
+            frame.value.append(value)
+        frame.state = "comma"
+        if len(self._stack) == 1 and self.first_field_seconds is None:
+            self.first_field_seconds = time.perf_counter() - self.started
+
+
+def parse_json_response(text: str, schema: Optional[dict] = None):
+    """Parses a complete response with the same repairs and validation as StreamingJSONParser."""
+    parser = StreamingJSONParser(schema)
+    parser.feed(text)
+    return parser.close()
@@ -0,0 +1,307 @@
+"""Pluggable LLM backends used by the contract analysis tools.
+
+The tools never call a model SDK directly. They hand the rendered prompt, the
+task name and the structured payload the prompt was built from to the active
+backend, and parse the JSON text it returns. This keeps the tools runnable
+offline: the default `SimulatedLLMBackend` produces the same canned responses
+the tools used to build inline, and `FakeLLMBackend` adds configurable latency
+and failures (and, optionally, prompt- and response-size dependent latency) so
+throughput can be measured without Vertex AI.
+
+Backends can also stream: `stream` and `astream` yield the response in pieces
+as the model produces them, so the tools can validate it incrementally (see
+json_stream) and stop a generation that has gone wrong. Backends without a
+streaming transport yield the whole response as one piece.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+from ..config import settings
+from ..prompts import CHARS_PER_TOKEN, estimate_tokens
+
+EXTRACTION_TASK = "extraction"
+BREACH_TASK = "breach_detection"
+PENALTY_TASK = "penalty_calculation"
+
+
+class LLMBackendError(RuntimeError):
+    """Raised when a backend fails to produce a response."""
+
+
+class LLMBackend:
+    """Base class for model backends."""
+
+    def generate(self, task: str, prompt: str, payload: dict, model: Optional[str] = None) -> str:
+        """
+        Sends a prompt to the model and returns its raw text response.
+
+        Args:
+            task (str): One of EXTRACTION_TASK, BREACH_TASK or PENALTY_TASK.
+            prompt (str): The fully rendered prompt.
+            payload (dict): The structured inputs the prompt was rendered from.
+            model (str, optional): Model name; backends fall back to their own default.
+
+        Returns:
+            str: The model's response text, expected to be JSON.
+        """
+        raise NotImplementedError
+
+    async def agenerate(self, task: str, prompt: str, payload: dict, model: Optional[str] = None) -> str:
+        """
+        Async counterpart of generate, used by the async tools.
+
+        The default runs generate in the event loop's default thread pool;
+        backends with a native async transport should override it.
+        """
+        return await asyncio.to_thread(self.generate, task, prompt, payload, model)
+
+    def stream(self, task: str, prompt: str, payload: dict, model: Optional[str] = None) -> Iterator[str]:
+        """
+        Yields the response text in pieces as the model produces them.
+
+        Closing the iterator early abandons the generation. The default yields
+        the result of generate as a single piece.
+        """
+        yield self.generate(task, prompt, payload, model)
+
+    async def astream(self, task: str, prompt: str, payload: dict, model: Optional[str] = None) -> AsyncIterator[str]:
+        """Async counterpart of stream."""
+        yield await self.agenerate(task, prompt, payload, model)
+
+
+class SimulatedLLMBackend(LLMBackend):
+    """Deterministic stand-in for Gemini that answers from the payload instead of the prompt."""
+
+    def generate(self, task: str, prompt: str, payload: dict, model: Optional[str] = None) -> str:
+        if task == EXTRACTION_TASK:
+            response = self._simulate_extraction(payload)
+        elif task == BREACH_TASK:
+            response = self._simulate_breach_detection(payload)
+        elif task == PENALTY_TASK:
+            response = self._simulate_penalty_calculation(payload)
+        else:
+            raise LLMBackendError(f"Unknown task: {task}")
+        return json.dumps(response)
+
+    async def agenerate(self, task: str, prompt: str, payload: dict, model: Optional[str] = None) -> str:
+        # No I/O to wait for, so there is nothing to gain from a thread.
+        return SimulatedLLMBackend.generate(self, task, prompt, payload, model)
+
+    @staticmethod
+    def _simulate_extraction(payload: dict) -> dict:
+        return {
+            "structured_data": {
+                "effective_date": "2024-01-01",
+                "expiration_date": "2025-12-31",
+                "parties": [
+                    {"name": "Party A Inc.", "role": "Provider", "address": "123 Main St", "contact": "contact@partya.com"},
+                    {"name": "Party B Ltd.", "role": "Client", "address": "456 Oak Ave", "contact": "contact@partyb.com"}
+                ],
+                "financial_terms": "Client pays $10,000 USD monthly.",
+                "governing_law": "State of California",
+                "renewal_terms": "Renews automatically for successive one-year terms unless either party gives 60 days' written notice.",
+                "termination_clauses": "Either party may terminate for a material breach not cured within 30 days of written notice.",
+                "penalty_clauses": "Late payments accrue interest at 1.5% per month."
+            },
+            "data_quality_assessment": "High confidence in extracted dates and parties. Financial terms are clear. Some specific conditions might require deeper review.",
+            "summary": "This is a service agreement between Party A Inc. and Party B Ltd. for services rendered from 2024-01-01 to 2025-12-31, with monthly payments of $10,000."
+        }
+
+    @staticmethod
+    def _simulate_breach_detection(payload: dict) -> list:
+        # Only rules the local rule engine could not decide reach the model. The
+        # simulation has no more information than the structured data either.
+        return [
+            {
+                "rule_id": rule["id"],
+                "rule_description": rule["description"],
+                "status": "Insufficient Data",
+                "details": f"The contract data does not itemize the information needed for: {rule['description']}"
+            }
+            for rule in payload.get("breach_rules") or []
+        ]
+
+    @staticmethod
+    def _simulate_penalty_calculation(payload: dict) -> dict:
+        contract_data = payload.get("extracted_contract_data") or {}
+        # Simulate finding a penalty clause if financial_terms exist
+        penalty_clauses_found = []
+        if contract_data.get("financial_terms") and "pays $10,000 USD monthly" in contract_data.get("financial_terms"):
+            penalty_clauses_found.append({
+                "breach_type_or_clause": "Late Payment",
+                "penalty_description": "A late fee of 5% of the outstanding monthly amount may be applied if payment is not received within 10 days of the due date.",
+                "calculated_amount_formula": "0.05 * monthly_amount",
+                "conditions_for_penalty": "Payment not received within 10 days of due date.",
+                "notes": "Assumes monthly amount is $10,000 as per financial terms."
+            })
+
+        if not penalty_clauses_found:
+            penalty_clauses_found.append({
+                "breach_type_or_clause": "General Non-compliance",
+                "penalty_description": "No specific penalty clauses for general non-compliance were automatically quantifiable from the text.",
+                "calculated_amount_formula": "N/A",
+                "conditions_for_penalty": "N/A",
+                "notes": "Contract may refer to dispute resolution or other remedies."
+            })
+
+        return {
+            "penalty_summary": penalty_clauses_found,
+            "overall_notes": "The contract's penalty clauses seem standard. Further review of specific sections mentioned in 'penalty clauses' (if extracted) is advised."
+        }
+
+
+class FakeLLMBackend(SimulatedLLMBackend):
+    """
+    Simulated backend with configurable latency and failure rate, for offline throughput tests.
+
+    Args:
+        latency_seconds (float): Base delay added to every call.
+        jitter_seconds (float): Uniform random delay added on top of the base latency.
+        failure_rate (float): Probability in [0, 1] that a call raises LLMBackendError.
+        seed (int, optional): Seed for the jitter and failure draws.
+        input_tokens_per_second (float): Prompt processing speed; 0 makes prompt size free.
+        output_tokens_per_second (float): Generation speed; 0 makes response size free.
+        malformed_rate (float): Probability in [0, 1] that a response breaks off
+            into non-JSON text part-way through.
+        stream_chunk_tokens (int): Size of the pieces yielded by stream and astream.
+        model_profiles (dict, optional): Per-model behaviour, keyed by model name, so
+            routing between models can be evaluated offline. Each profile may set
+            "latency_scale" (multiplies every delay) and "field_dropout" (probability
+            that each structured_data field is left out of an extraction; the
+            data_quality_assessment then reports low confidence).
+    """
+
+    def __init__(self, latency_seconds: float = 0.5, jitter_seconds: float = 0.0,
+                 failure_rate: float = 0.0, seed: Optional[int] = None,
+                 input_tokens_per_second: float = 0.0, output_tokens_per_second: float = 0.0,
+                 malformed_rate: float = 0.0, stream_chunk_tokens: int = 8,
+                 model_profiles: Optional[Dict[str, dict]] = None):
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self.failure_rate = failure_rate
+        self.input_tokens_per_second = input_tokens_per_second
+        self.output_tokens_per_second = output_tokens_per_second
+        self.malformed_rate = malformed_rate
+        self.stream_chunk_tokens = stream_chunk_tokens
+        self.model_profiles = model_profiles or {}
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self, task: str, prompt: str, payload: dict, model: Optional[str]):
+        """Returns (response, time to first token, whether to fail, latency scale) for one call."""
+        profile = self.model_profiles.get(model or "", {})
+        with self._lock:
+            self.calls += 1
+            delay = self.latency_seconds + self._random.uniform(0.0, self.jitter_seconds)
+            fail = self._random.random() < self.failure_rate
+            malformed = self._random.random() < self.malformed_rate
+            cut = self._random.uniform(0.2, 0.5)
+            dropout = [self._random.random() < profile.get("field_dropout", 0.0) for _ in range(16)]
+        response = SimulatedLLMBackend.generate(self, task, prompt, payload, model)
+        if task == EXTRACTION_TASK and any(dropout):
+            response = self._drop_fields(response, dropout)
+        if malformed:
+            # Same length, so a malformed response costs as much time as a good one.
+            keep = int(len(response) * cut)
+            filler = '"} I am unable to complete this response. '
+            response = response[:keep] + (filler * (len(response) // len(filler) + 1))[:len(response) - keep]
+        if self.input_tokens_per_second > 0:
+            delay += estimate_tokens(prompt) / self.input_tokens_per_second
+        scale = profile.get("latency_scale", 1.0)
+        return response, delay * scale, fail, scale
+
+    @staticmethod
+    def _drop_fields(response: str, dropout: list) -> str:
+        extraction = json.loads(response)
+        fields = list(extraction["structured_data"])
+        dropped = [field for field, drop in zip(fields, dropout) if drop]
+        if not dropped:
+            return response
+        for field in dropped:
+            del extraction["structured_data"][field]
+        extraction["data_quality_assessment"] = f"Low confidence: could not locate {', '.join(dropped)}."
+        return json.dumps(extraction)
+
+    def _output_seconds(self, text: str, scale: float = 1.0) -> float:
+        if self.output_tokens_per_second <= 0:
+            return 0.0
+        return estimate_tokens(text) / self.output_tokens_per_second * scale
+
+    def _pieces(self, response: str) -> Iterator[str]:
+        size = max(1, self.stream_chunk_tokens * CHARS_PER_TOKEN)
+        for start in range(0, len(response), size):
+            yield response[start:start + size]
+
+    def _prepare(self, task: str, prompt: str, payload: dict, model: Optional[str]):
+        """Returns (response, total delay in seconds, whether to fail) for one call."""
+        response, delay, fail, scale = self._draw(task, prompt, payload, model)
+        return response, delay + self._output_seconds(response, scale), fail
+
+    def generate(self, task: str, prompt: str, payload: dict, model: Optional[str] = None) -> str:
+        response, delay, fail = self._prepare(task, prompt, payload, model)
+        time.sleep(delay)
+        if fail:
+            raise LLMBackendError(f"Simulated {task} failure")
+        return response
+
+    async def agenerate(self, task: str, prompt: str, payload: dict, model: Optional[str] = None) -> str:
+        response, delay, fail = self._prepare(task, prompt, payload, model)
+        await asyncio.sleep(delay)
+        if fail:
+            raise LLMBackendError(f"Simulated {task} failure")
+        return response
+
+    def stream(self, task: str, prompt: str, payload: dict, model: Optional[str] = None) -> Iterator[str]:
+        response, delay, fail, scale = self._draw(task, prompt, payload, model)
+        time.sleep(delay)
+        if fail:
+            raise LLMBackendError(f"Simulated {task} failure")
+        for piece in self._pieces(response):
+            time.sleep(self._output_seconds(piece, scale))
+            yield piece
+
+    async def astream(self, task: str, prompt: str, payload: dict, model: Optional[str] = None) -> AsyncIterator[str]:
+        response, delay, fail, scale = self._draw(task, prompt, payload, model)
+        await asyncio.sleep(delay)
+        if fail:
+            raise LLMBackendError(f"Simulated {task} failure")
+        for piece in self._pieces(response):
+            await asyncio.sleep(self._output_seconds(piece, scale))
+            yield piece
+
+
+_backend: Optional[LLMBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_llm_backend() -> LLMBackend:
+    """
+    Returns the backend the tools currently send prompts to.
+
+    Unless one was set explicitly, this is the shared HTTP client when
+    settings.llm_client.enabled is true and the simulated backend otherwise.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if settings.llm_client.enabled:
+                    from .llm_client import HTTPLLMBackend, get_llm_client # Imports this module
+                    _backend = HTTPLLMBackend(get_llm_client())
+                else:
+                    _backend = SimulatedLLMBackend()
+    return _backend
+
+
+def set_llm_backend(backend: LLMBackend) -> LLMBackend:
+    """Replaces the active backend and returns the previous one."""
+    global _backend
+    previous = get_llm_backend()
+    _backend = backend
+    return previous
@@ -0,0 +1,329 @@
+"""Shared HTTP client for Gemini calls from every tool.
+
+One `LLMClient` per process is meant to be shared by all tools and threads:
+
+* HTTP keep-alive connections are pooled and reused instead of being opened per call.
+* Two token buckets cap requests per minute and (estimated) tokens per minute,
+  so bursts queue locally instead of being throttled upstream.
+* Retryable failures (429, 5xx, connection errors) are retried with full-jitter
+  exponential backoff, honouring Retry-After when the server sends it.
+* Identical concurrent prompts are coalesced (single-flight): only the first
+  caller sends a request and the others wait for and share its result.
+
+`HTTPLLMBackend` plugs the client into the tools via `set_llm_backend`, and
+`fake_llm_server.FakeLLMServer` provides a local endpoint for tests.
+"""
+
+import hashlib
+import http.client
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import urllib.parse
+from typing import Callable, Dict, Optional
+
+from ..config import settings
+from ..prompts import estimate_tokens
+from .llm_backends import LLMBackend, LLMBackendError
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class LLMRequestError(LLMBackendError):
+    """Raised when a request fails permanently or runs out of retries."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `rate_per_minute`.
+
+    Args:
+        rate_per_minute (float): Refill rate. Zero or less disables the limit.
+        capacity (float, optional): Maximum burst. Defaults to one minute of refill.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._condition = threading.Condition()
+
+    def acquire(self, amount: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Blocks until `amount` tokens are available and takes them. Returns False on timeout."""
+        if self.rate_per_second <= 0:
+            return True
+        amount = min(amount, self.capacity) # A request larger than the bucket would otherwise wait forever
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return True
+                wait = (amount - self._tokens) / self.rate_per_second
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                self._condition.wait(wait)
+
+
+class ConnectionPool:
+    """A fixed-size pool of keep-alive HTTP(S) connections to one host."""
+
+    def __init__(self, base_url: str, size: int = 10, timeout: float = 60.0):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.scheme = parsed.scheme or "https"
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.base_path = parsed.path.rstrip("/")
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method: str, path: str, body: bytes, headers: Dict[str, str]):
+        """Sends a request on a pooled connection and returns (status, headers, body)."""
+        self._slots.acquire()
+        try:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self._new_connection()
+                with self._lock:
+                    self._created += 1
+            try:
+                connection.request(method, self.base_path + path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._idle.put(connection)
+            return response.status, dict(response.getheaders()), data
+        finally:
+            self._slots.release()
+
+    @property
+    def connections_created(self) -> int:
+        return self._created
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class _Flight:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self.coalesced = 0
+
+    def do(self, key: str, function: Callable[[], object]):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = function()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+
+
+class LLMClient:
+    """
+    Pooled, rate-limited, retrying, single-flight client for the Gemini generateContent API.
+
+    Args:
+        base_url (str): Scheme and host (and optional path prefix) of the API.
+        path_template (str): Request path with a `{model}` placeholder.
+        api_key (str, optional): Sent as the x-goog-api-key header.
+        requests_per_minute (float): Request rate limit; 0 disables it.
+        tokens_per_minute (float): Estimated input+output token rate limit; 0 disables it.
+        output_token_reserve (int): Output tokens budgeted per request for the token limit.
+        max_retries (int): Retries after the first attempt for retryable failures.
+        backoff_base_seconds (float): First backoff ceiling; doubles every retry.
+        backoff_max_seconds (float): Upper bound for a single backoff.
+        pool_size (int): Maximum concurrent connections.
+        timeout_seconds (float): Socket timeout per request.
+    """
+
+    def __init__(self, base_url: str, path_template: str = "/v1beta/models/{model}:generateContent",
+                 api_key: Optional[str] = None, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 output_token_reserve: int = 1024, max_retries: int = 5, backoff_base_seconds: float = 0.5,
+                 backoff_max_seconds: float = 30.0, pool_size: int = 10, timeout_seconds: float = 120.0):
+        self.path_template = path_template
+        self.api_key = api_key
+        self.output_token_reserve = output_token_reserve
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.pool = ConnectionPool(base_url, size=pool_size, timeout=timeout_seconds)
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.single_flight = SingleFlight()
+        self._random = random.Random()
+        self._stats_lock = threading.Lock()
+        self.upstream_requests = 0
+        self.retries = 0
+
+    def generate(self, prompt: str, model: str, response_mime_type: str = "application/json") -> str:
+        """Returns the text of the first candidate for `prompt`."""
+        key = hashlib.sha256(f"{model}\0{response_mime_type}\0{prompt}".encode("utf-8")).hexdigest()
+        return self.single_flight.do(key, lambda: self._generate_uncoalesced(prompt, model, response_mime_type))
+
+    def _generate_uncoalesced(self, prompt: str, model: str, response_mime_type: str) -> str:
+        body = json.dumps({
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {"responseMimeType": response_mime_type},
+        }).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["x-goog-api-key"] = self.api_key
+        path = self.path_template.format(model=urllib.parse.quote(model, safe=""))
+        token_cost = estimate_tokens(prompt) + self.output_token_reserve
+
+        attempt = 0
+        while True:
+            self.request_bucket.acquire(1)
+            self.token_bucket.acquire(token_cost)
+            retry_after = None
+            try:
+                with self._stats_lock:
+                    self.upstream_requests += 1
+                status, response_headers, data = self.pool.request("POST", path, body, headers)
+                if status == 200:
+                    return self._parse_text(data)
+                if status not in RETRYABLE_STATUSES:
+                    raise LLMRequestError(f"LLM request failed with HTTP {status}: {data[:200]!r}", status)
+                error = LLMRequestError(f"LLM request failed with HTTP {status}", status)
+                retry_after = self._retry_after_seconds(response_headers)
+            except (OSError, http.client.HTTPException) as e:
+                error = LLMRequestError(f"LLM connection error: {e}")
+            if attempt >= self.max_retries:
+                raise error
+            delay = self._random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt)))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            logger.warning("%s; retrying in %.2fs (attempt %d of %d)", error, delay, attempt + 1, self.max_retries)
+            with self._stats_lock:
+                self.retries += 1
+            time.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _retry_after_seconds(headers: Dict[str, str]) -> Optional[float]:
+        for name, value in headers.items():
+            if name.lower() == "retry-after":
+                try:
+                    return float(value)
+                except ValueError:
+                    return None
+        return None
+
+    @staticmethod
+    def _parse_text(data: bytes) -> str:
+        try:
+            response = json.loads(data)
+            return "".join(part.get("text", "") for part in response["candidates"][0]["content"]["parts"])
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise LLMRequestError(f"Unexpected LLM response shape: {e}")
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "upstream_requests": self.upstream_requests,
+                "retries": self.retries,
+                "coalesced_requests": self.single_flight.coalesced,
+                "connections_created": self.pool.connections_created,
+            }
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class HTTPLLMBackend(LLMBackend):
+    """Backend that sends the rendered prompt through an LLMClient."""
+
+    def __init__(self, client: "LLMClient", default_model: Optional[str] = None):
+        self.client = client
+        self.default_model = default_model or settings.agent_settings.model
+
+    def generate(self, task: str, prompt: str, payload: dict, model: Optional[str] = None) -> str:
+        return self.client.generate(prompt, model or self.default_model)
+
+
+_llm_client: Optional[LLMClient] = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Returns the process-wide client configured from settings.llm_client."""
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            client_settings = settings.llm_client
+            _llm_client = LLMClient(
+                base_url=client_settings.base_url,
+                path_template=client_settings.path_template,
+                api_key=settings.API_KEY,
+                requests_per_minute=client_settings.requests_per_minute,
+                tokens_per_minute=client_settings.tokens_per_minute,
+                output_token_reserve=client_settings.output_token_reserve,
+                max_retries=client_settings.max_retries,
+                backoff_base_seconds=client_settings.backoff_base_seconds,
+                backoff_max_seconds=client_settings.backoff_max_seconds,
+                pool_size=client_settings.pool_size,
+                timeout_seconds=client_settings.timeout_seconds,
+            )
+    return _llm_client
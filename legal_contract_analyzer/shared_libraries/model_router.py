@@ -0,0 +1,332 @@
+"""Per-stage model routing: a fast model first, a stronger one only when needed.
+
+Each pipeline stage (extraction, breach detection, penalty calculation) has its
+own models and thresholds in settings.model_routing. `route_stage` runs the
+stage with the stage's fast model, scores the result, and runs it again with
+the strong model when a score is below its threshold:
+
+- confidence: for extraction, how confident the model says it is in its
+  data_quality_assessment (see assessment_confidence);
+- completeness: the share of the fields the stage's output schema declares that
+  the result actually fills (see schema_completeness).
+
+    structured = route_stage(EXTRACTION_TASK, lambda model: extract(text, model))
+
+Every model call is priced with settings.model_routing.prices. Every routed
+stage records its route (the models it went through, e.g.
+"gemini-2.0-flash-001>gemini-2.5-pro"), latency and cost in METRICS and in
+ROUTE_STATS, which `benchmarks.routing_eval` reads to tune the thresholds
+against a labeled evaluation set.
+"""
+
+import collections
+import contextvars
+import logging
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+from ..config import settings
+from ..prompts import BREACH_OUTPUT_SCHEMA, EXTRACTION_OUTPUT_SCHEMA, PENALTY_OUTPUT_SCHEMA
+from .instrumentation import count, observe
+from .llm_backends import BREACH_TASK, EXTRACTION_TASK, PENALTY_TASK
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# What completeness is measured against, per stage. Extraction is judged on its structured_data.
+_COMPLETENESS_SCHEMAS = {
+    EXTRACTION_TASK: EXTRACTION_OUTPUT_SCHEMA["properties"]["structured_data"],
+    BREACH_TASK: BREACH_OUTPUT_SCHEMA,
+    PENALTY_TASK: PENALTY_OUTPUT_SCHEMA,
+}
+
+_PLACEHOLDERS = frozenset({"n/a", "na", "none", "null", "unknown", "not specified", "not found", "not available"})
+
+_CONFIDENCE_FIGURES = (
+    re.compile(r"confidence(?:\s+(?:score|level))?\s*(?:of|:|=|is|was)?\s*(\d+(?:\.\d+)?)\s*(%?)", re.IGNORECASE),
+    re.compile(r"(\d+(?:\.\d+)?)\s*(%)\s*confiden", re.IGNORECASE),
+)
+_CONFIDENCE_WORDS = (
+    re.compile(r"\b(very low|low|medium|moderate|high|very high)\s+(?:\w+\s+)?(?:confidence|certainty)\b", re.IGNORECASE),
+    re.compile(r"\b(?:confidence|certainty)\s+(?:is\s+|was\s+)?(very low|low|medium|moderate|high|very high)\b",
+               re.IGNORECASE),
+)
+_CONFIDENCE_LEVELS = {"very low": 0.1, "low": 0.3, "medium": 0.6, "moderate": 0.6, "high": 0.9, "very high": 1.0}
+_HEDGES = re.compile(
+    r"\b(?:unclear|ambiguous|illegible|incomplete|uncertain|could not|cannot|unable to|not found|missing)\b",
+    re.IGNORECASE,
+)
+NEUTRAL_CONFIDENCE = 0.5 # An assessment that states no confidence either way
+_HEDGE_PENALTY = 0.1
+
+
+def assessment_confidence(text: Optional[str]) -> float:
+    """
+    Reads a confidence in [0, 1] out of a free-text data_quality_assessment.
+
+    Stated figures ("confidence: 0.8", "85% confidence") take precedence, then
+    confidence words ("high confidence in the dates", "confidence is low");
+    when several are stated, the lowest counts. Without either, the assessment
+    starts from NEUTRAL_CONFIDENCE. Every hedge ("unclear", "missing", "could
+    not") then lowers the score by 0.1. An empty assessment scores 0.
+    """
+    if not text or not text.strip():
+        return 0.0
+    figures = []
+    for pattern in _CONFIDENCE_FIGURES:
+        for number, percent in pattern.findall(text):
+            value = float(number)
+            figures.append(value / 100.0 if percent or value > 1.0 else value)
+    if figures:
+        confidence = min(figures)
+    else:
+        levels = [_CONFIDENCE_LEVELS[word.lower()] for pattern in _CONFIDENCE_WORDS for word in pattern.findall(text)]
+        confidence = min(levels) if levels else NEUTRAL_CONFIDENCE
+    confidence -= _HEDGE_PENALTY * len(_HEDGES.findall(text))
+    return min(1.0, max(0.0, confidence))
+
+
+def _is_empty(value) -> bool:
+    if value is None or value == [] or value == {}:
+        return True
+    return isinstance(value, str) and (not value.strip() or value.strip().lower() in _PLACEHOLDERS)
+
+
+def schema_completeness(value, schema: Optional[dict]) -> float:
+    """
+    Returns the share, in [0, 1], of the fields `schema` declares that `value` fills.
+
+    Objects score the mean of their declared properties and lists the mean of
+    their items; an empty value or a placeholder such as "N/A" scores 0 and any
+    other value 1.
+    """
+    if _is_empty(value):
+        return 0.0
+    schema = schema or {}
+    properties = schema.get("properties")
+    if isinstance(value, dict) and properties:
+        return sum(schema_completeness(value.get(name), child) for name, child in properties.items()) / len(properties)
+    items = schema.get("items")
+    if isinstance(value, list) and items:
+        return sum(schema_completeness(item, items) for item in value) / len(value)
+    return 1.0
+
+
+def stage_settings(task: str):
+    """Returns the StageModelSettings of a stage, named by its task (e.g. EXTRACTION_TASK)."""
+    return getattr(settings.model_routing, task)
+
+
+def stage_models(task: str) -> List[str]:
+    """The models a stage is routed through, in order: the fast model, then the strong one if any."""
+    default = settings.agent_settings.model
+    if not settings.model_routing.enabled:
+        return [default]
+    stage = stage_settings(task)
+    fast = stage.fast_model or default
+    if stage.strong_model and stage.strong_model != fast:
+        return [fast, stage.strong_model]
+    return [fast]
+
+
+def route_key(task: str) -> str:
+    """
+    Identifies what a stage's results depend on, for cache keys: its models
+    and, when it can escalate, its thresholds.
+    """
+    models = stage_models(task)
+    if len(models) == 1:
+        return models[0]
+    stage = stage_settings(task)
+    return f"{'>'.join(models)}@confidence={stage.min_confidence},completeness={stage.min_completeness}"
+
+
+def route_scores(task: str, value) -> Dict[str, float]:
+    """Scores a stage result: completeness, plus confidence for extraction."""
+    scores = {}
+    if task == EXTRACTION_TASK:
+        scores["confidence"] = assessment_confidence((value or {}).get("data_quality_assessment"))
+        value = (value or {}).get("structured_data")
+    scores["completeness"] = schema_completeness(value, _COMPLETENESS_SCHEMAS.get(task))
+    return scores
+
+
+def escalation_reason(task: str, value) -> Optional[str]:
+    """Returns why a stage result should go to the strong model ("confidence" or "completeness"), or None."""
+    stage = stage_settings(task)
+    scores = route_scores(task, value)
+    if scores.get("confidence", 1.0) < stage.min_confidence:
+        return "confidence"
+    if scores["completeness"] < stage.min_completeness:
+        return "completeness"
+    return None
+
+
+def model_cost(model: str, input_tokens: float, output_tokens: float) -> float:
+    """Cost in USD of one call, from settings.model_routing.prices; 0 for unpriced models."""
+    price = settings.model_routing.prices.get(model)
+    if price is None:
+        return 0.0
+    return (input_tokens * price.input_per_million_tokens + output_tokens * price.output_per_million_tokens) / 1e6
+
+
+class _RouteUsage:
+    __slots__ = ("calls", "input_tokens", "output_tokens", "cost_usd")
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd = 0.0
+
+
+# The usage of the routed stage running in the current context. It is a mutable
+# object, so calls made from tasks or threads started inside the stage add to it.
+_current_usage: contextvars.ContextVar[Optional[_RouteUsage]] = contextvars.ContextVar("route_usage", default=None)
+
+
+def record_llm_usage(task: str, model: str, input_tokens: int, output_tokens: int) -> None:
+    """Prices one model call and adds it to the cost counter and to the routed stage it belongs to."""
+    cost = model_cost(model, input_tokens, output_tokens)
+    count("llm_cost_usd_total", cost, task=task, model=model)
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.calls += 1
+        usage.input_tokens += input_tokens
+        usage.output_tokens += output_tokens
+        usage.cost_usd += cost
+
+
+class RouteStats:
+    """
+    In-process record of routed stages: per stage and route, how often it was
+    taken, its latencies (the most recent `history`), token usage and cost, and
+    why stages escalated.
+    """
+
+    def __init__(self, history: int = 10000):
+        self.history = history
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], dict] = {}
+        self._escalations: Dict[Tuple[str, str], int] = {}
+
+    def record(self, task: str, route: str, seconds: float, usage: _RouteUsage, reasons: List[str]) -> None:
+        with self._lock:
+            entry = self._routes.get((task, route))
+            if entry is None:
+                entry = self._routes[(task, route)] = {
+                    "count": 0, "latencies": collections.deque(maxlen=self.history),
+                    "calls": 0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+                }
+            entry["count"] += 1
+            entry["latencies"].append(seconds)
+            entry["calls"] += usage.calls
+            entry["input_tokens"] += usage.input_tokens
+            entry["output_tokens"] += usage.output_tokens
+            entry["cost_usd"] += usage.cost_usd
+            for reason in reasons:
+                self._escalations[(task, reason)] = self._escalations.get((task, reason), 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+            self._escalations.clear()
+
+    def summary(self) -> dict:
+        """
+        Returns {task: {"routes": {route: stats}, "escalations": {reason: n}, "escalation_rate": r}},
+        where stats holds count, latency (p50_ms, p99_ms, mean_ms), calls, tokens and cost_usd.
+        """
+        with self._lock:
+            result: Dict[str, dict] = {}
+            for (task, route), entry in sorted(self._routes.items()):
+                latencies = np.asarray(entry["latencies"]) * 1000.0
+                stage = result.setdefault(task, {"routes": {}, "escalations": {}})
+                stage["routes"][route] = {
+                    "count": entry["count"],
+                    "latency": {
+                        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+                        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+                        "mean_ms": round(float(latencies.mean()), 3),
+                    },
+                    "calls": entry["calls"],
+                    "input_tokens": entry["input_tokens"],
+                    "output_tokens": entry["output_tokens"],
+                    "cost_usd": round(entry["cost_usd"], 6),
+                }
+            for (task, reason), escalations in self._escalations.items():
+                result.setdefault(task, {"routes": {}, "escalations": {}})["escalations"][reason] = escalations
+        for stage in result.values():
+            total = sum(route["count"] for route in stage["routes"].values())
+            stage["escalation_rate"] = round(sum(stage["escalations"].values()) / total, 4) if total else 0.0
+        return result
+
+
+ROUTE_STATS = RouteStats()
+
+
+class _Route:
+    """Bookkeeping for one routed stage: usage, escalation decisions and the final record."""
+
+    def __init__(self, task: str):
+        self.task = task
+        self.models = stage_models(task)
+        self.tried: List[str] = []
+        self.reasons: List[str] = []
+        self.usage = _RouteUsage()
+
+    def __enter__(self) -> "_Route":
+        self._token = _current_usage.set(self.usage)
+        self._started = time.perf_counter()
+        return self
+
+    def escalate(self, model: str, value) -> bool:
+        """Records that `model` produced `value`; returns whether to try the next model."""
+        self.tried.append(model)
+        if len(self.tried) == len(self.models):
+            return False
+        reason = escalation_reason(self.task, value)
+        if reason is None:
+            return False
+        self.reasons.append(reason)
+        count("llm_escalations_total", task=self.task, reason=reason)
+        logger.info("Escalating %s from %s to %s: %s below threshold (%s).", self.task, model,
+                    self.models[len(self.tried)], reason, route_scores(self.task, value))
+        return True
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        seconds = time.perf_counter() - self._started
+        _current_usage.reset(self._token)
+        if exc_type is None:
+            route = ">".join(self.tried)
+            observe("model_route_seconds", seconds, task=self.task, route=route)
+            count("model_routes_total", task=self.task, route=route)
+            ROUTE_STATS.record(self.task, route, seconds, self.usage, self.reasons)
+        return False
+
+
+def route_stage(task: str, run: Callable[[str], T], judge: Optional[Callable[[T], object]] = None) -> T:
+    """
+    Runs a stage with its routed models until one's result is good enough.
+
+    Args:
+        task (str): The stage, e.g. EXTRACTION_TASK.
+        run (callable): Runs the stage with the model name it is given and returns its result.
+        judge (callable, optional): Maps a result to the value that is scored, when the
+            result is not itself in the shape of the stage's output (e.g. a partial
+            extraction that is judged merged with the rest of the contract).
+
+    Returns:
+        The result of the last model run.
+    """
+    with _Route(task) as route:
+        for model in route.models:
+            result = run(model)
+            if not route.escalate(model, result if judge is None else judge(result)):
+                break
+    return result
@@ -0,0 +1,449 @@
+"""MinHash/LSH index of processed contracts, for reusing the extraction of templated ones.
+
+Most contracts are filled-in templates: two NDAs from the same template differ
+only in party names, dates and amounts. Every extracted contract is added to
+this index with a MinHash signature of its word shingles, the hashes of its
+clauses and its extraction (structured_data, summary, data_quality_assessment).
+When a new contract's signature is close enough to an indexed one, only the
+clauses the indexed contract does not contain need to go to the model; their
+values are laid over the indexed contract's structured_data. A match that
+dropped clauses of the indexed contract is reported but must not be reused:
+the fields those clauses fed would keep their stale values.
+
+    index = get_near_duplicate_index()
+    match = index.find(extracted_text, model, prompt_version)
+    if match is not None and not match.removed_clauses:
+        delta = extract(match.changed_text)     # Empty when the texts are identical
+        result = match.merge(delta)
+    index.add(pdf_file_path, extracted_text, result, model, prompt_version)
+
+Candidates come from locality-sensitive hashing: the signature is cut into
+bands and every band is a bucket key in SQLite, so a lookup is one indexed
+query however many contracts are stored. The band layout is derived from the
+similarity threshold (see lsh_bands) and candidates are then checked against
+the threshold with the full signatures. `MinHasher.signature_of_pages`
+computes a signature over a stream of pages and `best_match` looks it up, so
+whether a contract has a near-duplicate is known before its whole text is read.
+
+Similarity is the estimated Jaccard similarity of the two texts' sets of
+`shingle_words`-word shingles (lowercased, punctuation ignored).
+"""
+
+import difflib
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings
+from .pdf_stream import split_clauses
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parameters (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    pdf_file_path TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    clause_hashes TEXT NOT NULL,
+    extraction TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    bucket INTEGER NOT NULL,
+    doc_id TEXT NOT NULL,
+    PRIMARY KEY (bucket, doc_id)
+) WITHOUT ROWID;
+"""
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_WHITESPACE = re.compile(r"\s+")
+_PRIME = np.uint64((1 << 61) - 1)
+_HASH_MASK = np.uint64((1 << 32) - 1)
+_SHINGLE_MULTIPLIER = np.uint64(1_000_003)
+_BLOCK_SHINGLES = 4096 # Shingles hashed per NumPy pass, bounding memory to block x permutations
+_MAX_CANDIDATES = 64 # Candidates sharing the most bands that are compared in full
+
+EXTRACTION_FIELDS = ("structured_data", "summary", "data_quality_assessment")
+
+
+def document_id(extracted_text: str) -> str:
+    return hashlib.sha256(extracted_text.encode("utf-8")).hexdigest()
+
+
+def clause_hash(clause: str) -> str:
+    # Whitespace is normalised so re-flowed but otherwise identical clauses match.
+    return hashlib.blake2b(_WHITESPACE.sub(" ", clause).strip().encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _iter_page_words(pages: Iterable[str]) -> Iterator[List[str]]:
+    """Yields the lowercased words of each page. A word cut by a page break is joined to its end."""
+    carry = ""
+    for page in pages:
+        text = carry + page.lower()
+        words = _WORD.findall(text)
+        carry = words.pop() if words and _WORD.match(text, len(text) - 1) else ""
+        yield words
+    if carry:
+        yield [carry]
+
+
+def _removed_clauses(old_hashes: List[str], new_hashes: List[str]) -> int:
+    """
+    Counts the clauses of the old text deleted from the new one.
+
+    The clause sequences are aligned. Within each differing stretch, old
+    clauses found elsewhere in the new text were moved, and as many of the
+    rest as there are new clauses in the stretch were rewritten in place;
+    the remainder were deleted.
+    """
+    old_set, new_set = set(old_hashes), set(new_hashes)
+    removed = 0
+    matcher = difflib.SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        gone = sum(h not in new_set for h in old_hashes[old_start:old_end])
+        rewritten = sum(h not in old_set for h in new_hashes[new_start:new_end])
+        removed += max(0, gone - rewritten)
+    return removed
+
+
+def lsh_bands(threshold: float, num_permutations: int) -> Tuple[int, int]:
+    """
+    Returns the (bands, rows per band) split of a signature for a similarity threshold.
+
+    Two documents become candidates when all rows of at least one band agree,
+    which happens with probability 1 - (1 - s**rows)**bands for similarity s.
+    The split chosen is the one whose S-curve midpoint, (1 / bands) ** (1 / rows),
+    is the highest not above the threshold: documents at the threshold are found
+    with high probability, and most of what is much less similar is never compared.
+    """
+    best = (num_permutations, 1)
+    for rows in range(1, num_permutations + 1):
+        if num_permutations % rows:
+            continue
+        bands = num_permutations // rows
+        if (1.0 / bands) ** (1.0 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures of texts over word shingles.
+
+    Each of the `num_permutations` hash functions is (a * h + b) mod p over the
+    32-bit shingle hash h, with p the Mersenne prime 2**61 - 1; a signature
+    entry is the minimum over the document's shingles, truncated to 32 bits.
+    """
+
+    def __init__(self, num_permutations: int = 128, shingle_words: int = 5, seed: int = 1):
+        self.num_permutations = num_permutations
+        self.shingle_words = shingle_words
+        generator = np.random.default_rng(seed)
+        # Below 2**32, so a * h + b cannot overflow 64 bits.
+        self._a = generator.integers(1, 1 << 32, num_permutations, dtype=np.uint64)
+        self._b = generator.integers(0, 1 << 32, num_permutations, dtype=np.uint64)
+
+    @staticmethod
+    def _word_hashes(words: List[str]) -> np.ndarray:
+        vocabulary = {word: zlib.crc32(word.encode("utf-8")) for word in set(words)}
+        return np.fromiter((vocabulary[word] for word in words), dtype=np.uint64, count=len(words))
+
+    @staticmethod
+    def _shingle_hashes(word_hashes: np.ndarray, size: int) -> np.ndarray:
+        """Returns the distinct hashes of every run of `size` consecutive words."""
+        count = len(word_hashes) - size + 1
+        hashes = np.zeros(count, dtype=np.uint64)
+        for offset in range(size):
+            hashes = (hashes * _SHINGLE_MULTIPLIER + word_hashes[offset:offset + count]) & _HASH_MASK
+        return np.unique(hashes)
+
+    def _update(self, signature: np.ndarray, shingles: np.ndarray) -> None:
+        for start in range(0, len(shingles), _BLOCK_SHINGLES):
+            block = shingles[start:start + _BLOCK_SHINGLES, None]
+            values = ((block * self._a + self._b) % _PRIME) & _HASH_MASK
+            np.minimum(signature, values.min(axis=0), out=signature)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Returns the distinct 32-bit hashes of the text's word shingles."""
+        words = _WORD.findall(text.lower())
+        if not words:
+            return np.empty(0, dtype=np.uint64)
+        return self._shingle_hashes(self._word_hashes(words), min(self.shingle_words, len(words)))
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Returns the text's signature as a uint32 array, or None when it has no words."""
+        return self.signature_of_pages([text])
+
+    def signature_of_pages(self, pages: Iterable[str]) -> Optional[np.ndarray]:
+        """
+        Returns the signature of the pages' concatenated text, reading one page at a time.
+
+        Only the last `shingle_words - 1` words of the previous page are kept, for
+        the shingles that span a page break. Returns None when there are no words.
+        """
+        signature = np.full(self.num_permutations, _HASH_MASK, dtype=np.uint64)
+        tail = np.empty(0, dtype=np.uint64)
+        updated = False
+        for words in _iter_page_words(pages):
+            word_hashes = np.concatenate([tail, self._word_hashes(words)])
+            if len(word_hashes) >= self.shingle_words:
+                self._update(signature, self._shingle_hashes(word_hashes, self.shingle_words))
+                updated = True
+            tail = word_hashes[max(0, len(word_hashes) - self.shingle_words + 1):]
+        if not updated:
+            if not len(tail):
+                return None
+            # Fewer words than a shingle: the whole text is one shingle, as in shingles().
+            self._update(signature, self._shingle_hashes(tail, len(tail)))
+        return signature.astype(np.uint32)
+
+
+@dataclass
+class NearDuplicate:
+    """
+    An indexed contract similar enough to a new text to reuse its extraction.
+
+    Attributes:
+        doc_id (str): Id of the indexed contract (SHA-256 of its text).
+        pdf_file_path (str): Path the indexed contract was last processed from.
+        similarity (float): Estimated Jaccard similarity to the new text.
+        extraction (dict): The indexed contract's structured_data, summary and data_quality_assessment.
+        total_clauses (int): Non-empty clauses in the new text.
+        changed_clauses (list): The new text's clauses that the indexed contract does not contain, in order.
+        removed_clauses (int): Clauses of the indexed contract that were deleted from the new
+            text, rather than moved or replaced by a changed clause.
+    """
+
+    doc_id: str
+    pdf_file_path: str
+    similarity: float
+    extraction: dict
+    total_clauses: int
+    changed_clauses: List[str]
+    removed_clauses: int = 0
+
+    @property
+    def reused_clauses(self) -> int:
+        return self.total_clauses - len(self.changed_clauses)
+
+    @property
+    def changed_text(self) -> str:
+        return "".join(clause if clause.endswith("\n") else clause + "\n" for clause in self.changed_clauses)
+
+    def merge(self, delta: Optional[dict] = None) -> dict:
+        """
+        Lays the extraction of the changed clauses over the indexed contract's extraction.
+
+        Every non-empty field of the delta's structured_data replaces the
+        indexed contract's value for that field: in a template, a clause that
+        changed carries the new value (the new party names, the new amount)
+        and the template's value for the field is stale. Fields the changed
+        clauses say nothing about keep the template's value, which is only
+        right when no template clause was removed: do not merge a match
+        with `removed_clauses`.
+
+        Returns:
+            dict: structured_data, summary and data_quality_assessment.
+        """
+        structured_data = dict(self.extraction.get("structured_data") or {})
+        delta = delta or {}
+        for field, value in (delta.get("structured_data") or {}).items():
+            if value not in (None, "", [], {}):
+                structured_data[field] = value
+        return {
+            "structured_data": structured_data,
+            "summary": delta.get("summary") or self.extraction.get("summary", ""),
+            "data_quality_assessment": (delta.get("data_quality_assessment")
+                                        or self.extraction.get("data_quality_assessment", "")),
+        }
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index over processed contracts, persisted in SQLite.
+
+    Safe to share between threads; each thread gets its own connection. When
+    the MinHash parameters change, signatures stored with the old ones are
+    dropped, since they cannot be compared with new ones.
+    """
+
+    def __init__(self, db_path: str, similarity_threshold: float = 0.8, num_permutations: int = 128,
+                 shingle_words: int = 5, seed: int = 1):
+        self.db_path = db_path
+        self.similarity_threshold = similarity_threshold
+        self.hasher = MinHasher(num_permutations, shingle_words, seed)
+        self.bands, self.rows = lsh_bands(similarity_threshold, num_permutations)
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # clause_order: clause hashes are stored in document order, so deleted clauses can be told apart.
+        parameters = json.dumps({"num_permutations": num_permutations, "shingle_words": shingle_words,
+                                 "seed": seed, "bands": self.bands, "clause_order": True})
+        connection = self._connection()
+        with connection:
+            connection.executescript(_SCHEMA)
+            stored = connection.execute("SELECT value FROM parameters WHERE name = 'minhash'").fetchone()
+            if stored is not None and stored[0] != parameters:
+                logger.info("MinHash parameters changed; clearing the near-duplicate index.")
+                connection.execute("DELETE FROM buckets")
+                connection.execute("DELETE FROM documents")
+            connection.execute("INSERT OR REPLACE INTO parameters (name, value) VALUES ('minhash', ?)", (parameters,))
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _buckets(self, signature: np.ndarray) -> List[int]:
+        """One bucket key per band; the band number is part of the key."""
+        rows = signature[:self.bands * self.rows].reshape(self.bands, self.rows)
+        return [
+            int.from_bytes(hashlib.blake2b(band.to_bytes(2, "little") + row.tobytes(), digest_size=8).digest(),
+                           "little", signed=True)
+            for band, row in enumerate(rows)
+        ]
+
+    def add(self, pdf_file_path: str, extracted_text: str, result: dict, model: str, prompt_version: str) -> str:
+        """
+        Indexes a processed contract's text and extraction. Re-adding the same text only updates its path.
+
+        Returns:
+            str: The document id.
+        """
+        doc_id = document_id(extracted_text)
+        connection = self._connection()
+        updated = connection.execute(
+            "UPDATE documents SET pdf_file_path = ?, indexed_at = ? "
+            "WHERE doc_id = ? AND model = ? AND prompt_version = ?",
+            (pdf_file_path, time.time(), doc_id, model, prompt_version),
+        ).rowcount
+        connection.commit()
+        if updated:
+            return doc_id
+        signature = self.hasher.signature(extracted_text)
+        if signature is None:
+            return doc_id
+        clause_hashes = [clause_hash(clause) for clause in split_clauses(extracted_text) if clause.strip()]
+        extraction = {field: result.get(field) for field in EXTRACTION_FIELDS}
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO documents (doc_id, pdf_file_path, model, prompt_version, signature, "
+                "clause_hashes, extraction, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (doc_id, pdf_file_path, model, prompt_version, signature.tobytes(),
+                 json.dumps(clause_hashes), json.dumps(extraction), time.time()),
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO buckets (bucket, doc_id) VALUES (?, ?)",
+                [(bucket, doc_id) for bucket in self._buckets(signature)],
+            )
+        logger.debug("Indexed %s for near-duplicate reuse", pdf_file_path)
+        return doc_id
+
+    def best_match(self, signature: Optional[np.ndarray], model: str,
+                   prompt_version: str) -> Optional[Tuple[str, float]]:
+        """
+        Finds the indexed contract whose signature is closest to `signature`, extracted with the same model and prompt.
+
+        Returns:
+            tuple: (doc_id, estimated similarity) of the best match at or above the similarity threshold, or None.
+        """
+        if signature is None:
+            return None
+        buckets = self._buckets(signature)
+        connection = self._connection()
+        rows = connection.execute(
+            f"""
+            SELECT d.doc_id, d.signature
+            FROM (SELECT doc_id, COUNT(*) AS hits FROM buckets
+                  WHERE bucket IN ({", ".join("?" * len(buckets))})
+                  GROUP BY doc_id ORDER BY hits DESC LIMIT ?) AS c
+            JOIN documents AS d ON d.doc_id = c.doc_id
+            WHERE d.model = ? AND d.prompt_version = ?
+            """,
+            (*buckets, _MAX_CANDIDATES, model, prompt_version),
+        ).fetchall()
+        if not rows:
+            return None
+        signatures = np.stack([np.frombuffer(blob, dtype=np.uint32) for _, blob in rows])
+        similarities = (signatures == signature).mean(axis=1)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        return rows[best][0], round(float(similarities[best]), 4)
+
+    def find(self, extracted_text: str, model: str, prompt_version: str,
+             signature: Optional[np.ndarray] = None) -> Optional[NearDuplicate]:
+        """
+        Finds the indexed contract most similar to `extracted_text`, extracted with the same model and prompt.
+
+        Args:
+            signature (np.ndarray, optional): The text's signature, when already computed.
+
+        Returns:
+            NearDuplicate: The best match at or above the similarity threshold, or None.
+        """
+        if signature is None:
+            signature = self.hasher.signature(extracted_text)
+        best = self.best_match(signature, model, prompt_version)
+        if best is None:
+            return None
+        doc_id, similarity = best
+        connection = self._connection()
+        pdf_file_path, clause_hashes, extraction = connection.execute(
+            "SELECT pdf_file_path, clause_hashes, extraction FROM documents WHERE doc_id = ?", (doc_id,)
+        ).fetchone()
+        known_hashes = json.loads(clause_hashes)
+        known = set(known_hashes)
+        clauses = [clause for clause in split_clauses(extracted_text) if clause.strip()]
+        new_hashes = [clause_hash(clause) for clause in clauses]
+        return NearDuplicate(
+            doc_id=doc_id,
+            pdf_file_path=pdf_file_path,
+            similarity=similarity,
+            extraction=json.loads(extraction),
+            total_clauses=len(clauses),
+            changed_clauses=[clause for clause, h in zip(clauses, new_hashes) if h not in known],
+            removed_clauses=_removed_clauses(known_hashes, new_hashes),
+        )
+
+    def document_count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+
+_near_duplicate_index: Optional[NearDuplicateIndex] = None
+_near_duplicate_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index() -> Optional[NearDuplicateIndex]:
+    """Returns the process-wide near-duplicate index, or None when disabled in settings.near_duplicates."""
+    global _near_duplicate_index
+    config = settings.near_duplicates
+    if not config.enabled:
+        return None
+    with _near_duplicate_index_lock:
+        if _near_duplicate_index is None:
+            _near_duplicate_index = NearDuplicateIndex(
+                config.db_path, config.similarity_threshold, config.num_permutations, config.shingle_words
+            )
+    return _near_duplicate_index
@@ -0,0 +1,365 @@
+"""Streaming, page-at-a-time contract text ingestion.
+
+PDFs are memory-mapped and their content streams are decoded one at a time,
+so only the page currently being read is ever materialised. The page text is
+then re-cut into chunks that fit a token budget, preferring clause boundaries,
+so each chunk can be sent to the extraction model on its own. The partial
+`structured_data` results are folded back together with `merge_structured_data`.
+Passes that need the pages again (escalation, near-duplicate lookup) replay
+them from a `PageSpool` instead of decoding the PDF again.
+
+Only text-layer PDFs are decoded locally. Each content stream holding text
+operators is treated as one page, which holds for the PDFs produced by
+common writers but is not a full implementation of the page tree. Files
+that are not PDFs are read as plain text, split into pages on form feeds.
+"""
+
+import mmap
+import re
+import tempfile
+import zlib
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from ..prompts import CHARS_PER_TOKEN, estimate_tokens
+
+# Streams with any of these keys in their dictionary are fonts, images,
+# object streams or cross-reference data rather than page content.
+_NON_CONTENT_MARKERS = (b"/Subtype/Image", b"/Subtype /Image", b"/Length1", b"/Type/XObject",
+                        b"/Type /XObject", b"/Type/ObjStm", b"/Type /ObjStm", b"/Type/XRef", b"/Type /XRef")
+
+_TEXT_SHOW_OPERATORS = {b"Tj", b"TJ", b"'", b'"'}
+_LINE_BREAK_OPERATORS = {b"T*", b"Td", b"TD", b"ET", b"'", b'"'}
+_DELIMITERS = b"()<>[]{}/% \t\r\n\f\0"
+
+# A new clause starts at a numbered heading ("1.", "2.3)", "Section 4", "ARTICLE V")
+# at the start of a line, or after a blank line.
+_CLAUSE_BOUNDARY = re.compile(
+    r"\n(?=[ \t]*(?:(?:ARTICLE|Article|SECTION|Section|CLAUSE|Clause)\s+[\w.]+|\d+(?:\.\d+)*[.)]\s))"
+    r"|\n[ \t]*\n"
+)
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.;:])\s+")
+
+
+def iter_pdf_pages(pdf_file_path: str) -> Iterator[str]:
+    """
+    Yields the text of a contract one page at a time.
+
+    Args:
+        pdf_file_path (str): Path of the PDF (or plain text) contract.
+
+    Yields:
+        str: The text of each page, in file order. Pages without a text layer are skipped.
+    """
+    with open(pdf_file_path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # Empty files cannot be mapped
+            return
+        with mm:
+            if mm[:5] == b"%PDF-":
+                yield from _iter_pdf_content_pages(mm)
+            else:
+                yield from _iter_plain_text_pages(mm)
+
+
+def _iter_plain_text_pages(mm: mmap.mmap) -> Iterator[str]:
+    start = 0
+    while start < len(mm):
+        end = mm.find(b"\f", start)
+        if end == -1:
+            end = len(mm)
+        page = mm[start:end].decode("utf-8", errors="replace")
+        if page.strip():
+            yield page
+        start = end + 1
+
+
+def _iter_pdf_content_pages(mm: mmap.mmap) -> Iterator[str]:
+    position = 0
+    while True:
+        keyword = mm.find(b"stream", position)
+        if keyword == -1:
+            return
+        if mm[max(0, keyword - 3):keyword] == b"end":
+            position = keyword + 6
+            continue
+        data_start = keyword + 6
+        if mm[data_start:data_start + 2] == b"\r\n":
+            data_start += 2
+        elif mm[data_start:data_start + 1] in (b"\n", b"\r"):
+            data_start += 1
+        data_end = mm.find(b"endstream", data_start)
+        if data_end == -1:
+            return
+        position = data_end + 9
+
+        object_start = mm.rfind(b"obj", 0, keyword)
+        stream_dict = mm[object_start if object_start != -1 else max(0, keyword - 512):keyword]
+        if any(marker in stream_dict for marker in _NON_CONTENT_MARKERS):
+            continue
+        data = mm[data_start:data_end]
+        if b"/FlateDecode" in stream_dict:
+            try:
+                data = zlib.decompressobj().decompress(data)
+            except zlib.error:
+                continue
+        if b"BT" not in data:
+            continue
+        text = _content_stream_text(data)
+        if text.strip():
+            yield text
+
+
+def _content_stream_text(data: bytes) -> str:
+    """Extracts the shown text from a decoded PDF content stream."""
+    parts: List[str] = []
+    operands: List[bytes] = []
+    i, n = 0, len(data)
+    while i < n:
+        c = data[i]
+        if c in b" \t\r\n\f\0":
+            i += 1
+        elif c == 0x25: # % comment
+            while i < n and data[i] not in b"\r\n":
+                i += 1
+        elif c == 0x28: # ( literal string
+            string, i = _read_literal_string(data, i)
+            operands.append(string)
+        elif c == 0x3C and data[i + 1:i + 2] != b"<": # <hex string>
+            end = data.find(b">", i)
+            end = n if end == -1 else end
+            hex_digits = re.sub(rb"\s", b"", data[i + 1:end])
+            if len(hex_digits) % 2:
+                hex_digits += b"0"
+            try:
+                operands.append(bytes.fromhex(hex_digits.decode("ascii")))
+            except ValueError:
+                pass
+            i = end + 1
+        elif c in b"[]<>{}":
+            i += 1 # Array and dictionary brackets; TJ arrays just collect their strings
+        else:
+            start = i
+            while i < n and data[i] not in _DELIMITERS:
+                i += 1
+            if i == start: # Lone delimiter such as '/'
+                i += 1
+                continue
+            token = data[start:i]
+            if token in _TEXT_SHOW_OPERATORS:
+                if token in _LINE_BREAK_OPERATORS:
+                    parts.append("\n")
+                parts.append("".join(s.decode("latin-1") for s in operands))
+                operands = []
+            elif token in _LINE_BREAK_OPERATORS:
+                parts.append("\n")
+                operands = []
+            elif not (token[:1].isdigit() or token[:1] in b"+-."):
+                operands = [] # Any other operator discards pending operands
+    return re.sub(r"\n{2,}", "\n", "".join(parts)).strip("\n") + "\n"
+
+
+def _read_literal_string(data: bytes, i: int):
+    out = bytearray()
+    depth = 0
+    i += 1
+    n = len(data)
+    escapes = {ord("n"): b"\n", ord("r"): b"\r", ord("t"): b"\t", ord("b"): b"\b", ord("f"): b"\f"}
+    while i < n:
+        c = data[i]
+        if c == 0x5C and i + 1 < n: # backslash
+            nxt = data[i + 1]
+            if nxt in escapes:
+                out += escapes[nxt]
+                i += 2
+            elif 0x30 <= nxt <= 0x37: # octal escape
+                j = i + 1
+                while j < min(i + 4, n) and 0x30 <= data[j] <= 0x37:
+                    j += 1
+                out.append(int(data[i + 1:j], 8) & 0xFF)
+                i = j
+            elif nxt in b"\r\n": # line continuation
+                i += 2
+            else:
+                out.append(nxt)
+                i += 2
+        elif c == 0x28:
+            depth += 1
+            out.append(c)
+            i += 1
+        elif c == 0x29:
+            if depth == 0:
+                return bytes(out), i + 1
+            depth -= 1
+            out.append(c)
+            i += 1
+        else:
+            out.append(c)
+            i += 1
+    return bytes(out), i
+
+
+class PageSpool:
+    """
+    A stream of pages that is read once and can be iterated any number of times.
+
+    The first pass takes pages from the source (e.g. iter_pdf_pages) and spills
+    each one to an anonymous temporary file as it goes by; later passes read
+    the pages back from that file one at a time, so the PDF is decoded only
+    once and no pass holds more than one page in memory. A pass that stops
+    early leaves the rest of the source to the next one.
+
+        with PageSpool(iter_pdf_pages(path)) as pages:
+            signature = hasher.signature_of_pages(pages)
+            chunks = iter_text_chunks(pages, budget)
+    """
+
+    def __init__(self, pages: Iterable[str]):
+        self._source: Optional[Iterator[str]] = iter(pages)
+        self._file = tempfile.TemporaryFile()
+        self._spans: List[Tuple[int, int]] = [] # (offset, length) of each page in the file
+        self._end = 0
+
+    def __iter__(self) -> Iterator[str]:
+        index = 0
+        while True:
+            if index < len(self._spans):
+                offset, length = self._spans[index]
+                self._file.seek(offset)
+                page = self._file.read(length).decode("utf-8", "surrogatepass")
+            elif self._source is None:
+                return
+            else:
+                page = next(self._source, None)
+                if page is None:
+                    self._source = None
+                    return
+                data = page.encode("utf-8", "surrogatepass")
+                self._file.seek(self._end)
+                self._file.write(data)
+                self._spans.append((self._end, len(data)))
+                self._end += len(data)
+            index += 1
+            yield page
+
+    def text(self) -> str:
+        """Returns the full text: the only point where all the pages are held in memory at once."""
+        return "".join(self)
+
+    def close(self) -> None:
+        self._source = None
+        self._file.close()
+
+    def __enter__(self) -> "PageSpool":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.close()
+        return False
+
+
+def split_clauses(text: str) -> List[str]:
+    """Splits text at clause boundaries. Joining the result gives back `text`."""
+    clauses = []
+    start = 0
+    for match in _CLAUSE_BOUNDARY.finditer(text):
+        end = match.end()
+        if end > start:
+            clauses.append(text[start:end])
+            start = end
+    if start < len(text):
+        clauses.append(text[start:])
+    return clauses
+
+
+def _split_oversized(clause: str, token_budget: int) -> Iterator[str]:
+    """Cuts a clause that alone exceeds the budget at sentence boundaries, then hard at the budget."""
+    max_chars = token_budget * CHARS_PER_TOKEN
+    buffer = ""
+    for sentence in _SENTENCE_BOUNDARY.split(clause):
+        sentence += " "
+        while len(sentence) > max_chars:
+            if buffer:
+                yield buffer
+                buffer = ""
+            yield sentence[:max_chars]
+            sentence = sentence[max_chars:]
+        if len(buffer) + len(sentence) > max_chars:
+            yield buffer
+            buffer = ""
+        buffer += sentence
+    if buffer.strip():
+        yield buffer
+
+
+def iter_text_chunks(pages: Iterable[str], token_budget: int) -> Iterator[str]:
+    """
+    Re-cuts a stream of pages into chunks of at most `token_budget` estimated tokens.
+
+    Chunks end on clause boundaries where possible; a clause that spans a page
+    break stays in one chunk. Only clauses waiting for the current chunk are held in memory.
+
+    Args:
+        pages (Iterable[str]): Page texts, e.g. from iter_pdf_pages.
+        token_budget (int): Maximum estimated tokens per chunk.
+
+    Yields:
+        str: Consecutive chunks of the contract text.
+    """
+    buffer: List[str] = []
+    used = 0
+    for page in pages:
+        if not page.endswith("\n"):
+            page += "\n"
+        for clause in split_clauses(page):
+            cost = estimate_tokens(clause)
+            if cost > token_budget:
+                if buffer:
+                    yield "".join(buffer)
+                    buffer, used = [], 0
+                yield from _split_oversized(clause, token_budget)
+                continue
+            if buffer and used + cost > token_budget:
+                yield "".join(buffer)
+                buffer, used = [], 0
+            buffer.append(clause)
+            used += cost
+    if buffer:
+        yield "".join(buffer)
+
+
+def _merge_value(current, new, key: str):
+    if current in (None, "", [], {}):
+        return new
+    if new in (None, "", [], {}) or current == new:
+        return current
+    if isinstance(current, dict) and isinstance(new, dict):
+        return merge_structured_data([current, new])
+    if isinstance(current, list) and isinstance(new, list):
+        merged = list(current)
+        for item in new:
+            if item not in merged:
+                merged.append(item)
+        return merged
+    if key.endswith("_date"):
+        return current # Dates are stated once; the first chunk that has one wins
+    if isinstance(current, str) and isinstance(new, str):
+        if new in current:
+            return current
+        return f"{current}\n{new}"
+    return current
+
+
+def merge_structured_data(partials: Iterable[dict]) -> dict:
+    """
+    Folds per-chunk `structured_data` dicts into one.
+
+    Empty values are filled from later chunks, lists are unioned in order,
+    nested dicts are merged recursively, `*_date` fields keep the first value
+    found and differing text fields are concatenated.
+    """
+    merged: dict = {}
+    for partial in partials:
+        for key, value in (partial or {}).items():
+            merged[key] = _merge_value(merged.get(key), value, key)
+    return merged
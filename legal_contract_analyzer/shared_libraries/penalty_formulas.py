@@ -0,0 +1,407 @@
+"""Safe, compiled evaluation of penalty `calculated_amount_formula` strings.
+
+Formulas such as "0.05 * monthly_amount" or "min(0.01 * contract_value * days_late, 50000)"
+are parsed into an AST by a small recursive-descent parser and compiled into a
+tree of closures over NumPy operations; nothing is passed to `eval`. A compiled
+formula can be evaluated over whole arrays of scenario variables at once, and
+`evaluate_portfolio` groups many contracts' formulas so each distinct formula
+is evaluated in a single broadcast pass.
+
+Grammar (lowest to highest precedence):
+
+    comparison := sum (("<" | "<=" | ">" | ">=" | "==" | "!=") sum)?
+    sum        := product (("+" | "-") product)*
+    product    := unary (("*" | "/") unary)*
+    unary      := "-" unary | "+" unary | power
+    power      := atom (("**" | "^") unary)?
+    atom       := number ["%"] | "$" number | name | name "(" args ")" | "(" comparison ")"
+
+Dollar amounts may use thousands separators ("$10,000"), and "5%" means 0.05.
+"""
+
+import functools
+import re
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+
+class FormulaError(ValueError):
+    """Raised when a formula cannot be parsed, compiled or evaluated."""
+
+
+_TOKEN = re.compile(
+    r"\s*(?:"
+    r"(?P<money>\$\s*(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?)"
+    r"|(?P<number>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|\.\d+)"
+    r"|(?P<name>[A-Za-z_][A-Za-z0-9_]*)"
+    r"|(?P<op>\*\*|<=|>=|==|!=|[-+*/^%(),<>])"
+    r")"
+)
+
+_BINARY = {
+    "+": np.add,
+    "-": np.subtract,
+    "*": np.multiply,
+    "/": np.true_divide,
+    "**": np.power,
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+
+# Division by zero, overflow and invalid operations give inf and NaN amounts rather
+# than warnings, both when constant subtrees are folded and when formulas are evaluated.
+_ERRSTATE = {"divide": "ignore", "over": "ignore", "invalid": "ignore"}
+
+
+def _variadic(ufunc):
+    def apply(*args):
+        if not args:
+            raise FormulaError(f"{ufunc.__name__} needs at least one argument")
+        return functools.reduce(ufunc, args)
+    return apply
+
+
+# name -> (callable, minimum arity, maximum arity or None)
+_FUNCTIONS: Dict[str, Tuple[Callable, int, Optional[int]]] = {
+    "min": (_variadic(np.minimum), 1, None),
+    "max": (_variadic(np.maximum), 1, None),
+    "abs": (np.abs, 1, 1),
+    "round": (lambda x, digits=0: np.round(x, int(digits)), 1, 2),
+    "floor": (np.floor, 1, 1),
+    "ceil": (np.ceil, 1, 1),
+    "clip": (np.clip, 3, 3),
+    "if": (np.where, 3, 3),
+}
+
+
+def _tokenize(source: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    source = source.rstrip()
+    while position < len(source):
+        match = _TOKEN.match(source, position)
+        if not match or match.end() == position:
+            raise FormulaError(f"Unexpected character {source[position:].strip()[:1]!r} in formula {source!r}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    tokens.append(("end", ""))
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser producing tuple-based AST nodes."""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.tokens = _tokenize(source)
+        self.index = 0
+
+    def _peek(self) -> Tuple[str, str]:
+        return self.tokens[self.index]
+
+    def _take(self) -> Tuple[str, str]:
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def _expect(self, value: str) -> None:
+        kind, text = self._take()
+        if text != value:
+            raise FormulaError(f"Expected {value!r} but found {text or 'end of formula'!r} in {self.source!r}")
+
+    def parse(self):
+        node = self._comparison()
+        kind, text = self._peek()
+        if kind != "end":
+            raise FormulaError(f"Unexpected {text!r} in formula {self.source!r}")
+        return node
+
+    def _comparison(self):
+        node = self._sum()
+        if self._peek()[1] in ("<", "<=", ">", ">=", "==", "!="):
+            op = self._take()[1]
+            node = ("binary", op, node, self._sum())
+        return node
+
+    def _sum(self):
+        node = self._product()
+        while self._peek()[1] in ("+", "-"):
+            op = self._take()[1]
+            node = ("binary", op, node, self._product())
+        return node
+
+    def _product(self):
+        node = self._unary()
+        while self._peek()[1] in ("*", "/"):
+            op = self._take()[1]
+            node = ("binary", op, node, self._unary())
+        return node
+
+    def _unary(self):
+        if self._peek()[1] in ("-", "+"):
+            op = self._take()[1]
+            operand = self._unary()
+            return ("negate", operand) if op == "-" else operand
+        return self._power()
+
+    def _power(self):
+        node = self._atom()
+        if self._peek()[1] in ("**", "^"):
+            self._take()
+            node = ("binary", "**", node, self._unary())
+        return node
+
+    def _atom(self):
+        kind, text = self._take()
+        if kind == "money":
+            return ("constant", float(text.lstrip("$ ").replace(",", "")))
+        if kind == "number":
+            value = float(text)
+            if self._peek()[1] == "%":
+                self._take()
+                value /= 100.0
+            return ("constant", value)
+        if kind == "name":
+            if self._peek()[1] != "(":
+                return ("variable", text)
+            if text not in _FUNCTIONS:
+                raise FormulaError(f"Unknown function {text!r} in formula {self.source!r}")
+            self._take()
+            args = []
+            if self._peek()[1] != ")":
+                args.append(self._comparison())
+                while self._peek()[1] == ",":
+                    self._take()
+                    args.append(self._comparison())
+            self._expect(")")
+            _, min_args, max_args = _FUNCTIONS[text]
+            if len(args) < min_args or (max_args is not None and len(args) > max_args):
+                raise FormulaError(f"Wrong number of arguments to {text}() in formula {self.source!r}")
+            if text == "round" and len(args) == 2:
+                digits = _literal_value(args[1])
+                if digits is None or digits != int(digits):
+                    raise FormulaError(f"round() digits must be a whole-number literal in formula {self.source!r}")
+            return ("call", text, tuple(args))
+        if text == "(":
+            node = self._comparison()
+            self._expect(")")
+            return node
+        raise FormulaError(f"Unexpected {text or 'end of formula'!r} in formula {self.source!r}")
+
+
+def _literal_value(node) -> Optional[float]:
+    """The value of a number literal, possibly negated, or None for any other node."""
+    if node[0] == "constant":
+        return node[1]
+    if node[0] == "negate":
+        value = _literal_value(node[1])
+        return None if value is None else -value
+    return None
+
+
+def _compile_node(node) -> Tuple[Callable[[Mapping], object], Optional[float]]:
+    """Returns (closure, constant value or None). Constant subtrees are folded at compile time."""
+    kind = node[0]
+    if kind == "constant":
+        value = node[1]
+        return (lambda env: value), value
+    if kind == "variable":
+        name = node[1]
+        return (lambda env: env[name]), None
+    if kind == "negate":
+        operand, constant = _compile_node(node[1])
+        if constant is not None:
+            return _constant(-constant)
+        return (lambda env: np.negative(operand(env))), None
+    if kind == "binary":
+        ufunc = _BINARY[node[1]]
+        left, left_constant = _compile_node(node[2])
+        right, right_constant = _compile_node(node[3])
+        if left_constant is not None and right_constant is not None:
+            return _constant(float(ufunc(left_constant, right_constant)))
+        return (lambda env: ufunc(left(env), right(env))), None
+    if kind == "call":
+        function = _FUNCTIONS[node[1]][0]
+        compiled = [_compile_node(arg) for arg in node[2]]
+        if all(constant is not None for _, constant in compiled):
+            return _constant(float(function(*(constant for _, constant in compiled))))
+        closures = [closure for closure, _ in compiled]
+        return (lambda env: function(*(closure(env) for closure in closures))), None
+    raise FormulaError(f"Unknown node type {kind!r}")
+
+
+def _constant(value: float):
+    return (lambda env: value), value
+
+
+def _collect_variables(node, names: set) -> set:
+    if node[0] == "variable":
+        names.add(node[1])
+    elif node[0] == "negate":
+        _collect_variables(node[1], names)
+    elif node[0] == "binary":
+        _collect_variables(node[2], names)
+        _collect_variables(node[3], names)
+    elif node[0] == "call":
+        for arg in node[2]:
+            _collect_variables(arg, names)
+    return names
+
+
+class CompiledFormula:
+    """A parsed and compiled penalty formula, reusable across any number of evaluations."""
+
+    __slots__ = ("source", "variables", "_closure")
+
+    def __init__(self, source: str):
+        try:
+            tree = _Parser(source).parse()
+            self.variables = frozenset(_collect_variables(tree, set()))
+            with np.errstate(**_ERRSTATE):
+                self._closure = _compile_node(tree)[0]
+        except RecursionError:
+            raise FormulaError(f"Formula {source[:80]!r}... is nested too deeply") from None
+        self.source = source
+
+    def evaluate(self, variables: Mapping[str, object]) -> np.ndarray:
+        """
+        Evaluates the formula with NumPy broadcasting.
+
+        Args:
+            variables (Mapping): Value for every name in `self.variables`. Scalars and
+                arrays of any broadcast-compatible shapes may be mixed.
+
+        Returns:
+            np.ndarray: The penalty amounts, shaped like the broadcast of the inputs.
+        """
+        missing = self.variables.difference(variables)
+        if missing:
+            raise FormulaError(f"Formula {self.source!r} is missing values for: {', '.join(sorted(missing))}")
+        env = {name: np.asarray(variables[name], dtype=float) for name in self.variables}
+        try:
+            with np.errstate(**_ERRSTATE):
+                result = np.asarray(self._closure(env), dtype=float)
+        except RecursionError:
+            raise FormulaError(f"Formula {self.source[:80]!r}... is nested too deeply") from None
+        if env:
+            result = np.broadcast_to(result, np.broadcast_shapes(result.shape, *(v.shape for v in env.values())))
+        return result
+
+    def __call__(self, **variables) -> np.ndarray:
+        return self.evaluate(variables)
+
+    def __repr__(self) -> str:
+        return f"CompiledFormula({self.source!r})"
+
+
+# Placeholders the model uses when a clause has no computable formula.
+_NOT_APPLICABLE = {"N/A", "NA", "NONE", "NOT APPLICABLE"}
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_formula(source: str) -> CompiledFormula:
+    """Compiles a formula, reusing the compiled object for repeated sources."""
+    if not isinstance(source, str) or not source.strip():
+        raise FormulaError("Formula is empty")
+    if source.strip().upper() in _NOT_APPLICABLE:
+        raise FormulaError(f"Formula {source!r} is not applicable")
+    return CompiledFormula(source.strip())
+
+
+# The structured_data fields derive_formula_variables reads amounts from, in order of precedence.
+FORMULA_SOURCE_FIELDS = ("financial_terms",)
+
+_AMOUNT = re.compile(r"(?:\$|USD\s*)\s*(\d[\d,]*(?:\.\d+)?)|(\d[\d,]*(?:\.\d+)?)\s*(?:USD|dollars)", re.IGNORECASE)
+_PERIODS = (
+    (re.compile(r"\b(?:monthly|per month|each month|a month)\b", re.IGNORECASE), "monthly_amount"),
+    (re.compile(r"\b(?:annually|yearly|per year|per annum|each year)\b", re.IGNORECASE), "annual_amount"),
+    (re.compile(r"\b(?:weekly|per week|each week)\b", re.IGNORECASE), "weekly_amount"),
+)
+
+
+def derive_formula_variables(structured_data: dict) -> Dict[str, float]:
+    """
+    Pulls the amount variables penalty formulas usually refer to out of the
+    FORMULA_SOURCE_FIELDS of `structured_data`.
+
+    "Client pays $10,000 USD monthly." gives {"monthly_amount": 10000.0}; an amount
+    without a stated period is reported as `contract_value`.
+    """
+    variables: Dict[str, float] = {}
+    for field in FORMULA_SOURCE_FIELDS:
+        text = structured_data.get(field)
+        if not isinstance(text, str):
+            continue
+        for sentence in re.split(r"(?<=[.;])\s+", text):
+            match = _AMOUNT.search(sentence)
+            if not match:
+                continue
+            amount = float((match.group(1) or match.group(2)).replace(",", ""))
+            name = next((name for pattern, name in _PERIODS if pattern.search(sentence)), "contract_value")
+            variables.setdefault(name, amount)
+    return variables
+
+
+def evaluate_portfolio(
+    items: Iterable[Mapping],
+    scenarios: Mapping[str, object],
+) -> Tuple[np.ndarray, Dict[int, str]]:
+    """
+    Evaluates many contracts' penalty formulas over a shared scenario grid.
+
+    Items with the same formula are stacked and evaluated in one broadcast pass:
+    per-contract variables become column vectors and scenario variables row vectors.
+
+    Args:
+        items (Iterable[Mapping]): Each with a "formula" string and a "variables"
+            mapping of per-contract scalars (e.g. {"monthly_amount": 10000}).
+        scenarios (Mapping[str, object]): 1-D arrays of scenario values shared by
+            every item, e.g. {"days_late": np.arange(1, 366)}. All must have the same length.
+
+    Returns:
+        tuple: (exposure, errors). `exposure` has shape (len(items), n_scenarios),
+            in input order, with NaN rows for items that could not be evaluated;
+            `errors` maps those row indexes to the reason.
+    """
+    items = list(items)
+    scenario_arrays = {name: np.asarray(values, dtype=float).reshape(1, -1) for name, values in scenarios.items()}
+    lengths = {array.shape[1] for array in scenario_arrays.values()}
+    if len(lengths) > 1:
+        raise FormulaError("All scenario arrays must have the same length")
+    n_scenarios = lengths.pop() if lengths else 1
+
+    exposure = np.full((len(items), n_scenarios), np.nan)
+    errors: Dict[int, str] = {}
+    groups: Dict[str, List[int]] = {}
+    for index, item in enumerate(items):
+        groups.setdefault(item.get("formula") or "", []).append(index)
+
+    for source, indexes in groups.items():
+        try:
+            formula = compile_formula(source)
+        except FormulaError as e:
+            for index in indexes:
+                errors[index] = str(e)
+            continue
+        contract_names = formula.variables.difference(scenario_arrays)
+        usable = []
+        for index in indexes:
+            missing = contract_names.difference(items[index].get("variables") or {})
+            if missing:
+                errors[index] = f"Missing values for: {', '.join(sorted(missing))}"
+            else:
+                usable.append(index)
+        if not usable:
+            continue
+        env = {name: array for name, array in scenario_arrays.items() if name in formula.variables}
+        for name in contract_names:
+            env[name] = np.array([items[index]["variables"][name] for index in usable], dtype=float).reshape(-1, 1)
+        exposure[usable] = np.broadcast_to(formula.evaluate(env), (len(usable), n_scenarios))
+    return exposure, errors
@@ -0,0 +1,190 @@
+"""Content-addressed, on-disk cache for contract processing results."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from ..config import settings
+from .instrumentation import count
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    Persistent cache of process_contract_document results.
+
+    Entries are JSON files named after a key derived from the SHA-256 of the
+    PDF bytes, the model name and the extraction prompt version, so a changed
+    document, model or prompt never reuses a stale result. Entries older than
+    `max_age_seconds` are misses, and the least recently used entries are
+    evicted once the cache grows beyond `max_size_bytes`.
+    """
+
+    def __init__(self, directory: str, max_size_bytes: int, max_age_seconds: int, enabled: bool = True):
+        self.directory = directory
+        self.max_size_bytes = max_size_bytes
+        self.max_age_seconds = max_age_seconds
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size_estimate: Optional[int] = None
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def digest_file(file_path: str) -> str:
+        """Returns the SHA-256 hex digest of a file without loading it all into memory."""
+        with open(file_path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+
+    @staticmethod
+    def make_key(document_digest: str, model: str, prompt_version: str) -> str:
+        """Combines the document digest with everything else that determines the result."""
+        material = f"{document_digest}\0{model}\0{prompt_version}".encode("utf-8")
+        return hashlib.sha256(material).hexdigest()
+
+    def _path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        """Returns the cached result for `key`, or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self._path_for(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age_seconds:
+                self._remove(path)
+                raise FileNotFoundError(path)
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path) # Refresh mtime so eviction is least-recently-used
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            count("cache_requests_total", cache="result", outcome="miss")
+            return None
+        with self._lock:
+            self.hits += 1
+        count("cache_requests_total", cache="result", outcome="hit")
+        return value
+
+    def put(self, key: str, value: dict) -> None:
+        """Stores `value` under `key`, evicting old entries if the cache is over its size limit."""
+        if not self.enabled:
+            return
+        path = self._path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+            raise
+        with self._lock:
+            if self._size_estimate is None:
+                self._size_estimate = self._scan_size()
+            else:
+                self._size_estimate += len(data)
+            over_limit = self._size_estimate > self.max_size_bytes
+        if over_limit:
+            self.evict()
+
+    def evict(self) -> int:
+        """Removes expired entries, then the oldest ones until under the size limit. Returns the number removed."""
+        now = time.time()
+        entries = []
+        removed = 0
+        for path, size, mtime in self._iter_entries():
+            if now - mtime > self.max_age_seconds:
+                self._remove(path)
+                removed += 1
+            else:
+                entries.append((mtime, size, path))
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size_bytes:
+                break
+            self._remove(path)
+            total -= size
+            removed += 1
+        with self._lock:
+            self._size_estimate = total
+        if removed:
+            logger.info("Evicted %d result cache entries from %s", removed, self.directory)
+        return removed
+
+    def clear(self) -> None:
+        """Removes every entry and resets the counters."""
+        for path, _, _ in self._iter_entries():
+            self._remove(path)
+        with self._lock:
+            self._size_estimate = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the current on-disk footprint."""
+        entries = list(self._iter_entries())
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(entries),
+                "size_bytes": sum(size for _, size, _ in entries),
+            }
+
+    def _iter_entries(self):
+        if not os.path.isdir(self.directory):
+            return
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue # Removed by a concurrent eviction
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._iter_entries())
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """Returns the process-wide result cache built from `settings.result_cache`."""
+    global _result_cache
+    if _result_cache is None:
+        cache_settings = settings.result_cache
+        _result_cache = ResultCache(
+            directory=cache_settings.directory,
+            max_size_bytes=cache_settings.max_size_bytes,
+            max_age_seconds=cache_settings.max_age_seconds,
+            enabled=cache_settings.enabled,
+        )
+    return _result_cache
@@ -0,0 +1,230 @@
+"""Declarative breach rules evaluated locally against structured contract data.
+
+Rules are loaded from a JSON file (see `breach_rules.json` next to `config.py`)
+and compiled once into `Rule` objects. Each rule inspects one field of
+`structured_data` and reports "Met", "Not Met" or "Insufficient Data". Only the
+rules that end up as "Insufficient Data" need a model to interpret the contract.
+
+A rule entry looks like:
+
+    {
+      "id": "min_two_parties",
+      "description": "Contract must involve at least two distinct parties.",
+      "field": "parties",               # dotted path into structured_data
+      "check": "min_items",             # see CHECKS
+      "value": 2,                       # check-specific arguments
+      "on_missing": "Not Met",          # status when the field is absent or empty
+      "details": {"Met": "{count} parties found."}
+    }
+"""
+
+import datetime
+import functools
+import json
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+MET = "Met"
+NOT_MET = "Not Met"
+INSUFFICIENT_DATA = "Insufficient Data"
+STATUSES = (MET, NOT_MET, INSUFFICIENT_DATA)
+
+_DEFAULT_DETAILS = {
+    MET: "Rule satisfied by '{field}': {value}",
+    NOT_MET: "Rule not satisfied by '{field}'.",
+    INSUFFICIENT_DATA: "The extracted data does not say enough about '{field}' to decide this rule.",
+}
+
+_MISSING = object()
+
+
+class RuleDefinitionError(ValueError):
+    """Raised when a rule in the rules file is malformed."""
+
+
+def _is_empty(value) -> bool:
+    return value is _MISSING or value is None or value in ("", [], {})
+
+
+def _parse_date(value) -> Optional[datetime.date]:
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+
+
+# Each check takes (value, rule spec, contract data) and returns (status, detail fields).
+# It is only called with a non-empty value; missing values are handled by `on_missing`.
+def _check_present(value, spec, data) -> Tuple[str, dict]:
+    return MET, {}
+
+
+def _check_min_items(value, spec, data) -> Tuple[str, dict]:
+    if not isinstance(value, list):
+        return spec.get("on_missing", NOT_MET), {}
+    distinct_by = spec.get("distinct_by")
+    if distinct_by:
+        keys = {str(item.get(distinct_by, "")).strip().lower() if hasattr(item, "get") else str(item)
+                for item in value}
+        keys.discard("")
+        count = len(keys)
+    else:
+        count = len(value)
+    return (MET if count >= spec["value"] else NOT_MET), {"count": count}
+
+
+def _check_matches(value, spec, data) -> Tuple[str, dict]:
+    if spec["_pattern"].search(str(value)):
+        return MET, {}
+    return spec.get("on_mismatch", NOT_MET), {}
+
+
+def _check_is_date(value, spec, data) -> Tuple[str, dict]:
+    # A date the parser cannot read may still be a valid date in prose; let the model decide.
+    return (MET if _parse_date(value) else INSUFFICIENT_DATA), {}
+
+
+def _check_date_before(value, spec, data) -> Tuple[str, dict]:
+    other = _get_field(data, spec["other_field"])
+    if _is_empty(other):
+        return spec.get("on_missing", INSUFFICIENT_DATA), {"other": other}
+    start, end = _parse_date(value), _parse_date(other)
+    if start is None or end is None:
+        return INSUFFICIENT_DATA, {"other": other}
+    return (MET if start < end else NOT_MET), {"other": other}
+
+
+CHECKS: Dict[str, Callable] = {
+    "present": _check_present,
+    "min_items": _check_min_items,
+    "matches": _check_matches,
+    "is_date": _check_is_date,
+    "date_before": _check_date_before,
+}
+
+_REQUIRED_ARGUMENTS = {
+    "min_items": ("value",),
+    "matches": ("pattern",),
+    "date_before": ("other_field",),
+}
+
+
+def _get_field(data, path: str):
+    # Works on structured_data dicts and on entity records, which both provide .get()
+    value = data
+    for part in path.split("."):
+        getter = getattr(value, "get", None)
+        if getter is None:
+            return _MISSING
+        value = getter(part, _MISSING)
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+class Rule:
+    """A compiled breach rule."""
+
+    __slots__ = ("id", "description", "field", "check", "on_missing", "details", "_spec", "_check")
+
+    def __init__(self, spec: dict):
+        for key in ("id", "description", "field", "check"):
+            if key not in spec:
+                raise RuleDefinitionError(f"Rule {spec.get('id', '<unnamed>')} is missing '{key}'")
+        if spec["check"] not in CHECKS:
+            raise RuleDefinitionError(f"Rule {spec['id']} uses unknown check '{spec['check']}'")
+        for key in _REQUIRED_ARGUMENTS.get(spec["check"], ()):
+            if key not in spec:
+                raise RuleDefinitionError(f"Rule {spec['id']} check '{spec['check']}' requires '{key}'")
+        on_missing = spec.get("on_missing", NOT_MET)
+        if on_missing not in STATUSES:
+            raise RuleDefinitionError(f"Rule {spec['id']} has invalid on_missing status '{on_missing}'")
+
+        self.id = spec["id"]
+        self.description = spec["description"]
+        self.field = spec["field"]
+        self.check = spec["check"]
+        self.on_missing = on_missing
+        self.details = {**_DEFAULT_DETAILS, **spec.get("details", {})}
+        self._spec = dict(spec)
+        if self.check == "matches":
+            self._spec["_pattern"] = re.compile(spec["pattern"], re.IGNORECASE)
+        self._check = CHECKS[self.check]
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        """Top-level structured_data fields this rule reads."""
+        paths = [self.field] + ([self._spec["other_field"]] if "other_field" in self._spec else [])
+        return tuple(path.split(".")[0] for path in paths)
+
+    def as_prompt_dict(self) -> dict:
+        """The rule as the model sees it."""
+        return {"id": self.id, "description": self.description}
+
+    def evaluate(self, data) -> dict:
+        """Evaluates the rule against `data` (a dict or ContractRecord) and returns a breach report entry."""
+        value = _get_field(data, self.field)
+        if _is_empty(value):
+            status, extra = self.on_missing, {}
+        else:
+            status, extra = self._check(value, self._spec, data)
+        template = self.details.get(status, _DEFAULT_DETAILS[status])
+        format_args = {"field": self.field, "value": "" if value is _MISSING else value, **extra}
+        try:
+            details = template.format(**format_args)
+        except (KeyError, IndexError):
+            details = _DEFAULT_DETAILS[status].format(**format_args)
+        return {
+            "rule_id": self.id,
+            "rule_description": self.description,
+            "status": status,
+            "details": details,
+        }
+
+
+class RuleEngine:
+    """An ordered set of compiled rules."""
+
+    def __init__(self, rules: List[Rule]):
+        ids = [rule.id for rule in rules]
+        if len(ids) != len(set(ids)):
+            raise RuleDefinitionError("Rule ids must be unique")
+        self.rules = rules
+
+    @classmethod
+    def from_specs(cls, specs: List[dict]) -> "RuleEngine":
+        return cls([Rule(spec) for spec in specs])
+
+    @classmethod
+    def from_file(cls, rules_file: str) -> "RuleEngine":
+        with open(rules_file, "r", encoding="utf-8") as f:
+            specs = json.load(f)
+        if not isinstance(specs, list):
+            raise RuleDefinitionError(f"{rules_file} must contain a JSON list of rules")
+        return cls.from_specs(specs)
+
+    def evaluate(self, data, rule_ids: Optional[Iterable[str]] = None) -> List[dict]:
+        """Evaluates every rule (or only those in `rule_ids`) locally, in file order."""
+        if rule_ids is None:
+            return [rule.evaluate(data) for rule in self.rules]
+        wanted = set(rule_ids)
+        return [rule.evaluate(data) for rule in self.rules if rule.id in wanted]
+
+    def rules_reading(self, fields: Iterable[str]) -> List[str]:
+        """Ids of the rules that read any of the given top-level fields."""
+        fields = set(fields)
+        return [rule.id for rule in self.rules if fields.intersection(rule.fields)]
+
+    def rule(self, rule_id: str) -> Rule:
+        for rule in self.rules:
+            if rule.id == rule_id:
+                return rule
+        raise KeyError(rule_id)
+
+
+@functools.lru_cache(maxsize=8)
+def load_rule_engine(rules_file: str) -> RuleEngine:
+    """Loads and compiles a rules file once per process."""
+    return RuleEngine.from_file(rules_file)
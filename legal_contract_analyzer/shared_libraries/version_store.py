@@ -0,0 +1,65 @@
+"""On-disk store of the last analysed version of each contract.
+
+Incremental re-analysis needs, per contract lineage, the page and clause
+hashes of the previous version, the partial extraction of every chunk, and
+the breach and penalty results. Each contract is one JSON file named after
+the SHA-256 of its contract id, written atomically.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional
+
+from ..config import settings
+
+
+class ContractVersionStore:
+    """Keeps the latest analysed version of each contract, keyed by contract id."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path_for(self, contract_id: str) -> str:
+        digest = hashlib.sha256(contract_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def load(self, contract_id: str) -> Optional[dict]:
+        """Returns the stored version, or None if the contract has not been analysed."""
+        try:
+            with open(self._path_for(contract_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, contract_id: str, version: dict) -> None:
+        """Replaces the stored version atomically."""
+        path = self._path_for(contract_id)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({**version, "contract_id": contract_id}, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def delete(self, contract_id: str) -> None:
+        try:
+            os.remove(self._path_for(contract_id))
+        except FileNotFoundError:
+            pass
+
+
+_version_store: Optional[ContractVersionStore] = None
+
+
+def get_version_store() -> ContractVersionStore:
+    """Returns the process-wide store configured by settings.version_store."""
+    global _version_store
+    if _version_store is None:
+        _version_store = ContractVersionStore(settings.version_store.directory)
+    return _version_store
@@ -0,0 +1,116 @@
+"""Exports analysis results to the columnar analytics store and runs its standard reports.
+
+The export is incremental. Jobs finished by the job queue are read in
+completion order. The last exported completion is committed together with the
+rows, so every run picks up only the jobs finished since the previous one,
+and a crash never exports a job twice. Result files (JSON or JSONL, in the
+shape analyze_contract returns, plus `pdf_file_path` or `contract_id`) can be
+loaded too. Loading a file twice adds its rows twice.
+
+    python -m legal_contract_analyzer.tools.analytics export-jobs
+    python -m legal_contract_analyzer.tools.analytics export-files results/*.jsonl
+    python -m legal_contract_analyzer.tools.analytics report
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Iterable, Iterator, Optional
+
+from ..shared_libraries.analytics_store import AnalyticsStore, AnalyticsWriter
+from ..shared_libraries.job_queue import JobQueue, open_job_queue
+
+_JOBS_CURSOR = "job_queue_completion_seq"
+
+
+def export_job_results(queue: Optional[JobQueue] = None, directory: Optional[str] = None,
+                       batch_size: int = 500) -> int:
+    """
+    Appends the jobs completed since the last export to the store. Returns the number exported.
+
+    Args:
+        queue (JobQueue, optional): Defaults to the queue at settings.job_queue.db_path.
+        directory (str, optional): Defaults to settings.analytics_store.directory.
+    """
+    queue = queue or open_job_queue()
+    exported = 0
+    with AnalyticsWriter(directory) as writer:
+        seq = writer.cursors.get(_JOBS_CURSOR, 0)
+        while True:
+            completed = queue.completed_since(seq, batch_size)
+            if not completed:
+                return exported
+            for seq, job in completed:
+                results = job["results"]
+                writer.add(
+                    job["pdf_file_path"],
+                    results["process"].get("structured_data"),
+                    results["breach"].get("breach_report"),
+                    results["penalty"].get("penalty_summary"),
+                )
+            writer.flush(cursors={_JOBS_CURSOR: seq})
+            exported += len(completed)
+
+
+def _iter_result_files(paths: Iterable[str]) -> Iterator[dict]:
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            if path.endswith(".jsonl"):
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                data = json.load(f)
+                yield from (data if isinstance(data, list) else [data])
+
+
+def export_result_files(paths: Iterable[str], directory: Optional[str] = None) -> int:
+    """Appends analysis results read from JSON or JSONL files. Error results are skipped. Returns the number added."""
+    exported = 0
+    with AnalyticsWriter(directory) as writer:
+        for result in _iter_result_files(paths):
+            if result.get("status", "success") != "success":
+                continue
+            contract_id = result.get("contract_id") or result.get("pdf_file_path") or ""
+            writer.add(contract_id, result.get("structured_data"), result.get("breach_report"),
+                       result.get("penalty_summary"))
+            exported += 1
+    return exported
+
+
+def report(directory: Optional[str] = None) -> dict:
+    """Row counts, contracts failing each rule and penalty totals, with the time the queries took."""
+    started = time.perf_counter()
+    store = AnalyticsStore(directory)
+    result = {
+        "rows": {name: len(store.table(name)) for name in ("contracts", "findings", "penalties")},
+        "contracts_failing_rule": store.contracts_by_rule(),
+        "penalties_by_breach_type": store.penalty_totals(),
+    }
+    result["query_seconds"] = round(time.perf_counter() - started, 4)
+    return result
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Columnar analytics store of contract analysis results.")
+    parser.add_argument("--store", default=None, help="Store directory (default: settings.analytics_store.directory)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    jobs = commands.add_parser("export-jobs", help="Export the jobs completed since the last export")
+    jobs.add_argument("--db", default=None, help="Queue database (default: settings.job_queue.db_path)")
+    files = commands.add_parser("export-files", help="Export analyze_contract results from JSON/JSONL files")
+    files.add_argument("paths", nargs="+")
+    commands.add_parser("report", help="Contracts failing each rule and penalty totals")
+    args = parser.parse_args(argv)
+
+    if args.command == "export-jobs":
+        print(json.dumps({"exported": export_job_results(open_job_queue(args.db), args.store)}))
+    elif args.command == "export-files":
+        print(json.dumps({"exported": export_result_files(args.paths, args.store)}))
+    else:
+        print(json.dumps(report(args.store), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
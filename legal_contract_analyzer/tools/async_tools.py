@@ -0,0 +1,70 @@
+"""Async variants of the contract tools, for serving many sessions at once.
+
+ADK awaits `async def` tools on its event loop but calls plain functions
+directly on it, so one synchronous model call blocks every other session. The
+tools here are the synchronous `process_contract_document`,
+`detect_contract_breaches` and `calculate_contract_penalties` (tools.py),
+`analyze_contract` (pipeline.py) and `reanalyze_contract_document`
+(reanalysis.py) with the same names, arguments, results and docstrings, run
+in a thread pool so the event loop stays free:
+
+- Each call runs the synchronous pipeline as is, including the page-by-page
+  PDF streaming and the streaming near-duplicate lookup.
+- At most settings.async_tools.max_concurrent_calls tool calls run at once
+  across all sessions; the rest wait for a free thread without blocking the loop.
+- Calls keep their caller's context, so their spans land in the caller's trace.
+
+Run `python -m legal_contract_analyzer.benchmarks.load_test` to compare them
+with the synchronous tools under concurrent sessions.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import threading
+from typing import Callable, Optional
+
+from ..config import settings
+from . import pipeline, reanalysis, tools
+
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_tool_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Returns the thread pool, sized by settings.async_tools.max_concurrent_calls, that runs the tools."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=settings.async_tools.max_concurrent_calls, thread_name_prefix="contract_tool"
+            )
+    return _executor
+
+
+def shutdown_tool_executor() -> None:
+    """Stops the tool threads. The next async call starts a new pool."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown()
+
+
+def _in_thread(tool: Callable[..., dict]) -> Callable:
+    """Wraps a synchronous tool as an `async def` tool that runs it in the tool thread pool."""
+
+    @functools.wraps(tool)
+    async def run_tool(*args, **kwargs) -> dict:
+        call = functools.partial(contextvars.copy_context().run, tool, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(get_tool_executor(), call)
+
+    return run_tool
+
+
+process_contract_document = _in_thread(tools.process_contract_document)
+detect_contract_breaches = _in_thread(tools.detect_contract_breaches)
+calculate_contract_penalties = _in_thread(tools.calculate_contract_penalties)
+analyze_contract = _in_thread(pipeline.analyze_contract)
+reanalyze_contract_document = _in_thread(reanalysis.reanalyze_contract_document)
@@ -0,0 +1,225 @@
+"""Bulk contract ingestion.
+
+`process_contracts_batch` runs the same steps as `process_contract_document`
+for many files at once: PDF reading happens in a process pool, extraction
+requests go to the LLM backend through a bounded thread pool, and results are
+yielded per file as soon as they finish. A failing file produces an error
+result for that file only; the rest of the batch keeps going.
+
+Run `python -m legal_contract_analyzer.tools.batch --help` for the CLI.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
+from typing import Iterable, Iterator, Optional
+
+from ..config import settings
+from ..prompts import PROMPT_STATS
+from ..shared_libraries.instrumentation import METRICS, count, record_duration
+from ..shared_libraries.llm_backends import FakeLLMBackend, set_llm_backend
+from ..shared_libraries.result_cache import get_result_cache
+from .tools import (
+    _cache_result,
+    _extract_contract_data,
+    _index_clauses,
+    _index_contract_dates,
+    _index_near_duplicate,
+    _ocr_contract_document,
+    _result_cache_key,
+)
+
+
+def _read_stage(pdf_file_path: str, use_cache: bool) -> dict:
+    """
+    Worker-process half of the pipeline: cache lookup, then PDF reading.
+
+    Metrics recorded in the worker stay there, so the read time is returned
+    for the parent process to record.
+    """
+    if not pdf_file_path or not os.path.isfile(pdf_file_path):
+        raise FileNotFoundError(f"PDF file not found: {pdf_file_path}")
+    cache_key = _result_cache_key(pdf_file_path) if use_cache else None
+    if cache_key is not None:
+        cached_result = get_result_cache().get(cache_key)
+        if cached_result is not None:
+            return {"cache_key": cache_key, "result": cached_result}
+    started = time.perf_counter()
+    extracted_text = _ocr_contract_document(pdf_file_path)
+    return {"cache_key": cache_key, "extracted_text": extracted_text, "read_seconds": time.perf_counter() - started}
+
+
+def _extract_stage(read_output: dict) -> dict:
+    """Thread-pool half of the pipeline: the extraction LLM call and cache write."""
+    result = _extract_contract_data(read_output["extracted_text"])
+    _cache_result(read_output["cache_key"], result)
+    return result
+
+
+def _error_result(pdf_file_path: str, error: BaseException) -> dict:
+    if isinstance(error, FileNotFoundError):
+        message = str(error)
+    else:
+        message = f"An unexpected error occurred: {str(error)}"
+    return {"status": "error", "pdf_file_path": pdf_file_path, "error_message": message}
+
+
+def process_contracts_batch(
+    pdf_file_paths: Iterable[str],
+    max_workers: Optional[int] = None,
+    max_concurrent_llm_calls: Optional[int] = None,
+    use_cache: bool = True,
+) -> Iterator[dict]:
+    """
+    Processes many PDF contracts, yielding each result as soon as it is ready.
+
+    Args:
+        pdf_file_paths (Iterable[str]): Paths of the PDF contracts. Consumed lazily.
+        max_workers (int, optional): Size of the PDF reading process pool.
+            Defaults to settings.batch.max_workers.
+        max_concurrent_llm_calls (int, optional): Maximum extraction requests in flight.
+            Defaults to settings.batch.max_concurrent_llm_calls.
+        use_cache (bool, optional): Set to False to bypass the result cache. Defaults to True.
+
+    Yields:
+        dict: A process_contract_document result with an extra `pdf_file_path` key,
+            in completion order rather than input order.
+    """
+    max_workers = max_workers or settings.batch.max_workers or os.cpu_count() or 1
+    max_concurrent_llm_calls = max_concurrent_llm_calls or settings.batch.max_concurrent_llm_calls
+    # Bound the number of files in flight so extracted text does not pile up in memory
+    # when reading outpaces the model.
+    max_in_flight = 2 * max_workers + max_concurrent_llm_calls
+    paths = iter(pdf_file_paths)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as read_pool, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrent_llm_calls) as llm_pool:
+        pending = {} # future -> (stage, pdf_file_path)
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                pdf_file_path = next(paths, None)
+                if pdf_file_path is None:
+                    exhausted = True
+                    break
+                future = read_pool.submit(_read_stage, pdf_file_path, use_cache)
+                pending[future] = ("read", pdf_file_path)
+            if not pending:
+                return
+
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                stage, pdf_file_path = pending.pop(future)
+                error = future.exception()
+                if error is not None:
+                    yield _error_result(pdf_file_path, error)
+                    continue
+                output = future.result()
+                if stage == "read":
+                    if output["cache_key"] is not None:
+                        count("cache_requests_total", cache="result", outcome="hit" if "result" in output else "miss")
+                    if "read_seconds" in output:
+                        record_duration("file_read", output["read_seconds"])
+                if stage == "read" and "result" not in output:
+                    pending[llm_pool.submit(_extract_stage, output)] = ("extract", pdf_file_path)
+                    continue
+                result = output["result"] if stage == "read" else output
+                _index_clauses(pdf_file_path, result)
+                _index_contract_dates(pdf_file_path, result)
+                _index_near_duplicate(pdf_file_path, result)
+                yield {**result, "pdf_file_path": pdf_file_path}
+
+
+class BatchReport:
+    """Aggregates per-file batch results into success/failure counts and throughput."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.succeeded = 0
+        self.failures = []
+
+    def record(self, result: dict) -> None:
+        if result.get("status") == "success":
+            self.succeeded += 1
+        else:
+            self.failures.append({
+                "pdf_file_path": result.get("pdf_file_path"),
+                "error_message": result.get("error_message"),
+            })
+
+    def as_dict(self) -> dict:
+        elapsed = time.perf_counter() - self.started_at
+        total = self.succeeded + len(self.failures)
+        return {
+            "total": total,
+            "succeeded": self.succeeded,
+            "failed": len(self.failures),
+            "elapsed_seconds": round(elapsed, 3),
+            "contracts_per_second": round(total / elapsed, 2) if elapsed > 0 else 0.0,
+            "failures": self.failures,
+            "prompt_sizes": PROMPT_STATS.report(),
+        }
+
+
+def _expand_paths(inputs: Iterable[str]) -> Iterator[str]:
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(".pdf"):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Process a batch of PDF contracts.")
+    parser.add_argument("paths", nargs="+", help="PDF files, or directories to scan for *.pdf")
+    parser.add_argument("--workers", type=int, default=None, help="PDF reading processes")
+    parser.add_argument("--concurrency", type=int, default=None, help="Maximum extraction requests in flight")
+    parser.add_argument("--output", default=None, help="Write one JSON result per line to this file")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the result cache")
+    parser.add_argument("--metrics", default=None, help="Write stage timings and counters in Prometheus text format here")
+    parser.add_argument("--fake-latency", type=float, default=None,
+                        help="Use the offline fake LLM backend with this many seconds of latency per call")
+    parser.add_argument("--fake-jitter", type=float, default=0.0, help="Extra random latency for the fake backend")
+    parser.add_argument("--fake-failure-rate", type=float, default=0.0, help="Failure probability for the fake backend")
+    args = parser.parse_args(argv)
+
+    if args.fake_latency is not None:
+        set_llm_backend(FakeLLMBackend(
+            latency_seconds=args.fake_latency,
+            jitter_seconds=args.fake_jitter,
+            failure_rate=args.fake_failure_rate,
+        ))
+
+    report = BatchReport()
+    output = open(args.output, "w", encoding="utf-8") if args.output else None
+    try:
+        for result in process_contracts_batch(
+            _expand_paths(args.paths),
+            max_workers=args.workers,
+            max_concurrent_llm_calls=args.concurrency,
+            use_cache=not args.no_cache,
+        ):
+            report.record(result)
+            if output is not None:
+                output.write(json.dumps(result) + "\n")
+    finally:
+        if output is not None:
+            output.close()
+
+    summary = report.as_dict()
+    summary["metrics"] = METRICS.summary()
+    print(json.dumps(summary, indent=2))
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(METRICS.to_prometheus())
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+"""Worker processes for the durable job queue (shared_libraries/job_queue.py).
+
+`JobRunner` starts settings.job_queue.workers processes. Each runs
+settings.job_queue.jobs_per_worker threads that claim jobs and run their
+remaining stages: process_contract_document, then detect_contract_breaches,
+then calculate_contract_penalties. Each stage's result is committed before the
+next one starts, and the job's lease is renewed while a stage runs. The
+runner takes back the jobs of workers that died, queueing them again or
+failing them once they have used up max_attempts, and starts replacement
+workers. When the runner itself is restarted, it first takes back the jobs the
+previous run left behind. No finished stage is run twice.
+
+Workers are started with the "spawn" method, so they do not inherit the
+parent's SQLite connections. They get a copy of the parent's settings instead.
+
+    python -m legal_contract_analyzer.tools.jobs submit /imports/2025-q3 --priority bulk
+    python -m legal_contract_analyzer.tools.jobs run --workers 8 --until-empty
+    python -m legal_contract_analyzer.tools.jobs status
+"""
+
+import argparse
+import functools
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+from ..config import Config, settings
+from ..shared_libraries.instrumentation import count, span
+from ..shared_libraries.job_queue import (
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    QUEUED,
+    RUNNING,
+    Job,
+    JobQueue,
+    LeaseLostError,
+    QueueFullError,
+    open_job_queue,
+    worker_id,
+)
+from ..shared_libraries.llm_backends import FakeLLMBackend, LLMBackend, set_llm_backend
+from .batch import _expand_paths
+from .tools import calculate_contract_penalties, detect_contract_breaches, process_contract_document
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"bulk": PRIORITY_BULK, "interactive": PRIORITY_INTERACTIVE}
+
+
+def _run_stage(stage: str, job: Job, results: dict) -> dict:
+    if stage == "process":
+        result = process_contract_document(job.pdf_file_path, use_cache=job.use_cache)
+        # The text stays in the result cache; breach and penalty only need the structured data.
+        return {name: value for name, value in result.items() if name != "extracted_text"}
+    structured_data = results["process"]["structured_data"]
+    if stage == "breach":
+        return detect_contract_breaches(structured_data)
+    return calculate_contract_penalties(structured_data, results["breach"]["breach_report"])
+
+
+class _Heartbeat:
+    """Renews a job's lease every third of lease_seconds while a stage runs, so slow stages are not taken back."""
+
+    def __init__(self, queue: JobQueue, job: Job, worker: str):
+        self.queue = queue
+        self.job = job
+        self.worker = worker
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        interval = max(self.queue.lease_seconds / 3.0, 0.01)
+        while not self._done.wait(interval):
+            if not self.queue.renew(self.job, self.worker):
+                logger.warning("Lost the lease of job %d while running it.", self.job.job_id)
+                return
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self._done.set()
+        self._thread.join()
+        return False
+
+
+def run_job(queue: JobQueue, job: Job, worker: str, stop: Optional[threading.Event] = None) -> str:
+    """
+    Runs a claimed job's remaining stages, committing each result as it finishes.
+
+    The lease is renewed while each stage runs. A stage that reports an error,
+    or raises, fails the attempt (see JobQueue.fail). When `stop` is set, the job is handed back to the queue before its next stage.
+
+    Returns:
+        str: The job's state afterwards.
+    """
+    results = queue.stage_results(job.job_id) if job.last_stage else {}
+    for stage in job.remaining_stages:
+        if stop is not None and stop.is_set():
+            queue.release(job, worker)
+            return job.state
+        try:
+            with span("job_stage", stage=stage), _Heartbeat(queue, job, worker):
+                result = _run_stage(stage, job, results)
+        except Exception as e:
+            logger.exception("Job %d failed in stage %s: %s", job.job_id, stage, e)
+            return queue.fail(job, worker, f"An unexpected error occurred: {str(e)}")
+        if result.get("status") != "success":
+            logger.warning("Job %d failed in stage %s: %s", job.job_id, stage, result.get("error_message"))
+            return queue.fail(job, worker, result.get("error_message") or "Unknown error")
+        queue.finish_stage(job, worker, stage, result)
+        results[stage] = result
+    return job.state
+
+
+def _worker_thread(queue: JobQueue, stop: threading.Event) -> None:
+    worker = worker_id()
+    while not stop.is_set():
+        job = queue.claim(worker)
+        if job is None:
+            stop.wait(queue.poll_interval_seconds)
+            continue
+        try:
+            run_job(queue, job, worker, stop)
+        except LeaseLostError:
+            logger.warning("Job %d was requeued while %s was running it; dropping this attempt.", job.job_id, worker)
+            count("job_leases_lost_total")
+
+
+def _worker_process(settings_snapshot: dict, db_path: str, threads: int, stop,
+                    llm_backend_factory: Optional[Callable[[], LLMBackend]]) -> None:
+    """Entry point of a worker process: runs `threads` claim loops until `stop` is set."""
+    for name, value in Config.model_validate(settings_snapshot):
+        setattr(settings, name, value)
+    if llm_backend_factory is not None:
+        set_llm_backend(llm_backend_factory())
+    queue = open_job_queue(db_path)
+    local_stop = threading.Event()
+    loops = [threading.Thread(target=_worker_thread, args=(queue, local_stop), daemon=True) for _ in range(threads)]
+    for loop in loops:
+        loop.start()
+    # A multiprocessing Event cannot be waited on together with a threading one,
+    # so the main thread relays the stop request. It also stops the loops if the
+    # runner died without asking, so orphaned workers do not keep claiming jobs.
+    parent = os.getppid()
+    while not stop.wait(1.0) and os.getppid() == parent:
+        pass
+    local_stop.set()
+    for loop in loops:
+        loop.join()
+
+
+class JobRunner:
+    """
+    Runs queued jobs on a pool of worker processes.
+
+    Args:
+        workers (int, optional): Worker processes. Defaults to settings.job_queue.workers,
+            then os.cpu_count().
+        jobs_per_worker (int, optional): Jobs each process runs at once. Defaults to
+            settings.job_queue.jobs_per_worker.
+        db_path (str, optional): Queue database. Defaults to settings.job_queue.db_path.
+        llm_backend_factory (callable, optional): Picklable zero-argument callable that
+            builds the LLM backend in each worker, e.g. functools.partial(FakeLLMBackend, ...).
+            Workers use the default backend otherwise.
+    """
+
+    def __init__(self, workers: Optional[int] = None, jobs_per_worker: Optional[int] = None,
+                 db_path: Optional[str] = None, llm_backend_factory: Optional[Callable[[], LLMBackend]] = None):
+        self.workers = workers or settings.job_queue.workers or os.cpu_count() or 1
+        self.jobs_per_worker = jobs_per_worker or settings.job_queue.jobs_per_worker
+        self.db_path = db_path or settings.job_queue.db_path
+        self.llm_backend_factory = llm_backend_factory
+        self.queue = open_job_queue(self.db_path)
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self._processes = []
+
+    def _start_process(self) -> multiprocessing.Process:
+        process = self._context.Process(
+            target=_worker_process,
+            args=(settings.model_dump(), self.db_path, self.jobs_per_worker, self._stop, self.llm_backend_factory),
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def start(self) -> "JobRunner":
+        """Requeues jobs abandoned by an earlier run, then starts the worker processes."""
+        self.queue.recover()
+        self._stop.clear()
+        self._processes = [self._start_process() for _ in range(self.workers)]
+        logger.info("Started %d job worker process(es), %d job(s) each.", self.workers, self.jobs_per_worker)
+        return self
+
+    def supervise(self) -> None:
+        """Replaces worker processes that exited and requeues the jobs they held."""
+        exited = [process for process in self._processes if not process.is_alive()]
+        if exited:
+            logger.warning("%d job worker process(es) exited; restarting them.", len(exited))
+            count("job_workers_restarted_total", len(exited))
+            self._processes = [process for process in self._processes if process.is_alive()]
+        self.queue.recover() # Also catches expired leases of workers on other hosts
+        self._processes.extend(self._start_process() for _ in exited)
+
+    def run(self, until_empty: bool = False) -> dict:
+        """
+        Starts the workers and supervises them until interrupted or, with
+        `until_empty`, until no job is queued or running. Returns the final job counts.
+        """
+        self.start()
+        try:
+            while True:
+                time.sleep(self.queue.poll_interval_seconds)
+                self.supervise()
+                if until_empty:
+                    counts = self.queue.counts()
+                    if not counts[QUEUED] and not counts[RUNNING]:
+                        break
+        except KeyboardInterrupt:
+            logger.info("Stopping job workers; unfinished jobs resume on the next run.")
+        finally:
+            self.stop()
+        return self.queue.counts()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Asks the workers to stop after their current stage and waits for them.
+
+        Their jobs go back to the queue and resume after their last finished stage.
+        """
+        self._stop.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self._processes = []
+        self.queue.recover()
+
+    def __enter__(self) -> "JobRunner":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> bool:
+        self.stop()
+        return False
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Durable contract analysis job queue.")
+    parser.add_argument("--db", default=None, help="Queue database (default: settings.job_queue.db_path)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="Queue PDF files, or directories of them, for analysis")
+    submit.add_argument("paths", nargs="+")
+    submit.add_argument("--priority", choices=sorted(PRIORITIES), default="bulk")
+    submit.add_argument("--no-cache", action="store_true", help="Bypass the result cache")
+    submit.add_argument("--no-wait", action="store_true", help="Fail instead of waiting when the queue is full")
+
+    run = commands.add_parser("run", help="Run queued jobs on a pool of worker processes")
+    run.add_argument("--workers", type=int, default=None, help="Worker processes")
+    run.add_argument("--jobs-per-worker", type=int, default=None, help="Jobs each worker process runs at once")
+    run.add_argument("--until-empty", action="store_true", help="Stop once no job is queued or running")
+    run.add_argument("--fake-latency", type=float, default=None,
+                     help="Use the offline fake LLM backend with this many seconds of latency per call")
+
+    status = commands.add_parser("status", help="Show job counts, or one job with its stage results")
+    status.add_argument("job_id", nargs="?", type=int)
+
+    commands.add_parser("retry-failed", help="Queue the failed jobs again")
+    args = parser.parse_args(argv)
+
+    queue = open_job_queue(args.db)
+    if args.command == "submit":
+        try:
+            job_ids = queue.submit_many(_expand_paths(args.paths), priority=PRIORITIES[args.priority],
+                                        use_cache=not args.no_cache, wait=not args.no_wait)
+        except QueueFullError as e:
+            print(json.dumps({"status": "error", "error_message": str(e)}))
+            return 1
+        print(json.dumps({"status": "success", "submitted": len(job_ids), "job_ids": job_ids}))
+    elif args.command == "run":
+        factory = None
+        if args.fake_latency is not None:
+            factory = functools.partial(FakeLLMBackend, latency_seconds=args.fake_latency)
+        runner = JobRunner(args.workers, args.jobs_per_worker, queue.db_path, factory)
+        print(json.dumps(runner.run(until_empty=args.until_empty)))
+    elif args.command == "status":
+        print(json.dumps(queue.counts() if args.job_id is None else queue.get(args.job_id), indent=2))
+    else:
+        print(json.dumps({"requeued": queue.retry_failed()}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
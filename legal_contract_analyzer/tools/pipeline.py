@@ -0,0 +1,118 @@
+"""Single-call contract analysis: extraction, breach detection and penalties.
+
+`analyze_contract` runs the three stages inside one tool call, so the agent
+does not need three model turns that each carry the extracted data through
+its context. Penalty calculation does not wait for breach detection: as
+soon as the rules have been evaluated locally, penalties are calculated
+speculatively against that local breach report while the undecided rules are
+escalated to the LLM. The speculative result is kept unless escalation changes
+which rules are breached ("Not Met"), in which case penalties are recalculated
+once with the final report.
+"""
+
+import concurrent.futures
+import contextvars
+import logging
+from typing import Optional
+
+from google.adk.tools import ToolContext
+
+from ..config import settings
+from ..shared_libraries.artifact_store import get_artifact_store
+from ..shared_libraries.instrumentation import count, span, trace
+from ..shared_libraries.rule_engine import NOT_MET, load_rule_engine
+from .tools import _resolve_ambiguous_rules, calculate_contract_penalties, process_contract_document
+
+logger = logging.getLogger(__name__)
+
+
+def _breached_rule_ids(breach_report: list) -> frozenset:
+    return frozenset(finding["rule_id"] for finding in breach_report if finding["status"] == NOT_MET)
+
+
+def analyze_contract(pdf_file_path: str, use_cache: bool = True, tool_context: Optional[ToolContext] = None) -> dict:
+    """
+    Runs the full analysis of a PDF contract in one call: data extraction,
+    breach detection and penalty calculation.
+
+    Prefer this over calling the three tools one by one. The full extracted
+    text is not returned; use process_contract_document when it is needed.
+
+    Args:
+        pdf_file_path (str): The absolute path to the PDF contract file.
+        use_cache (bool, optional): Set to False to bypass the result cache. Defaults to True.
+        tool_context (ToolContext, optional): Supplied by ADK; enables handle mode.
+
+    Returns:
+        dict: A dictionary containing:
+            - status (str): "success" or "error"
+            - structured_data (dict): Extracted key data points.
+            - summary (str): LLM-generated summary.
+            - data_quality_assessment (str): LLM's assessment of extraction completeness.
+            - breach_report (list): Analysis for each breach rule.
+            - llm_escalated_rules (list): Ids of the rules that needed the LLM.
+            - penalty_summary (dict): Report detailing potential penalties.
+            - penalty_speculation (str): "accepted" if the penalties calculated
+              alongside breach detection were kept, "recalculated" otherwise.
+            - contract_handle / breach_report_handle (str): In handle mode only; see
+              process_contract_document and detect_contract_breaches.
+            - error_message (str, optional): Error message if status is "error".
+    """
+    logger.info("Analyzing contract: %s", pdf_file_path)
+    with trace("analyze_contract"):
+        processed = process_contract_document(pdf_file_path, use_cache=use_cache, tool_context=tool_context)
+        if processed.get("status") != "success":
+            return {"status": "error", "error_message": processed.get("error_message")}
+        structured_data = processed["structured_data"]
+        if not structured_data:
+            return {"status": "error", "error_message": "No contract data could be extracted."}
+
+        try:
+            with span("rule_evaluation"):
+                local_report = load_rule_engine(settings.breach_rules.rules_file).evaluate(structured_data)
+
+            # Penalties run in a worker thread against the local report while the
+            # ambiguous rules go to the LLM on this one. copy_context keeps the
+            # worker's spans in this request's trace.
+            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+                speculative = executor.submit(
+                    contextvars.copy_context().run, calculate_contract_penalties, structured_data, local_report
+                )
+                breach_report, escalated_rule_ids = _resolve_ambiguous_rules(structured_data, local_report)
+                penalties = speculative.result()
+
+            if penalties.get("status") == "success" and \
+                    _breached_rule_ids(breach_report) == _breached_rule_ids(local_report):
+                speculation = "accepted"
+            else:
+                logger.info("Breach detection changed the breached rules; recalculating penalties.")
+                speculation = "recalculated"
+                penalties = calculate_contract_penalties(structured_data, breach_report)
+            count("penalty_speculation_total", outcome=speculation)
+            if penalties.get("status") != "success":
+                return {"status": "error", "error_message": penalties.get("error_message")}
+
+            result = {
+                "status": "success",
+                "structured_data": structured_data,
+                "summary": processed.get("summary", ""),
+                "data_quality_assessment": processed.get("data_quality_assessment", ""),
+                "breach_report": breach_report,
+                "llm_escalated_rules": escalated_rule_ids,
+                "penalty_summary": penalties["penalty_summary"],
+                "penalty_speculation": speculation,
+            }
+            if tool_context is not None:
+                result["contract_handle"] = processed["contract_handle"]
+                result["breach_report_handle"] = get_artifact_store().put(
+                    tool_context.session.id, "breaches", {"breach_report": breach_report}
+                )
+            return result
+
+        except Exception as e:
+            logger.exception("An unexpected error occurred in analyze_contract: %s", e)
+            count("tool_errors_total", tool="analyze_contract")
+            return {
+                "status": "error",
+                "error_message": f"An unexpected error occurred: {str(e)}"
+            }
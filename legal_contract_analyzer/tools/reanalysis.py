@@ -0,0 +1,350 @@
+"""Incremental re-analysis of amended contracts.
+
+An amendment usually arrives as a full new PDF that is mostly identical to the
+previous version. `reanalyze_contract_document` hashes the new version per page
+and per clause and compares it with the version stored for the same contract
+id. Only clauses that are new, or that shared an extraction chunk with a
+changed or deleted clause, are sent to the extraction model; the stored
+partial results of every untouched chunk are reused and everything is merged
+back into one `structured_data`.
+
+Downstream work is limited the same way: only breach rules that read a changed
+field are re-evaluated, and penalties are recalculated only when a field they
+depend on, or a breach status, changed. The result includes a field-level change report.
+"""
+
+import bisect
+import datetime
+import difflib
+import hashlib
+import logging
+import os
+import re
+from typing import Dict, List, Optional
+
+from ..config import settings
+from ..prompts import EXTRACTION_PROMPT_VERSION, estimate_tokens
+from ..shared_libraries.instrumentation import trace
+from ..shared_libraries.llm_backends import EXTRACTION_TASK
+from ..shared_libraries.model_router import route_key, route_stage
+from ..shared_libraries.pdf_stream import merge_structured_data, split_clauses
+from ..shared_libraries.penalty_formulas import FORMULA_SOURCE_FIELDS
+from ..shared_libraries.rule_engine import load_rule_engine
+from ..shared_libraries.version_store import get_version_store
+from .tools import (
+    _extract_pages_with,
+    _index_clauses,
+    _index_contract_dates,
+    _index_near_duplicate,
+    _iter_contract_pages,
+    _run_breach_rules,
+    calculate_contract_penalties,
+)
+
+logger = logging.getLogger(__name__)
+
+# Fields a penalty summary depends on: the clauses the penalty prompt reasons
+# about and every field formula variables are derived from. A change to any of
+# them, or to any breach status, means the stored penalty summary may be stale.
+PENALTY_INPUT_FIELDS = frozenset({"penalty_clauses", "termination_clauses", "parties", *FORMULA_SOURCE_FIELDS})
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _text_hash(text: str) -> str:
+    # Whitespace is normalised so re-flowed but otherwise identical text is not a change.
+    return hashlib.sha256(_WHITESPACE.sub(" ", text).strip().encode("utf-8")).hexdigest()
+
+
+def _clause_pages(pages: List[str], full_text: str) -> List[int]:
+    """Returns the 1-based page number on which each non-blank clause of `full_text` starts."""
+    page_starts = []
+    offset = 0
+    for page in pages:
+        page_starts.append(offset)
+        offset += len(page) if page.endswith("\n") else len(page) + 1
+    clause_pages = []
+    offset = 0
+    for clause in split_clauses(full_text):
+        if clause.strip():
+            start = offset + len(clause) - len(clause.lstrip())
+            clause_pages.append(bisect.bisect_right(page_starts, start))
+        offset += len(clause)
+    return clause_pages
+
+
+def _changed_pages(previous: dict, clause_hashes: List[str], clause_pages: List[int]) -> List[int]:
+    """
+    Returns the pages of the new version holding clauses that were added, modified or deleted.
+
+    Clauses are aligned with the stored version's, so a page inserted or
+    deleted does not mark every later page as changed. A deleted clause is
+    reported on the page of the clause that now follows it.
+    """
+    previous_hashes = previous.get("clause_hashes")
+    if previous_hashes is None:
+        # Stored before clause order was kept: report pages holding clauses the stored version lacks.
+        known = {h for chunk in previous.get("chunks", []) for h in chunk["clause_hashes"]}
+        return sorted({clause_pages[i] for i, h in enumerate(clause_hashes) if h not in known})
+    pages = set()
+    matcher = difflib.SequenceMatcher(None, previous_hashes, clause_hashes, autojunk=False)
+    for tag, _, _, start, end in matcher.get_opcodes():
+        if tag == "equal" or not clause_pages:
+            continue
+        if end > start:
+            pages.update(clause_pages[start:end])
+        else:
+            pages.add(clause_pages[min(start, len(clause_pages) - 1)])
+    return sorted(pages)
+
+
+def _group_into_chunks(clause_indexes: List[int], clauses: List[str], token_budget: int) -> List[List[int]]:
+    """Packs clauses, in order, into groups that fit the token budget."""
+    groups: List[List[int]] = []
+    used = 0
+    for index in clause_indexes:
+        cost = estimate_tokens(clauses[index])
+        if groups and used + cost <= token_budget:
+            groups[-1].append(index)
+            used += cost
+        else:
+            groups.append([index])
+            used = cost
+    return groups
+
+
+def _extract_chunk_group(clauses: List[str], indexes: List[int], clause_hashes: List[str], model: str) -> dict:
+    result = _extract_pages_with(["".join(clauses[i] for i in indexes)], model)
+    return {
+        "clause_hashes": [clause_hashes[i] for i in indexes],
+        "structured_data": result["structured_data"],
+        "summary": result["summary"],
+        "data_quality_assessment": result["data_quality_assessment"],
+    }
+
+
+def diff_structured_data(old: dict, new: dict) -> List[dict]:
+    """Returns a field-level change report between two `structured_data` dicts."""
+    changes = []
+    for field in sorted(set(old) | set(new)):
+        if field not in old:
+            changes.append({"field": field, "change": "added", "new": new[field]})
+        elif field not in new:
+            changes.append({"field": field, "change": "removed", "old": old[field]})
+        elif old[field] != new[field]:
+            changes.append({"field": field, "change": "modified", "old": old[field], "new": new[field]})
+    return changes
+
+
+def _join_unique(values) -> str:
+    unique = []
+    for value in values:
+        if value and value not in unique:
+            unique.append(value)
+    return " ".join(unique)
+
+
+def _merge_chunks(chunks: List[dict]) -> dict:
+    """Merges stored or new chunk extractions, in the given order."""
+    return {
+        "structured_data": merge_structured_data(chunk["structured_data"] for chunk in chunks),
+        "summary": _join_unique(chunk["summary"] for chunk in chunks),
+        "data_quality_assessment": _join_unique(chunk["data_quality_assessment"] for chunk in chunks),
+    }
+
+
+def reanalyze_contract_document(pdf_file_path: str, contract_id: Optional[str] = None) -> dict:
+    """
+    Re-analyzes a new version of a contract, re-extracting only what changed.
+
+    The first call for a contract id runs the full pipeline (extraction, breach
+    detection, penalty calculation) and stores the result as the baseline. Later
+    calls with the same id compare the new PDF against that baseline.
+
+    Args:
+        pdf_file_path (str): The absolute path to the new version of the PDF contract.
+        contract_id (str, optional): Identifies the contract across versions, e.g.
+            "acme-msa-2024". Defaults to the absolute path of the file, so that
+            unrelated files with the same name never share a history; pass an
+            explicit id when a new version is saved under another name.
+
+    Returns:
+        dict: A dictionary containing:
+            - status (str): "success" or "error"
+            - contract_id (str): The contract id used.
+            - mode (str): "initial", "unchanged" or "incremental".
+            - changed_pages (list): 1-based numbers of the new version's pages holding
+              added, modified or deleted clauses. Every page in "initial" mode.
+            - clause_stats (dict): Total, new/changed and reused clause counts, plus
+              extraction chunks re-extracted and reused.
+            - structured_data (dict): The merged extracted data for the new version.
+            - summary (str) / data_quality_assessment (str): As in process_contract_document.
+            - field_changes (list): {field, change, old, new} for each changed field.
+            - breach_report (list): Full breach report for the new version.
+            - rerun_rules (list): Ids of the rules that were re-evaluated.
+            - penalty_summary (dict): Penalty report for the new version.
+            - penalties_recalculated (bool): Whether penalties were recalculated.
+            - error_message (str, optional): Error message if status is "error".
+    """
+    with trace("reanalyze_contract_document"):
+        contract_id = contract_id or (os.path.abspath(pdf_file_path) if pdf_file_path else "")
+        logger.info("Re-analyzing contract %s: %s", contract_id, pdf_file_path)
+        try:
+            if not pdf_file_path or not os.path.isfile(pdf_file_path):
+                raise FileNotFoundError(f"PDF file not found: {pdf_file_path}")
+
+            store = get_version_store()
+            previous = store.load(contract_id)
+            if previous is not None and (previous.get("extraction_prompt_version") != EXTRACTION_PROMPT_VERSION
+                                         or previous.get("model") != route_key(EXTRACTION_TASK)):
+                logger.info("Stored version was extracted with a different prompt or model; starting from scratch.")
+                previous = None
+
+            pages = list(_iter_contract_pages(pdf_file_path))
+            page_hashes = [_text_hash(page) for page in pages]
+            full_text = "".join(page if page.endswith("\n") else page + "\n" for page in pages)
+
+            if previous is not None and previous["page_hashes"] == page_hashes:
+                logger.info("No pages changed since the stored version.")
+                _index_clauses(pdf_file_path, {"extracted_text": full_text})
+                return _result(contract_id, "unchanged", [], previous, previous["clause_stats_total"], 0, [], [], False)
+
+            clauses = [clause for clause in split_clauses(full_text) if clause.strip()]
+            clause_hashes = [_text_hash(clause) for clause in clauses]
+            clause_pages = _clause_pages(pages, full_text)
+            budget = settings.ingestion.chunk_token_budget
+
+            # Stored chunks whose clauses all survive unchanged keep their extraction.
+            present = set(clause_hashes)
+            reused_chunks = [
+                chunk for chunk in (previous or {}).get("chunks", [])
+                if chunk["clause_hashes"] and all(h in present for h in chunk["clause_hashes"])
+            ]
+            covered = {h for chunk in reused_chunks for h in chunk["clause_hashes"]}
+            to_extract = [i for i, h in enumerate(clause_hashes) if h not in covered]
+            groups = _group_into_chunks(to_extract, clauses, budget)
+            # The router judges the new chunks merged with the reused ones: a chunk alone rarely fills every field.
+            new_chunks = route_stage(
+                EXTRACTION_TASK,
+                lambda model: [_extract_chunk_group(clauses, group, clause_hashes, model) for group in groups],
+                judge=lambda extracted: _merge_chunks(reused_chunks + extracted),
+            ) if groups else []
+            logger.info("Re-extracted %d chunk(s) covering %d of %d clauses; reused %d chunk(s).",
+                        len(new_chunks), len(to_extract), len(clauses), len(reused_chunks))
+
+            # Merge in document order so "first value wins" fields follow the new version's layout.
+            position = {h: i for i, h in reversed(list(enumerate(clause_hashes)))}
+            chunks = sorted(reused_chunks + new_chunks, key=lambda c: min(position[h] for h in c["clause_hashes"]))
+            merged = _merge_chunks(chunks)
+            structured_data = merged["structured_data"]
+            summary = merged["summary"]
+            data_quality_assessment = merged["data_quality_assessment"]
+
+            old_data = (previous or {}).get("structured_data", {})
+            field_changes = diff_structured_data(old_data, structured_data) if previous else []
+            changed_fields = {change["field"] for change in field_changes}
+
+            # Breach rules: only those reading a changed field, plus rules the stored report lacks.
+            rule_engine = load_rule_engine(settings.breach_rules.rules_file)
+            previous_report = {f["rule_id"]: f for f in (previous or {}).get("breach_report", [])}
+            if previous is None:
+                rerun_rules = [rule.id for rule in rule_engine.rules]
+            else:
+                rerun_rules = sorted(set(rule_engine.rules_reading(changed_fields))
+                                     | {rule.id for rule in rule_engine.rules if rule.id not in previous_report})
+            new_findings = {}
+            if rerun_rules:
+                findings, _ = _run_breach_rules(structured_data, rerun_rules)
+                new_findings = {f["rule_id"]: f for f in findings}
+            breach_report = [new_findings.get(rule.id) or previous_report[rule.id] for rule in rule_engine.rules]
+            breach_status_changed = any(
+                previous_report.get(rule_id, {}).get("status") != finding["status"]
+                for rule_id, finding in new_findings.items()
+            )
+
+            # Penalties: recalculate only when their inputs changed.
+            penalties_recalculated = previous is None or breach_status_changed or bool(changed_fields & PENALTY_INPUT_FIELDS)
+            if penalties_recalculated:
+                penalty_result = calculate_contract_penalties(structured_data, breach_report)
+                if penalty_result["status"] != "success":
+                    raise RuntimeError(penalty_result["error_message"])
+                penalty_summary = penalty_result["penalty_summary"]
+            else:
+                penalty_summary = previous["penalty_summary"]
+
+            version = {
+                "pdf_file_path": pdf_file_path,
+                "model": route_key(EXTRACTION_TASK),
+                "extraction_prompt_version": EXTRACTION_PROMPT_VERSION,
+                "analyzed_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "page_hashes": page_hashes,
+                "clause_hashes": clause_hashes,
+                "chunks": chunks,
+                "clause_stats_total": len(clauses),
+                "structured_data": structured_data,
+                "summary": summary,
+                "data_quality_assessment": data_quality_assessment,
+                "breach_report": breach_report,
+                "penalty_summary": penalty_summary,
+            }
+            store.save(contract_id, version)
+            _index_clauses(pdf_file_path, {"extracted_text": full_text})
+            _index_contract_dates(pdf_file_path, version)
+            _index_near_duplicate(pdf_file_path, {**version, "extracted_text": full_text})
+
+            if previous is None:
+                changed_pages = list(range(1, len(pages) + 1))
+            else:
+                changed_pages = _changed_pages(previous, clause_hashes, clause_pages)
+            return _result(
+                contract_id,
+                "initial" if previous is None else "incremental",
+                changed_pages,
+                version,
+                len(clauses),
+                len(to_extract),
+                field_changes,
+                rerun_rules,
+                penalties_recalculated,
+                chunks_reextracted=len(new_chunks),
+                chunks_reused=len(reused_chunks),
+            )
+
+        except FileNotFoundError as e:
+            logger.error("Error: %s", e)
+            return {"status": "error", "error_message": str(e)}
+        except Exception as e:
+            logger.exception("An unexpected error occurred in reanalyze_contract_document: %s", e)
+            return {
+                "status": "error",
+                "error_message": f"An unexpected error occurred: {str(e)}"
+            }
+
+
+def _result(contract_id: str, mode: str, changed_pages: List[int], version: dict, total_clauses: int,
+            changed_clauses: int, field_changes: List[dict], rerun_rules: List[str],
+            penalties_recalculated: bool, chunks_reextracted: int = 0, chunks_reused: Optional[int] = None) -> dict:
+    if chunks_reused is None:
+        chunks_reused = len(version.get("chunks", []))
+    clause_stats: Dict[str, int] = {
+        "total": total_clauses,
+        "changed": changed_clauses,
+        "reused": total_clauses - changed_clauses,
+        "chunks_reextracted": chunks_reextracted,
+        "chunks_reused": chunks_reused,
+    }
+    return {
+        "status": "success",
+        "contract_id": contract_id,
+        "mode": mode,
+        "changed_pages": changed_pages,
+        "clause_stats": clause_stats,
+        "structured_data": version["structured_data"],
+        "summary": version["summary"],
+        "data_quality_assessment": version["data_quality_assessment"],
+        "field_changes": field_changes,
+        "breach_report": version["breach_report"],
+        "rerun_rules": rerun_rules,
+        "penalty_summary": version["penalty_summary"],
+        "penalties_recalculated": penalties_recalculated,
+    }
@@ -1,367 +1,912 @@
 import datetime
 import json
-from zoneinfo import ZoneInfo
-from typing import Optional
+import logging
+import os
+import sqlite3
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from typing import Iterable, List, Optional
+
+import numpy as np
+from google.adk.tools import ToolContext
+
+from ..config import settings
+from ..entities import BreachFinding, ContractRecord, PenaltyItem
+from ..prompts import (
+    BREACH_PROMPT,
+    CHARS_PER_TOKEN,
+    EXTRACTION_PROMPT,
+    EXTRACTION_PROMPT_VERSION,
+    PENALTY_PROMPT,
+    estimate_tokens,
+)
+from ..shared_libraries.artifact_store import ArtifactNotFoundError, get_artifact_store
+from ..shared_libraries.clause_index import get_clause_index
+from ..shared_libraries.date_index import DATE_FIELDS, get_date_index, normalize_date
+from ..shared_libraries.instrumentation import count, record_duration, span, timed_iter, trace
+from ..shared_libraries.json_stream import ResponseSchemaError, StreamingJSONParser
+from ..shared_libraries.llm_backends import (
+    BREACH_TASK,
+    EXTRACTION_TASK,
+    PENALTY_TASK,
+    get_llm_backend,
+)
+from ..shared_libraries.model_router import record_llm_usage, route_key, route_stage, stage_models
+from ..shared_libraries.near_duplicates import NearDuplicate, get_near_duplicate_index
+from ..shared_libraries.pdf_stream import PageSpool, iter_pdf_pages, iter_text_chunks, merge_structured_data
+from ..shared_libraries.penalty_formulas import FormulaError, compile_formula, derive_formula_variables
+from ..shared_libraries.result_cache import ResultCache, get_result_cache
+from ..shared_libraries.rule_engine import INSUFFICIENT_DATA, STATUSES, load_rule_engine
 
 # Placeholder for Vertex AI SDK imports
 # from google.cloud import aiplatform
 # import google.generativeai as genai # Assuming Gemini is accessed this way or via aiplatform
 
-def process_contract_document(pdf_file_path: str) -> dict:
+logger = logging.getLogger(__name__)
+
+_RESPONSE_SCHEMAS = {
+    EXTRACTION_TASK: EXTRACTION_PROMPT.output_schema,
+    BREACH_TASK: BREACH_PROMPT.output_schema,
+    PENALTY_TASK: PENALTY_PROMPT.output_schema,
+}
+
+
+def _result_cache_key(pdf_file_path: str) -> Optional[str]:
+    """Returns the result cache key for a PDF, or None when the cache is disabled."""
+    if not get_result_cache().enabled:
+        return None
+    return ResultCache.make_key(
+        ResultCache.digest_file(pdf_file_path),
+        route_key(EXTRACTION_TASK),
+        EXTRACTION_PROMPT_VERSION,
+    )
+
+
+def _iter_contract_pages(pdf_file_path: str):
+    """
+    Yields the text of a PDF contract page by page.
+
+    The file is memory-mapped and decoded one page at a time. When the PDF has
+    no text layer, the whole document goes to OCR instead.
+    """
+    found_text = False
+    for page in timed_iter("file_read", iter_pdf_pages(pdf_file_path)):
+        found_text = True
+        yield page
+    if not found_text:
+        # 1. Document Parsing (OCR) with Vertex AI Gemini
+        # TODO: Implement actual call to Vertex AI Gemini for PDF text extraction
+        # This will likely involve reading the file and sending its content to Gemini's
+        # multimodal capabilities.
+        # Example (conceptual):
+        # extracted_text = vertex_ai_gemini_ocr(pdf_file_path)
+        logger.info("No text layer in %s, simulating OCR...", pdf_file_path)
+        with span("ocr"):
+            text = f"Simulated extracted text from {pdf_file_path}. " \
+                   "Contains details about parties, dates, and financial terms."
+        logger.debug("OCR simulation successful.")
+        yield text
+
+
+def _ocr_contract_document(pdf_file_path: str) -> str:
+    """
+    Reads the full text out of a PDF contract.
+
+    This is the CPU/IO-bound half of process_contract_document and takes no
+    shared state, so it is safe to run in a worker process.
+    """
+    return "".join(_iter_contract_pages(pdf_file_path))
+
+
+def _count_llm_request(task: str, prompt: str) -> None:
+    count("llm_calls_total", task=task)
+    count("llm_input_tokens_total", estimate_tokens(prompt), task=task)
+
+
+def _record_llm_response(task: str, parser: StreamingJSONParser, model: str, prompt: str) -> None:
+    """Records output tokens, cost, parse time, time to first field and repairs of one response."""
+    output_tokens = (parser.characters + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    count("llm_output_tokens_total", output_tokens, task=task)
+    record_llm_usage(task, model, estimate_tokens(prompt), output_tokens)
+    record_duration("response_parse", parser.parse_seconds, task=task)
+    if parser.first_field_seconds is not None:
+        record_duration("first_field", parser.first_field_seconds, task=task)
+    for repair, repairs in parser.repairs.items():
+        count("llm_response_repairs_total", repairs, task=task, repair=repair)
+
+
+def _reject_llm_response(task: str, error: ResponseSchemaError, attempt: int) -> None:
+    """Counts a malformed response; re-raises it when no attempts are left."""
+    count("llm_response_errors_total", task=task)
+    attempts = max(1, settings.llm_responses.max_attempts)
+    if attempt >= attempts:
+        raise error
+    logger.warning("Malformed %s response, retrying (attempt %d of %d): %s", task, attempt, attempts, error)
+
+
+def _generate_json(task: str, prompt: str, payload: dict, model: Optional[str] = None):
+    """
+    Sends a rendered prompt to the active LLM backend and parses the JSON response.
+
+    The response is validated against the task's output schema while it
+    streams in. A malformed response is abandoned at the first error and the
+    call is retried, up to settings.llm_responses.max_attempts calls in all.
+    `model` defaults to the stage's fast model (see model_router).
+    """
+    backend = get_llm_backend()
+    model = model or stage_models(task)[0]
+    attempt = 0
+    while True:
+        attempt += 1
+        _count_llm_request(task, prompt)
+        parser = StreamingJSONParser(_RESPONSE_SCHEMAS.get(task))
+        pieces = None
+        try:
+            with span("model_call", task=task):
+                if settings.llm_responses.streaming:
+                    pieces = backend.stream(task, prompt, payload, model=model)
+                    for piece in pieces:
+                        parser.feed(piece)
+                else:
+                    parser.feed(backend.generate(task, prompt, payload, model=model))
+                value = parser.close()
+        except ResponseSchemaError as e:
+            _reject_llm_response(task, e, attempt)
+            continue
+        finally:
+            if pieces is not None:
+                pieces.close() # Stops the generation if it was abandoned
+            _record_llm_response(task, parser, model, prompt)
+        return value
+
+
+def _extraction_request(chunk_text: str, chunk_note: str = ""):
+    """Returns the (prompt, payload) of the extraction call for one chunk of contract text."""
+    # 2. Data Extraction (LLM) with Vertex AI Gemini
+    with span("prompt_build", task=EXTRACTION_TASK):
+        prompt_for_extraction = EXTRACTION_PROMPT.render(chunk_note=chunk_note, contract_text=chunk_text)
+    return prompt_for_extraction, {"extracted_text": chunk_text}
+
+
+def _extract_chunk(chunk_text: str, chunk_note: str = "", model: Optional[str] = None) -> dict:
+    """Runs the extraction LLM call over one chunk of contract text and returns the parsed response."""
+    return _generate_json(EXTRACTION_TASK, *_extraction_request(chunk_text, chunk_note), model=model)
+
+
+def _extract_pages_with(pages, model: str) -> dict:
+    """
+    Extracts key data from a stream of page texts with one model.
+
+    Pages are re-cut into chunks that fit settings.ingestion.chunk_token_budget,
+    each chunk is extracted on its own as soon as it is complete, and the
+    partial results are merged. Only the current chunk's prompt is held in
+    memory; the pages are not kept, so the result's extracted_text is left
+    empty for the caller to fill in.
+
+    Returns:
+        dict: A successful process_contract_document result.
+    """
+    logger.debug("Calling LLM backend for data extraction...")
+    responses = [
+        _extract_chunk(chunk, _chunk_note(index), model)
+        for index, chunk in enumerate(iter_text_chunks(pages, settings.ingestion.chunk_token_budget))
+    ]
+    return _merge_extractions("", responses)
+
+
+def _extract_from_pages(pages: Iterable[str]) -> dict:
+    """
+    Extracts key data from a contract's pages, routed through the extraction models.
+
+    `pages` must be iterable more than once, e.g. a PageSpool. The fast model
+    reads the pages as they stream in; when its merged result is not confident
+    or complete enough, the strong model reads them again (see model_router). No model run keeps the pages: the full
+    text is assembled once, for the result's extracted_text, after the models
+    are done.
+
+    Returns:
+        dict: A successful process_contract_document result.
+    """
+    result = route_stage(EXTRACTION_TASK, lambda model: _extract_pages_with(pages, model))
+    result["extracted_text"] = "".join(pages)
+    return result
+
+
+def _chunk_note(index: int) -> str:
+    return "" if index == 0 else f" (continued, part {index + 1})"
+
+_NEAR_DUPLICATE_NOTE = " (excerpts: only the clauses that differ from a previously analysed contract)"
+
+
+def _merge_extractions(extracted_text: str, responses: list) -> dict:
+    """Folds the per-chunk extraction responses, in document order, into one process_contract_document result."""
+    partial_data = []
+    summaries = []
+    assessments = []
+    for response in responses:
+        partial_data.append(response.get("structured_data") or {})
+        for collected, value in ((summaries, response.get("summary")), (assessments, response.get("data_quality_assessment"))):
+            if value and value not in collected:
+                collected.append(value)
+    logger.info("LLM data extraction successful (%d chunk(s)).", len(partial_data))
+
+    return {
+        "status": "success",
+        "extracted_text": extracted_text,
+        "structured_data": merge_structured_data(partial_data),
+        "summary": " ".join(summaries),
+        "data_quality_assessment": " ".join(assessments)
+    }
+
+
+def _near_duplicate_signature(pages: PageSpool) -> Optional[np.ndarray]:
+    """
+    Streams a contract's pages through MinHash and returns the signature when
+    an earlier contract is similar enough to reuse, None otherwise. Only one
+    page is held at a time. Index problems never fail processing.
+    """
+    near_duplicate_index = get_near_duplicate_index()
+    if near_duplicate_index is None:
+        return None
+    try:
+        with span("near_duplicate_lookup"):
+            signature = near_duplicate_index.hasher.signature_of_pages(pages)
+            if near_duplicate_index.best_match(signature, route_key(EXTRACTION_TASK), EXTRACTION_PROMPT_VERSION):
+                return signature
+    except sqlite3.Error as e:
+        logger.warning("Could not look up near-duplicates: %s", e)
+    return None
+
+
+def _find_near_duplicate(extracted_text: str, signature: Optional[np.ndarray] = None) -> Optional[NearDuplicate]:
+    """
+    Looks for an earlier contract whose extraction can be reused: a near-duplicate
+    that kept all of its clauses. Index problems never fail processing.
+    """
+    near_duplicate_index = get_near_duplicate_index()
+    if near_duplicate_index is None:
+        return None
+    try:
+        with span("near_duplicate_lookup"):
+            match = near_duplicate_index.find(extracted_text, route_key(EXTRACTION_TASK), EXTRACTION_PROMPT_VERSION,
+                                              signature)
+    except sqlite3.Error as e:
+        logger.warning("Could not look up near-duplicates: %s", e)
+        return None
+    if match is not None and match.removed_clauses:
+        # The fields the removed clauses fed would keep the matched contract's values.
+        logger.info("Not reusing near-duplicate %s: %d of its clauses were removed.",
+                    match.pdf_file_path, match.removed_clauses)
+        count("near_duplicate_rejected_total", reason="removed_clauses")
+        return None
+    return match
+
+
+def _near_duplicate_chunks(match: NearDuplicate) -> list:
+    """Cuts the clauses that differ from the matched contract into extraction chunks."""
+    if not match.changed_clauses:
+        return []
+    return list(iter_text_chunks([match.changed_text], settings.ingestion.chunk_token_budget))
+
+
+def _extraction_input_tokens(chunks, chunk_notes) -> int:
+    return sum(
+        EXTRACTION_PROMPT.token_estimate(chunk_note=note, contract_text=chunk)
+        for chunk, note in zip(chunks, chunk_notes)
+    )
+
+
+def _reuse_near_duplicate(extracted_text: str, match: NearDuplicate, chunks: list, responses: list) -> dict:
+    """
+    Builds the process_contract_document result of a near-duplicate from the
+    matched contract's extraction and the responses for its changed clauses.
+
+    The result's `near_duplicate` entry reports what was reused and the
+    estimated model spend avoided: the calls and tokens a full extraction of
+    the text would have cost, less those of the calls actually made. Output
+    tokens are estimated from the size of the matched contract's extraction.
+    """
+    delta = _merge_extractions(match.changed_text, responses) if responses else None
+    result = {"status": "success", "extracted_text": extracted_text, **match.merge(delta)}
+
+    full_chunks = list(iter_text_chunks([extracted_text], settings.ingestion.chunk_token_budget))
+    full_input = _extraction_input_tokens(full_chunks, (_chunk_note(index) for index in range(len(full_chunks))))
+    delta_input = _extraction_input_tokens(chunks, [_NEAR_DUPLICATE_NOTE] * len(chunks))
+    calls_avoided = max(0, len(full_chunks) - len(chunks))
+    avoided = {
+        "llm_calls": calls_avoided,
+        "input_tokens": max(0, full_input - delta_input),
+        "output_tokens": calls_avoided * estimate_tokens(json.dumps(match.extraction)),
+    }
+    count("near_duplicate_reuse_total")
+    count("llm_calls_avoided_total", avoided["llm_calls"], task=EXTRACTION_TASK)
+    count("llm_input_tokens_avoided_total", avoided["input_tokens"], task=EXTRACTION_TASK)
+    count("llm_output_tokens_avoided_total", avoided["output_tokens"], task=EXTRACTION_TASK)
+    result["near_duplicate"] = {
+        "matched_pdf_file_path": match.pdf_file_path,
+        "similarity": match.similarity,
+        "total_clauses": match.total_clauses,
+        "reextracted_clauses": len(match.changed_clauses),
+        "reused_clauses": match.reused_clauses,
+        "model_spend_avoided": avoided,
+    }
+    logger.info("Reused the extraction of near-duplicate %s (similarity %.2f); re-extracted %d of %d clauses.",
+                match.pdf_file_path, match.similarity, len(match.changed_clauses), match.total_clauses)
+    return result
+
+
+def _judge_near_duplicate(match: NearDuplicate, responses: list) -> dict:
+    """The extraction a near-duplicate's delta responses produce, for the router to score."""
+    return match.merge(_merge_extractions(match.changed_text, responses))
+
+
+def _extract_contract_data(extracted_text: str, signature: Optional[np.ndarray] = None) -> dict:
+    """
+    Runs the extraction LLM calls over already-read contract text.
+
+    When a near-duplicate of the text was processed before (see
+    shared_libraries.near_duplicates), only the clauses that differ from it are
+    sent to the model and its structured_data is reused for the rest.
+    `signature` is the text's MinHash signature, when already computed.
+
+    Returns:
+        dict: A successful process_contract_document result for the text.
+    """
+    match = _find_near_duplicate(extracted_text, signature)
+    if match is None:
+        return _extract_from_pages([extracted_text])
+    chunks = _near_duplicate_chunks(match)
+    responses = []
+    if chunks:
+        responses = route_stage(
+            EXTRACTION_TASK,
+            lambda model: [_extract_chunk(chunk, _NEAR_DUPLICATE_NOTE, model) for chunk in chunks],
+            judge=lambda delta: _judge_near_duplicate(match, delta),
+        )
+    return _reuse_near_duplicate(extracted_text, match, chunks, responses)
+
+
+def _cache_result(cache_key: Optional[str], result: dict) -> None:
+    """Stores a result in the result cache. Cache write problems never fail processing."""
+    if cache_key is None:
+        return
+    try:
+        get_result_cache().put(cache_key, result)
+    except OSError as e:
+        logger.warning("Could not write the result cache entry %s: %s", cache_key, e)
+
+
+def _index_clauses(pdf_file_path: str, result: dict) -> None:
+    """Adds a processed contract's clauses to the search index. Indexing problems never fail processing."""
+    clause_index = get_clause_index()
+    if clause_index is None:
+        return
+    try:
+        clause_index.add_document(pdf_file_path, result["extracted_text"])
+    except sqlite3.Error as e:
+        logger.warning("Could not index clauses of %s: %s", pdf_file_path, e)
+
+
+def _index_contract_dates(pdf_file_path: str, result: dict) -> None:
+    """Adds a processed contract's dates to the date index. Indexing problems never fail processing."""
+    date_index = get_date_index()
+    if date_index is None:
+        return
+    try:
+        date_index.add(pdf_file_path, result.get("structured_data") or {})
+    except sqlite3.Error as e:
+        logger.warning("Could not index dates of %s: %s", pdf_file_path, e)
+
+
+def _index_near_duplicate(pdf_file_path: str, result: dict) -> None:
+    """Adds a processed contract to the near-duplicate index. Indexing problems never fail processing."""
+    near_duplicate_index = get_near_duplicate_index()
+    if near_duplicate_index is None:
+        return
+    try:
+        near_duplicate_index.add(pdf_file_path, result["extracted_text"], result,
+                                 route_key(EXTRACTION_TASK), EXTRACTION_PROMPT_VERSION)
+    except sqlite3.Error as e:
+        logger.warning("Could not add %s to the near-duplicate index: %s", pdf_file_path, e)
+
+
+def _load_artifact(tool_context: Optional[ToolContext], handle: str) -> dict:
+    """Loads an artifact stored earlier in the same agent session. Raises ArtifactNotFoundError."""
+    if tool_context is None:
+        raise ArtifactNotFoundError(handle)
+    return get_artifact_store().get(tool_context.session.id, handle)
+
+
+def _unknown_handle_error(handle: str) -> dict:
+    return {
+        "status": "error",
+        "error_message": f"Unknown or expired handle: {handle}. Process the contract again to get a new one."
+    }
+
+
+def _with_contract_handle(tool_context: ToolContext, pdf_file_path: str, result: dict) -> dict:
+    """Stores a processed contract for the session and returns the compact result shown to the agent."""
+    handle = get_artifact_store().put(tool_context.session.id, "contract", {**result, "pdf_file_path": pdf_file_path})
+    return {
+        "status": "success",
+        "contract_handle": handle,
+        "structured_data": result["structured_data"],
+        "summary": result["summary"],
+        "data_quality_assessment": result["data_quality_assessment"],
+        "extracted_text_characters": len(result["extracted_text"]),
+        **({"near_duplicate": result["near_duplicate"]} if "near_duplicate" in result else {})
+    }
+
+
+def process_contract_document(pdf_file_path: str, use_cache: bool = True,
+                              tool_context: Optional[ToolContext] = None) -> dict:
     """
     Parses a PDF contract, extracts its text using Vertex AI (Gemini),
     identifies key data points and provides a summary using a Vertex AI LLM (Gemini).
 
+    The PDF is decoded once, page by page, into a temporary spill file (see
+    pdf_stream.PageSpool), and long contracts are extracted in chunks that fit
+    the model's context, then merged. While the models run only the chunk
+    being extracted is held in memory; an escalation to the strong model and
+    the final extracted_text, the only copy of the full text, replay the
+    pages from the spill file. Results are cached on disk, keyed by
+    the PDF contents, the model and the extraction prompt version, so
+    re-uploading the same file skips both model calls. A contract that closely
+    matches one processed before (e.g. the same template with other parties and
+    amounts) reuses that contract's extraction, and only the clauses that
+    differ are sent to the model. The lookup streams the pages through MinHash
+    first; only a contract that has a near-duplicate is then held in full,
+    since its clauses are compared with the match's before extraction.
+
+    When called by the agent, the full result is kept in the session's artifact
+    store and a `contract_handle` is returned instead of the extracted text.
+
     Args:
         pdf_file_path (str): The absolute path to the PDF contract file.
+        use_cache (bool, optional): Set to False to bypass the result cache. Defaults to True.
+        tool_context (ToolContext, optional): Supplied by ADK; enables handle mode.
 
     Returns:
         dict: A dictionary containing:
             - status (str): "success" or "error"
-            - extracted_text (str): Full text from the PDF.
+            - extracted_text (str): Full text from the PDF. Not returned in handle mode.
+            - contract_handle (str): Handle of the stored result, in handle mode only. Pass it to
+              detect_contract_breaches and calculate_contract_penalties.
+            - extracted_text_characters (int): Length of the extracted text, in handle mode only.
             - structured_data (dict): JSON-like object with extracted key-value pairs.
             - summary (str): LLM-generated summary.
             - data_quality_assessment (str): LLM's assessment of extraction completeness.
+            - near_duplicate (dict, optional): Present when the extraction of a near-identical
+              contract was reused: matched_pdf_file_path, similarity, total_clauses,
+              reextracted_clauses, reused_clauses and model_spend_avoided (estimated
+              llm_calls, input_tokens and output_tokens).
             - error_message (str, optional): Error message if status is "error".
     """
-    print(f"Processing contract: {pdf_file_path}")
-
-    try:
-        # 1. Document Parsing (OCR) with Vertex AI Gemini
-        # TODO: Implement actual call to Vertex AI Gemini for PDF text extraction
-        # This will likely involve reading the file and sending its content to Gemini's
-        # multimodal capabilities.
-        # Example (conceptual):
-        # extracted_text = vertex_ai_gemini_ocr(pdf_file_path)
-        if not pdf_file_path: # Simple check, replace with actual file existence check
-            raise FileNotFoundError("PDF file path is empty or invalid.")
-        
-        print(f"Simulating OCR for {pdf_file_path}...")
-        # In a real scenario, you'd check if the file exists and is readable.
-        # For now, let's assume it's a valid path and simulate text extraction.
-        extracted_text = f"Simulated extracted text from {pdf_file_path}. " \
-                         "Contains details about parties, dates, and financial terms."
-        print("OCR simulation successful.")
-
-        # 2. Data Extraction (LLM) with Vertex AI Gemini
-        # TODO: Implement actual call to Vertex AI Gemini LLM for data extraction
-        # This involves constructing a detailed prompt.
-        prompt_for_extraction = f"""
-        Given the following contract text, please extract the specified key data points
-        and provide a concise summary. Also, assess the quality of the data extraction.
-
-        Contract Text:
-        {extracted_text}
-
-        Key Data Points to Extract:
-        - Effective Date:
-        - Expiration Date:
-        - Involved Parties (Names, Roles, Addresses, Contacts):
-        - Financial Amounts/Terms:
-        - Specific Conditions:
-        - Renewal Terms:
-        - Termination Clauses:
-        - Penalty Clauses:
-        - Non-compliance Mentions:
-        - Governing Law:
-        - Any other significant clauses or terms.
-
-        Data Quality Assessment:
-        Please provide a brief assessment of how completely and accurately you were able to
-        extract the requested data points. Note any ambiguities or missing information.
-
-        Summary:
-        Provide a concise summary of the contract's main purpose and key terms.
-
-        Output Format (JSON-like):
-        {{
-          "structured_data": {{
-            "effective_date": "YYYY-MM-DD",
-            "expiration_date": "YYYY-MM-DD",
-            "parties": [{{ "name": "", "role": "", "address": "", "contact": "" }}],
-            "financial_terms": "",
-            // ... other fields
-          }},
-          "data_quality_assessment": "...",
-          "summary": "..."
-        }}
-        """
-        print("Simulating LLM call for data extraction...")
-        # simulated_llm_response_extraction = vertex_ai_gemini_llm(prompt_for_extraction)
-        # For now, simulate a response:
-        simulated_llm_response_extraction = {
-            "structured_data": {
-                "effective_date": "2024-01-01",
-                "expiration_date": "2025-12-31",
-                "parties": [
-                    {"name": "Party A Inc.", "role": "Provider", "address": "123 Main St", "contact": "contact@partya.com"},
-                    {"name": "Party B Ltd.", "role": "Client", "address": "456 Oak Ave", "contact": "contact@partyb.com"}
-                ],
-                "financial_terms": "Client pays $10,000 USD monthly.",
-                "governing_law": "State of California"
-            },
-            "data_quality_assessment": "High confidence in extracted dates and parties. Financial terms are clear. Some specific conditions might require deeper review.",
-            "summary": "This is a service agreement between Party A Inc. and Party B Ltd. for services rendered from 2024-01-01 to 2025-12-31, with monthly payments of $10,000."
-        }
-        print("LLM simulation for data extraction successful.")
-
-        return {
-            "status": "success",
-            "extracted_text": extracted_text,
-            "structured_data": simulated_llm_response_extraction["structured_data"],
-            "summary": simulated_llm_response_extraction["summary"],
-            "data_quality_assessment": simulated_llm_response_extraction["data_quality_assessment"]
-        }
-
-    except FileNotFoundError as e:
-        print(f"Error: {e}")
-        return {"status": "error", "error_message": str(e)}
-    except Exception as e:
-        # Log the full exception for debugging
-        print(f"An unexpected error occurred in process_contract_document: {e}")
-        # Potentially log traceback: import traceback; traceback.print_exc()
-        return {
-            "status": "error",
-            "error_message": f"An unexpected error occurred: {str(e)}"
-        }
-
-def detect_contract_breaches(extracted_contract_data: dict) -> dict:
+    logger.info("Processing contract: %s", pdf_file_path)
+
+    with trace("process_contract_document"):
+        try:
+            if not pdf_file_path: # Simple check, replace with actual file existence check
+                raise FileNotFoundError("PDF file path is empty or invalid.")
+            if not os.path.isfile(pdf_file_path):
+                raise FileNotFoundError(f"PDF file not found: {pdf_file_path}")
+
+            cache = get_result_cache()
+            cache_key = _result_cache_key(pdf_file_path) if use_cache else None
+            result = cache.get(cache_key) if cache_key is not None else None
+            if result is not None:
+                logger.info("Result cache hit for %s, skipping OCR and extraction.", pdf_file_path)
+            else:
+                with PageSpool(_iter_contract_pages(pdf_file_path)) as pages:
+                    signature = _near_duplicate_signature(pages)
+                    if signature is not None:
+                        # Reusing a near-duplicate compares the whole text's clauses with the match's.
+                        result = _extract_contract_data(pages.text(), signature)
+                    else:
+                        result = _extract_from_pages(pages)
+                _cache_result(cache_key, result)
+            _index_clauses(pdf_file_path, result)
+            _index_contract_dates(pdf_file_path, result)
+            _index_near_duplicate(pdf_file_path, result)
+            if tool_context is not None:
+                return _with_contract_handle(tool_context, pdf_file_path, result)
+            return result
+
+        except FileNotFoundError as e:
+            logger.error("Error: %s", e)
+            count("tool_errors_total", tool="process_contract_document")
+            return {"status": "error", "error_message": str(e)}
+        except Exception as e:
+            # Log the full exception for debugging
+            logger.exception("An unexpected error occurred in process_contract_document: %s", e)
+            count("tool_errors_total", tool="process_contract_document")
+            return {
+                "status": "error",
+                "error_message": f"An unexpected error occurred: {str(e)}"
+            }
+
+
+def detect_contract_breaches(extracted_contract_data: Optional[dict] = None, contract_handle: Optional[str] = None,
+                             tool_context: Optional[ToolContext] = None) -> dict:
     """
-    Analyzes extracted contract data against predefined rules to identify potential breaches
-    using a Vertex AI LLM (Gemini).
+    Analyzes extracted contract data against predefined rules to identify potential breaches.
+
+    Rules are loaded from settings.breach_rules.rules_file and evaluated locally.
+    Only the rules that come back "Insufficient Data" are sent to a Vertex AI
+    LLM (Gemini), all together in a single request.
 
     Args:
-        extracted_contract_data (dict): The structured data output from 
-                                        process_contract_document.
+        extracted_contract_data (dict, optional): The structured data output from 
+                                        process_contract_document, or a ContractRecord.
+        contract_handle (str, optional): The contract_handle returned by process_contract_document.
+                                        Used instead of extracted_contract_data.
+        tool_context (ToolContext, optional): Supplied by ADK; enables handle mode.
 
     Returns:
         dict: A dictionary containing:
             - status (str): "success" or "error"
             - breach_report (dict): Structured report detailing analysis for each rule.
+            - breach_report_handle (str): Handle of the stored report, in handle mode only.
+              Pass it to calculate_contract_penalties.
+            - llm_escalated_rules (list): Ids of the rules that needed the LLM.
             - error_message (str, optional): Error message if status is "error".
     """
-    print("Detecting contract breaches...")
+    logger.info("Detecting contract breaches...")
+    if contract_handle:
+        try:
+            extracted_contract_data = _load_artifact(tool_context, contract_handle)["structured_data"]
+        except KeyError: # ArtifactNotFoundError, or a handle of the wrong kind
+            return _unknown_handle_error(contract_handle)
     if not extracted_contract_data:
         return {
             "status": "error",
             "error_message": "Extracted contract data is missing or empty."
         }
 
-    # Predefined Breach Rules (as per plan)
-    breach_rules = [
-        {"id": "expiration_date_exists", "description": "Contract must have an expiration date."},
-        {"id": "min_two_parties", "description": "Contract must involve at least two distinct parties."},
-        {"id": "financial_terms_specified", "description": "Contract should specify clear financial terms or considerations."},
-        {"id": "termination_clauses_included", "description": "Contract should include clauses detailing termination conditions."}
+    with trace("detect_contract_breaches"):
+        try:
+            breach_report, escalated_rule_ids = _run_breach_rules(extracted_contract_data)
+            result = {
+                "status": "success",
+                "breach_report": breach_report,
+                "llm_escalated_rules": escalated_rule_ids
+            }
+            if tool_context is not None:
+                result["breach_report_handle"] = get_artifact_store().put(
+                    tool_context.session.id, "breaches", {"breach_report": breach_report}
+                )
+            return result
+
+        except Exception as e:
+            logger.exception("An unexpected error occurred in detect_contract_breaches: %s", e)
+            count("tool_errors_total", tool="detect_contract_breaches")
+            return {
+                "status": "error",
+                "error_message": f"An unexpected error occurred: {str(e)}"
+            }
+
+
+def _run_breach_rules(extracted_contract_data, rule_ids: Optional[List[str]] = None):
+    """
+    Evaluates breach rules locally and escalates the undecided ones to the LLM.
+
+    Args:
+        extracted_contract_data: structured_data dict or ContractRecord.
+        rule_ids (list, optional): Only evaluate these rules. Defaults to all rules.
+
+    Returns:
+        tuple: (breach_report, ids of the rules sent to the LLM)
+    """
+    with span("rule_evaluation"):
+        breach_report = load_rule_engine(settings.breach_rules.rules_file).evaluate(extracted_contract_data, rule_ids)
+    return _resolve_ambiguous_rules(extracted_contract_data, breach_report)
+
+
+def _resolve_ambiguous_rules(extracted_contract_data, breach_report: list):
+    """
+    Sends the "Insufficient Data" findings of a locally evaluated breach report to the LLM.
+
+    Returns:
+        tuple: (breach_report with the LLM's findings merged in, ids of the rules sent to the LLM)
+    """
+    rule_engine = load_rule_engine(settings.breach_rules.rules_file)
+    ambiguous_rules = [
+        rule_engine.rule(finding["rule_id"]).as_prompt_dict()
+        for finding in breach_report
+        if finding["status"] == INSUFFICIENT_DATA
     ]
+    logger.info("Rule engine decided %d of %d rules locally.", len(breach_report) - len(ambiguous_rules), len(breach_report))
 
-    try:
-        # Safely serialize data to JSON strings for embedding in the prompt
-        extracted_contract_data_json_str = json.dumps(extracted_contract_data, indent=2)
-        breach_rules_json_str = json.dumps(breach_rules, indent=2)
-
-        # Construct prompt for Vertex AI Gemini LLM
-        prompt_for_breach_detection = f"""
-        Given the following extracted contract data:
-        {extracted_contract_data_json_str}
-
-        And the following rules for breach detection:
-        {breach_rules_json_str}
-
-        Please analyze the contract data against each rule and report whether the condition is:
-        - "Met": The rule is satisfied by the contract data.
-        - "Not Met": The rule is not satisfied, indicating a potential breach or missing information.
-        - "Insufficient Data": The contract data does not provide enough information to determine compliance with the rule.
-
-        For each rule, provide a brief 'details' string explaining your finding.
-
-        Output Format (JSON-like list of rule analyses):
-        [
-          {{
-            "rule_id": "expiration_date_exists",
-            "rule_description": "Contract must have an expiration date.",
-            "status": "Met/Not Met/Insufficient Data",
-            "details": "..."
-          }},
-          // ... analysis for other rules
-        ]
-        """
-        print("Simulating LLM call for breach detection...")
-        # simulated_llm_response_breach = vertex_ai_gemini_llm(prompt_for_breach_detection)
-        # For now, simulate a response based on the example data:
-        simulated_breach_report = []
-        # Rule 1: Expiration Date
-        if extracted_contract_data.get("expiration_date"):
-            simulated_breach_report.append({
-                "rule_id": "expiration_date_exists",
-                "rule_description": "Contract must have an expiration date.",
-                "status": "Met",
-                "details": f"Expiration date found: {extracted_contract_data.get('expiration_date')}"
-            })
-        else:
-            simulated_breach_report.append({
-                "rule_id": "expiration_date_exists",
-                "rule_description": "Contract must have an expiration date.",
-                "status": "Not Met",
-                "details": "No expiration date found in the extracted data."
-            })
-
-        # Rule 2: Min Two Parties
-        if isinstance(extracted_contract_data.get("parties"), list) and len(extracted_contract_data.get("parties")) >= 2:
-            simulated_breach_report.append({
-                "rule_id": "min_two_parties",
-                "rule_description": "Contract must involve at least two distinct parties.",
-                "status": "Met",
-                "details": f"{len(extracted_contract_data.get('parties'))} parties found."
-            })
-        else:
-            simulated_breach_report.append({
-                "rule_id": "min_two_parties",
-                "rule_description": "Contract must involve at least two distinct parties.",
-                "status": "Not Met",
-                "details": "Fewer than two parties found or parties data is not a list."
-            })
-        
-        # Rule 3: Financial Terms
-        if extracted_contract_data.get("financial_terms"):
-            simulated_breach_report.append({
-                "rule_id": "financial_terms_specified",
-                "rule_description": "Contract should specify clear financial terms or considerations.",
-                "status": "Met",
-                "details": f"Financial terms found: {extracted_contract_data.get('financial_terms')}"
-            })
-        else:
-            simulated_breach_report.append({
-                "rule_id": "financial_terms_specified",
-                "rule_description": "Contract should specify clear financial terms or considerations.",
-                "status": "Insufficient Data", # Or "Not Met" depending on strictness
-                "details": "No specific financial terms explicitly extracted."
-            })
-
-        # Rule 4: Termination Clauses (Simulating as Insufficient Data for now)
-        simulated_breach_report.append({
-            "rule_id": "termination_clauses_included",
-            "rule_description": "Contract should include clauses detailing termination conditions.",
-            "status": "Insufficient Data", # Assuming not explicitly extracted by the first tool
-            "details": "Termination clauses were not specifically itemized in the initial extraction."
-        })
-        print("LLM simulation for breach detection successful.")
+    if ambiguous_rules:
+        llm_findings = _escalate_breach_rules(extracted_contract_data, ambiguous_rules)
+        breach_report = [llm_findings.get(finding["rule_id"], finding) for finding in breach_report]
+    return breach_report, [rule["id"] for rule in ambiguous_rules]
+
+
+def _escalate_breach_rules(extracted_contract_data: dict, breach_rules: list) -> dict:
+    """
+    Asks the LLM to decide the rules the rule engine could not, in one request.
+
+    Returns:
+        dict: Breach report entries keyed by rule id. Rules the model did not
+              answer are left out, so the local "Insufficient Data" finding stands.
+    """
+    logger.debug("Calling LLM backend for %d ambiguous breach rule(s)...", len(breach_rules))
+    prompt, payload = _breach_request(extracted_contract_data, breach_rules)
+    response = route_stage(BREACH_TASK, lambda model: _generate_json(BREACH_TASK, prompt, payload, model=model))
+    logger.debug("LLM breach detection successful.")
+    return _collect_breach_findings(response, breach_rules)
+
+
+def _breach_request(extracted_contract_data, breach_rules: list):
+    """Returns the (prompt, payload) of the breach escalation call."""
+    with span("prompt_build", task=BREACH_TASK):
+        prompt_for_breach_detection = BREACH_PROMPT.render(
+            breach_rules=breach_rules,
+            extracted_contract_data=extracted_contract_data,
+        )
+    return prompt_for_breach_detection, {"extracted_contract_data": extracted_contract_data, "breach_rules": breach_rules}
+
+
+def _collect_breach_findings(response, breach_rules: list) -> dict:
+    """Keeps the well-formed findings for the requested rules from a breach escalation response."""
+    requested = {rule["id"] for rule in breach_rules}
+    return {
+        finding["rule_id"]: finding
+        for finding in response
+        if isinstance(finding, dict) and finding.get("rule_id") in requested and finding.get("status") in STATUSES
+    }
+
+
+def search_contract_clauses(query: str, max_results: int = 10, match_mode: str = "all") -> dict:
+    """
+    Searches the clauses of every contract processed so far, without any LLM call.
+
+    Args:
+        query (str): Keywords and/or "quoted phrases", e.g. 'termination "for convenience"'.
+        max_results (int, optional): Maximum number of clauses to return. Defaults to 10.
+        match_mode (str, optional): "all" (every term must appear), "any" (at least one),
+                                    or "phrase" (the whole query as one phrase). Defaults to "all".
 
+    Returns:
+        dict: A dictionary containing:
+            - status (str): "success" or "error"
+            - matches (list): Matching clauses, best first, each with pdf_file_path,
+              clause_number, heading and a snippet with the matched terms in [brackets].
+            - indexed_documents (int): Number of contracts in the index.
+            - error_message (str, optional): Error message if status is "error".
+    """
+    logger.info("Searching contract clauses for: %s", query)
+    if match_mode not in ("all", "any", "phrase"):
+        return {"status": "error", "error_message": f"Unknown match_mode: {match_mode}"}
+    clause_index = get_clause_index()
+    if clause_index is None:
+        return {"status": "error", "error_message": "The clause index is disabled."}
+    try:
+        matches = clause_index.search(query, limit=max_results, mode=match_mode)
         return {
             "status": "success",
-            "breach_report": simulated_breach_report
+            "matches": matches,
+            "indexed_documents": clause_index.document_count()
         }
-
-    except Exception as e:
-        print(f"An unexpected error occurred in detect_contract_breaches: {e}")
+    except sqlite3.Error as e:
+        logger.exception("An unexpected error occurred in search_contract_clauses: %s", e)
         return {
             "status": "error",
             "error_message": f"An unexpected error occurred: {str(e)}"
         }
-def calculate_contract_penalties(extracted_contract_data: dict, breach_report: Optional[dict] = None) -> dict:
+
+
+def find_contracts_by_date(date_field: str = "expiration_date", within_days: Optional[int] = None,
+                           start_date: Optional[str] = None, end_date: Optional[str] = None,
+                           timezone: str = "UTC", max_results: int = 50) -> dict:
+    """
+    Finds processed contracts by effective or expiration date, without any LLM call.
+
+    Either give `within_days` (e.g. 90 for "expiring in the next 90 days", -30 for
+    "in the last 30 days"), counted from today's date in `timezone`, or an explicit
+    range with `start_date` and/or `end_date`.
+
+    Args:
+        date_field (str, optional): "expiration_date" or "effective_date". Defaults to "expiration_date".
+        within_days (int, optional): Days from today; negative looks back.
+        start_date (str, optional): First date of the range, YYYY-MM-DD (inclusive).
+        end_date (str, optional): Last date of the range, YYYY-MM-DD (inclusive).
+        timezone (str, optional): IANA timezone, e.g. "Europe/Berlin". Defaults to "UTC".
+        max_results (int, optional): Maximum number of contracts to return. Defaults to 50.
+
+    Returns:
+        dict: A dictionary containing:
+            - status (str): "success" or "error"
+            - total_matches (int): Number of contracts in the range, even beyond max_results.
+            - contracts (list): Matching contracts, earliest date first, each with
+              contract_id (the PDF path), effective_date and expiration_date.
+            - start_date / end_date (str): The range searched, or None where open.
+            - indexed_contracts (int): Number of contracts in the index.
+            - error_message (str, optional): Error message if status is "error".
+    """
+    logger.info("Finding contracts by %s (within_days=%s, %s..%s, %s)",
+                date_field, within_days, start_date, end_date, timezone)
+    if date_field not in DATE_FIELDS:
+        return {"status": "error", "error_message": f"Unknown date_field: {date_field}"}
+    date_index = get_date_index()
+    if date_index is None:
+        return {"status": "error", "error_message": "The date index is disabled."}
+    try:
+        zone = ZoneInfo(timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        return {"status": "error", "error_message": f"Unknown timezone: {timezone}"}
+
+    if within_days is not None:
+        today = datetime.datetime.now(zone).date()
+        start, end = sorted((today, today + datetime.timedelta(days=within_days)))
+    else:
+        start = normalize_date(start_date, zone) if start_date else None
+        end = normalize_date(end_date, zone) if end_date else None
+        for given, parsed in ((start_date, start), (end_date, end)):
+            if given and parsed is None:
+                return {"status": "error", "error_message": f"Not a date: {given}. Use YYYY-MM-DD."}
+        if start is None and end is None:
+            return {"status": "error", "error_message": "Give within_days, or start_date and/or end_date."}
+
+    with trace("find_contracts_by_date"):
+        try:
+            total, contracts = date_index.query(date_field, start, end, limit=max_results)
+            return {
+                "status": "success",
+                "total_matches": total,
+                "contracts": contracts,
+                "start_date": start.isoformat() if start else None,
+                "end_date": end.isoformat() if end else None,
+                "indexed_contracts": len(date_index)
+            }
+        except sqlite3.Error as e:
+            logger.exception("An unexpected error occurred in find_contracts_by_date: %s", e)
+            count("tool_errors_total", tool="find_contracts_by_date")
+            return {
+                "status": "error",
+                "error_message": f"An unexpected error occurred: {str(e)}"
+            }
+
+
+def _attach_calculated_amounts(extracted_contract_data: dict, penalty_items: list) -> None:
+    """
+    Evaluates each penalty's `calculated_amount_formula` locally where the contract
+    supplies every variable it needs, adding a `calculated_amount` to the item.
+
+    Formulas that depend on scenario variables (e.g. days_late) are left for
+    shared_libraries.penalty_formulas.evaluate_portfolio.
+    """
+    variables = derive_formula_variables(extracted_contract_data)
+    for item in penalty_items:
+        try:
+            formula = compile_formula(item.get("calculated_amount_formula"))
+            if formula.variables.issubset(variables):
+                item["calculated_amount"] = round(float(formula.evaluate(variables)), 2)
+        except FormulaError:
+            continue
+
+
+def _penalty_request(extracted_contract_data, breach_report):
+    """Returns the (prompt, payload) of the penalty calculation call."""
+    with span("prompt_build", task=PENALTY_TASK):
+        prompt_for_penalty_calculation = PENALTY_PROMPT.render(
+            extracted_contract_data=extracted_contract_data,
+            breach_report=breach_report if breach_report else "No specific breach report provided.",
+        )
+    return prompt_for_penalty_calculation, {"extracted_contract_data": extracted_contract_data, "breach_report": breach_report}
+
+
+def calculate_contract_penalties(extracted_contract_data: Optional[dict] = None, breach_report: Optional[dict] = None,
+                                 contract_handle: Optional[str] = None, breach_report_handle: Optional[str] = None,
+                                 tool_context: Optional[ToolContext] = None) -> dict:
     """
     Calculates potential penalty amounts based on contract terms and identified breaches
     using a Vertex AI LLM (Gemini).
 
     Args:
-        extracted_contract_data (dict): The structured data output from 
-                                        process_contract_document.
+        extracted_contract_data (dict, optional): The structured data output from 
+                                        process_contract_document, or a ContractRecord.
         breach_report (dict, optional): The breach_report output from 
-                                        detect_contract_breaches. Defaults to None.
+                                        detect_contract_breaches, or a list of
+                                        BreachFinding. Defaults to None.
+        contract_handle (str, optional): The contract_handle returned by process_contract_document.
+                                        Used instead of extracted_contract_data.
+        breach_report_handle (str, optional): The breach_report_handle returned by
+                                        detect_contract_breaches. Used instead of breach_report.
+        tool_context (ToolContext, optional): Supplied by ADK; enables handle mode.
 
     Returns:
         dict: A dictionary containing:
             - status (str): "success" or "error"
-            - penalty_summary (dict): Report detailing potential penalties.
+            - penalty_summary (dict): Report detailing potential penalties. Items whose
+              formula can be evaluated from the contract data carry a `calculated_amount`.
             - error_message (str, optional): Error message if status is "error".
     """
-    print("Calculating contract penalties...")
+    logger.info("Calculating contract penalties...")
+    if contract_handle:
+        try:
+            extracted_contract_data = _load_artifact(tool_context, contract_handle)["structured_data"]
+        except KeyError: # ArtifactNotFoundError, or a handle of the wrong kind
+            return _unknown_handle_error(contract_handle)
+    if breach_report_handle:
+        try:
+            breach_report = _load_artifact(tool_context, breach_report_handle)["breach_report"]
+        except KeyError:
+            return _unknown_handle_error(breach_report_handle)
     if not extracted_contract_data:
         return {
             "status": "error",
             "error_message": "Extracted contract data is missing or empty."
         }
 
-    try:
-        breach_report_info_string = "No specific breach report provided."
-        if breach_report:
-            # Safely serialize breach_report to a string using json.dumps
-            breach_report_json_str = json.dumps(breach_report, indent=2)
-            breach_report_info_string = f"And the following breach report (if available):\n{breach_report_json_str}"
-
-        # Construct prompt for Vertex AI Gemini LLM
-        # Safely serialize extracted_contract_data to a JSON string
-        extracted_contract_data_json_str = json.dumps(extracted_contract_data, indent=2)
-
-        prompt_for_penalty_calculation = f"""
-        Given the following extracted contract data:
-        {extracted_contract_data_json_str}
-
-        {breach_report_info_string}
-
-        Please review the contract data, especially any clauses related to penalties, late fees,
-        or consequences for non-compliance. If a breach report is provided, focus on penalties
-        related to those identified breaches.
-
-        Identify and, if possible, quantify any penalty amounts or calculation formulas described.
-        If direct calculation isn't possible from the provided text, describe the nature of the
-        penalties and any conditions mentioned for their application.
-
-        Output Format (JSON-like):
-        {{
-          "penalty_summary": [ // Could be a list if multiple penalties are found
-            {{
-              "breach_type_or_clause": "e.g., Late Delivery, Confidentiality Breach",
-              "penalty_description": "e.g., 1% of contract value per day of delay",
-              "calculated_amount_formula": "e.g., $100 per incident or specific formula",
-              "conditions_for_penalty": "e.g., If delay exceeds 5 business days",
-              "notes": "e.g., Ambiguity in clause X, requires legal interpretation"
-            }}
-          ],
-          "overall_notes": "Any general observations about penalties in the contract."
-        }}
-        """
-        print("Simulating LLM call for penalty calculation...")
-        # simulated_llm_response_penalty = vertex_ai_gemini_llm(prompt_for_penalty_calculation)
-        # For now, simulate a response:
-        
-        # Simulate finding a penalty clause if financial_terms exist
-        penalty_clauses_found = []
-        if extracted_contract_data.get("financial_terms") and "pays $10,000 USD monthly" in extracted_contract_data.get("financial_terms"):
-            penalty_clauses_found.append({
-                "breach_type_or_clause": "Late Payment",
-                "penalty_description": "A late fee of 5% of the outstanding monthly amount may be applied if payment is not received within 10 days of the due date.",
-                "calculated_amount_formula": "0.05 * monthly_amount",
-                "conditions_for_penalty": "Payment not received within 10 days of due date.",
-                "notes": "Assumes monthly amount is $10,000 as per financial terms."
-            })
-        
-        if not penalty_clauses_found:
-             penalty_clauses_found.append({
-                "breach_type_or_clause": "General Non-compliance",
-                "penalty_description": "No specific penalty clauses for general non-compliance were automatically quantifiable from the text.",
-                "calculated_amount_formula": "N/A",
-                "conditions_for_penalty": "N/A",
-                "notes": "Contract may refer to dispute resolution or other remedies."
-            })
-
-        simulated_llm_response_penalty = {
-            "penalty_summary": penalty_clauses_found,
-            "overall_notes": "The contract's penalty clauses seem standard. Further review of specific sections mentioned in 'penalty clauses' (if extracted) is advised."
-        }
-        print("LLM simulation for penalty calculation successful.")
+    with trace("calculate_contract_penalties"):
+        try:
+            logger.debug("Calling LLM backend for penalty calculation...")
+            prompt, payload = _penalty_request(extracted_contract_data, breach_report)
+            penalty_response = route_stage(PENALTY_TASK,
+                                           lambda model: _generate_json(PENALTY_TASK, prompt, payload, model=model))
+            logger.debug("LLM penalty calculation successful.")
 
-        return {
-            "status": "success",
-            "penalty_summary": simulated_llm_response_penalty
-        }
+            with span("formula_evaluation"):
+                _attach_calculated_amounts(extracted_contract_data, penalty_response.get("penalty_summary") or [])
+
+            return {
+                "status": "success",
+                "penalty_summary": penalty_response
+            }
+
+        except Exception as e:
+            logger.exception("An unexpected error occurred in calculate_contract_penalties: %s", e)
+            count("tool_errors_total", tool="calculate_contract_penalties")
+            return {
+                "status": "error",
+                "error_message": f"An unexpected error occurred: {str(e)}"
+            }
+
+
+class ContractAnalysisError(RuntimeError):
+    """Raised by the record-based API when a tool reports an error."""
+
+
+def _require_success(result: dict) -> dict:
+    if result.get("status") != "success":
+        raise ContractAnalysisError(result.get("error_message", "Unknown error"))
+    return result
+
+
+def process_contract_record(pdf_file_path: str, use_cache: bool = True) -> ContractRecord:
+    """
+    Python API counterpart of process_contract_document that returns a ContractRecord.
+
+    Raises:
+        ContractAnalysisError: If the document could not be processed.
+    """
+    result = _require_success(process_contract_document(pdf_file_path, use_cache=use_cache))
+    return ContractRecord.from_dict(result["structured_data"], contract_id=pdf_file_path)
+
+
+def detect_breach_findings(contract: ContractRecord) -> List[BreachFinding]:
+    """
+    Python API counterpart of detect_contract_breaches that returns BreachFinding records.
+
+    Raises:
+        ContractAnalysisError: If breach detection failed.
+    """
+    result = _require_success(detect_contract_breaches(contract))
+    return [BreachFinding.from_dict(finding) for finding in result["breach_report"]]
+
+
+def calculate_penalty_items(contract: ContractRecord,
+                            findings: Optional[List[BreachFinding]] = None) -> List[PenaltyItem]:
+    """
+    Python API counterpart of calculate_contract_penalties that returns PenaltyItem records.
+
+    Raises:
+        ContractAnalysisError: If penalty calculation failed.
+    """
+    result = _require_success(calculate_contract_penalties(contract, findings))
+    return [PenaltyItem.from_dict(item) for item in result["penalty_summary"].get("penalty_summary") or []]
 
-    except Exception as e:
-        print(f"An unexpected error occurred in calculate_contract_penalties: {e}")
-        return {
-            "status": "error",
-            "error_message": f"An unexpected error occurred: {str(e)}"
-        }
 if __name__ == '__main__':
     # Example usage (for testing this tool directly)
     # Create a dummy PDF file for testing if one doesn't exist
@@ -385,7 +930,6 @@ if __name__ == '__main__':
         print(f"Error: {test_result['error_message']}")
 
     # Clean up dummy file
-    import os
     try:
         if os.path.exists(dummy_pdf_path):
             os.remove(dummy_pdf_path)
@@ -0,0 +1,30 @@
+"""Shared fixtures: every test gets its own on-disk stores and the default offline backend."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from legal_contract_analyzer.config import settings  # noqa: E402
+from legal_contract_analyzer.shared_libraries import llm_backends  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_settings(tmp_path, monkeypatch):
+    """Points every persistent store at tmp_path and resets the process-wide singletons."""
+    for name in ("clause_index", "date_index", "near_duplicates", "job_queue"):
+        monkeypatch.setattr(getattr(settings, name), "db_path", str(tmp_path / f"{name}.sqlite3"))
+    monkeypatch.setattr(settings.result_cache, "directory", str(tmp_path / "results"))
+    monkeypatch.setattr(settings.version_store, "directory", str(tmp_path / "versions"))
+    monkeypatch.setattr(settings.analytics_store, "directory", str(tmp_path / "analytics"))
+    from legal_contract_analyzer.shared_libraries import (
+        artifact_store, clause_index, date_index, job_queue, near_duplicates, result_cache, version_store,
+    )
+    for module, attribute in ((artifact_store, "_artifact_store"), (clause_index, "_clause_index"),
+                              (date_index, "_date_index"), (job_queue, "_job_queue"),
+                              (near_duplicates, "_near_duplicate_index"), (result_cache, "_result_cache"),
+                              (version_store, "_version_store"), (llm_backends, "_backend")):
+        monkeypatch.setattr(module, attribute, None)
+    yield settings
@@ -0,0 +1,57 @@
+import pytest
+
+from legal_contract_analyzer.shared_libraries.analytics_store import AnalyticsStore, AnalyticsWriter
+from legal_contract_analyzer.shared_libraries.rule_engine import MET, NOT_MET
+
+
+def _add(writer, number, status=NOT_MET, amount=100.0):
+    writer.add(
+        f"contract-{number}.pdf",
+        {"effective_date": "2024-01-01", "governing_law": f"State {number}"},
+        [{"rule_id": "termination_clauses_included", "rule_description": "", "status": status, "details": ""}],
+        {"penalty_summary": [{"breach_type_or_clause": "late_payment", "calculated_amount": amount}]},
+    )
+
+
+def _crash(self):
+    raise OSError("killed")
+
+
+def test_crashed_writer_leaves_no_uncommitted_rows(tmp_path, monkeypatch):
+    directory = str(tmp_path / "store")
+    with AnalyticsWriter(directory) as writer:
+        _add(writer, 1)
+        writer.flush(cursors={"seq": 1})
+
+    crashed = AnalyticsWriter(directory)
+    for number in range(2, 5):
+        _add(crashed, number, amount=1_000_000.0)
+    monkeypatch.setattr(AnalyticsWriter, "_commit", _crash)
+    with pytest.raises(OSError):
+        crashed.flush(cursors={"seq": 4}) # Column and dictionary files are appended, the commit never happens
+    crashed._lock_file.close() # The process is gone
+    monkeypatch.undo()
+
+    store = AnalyticsStore(directory)
+    assert store.cursors == {"seq": 1}
+    assert len(store.table("findings")) == 1
+    assert store.penalty_totals()["late_payment"]["total"] == 100.0
+
+    with AnalyticsWriter(directory) as writer:
+        assert writer.cursors == {"seq": 1}
+        _add(writer, 5, status=MET, amount=50.0)
+        writer.flush(cursors={"seq": 5})
+
+    store = AnalyticsStore(directory)
+    contracts = store.table("contracts")
+    assert contracts["contract_id"].decode(contracts["contract_id"].codes) == ["contract-1.pdf", "contract-5.pdf"]
+    assert contracts["governing_law"].decode(contracts["governing_law"].codes) == ["State 1", "State 5"]
+    assert store.contracts_by_rule() == {"termination_clauses_included": 1}
+    assert store.penalty_totals()["late_payment"] == {"items": 2, "calculated": 2, "total": 150.0}
+
+
+def test_second_writer_is_refused(tmp_path):
+    directory = str(tmp_path / "store")
+    with AnalyticsWriter(directory):
+        with pytest.raises(RuntimeError, match="Another writer"):
+            AnalyticsWriter(directory)
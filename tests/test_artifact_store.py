@@ -0,0 +1,76 @@
+import types
+
+import pytest
+
+from legal_contract_analyzer.shared_libraries import artifact_store
+from legal_contract_analyzer.shared_libraries.artifact_store import ArtifactNotFoundError, ArtifactStore
+from legal_contract_analyzer.tools import tools
+
+CONTRACT = (
+    "1. Parties. This Agreement is made between Party A Inc. (Provider) and Party B LLC (Client).\n\n"
+    "2. Term. Effective 2024-01-01 and expiring 2026-12-31.\n\n"
+    "3. Fees. Client pays $10,000 USD monthly.\n"
+)
+
+
+def _tool_context(session_id):
+    return types.SimpleNamespace(session=types.SimpleNamespace(id=session_id))
+
+
+def test_handles_are_content_addressed_and_scoped_to_their_session():
+    store = ArtifactStore(max_sessions=10, max_bytes_per_session=1 << 20, idle_seconds=60)
+    handle = store.put("s1", "contract", {"b": 1, "a": 2})
+
+    assert handle.startswith("contract-")
+    assert store.put("s1", "contract", {"a": 2, "b": 1}) == handle
+    assert store.get("s1", handle) == {"b": 1, "a": 2}
+    assert store.stats()["artifacts"] == 1
+    with pytest.raises(ArtifactNotFoundError):
+        store.get("s2", handle)
+
+
+def test_least_recently_used_artifacts_and_sessions_are_dropped(monkeypatch):
+    store = ArtifactStore(max_sessions=2, max_bytes_per_session=70, idle_seconds=60)
+    first = store.put("s1", "x", {"text": "a" * 20})
+    second = store.put("s1", "x", {"text": "b" * 20})
+    store.get("s1", first)
+    third = store.put("s1", "x", {"text": "c" * 20})
+
+    assert store.get("s1", first) and store.get("s1", third)
+    with pytest.raises(ArtifactNotFoundError):
+        store.get("s1", second)
+
+    store.put("s2", "x", {})
+    store.put("s3", "x", {})
+    with pytest.raises(ArtifactNotFoundError):
+        store.get("s1", first)
+
+    now = artifact_store.time.monotonic()
+    monkeypatch.setattr(artifact_store.time, "monotonic", lambda: now + 61)
+    assert store.stats()["sessions"] == 2
+    store.put("s4", "x", {})
+    assert store.stats()["sessions"] == 1
+
+
+def test_tools_resolve_each_others_handles(tmp_path):
+    path = tmp_path / "contract.txt"
+    path.write_text(CONTRACT, encoding="utf-8")
+    context = _tool_context("session-1")
+
+    processed = tools.process_contract_document(str(path), tool_context=context)
+    assert "extracted_text" not in processed
+    assert processed["extracted_text_characters"] == len(CONTRACT)
+    breaches = tools.detect_contract_breaches(contract_handle=processed["contract_handle"], tool_context=context)
+    assert breaches["status"] == "success"
+    penalties = tools.calculate_contract_penalties(contract_handle=processed["contract_handle"],
+                                                   breach_report_handle=breaches["breach_report_handle"],
+                                                   tool_context=context)
+    assert penalties["status"] == "success"
+
+    other_session = tools.detect_contract_breaches(contract_handle=processed["contract_handle"],
+                                                   tool_context=_tool_context("session-2"))
+    assert other_session["status"] == "error"
+    assert processed["contract_handle"] in other_session["error_message"]
+    wrong_kind = tools.calculate_contract_penalties(contract_handle=breaches["breach_report_handle"],
+                                                    tool_context=context)
+    assert wrong_kind["status"] == "error"
@@ -0,0 +1,40 @@
+import json
+
+from legal_contract_analyzer.benchmarks.corpus import write_synthetic_pdf
+from legal_contract_analyzer.prompts import EXTRACTION_PROMPT
+from legal_contract_analyzer.tools import batch
+
+
+def test_cli_processes_a_directory_and_reports_failures_per_file(tmp_path, capsys):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    paths = sorted(write_synthetic_pdf(str(corpus / f"contract_{number}.pdf"), pages=2, seed=number)
+                   for number in range(3))
+    (corpus / "notes.txt").write_text("Not a contract.", encoding="utf-8")
+    missing = str(tmp_path / "missing.pdf")
+    output = tmp_path / "results.jsonl"
+    metrics = tmp_path / "metrics.prom"
+
+    exit_code = batch.main([str(corpus), missing, "--workers", "1", "--concurrency", "2", "--no-cache",
+                            "--output", str(output), "--metrics", str(metrics)])
+
+    summary = json.loads(capsys.readouterr().out)
+    assert exit_code == 1
+    assert (summary["total"], summary["succeeded"], summary["failed"]) == (4, 3, 1)
+    assert summary["failures"] == [{"pdf_file_path": missing, "error_message": f"PDF file not found: {missing}"}]
+    assert summary["prompt_sizes"][EXTRACTION_PROMPT.name]["calls"] >= 3
+    results = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert sorted(result["pdf_file_path"] for result in results if result["status"] == "success") == paths
+    assert all(result["structured_data"] for result in results if result["status"] == "success")
+    assert "stage_duration_seconds" in metrics.read_text(encoding="utf-8")
+
+
+def test_report_counts_results_and_throughput():
+    report = batch.BatchReport()
+    report.record({"status": "success", "pdf_file_path": "a.pdf"})
+    report.record({"status": "error", "pdf_file_path": "b.pdf", "error_message": "boom"})
+
+    summary = report.as_dict()
+    assert (summary["total"], summary["succeeded"], summary["failed"]) == (2, 1, 1)
+    assert summary["failures"] == [{"pdf_file_path": "b.pdf", "error_message": "boom"}]
+    assert summary["contracts_per_second"] > 0
@@ -0,0 +1,51 @@
+from legal_contract_analyzer.shared_libraries.clause_index import build_match_query
+from legal_contract_analyzer.tools import tools
+
+CONVENIENCE = (
+    "1. Term. This Agreement runs for two years.\n\n"
+    "2. Termination. Either party may terminate this Agreement for convenience upon 30 days notice.\n\n"
+    "3. Fees. Client pays $10,000 USD monthly.\n"
+)
+CAUSE = (
+    "1. Term. This Agreement runs for one year.\n\n"
+    "2. Termination. Either party may terminate for cause if the other party fails to cure a breach.\n"
+)
+
+
+def _process(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    assert tools.process_contract_document(str(path))["status"] == "success"
+    return str(path)
+
+
+def test_search_finds_clauses_across_processed_contracts(tmp_path):
+    convenience = _process(tmp_path, "convenience.txt", CONVENIENCE)
+    cause = _process(tmp_path, "cause.txt", CAUSE)
+
+    result = tools.search_contract_clauses('terminate "for convenience"')
+    assert result["status"] == "success"
+    assert result["indexed_documents"] == 2
+    assert [(match["pdf_file_path"], match["clause_number"]) for match in result["matches"]] == [(convenience, 2)]
+    assert "[for convenience]" in result["matches"][0]["snippet"]
+
+    terminations = tools.search_contract_clauses("terminating", match_mode="any")["matches"]
+    assert {match["pdf_file_path"] for match in terminations} == {convenience, cause} # Porter stemming
+    assert tools.search_contract_clauses("convenience cure", match_mode="all")["matches"] == []
+    assert tools.search_contract_clauses("for convenience upon", match_mode="phrase")["matches"][0]["pdf_file_path"] \
+        == convenience
+
+
+def test_reprocessing_a_changed_file_replaces_its_clauses(tmp_path):
+    path = _process(tmp_path, "msa.txt", CONVENIENCE)
+    _process(tmp_path, "msa.txt", CAUSE)
+
+    assert tools.search_contract_clauses('"for convenience"')["matches"] == []
+    assert tools.search_contract_clauses("cure")["matches"][0]["pdf_file_path"] == path
+    assert tools.search_contract_clauses("cure")["indexed_documents"] == 1
+
+
+def test_fts_operators_in_queries_are_searched_as_text():
+    assert build_match_query('fees OR NEAR(x) "late fee"') == '"fees" AND "OR" AND "NEAR" AND "x" AND "late fee"'
+    assert tools.search_contract_clauses('"unbalanced')["status"] == "success"
+    assert tools.search_contract_clauses("anything", match_mode="fuzzy")["status"] == "error"
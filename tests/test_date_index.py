@@ -0,0 +1,77 @@
+import datetime
+
+from legal_contract_analyzer.shared_libraries.date_index import get_date_index
+from legal_contract_analyzer.tools import tools
+
+
+def _index_contracts(expirations):
+    date_index = get_date_index()
+    for contract_id, expiration_date in expirations.items():
+        date_index.add(contract_id, {"effective_date": "2024-01-01", "expiration_date": expiration_date})
+
+
+def test_processed_contracts_are_found_by_date_range(tmp_path):
+    path = tmp_path / "contract.txt"
+    path.write_text("1. Term. Effective 2024-01-01 and expiring 2025-12-31.\n", encoding="utf-8")
+    assert tools.process_contract_document(str(path))["status"] == "success"
+
+    result = tools.find_contracts_by_date(start_date="2025-12-01", end_date="2025-12-31")
+
+    assert result["status"] == "success"
+    assert result["total_matches"] == 1
+    assert result["contracts"] == [
+        {"contract_id": str(path), "effective_date": "2024-01-01", "expiration_date": "2025-12-31"}
+    ]
+    assert tools.find_contracts_by_date(end_date="2025-12-30")["total_matches"] == 0
+
+
+def test_within_days_looks_forward_and_back_from_today():
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    _index_contracts({
+        "soon.pdf": (today + datetime.timedelta(days=30)).isoformat(),
+        "later.pdf": (today + datetime.timedelta(days=200)).isoformat(),
+        "lapsed.pdf": (today - datetime.timedelta(days=10)).isoformat(),
+    })
+
+    ahead = tools.find_contracts_by_date(within_days=90)
+    behind = tools.find_contracts_by_date(within_days=-30)
+
+    assert [contract["contract_id"] for contract in ahead["contracts"]] == ["soon.pdf"]
+    assert ahead["start_date"] == today.isoformat()
+    assert [contract["contract_id"] for contract in behind["contracts"]] == ["lapsed.pdf"]
+    assert behind["end_date"] == today.isoformat()
+    assert ahead["indexed_contracts"] == 3
+
+
+def test_results_are_earliest_first_and_capped():
+    _index_contracts({f"contract-{day}.pdf": f"2027-03-{day:02d}" for day in (20, 5, 12)})
+
+    result = tools.find_contracts_by_date(start_date="2027-03-01", end_date="2027-03-31", max_results=2)
+
+    assert result["total_matches"] == 3
+    assert [contract["expiration_date"] for contract in result["contracts"]] == ["2027-03-05", "2027-03-12"]
+    assert tools.find_contracts_by_date("effective_date", end_date="2024-01-01")["total_matches"] == 3
+
+
+def test_timestamps_are_dated_in_the_requested_timezone():
+    _index_contracts({"late.pdf": "2027-06-30"})
+
+    # 23:30 UTC on June 30 is already July 1 in Tokyo.
+    utc = tools.find_contracts_by_date(start_date="2027-06-30T23:30:00Z", end_date="2027-06-30")
+    tokyo = tools.find_contracts_by_date(start_date="2027-06-30T23:30:00Z", end_date="2027-07-31",
+                                         timezone="Asia/Tokyo")
+
+    assert utc["total_matches"] == 1
+    assert tokyo["start_date"] == "2027-07-01"
+    assert tokyo["total_matches"] == 0
+
+
+def test_invalid_queries_return_errors(monkeypatch):
+    from legal_contract_analyzer.config import settings
+
+    assert "date_field" in tools.find_contracts_by_date("signature_date", within_days=30)["error_message"]
+    assert "timezone" in tools.find_contracts_by_date(within_days=30, timezone="Mars/Olympus")["error_message"]
+    assert "Not a date" in tools.find_contracts_by_date(start_date="31/12/2026")["error_message"]
+    assert tools.find_contracts_by_date()["status"] == "error"
+    monkeypatch.setattr(settings.date_index, "enabled", False)
+    assert tools.find_contracts_by_date(within_days=30)["error_message"] == "The date index is disabled."
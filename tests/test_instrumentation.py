@@ -0,0 +1,103 @@
+import pytest
+
+from legal_contract_analyzer.shared_libraries import instrumentation
+from legal_contract_analyzer.shared_libraries.instrumentation import (
+    METRICS,
+    STAGE_DURATION,
+    MetricsRegistry,
+    count,
+    recent_traces,
+    set_enabled,
+    span,
+    timed_iter,
+    trace,
+)
+
+
+@pytest.fixture(autouse=True)
+def enabled_and_empty():
+    previous = set_enabled(True)
+    METRICS.reset()
+    yield
+    METRICS.reset()
+    set_enabled(previous)
+
+
+def test_spans_nest_inside_the_request_trace():
+    with trace("process_contract_document") as request:
+        with span("file_read", pages=2):
+            pass
+        with span("model_call", task="extraction"):
+            with pytest.raises(ValueError):
+                with span("response_parse"):
+                    raise ValueError("bad json")
+        pages = list(timed_iter("chunking", iter(range(3))))
+
+    recorded = recent_traces(1)[0]
+    assert recorded["trace_id"] == request.trace_id
+    parents = {record["name"]: record["parent"] for record in recorded["spans"]}
+    assert parents == {"file_read": "process_contract_document", "model_call": "process_contract_document",
+                       "response_parse": "model_call", "chunking": "process_contract_document",
+                       "process_contract_document": None}
+    attributes = {record["name"]: record.get("attributes") for record in recorded["spans"]}
+    assert attributes["file_read"] == {"pages": 2}
+    assert attributes["chunking"] == {"items": 3} and pages == [0, 1, 2]
+    assert METRICS.counter_value("stage_errors_total", stage="response_parse") == 1
+    assert METRICS.summary()["stages"]["model_call"]["count"] == 1
+
+
+def test_a_tool_called_from_another_tool_joins_its_trace():
+    with trace("analyze_contract"):
+        with trace("process_contract_document"):
+            pass
+
+    recorded = recent_traces(1)[0]
+    assert recorded["name"] == "analyze_contract"
+    assert [record["name"] for record in recorded["spans"]] == ["process_contract_document", "analyze_contract"]
+
+
+def test_counters_add_up_per_label_set():
+    count("llm_calls_total", task="extraction")
+    count("llm_calls_total", task="extraction")
+    count("llm_input_tokens_total", 120, task="breach_detection")
+    count("cache_requests_total", cache="result", outcome="hit")
+    count("cache_requests_total", cache="result", outcome="miss")
+
+    assert METRICS.counter_value("llm_calls_total", task="extraction") == 2
+    assert METRICS.counter_value("llm_calls_total", task="breach_detection") == 0
+    assert METRICS.summary()["counters"]["llm_input_tokens_total"] == {"task=breach_detection": 120}
+    assert METRICS.cache_hit_ratios() == {"result": 0.5}
+
+
+def test_disabled_instrumentation_records_nothing():
+    set_enabled(False)
+    with trace("process_contract_document") as request:
+        with span("file_read"):
+            count("llm_calls_total", task="extraction")
+
+    assert request is instrumentation._NOOP
+    assert METRICS.summary()["stages"] == {} and METRICS.summary()["counters"] == {}
+
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry([0.1, 1.0])
+    registry.inc("llm_calls_total", task="extraction")
+    registry.inc("cache_requests_total", cache="result", outcome="hit")
+    registry.observe(STAGE_DURATION, 0.05, stage="file_read")
+    registry.observe(STAGE_DURATION, 0.5, stage="file_read")
+    registry.observe(STAGE_DURATION, 5.0, stage="file_read")
+    registry.inc("tool_errors_total", tool='say "hi"\n')
+
+    lines = registry.to_prometheus().splitlines()
+    assert "# TYPE contract_analyzer_llm_calls_total counter" in lines
+    assert 'contract_analyzer_llm_calls_total{task="extraction"} 1' in lines
+    assert 'contract_analyzer_tool_errors_total{tool="say \\"hi\\"\\n"} 1' in lines
+    assert "# TYPE contract_analyzer_stage_duration_seconds histogram" in lines
+    assert [line for line in lines if line.startswith("contract_analyzer_stage_duration_seconds")] == [
+        'contract_analyzer_stage_duration_seconds_bucket{stage="file_read",le="0.1"} 1',
+        'contract_analyzer_stage_duration_seconds_bucket{stage="file_read",le="1"} 2',
+        'contract_analyzer_stage_duration_seconds_bucket{stage="file_read",le="+Inf"} 3',
+        'contract_analyzer_stage_duration_seconds_sum{stage="file_read"} 5.550000',
+        'contract_analyzer_stage_duration_seconds_count{stage="file_read"} 3',
+    ]
+    assert 'contract_analyzer_cache_hit_ratio{cache="result"} 1.000000' in lines
@@ -0,0 +1,148 @@
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from legal_contract_analyzer.shared_libraries.job_queue import (
+    DONE,
+    FAILED,
+    PRIORITY_INTERACTIVE,
+    QUEUED,
+    RUNNING,
+    JobQueue,
+    LeaseLostError,
+    QueueFullError,
+)
+from legal_contract_analyzer.tools import jobs
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"), max_queued_jobs=3, max_attempts=3, lease_seconds=0.3,
+                    poll_interval_seconds=0.01)
+
+
+@pytest.fixture
+def dead_worker():
+    """A worker id on this host whose process has exited."""
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return f"{socket.gethostname()}:{process.pid}:1"
+
+
+@pytest.fixture
+def fake_stages(monkeypatch):
+    """Replaces the tools behind the stages; `delays` holds seconds to sleep per stage."""
+    delays = {}
+    calls = []
+
+    def run_stage(stage, job, results):
+        calls.append(stage)
+        time.sleep(delays.get(stage, 0.0))
+        return {"status": "success", "stage": stage}
+
+    monkeypatch.setattr(jobs, "_run_stage", run_stage)
+    return delays, calls
+
+
+def test_interactive_jobs_are_claimed_first_and_skip_backpressure(queue):
+    bulk = queue.submit_many(["a.pdf", "b.pdf", "c.pdf"], wait=False)
+    with pytest.raises(QueueFullError):
+        queue.submit("d.pdf")
+    interactive = queue.submit("urgent.pdf", priority=PRIORITY_INTERACTIVE)
+
+    assert queue.claim("w").job_id == interactive
+    assert queue.claim("w").job_id == bulk[0]
+    assert queue.depth() == 2
+
+
+def test_bulk_submission_waits_for_room(queue):
+    queue.submit_many(["a.pdf", "b.pdf", "c.pdf"], wait=False)
+    threading.Timer(0.1, lambda: queue.claim("w")).start()
+    assert queue.submit("d.pdf", wait=True, timeout=5)
+    with pytest.raises(QueueFullError):
+        queue.submit("e.pdf", wait=True, timeout=0.05)
+
+
+def test_dead_worker_job_resumes_after_last_finished_stage(queue, dead_worker, fake_stages):
+    _, calls = fake_stages
+    job_id = queue.submit("a.pdf")
+    job = queue.claim(dead_worker)
+    queue.finish_stage(job, dead_worker, "process", {"status": "success"})
+
+    assert queue.recover() == 1
+    job = queue.claim("w")
+    assert job.remaining_stages == ("breach", "penalty")
+    assert jobs.run_job(queue, job, "w") == DONE
+    assert calls == ["breach", "penalty"]
+    assert set(queue.get(job_id)["results"]) == {"process", "breach", "penalty"}
+    assert [job["job_id"] for _, job in queue.completed_since(0)] == [job_id]
+
+
+def test_job_that_keeps_killing_its_worker_fails_after_max_attempts(queue, dead_worker):
+    job_id = queue.submit("poison.pdf")
+    for _ in range(queue.max_attempts):
+        assert queue.claim(dead_worker).job_id == job_id
+        assert queue.recover() == 1
+
+    job = queue.get(job_id)
+    assert job["state"] == FAILED
+    assert job["attempts"] == queue.max_attempts
+    assert "exited" in job["error_message"]
+    assert queue.claim("w") is None
+
+
+def test_expired_lease_of_hung_worker_is_taken_back(queue):
+    job_id = queue.submit("a.pdf")
+    job = queue.claim("other-host:1:1")
+    time.sleep(queue.lease_seconds + 0.05)
+
+    assert queue.recover() == 1
+    assert queue.get(job_id)["state"] == QUEUED
+    with pytest.raises(LeaseLostError):
+        queue.finish_stage(job, "other-host:1:1", "process", {"status": "success"})
+
+
+def test_heartbeat_keeps_slow_stage_leased(queue, fake_stages):
+    delays, calls = fake_stages
+    delays["process"] = queue.lease_seconds * 4
+    job_id = queue.submit("long.pdf")
+    job = queue.claim("w")
+    stop = threading.Event()
+
+    def recover_repeatedly():
+        while not stop.is_set():
+            queue.recover()
+            time.sleep(0.02)
+
+    recovering = threading.Thread(target=recover_repeatedly)
+    recovering.start()
+    try:
+        assert jobs.run_job(queue, job, "w") == DONE
+    finally:
+        stop.set()
+        recovering.join()
+    assert calls == ["process", "breach", "penalty"]
+    assert queue.get(job_id)["attempts"] == 1
+
+
+def test_failing_stage_is_retried_then_failed(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "_run_stage", lambda stage, job, results: {"status": "error", "error_message": "boom"})
+    job_id = queue.submit("bad.pdf")
+    states = [jobs.run_job(queue, queue.claim("w"), "w") for _ in range(queue.max_attempts)]
+
+    assert states == [QUEUED, QUEUED, FAILED]
+    assert queue.get(job_id)["error_message"] == "boom"
+    assert queue.retry_failed() == 1
+
+
+def test_stop_releases_job_without_using_an_attempt(queue, fake_stages):
+    job_id = queue.submit("a.pdf")
+    stop = threading.Event()
+    stop.set()
+    assert jobs.run_job(queue, queue.claim("w"), "w", stop) == QUEUED
+    assert queue.get(job_id)["attempts"] == 0
+    assert queue.counts()[RUNNING] == 0
@@ -0,0 +1,77 @@
+import pytest
+
+from legal_contract_analyzer.shared_libraries.json_stream import (
+    ResponseSchemaError, StreamingJSONParser, parse_json_response,
+)
+
+SCHEMA = {
+    "type": "object",
+    "required": ["parties", "status"],
+    "additionalProperties": False,
+    "properties": {
+        "parties": {"type": "array", "items": {"type": "string"}},
+        "status": {"type": "string", "enum": ["Met", "Breached"]},
+        "amount": {"type": ["number", "null"]},
+    },
+}
+
+
+def _parse_in_pieces(text, schema=SCHEMA, size=3):
+    parser = StreamingJSONParser(schema)
+    for start in range(0, len(text), size):
+        parser.feed(text[start:start + size])
+    return parser.close(), parser
+
+
+def test_pieces_of_any_size_give_the_same_value():
+    text = '{"parties": ["Party A Inc.", "Party B \\"LLC\\""], "status": "Met", "amount": -1.5e3}'
+    expected = {"parties": ["Party A Inc.", 'Party B "LLC"'], "status": "Met", "amount": -1500.0}
+
+    for size in (1, 2, 7, len(text)):
+        value, parser = _parse_in_pieces(text, size=size)
+        assert value == expected
+        assert parser.repairs == {}
+        assert parser.first_field_seconds is not None
+
+
+def test_code_fences_comments_and_trailing_commas_are_repaired():
+    text = (
+        "```json\n"
+        "{\n"
+        '  "parties": ["Party A Inc.", "Party B LLC",], // Both signatories\n'
+        '  /* Compliance */ "status": "Breached",\n'
+        "}\n"
+        "```\n"
+    )
+
+    value, parser = _parse_in_pieces(text)
+
+    assert value == {"parties": ["Party A Inc.", "Party B LLC"], "status": "Breached"}
+    assert parser.repairs == {"code_fence": 2, "comment": 2, "trailing_comma": 2}
+    assert parse_json_response(text, SCHEMA) == value
+
+
+@pytest.mark.parametrize("text, message, path", [
+    ('{"parties": "Party A Inc."', "Expected array, got string", "$.parties"),
+    ('{"parties": [1]', "Expected string, got number", "$.parties[0]"),
+    ('{"parties": [], "status": "Pending"', "'Pending' is not one of", "$.status"),
+    ('{"parties": [], "signed": true', "Unexpected field 'signed'", "$"),
+    ('{"parties": []}', "Missing required field(s) status", "$"),
+])
+def test_schema_errors_stop_the_stream_where_they_happen(text, message, path):
+    parser = StreamingJSONParser(SCHEMA)
+
+    with pytest.raises(ResponseSchemaError) as error:
+        parser.feed(text)
+
+    assert message in str(error.value)
+    assert error.value.path == path
+
+
+def test_incomplete_or_invalid_responses_fail_on_close():
+    for text, message in (("", "Empty response"), ('{"parties": [', "Response ended early"),
+                          ('{"parties": ["Party A', "Unterminated string")):
+        with pytest.raises(ResponseSchemaError, match=message):
+            parse_json_response(text, SCHEMA)
+    with pytest.raises(ResponseSchemaError, match="Unexpected text after the JSON value"):
+        parse_json_response('{"status": "Met"} {"status": "Met"}')
@@ -0,0 +1,154 @@
+import threading
+import time
+
+import pytest
+
+from legal_contract_analyzer.shared_libraries.fake_llm_server import FakeLLMServer
+from legal_contract_analyzer.shared_libraries.llm_client import LLMClient, LLMRequestError, SingleFlight, TokenBucket
+
+
+def _run_concurrently(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_fake_server_answers_generate_content():
+    with FakeLLMServer(responder=lambda prompt, model: f"{model}:{prompt.upper()}") as server:
+        client = LLMClient(server.url, backoff_base_seconds=0.01)
+        try:
+            assert client.generate("hello", "gemini-test") == "gemini-test:HELLO"
+            assert client.generate("again", "gemini-test") == "gemini-test:AGAIN"
+        finally:
+            client.close()
+        assert server.request_count == 2
+        assert server.prompts == ["hello", "again"]
+        assert client.stats()["connections_created"] == 1 # Keep-alive
+
+
+def test_fake_server_unknown_path_is_not_retried():
+    with FakeLLMServer() as server:
+        client = LLMClient(server.url, path_template="/v1beta/models/{model}:countTokens", max_retries=3)
+        try:
+            with pytest.raises(LLMRequestError) as error:
+                client.generate("hello", "gemini-test")
+        finally:
+            client.close()
+        assert error.value.status == 404
+        assert client.stats()["upstream_requests"] == 1
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+    results = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    def call():
+        results.append(flight.do("key", work))
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while flight.coalesced < 7 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ["result"] * 8
+    assert flight.coalesced == 7
+    assert flight.do("key", lambda: "next") == "next" # A finished flight is not reused
+
+
+def test_single_flight_shares_the_error():
+    flight = SingleFlight()
+    errors = []
+    started = threading.Event()
+
+    def work():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    def call():
+        try:
+            flight.do("key", work)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    _run_concurrently(3, call)
+    leader.join()
+    assert len(errors) == 4
+
+
+def test_identical_concurrent_requests_reach_the_server_once():
+    with FakeLLMServer(latency_seconds=0.2) as server:
+        client = LLMClient(server.url)
+        try:
+            _run_concurrently(6, lambda: client.generate("same prompt", "gemini-test"))
+        finally:
+            client.close()
+        assert server.request_count == 1
+        assert client.stats()["coalesced_requests"] == 5
+
+
+def test_token_bucket_allows_burst_then_refills_at_rate():
+    bucket = TokenBucket(rate_per_minute=600, capacity=5) # 10 tokens a second
+    started = time.monotonic()
+    for _ in range(5):
+        assert bucket.acquire(timeout=0)
+    assert time.monotonic() - started < 0.05
+    assert not bucket.acquire(timeout=0)
+
+    started = time.monotonic()
+    assert bucket.acquire(2)
+    assert 0.15 <= time.monotonic() - started < 1.0
+
+
+def test_token_bucket_timeout_and_disabled_limit():
+    bucket = TokenBucket(rate_per_minute=6, capacity=1)
+    assert bucket.acquire()
+    started = time.monotonic()
+    assert not bucket.acquire(timeout=0.1)
+    assert time.monotonic() - started >= 0.1
+    assert all(TokenBucket(rate_per_minute=0).acquire() for _ in range(1000))
+
+
+def test_retry_after_header_sets_the_minimum_backoff():
+    with FakeLLMServer(throttle_rate=1.0, retry_after_seconds=0.2) as server:
+        client = LLMClient(server.url, max_retries=2, backoff_base_seconds=0.001, backoff_max_seconds=0.001)
+        started = time.monotonic()
+        try:
+            with pytest.raises(LLMRequestError) as error:
+                client.generate("hello", "gemini-test")
+        finally:
+            client.close()
+        assert error.value.status == 429
+        assert time.monotonic() - started >= 0.4
+        assert server.throttled_count == 3
+        assert client.stats()["retries"] == 2
+
+
+def test_transient_failures_are_retried_until_success():
+    with FakeLLMServer(failure_rate=0.5, seed=7) as server:
+        client = LLMClient(server.url, max_retries=10, backoff_base_seconds=0.001)
+        try:
+            answers = [client.generate(f"prompt {number}", "gemini-test") for number in range(10)]
+        finally:
+            client.close()
+        assert len(answers) == 10
+        assert server.failed_count > 0
+        assert client.stats()["retries"] == server.failed_count
@@ -0,0 +1,90 @@
+import pytest
+
+from legal_contract_analyzer.prompts import EXTRACTION_OUTPUT_SCHEMA
+from legal_contract_analyzer.shared_libraries.instrumentation import METRICS, STAGE_DURATION
+from legal_contract_analyzer.shared_libraries.llm_backends import EXTRACTION_TASK
+from legal_contract_analyzer.shared_libraries.model_router import (
+    ROUTE_STATS, escalation_reason, route_stage, stage_models,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    METRICS.reset()
+    ROUTE_STATS.reset()
+    yield
+    METRICS.reset()
+    ROUTE_STATS.reset()
+
+
+def test_summary_keeps_route_latencies_out_of_stages():
+    fast, strong = stage_models(EXTRACTION_TASK)
+    METRICS.observe(STAGE_DURATION, 0.5, stage=EXTRACTION_TASK)
+    METRICS.observe("model_route_seconds", 0.1, task=EXTRACTION_TASK, route=fast)
+    route_stage(EXTRACTION_TASK, lambda model: {"structured_data": {}, "data_quality_assessment": ""})
+
+    summary = METRICS.summary()
+
+    assert summary["stages"] == {EXTRACTION_TASK: {"count": 1, "total_seconds": 0.5, "mean_seconds": 0.5}}
+    routes = summary["histograms"]["model_route_seconds"]
+    assert sorted(routes) == [f"route={fast},task={EXTRACTION_TASK}", f"route={fast}>{strong},task={EXTRACTION_TASK}"]
+    assert routes[f"route={fast},task={EXTRACTION_TASK}"]["total_seconds"] == 0.1
+
+
+def _extraction(confidence: str, filled: bool = True) -> dict:
+    fields = EXTRACTION_OUTPUT_SCHEMA["properties"]["structured_data"]["properties"] if filled else ()
+    structured_data = {name: "Stated in the contract" for name in fields}
+    return {"structured_data": structured_data, "data_quality_assessment": confidence}
+
+
+def _routed(results: dict):
+    calls = []
+
+    def run(model):
+        calls.append(model)
+        return results[model]
+
+    return calls, run
+
+
+def test_confident_complete_results_stay_on_the_fast_model():
+    fast, strong = stage_models(EXTRACTION_TASK)
+    calls, run = _routed({fast: _extraction("High confidence in all fields.")})
+
+    assert route_stage(EXTRACTION_TASK, run) is not None
+    assert calls == [fast]
+    assert METRICS.counter_value("llm_escalations_total", task=EXTRACTION_TASK, reason="confidence") == 0
+    assert ROUTE_STATS.summary()[EXTRACTION_TASK]["escalation_rate"] == 0.0
+
+
+@pytest.mark.parametrize("fast_result, reason", [
+    (_extraction("Confidence: 0.2, the scan is illegible."), "confidence"),
+    (_extraction("High confidence.", filled=False), "completeness"),
+])
+def test_weak_results_escalate_to_the_strong_model(fast_result, reason):
+    fast, strong = stage_models(EXTRACTION_TASK)
+    strong_result = _extraction("Confidence: 0.95")
+    calls, run = _routed({fast: fast_result, strong: strong_result})
+
+    assert escalation_reason(EXTRACTION_TASK, fast_result) == reason
+    assert route_stage(EXTRACTION_TASK, run) is strong_result
+    assert calls == [fast, strong]
+    assert METRICS.counter_value("llm_escalations_total", task=EXTRACTION_TASK, reason=reason) == 1
+    stats = ROUTE_STATS.summary()[EXTRACTION_TASK]
+    assert stats["escalations"] == {reason: 1}
+    assert stats["escalation_rate"] == 1.0
+    assert stats["routes"][f"{fast}>{strong}"]["count"] == 1
+
+
+def test_disabled_routing_uses_only_the_default_model(monkeypatch):
+    from legal_contract_analyzer.config import settings
+
+    monkeypatch.setattr(settings.model_routing, "enabled", False)
+    default = settings.agent_settings.model
+    calls, run = _routed({default: _extraction("", filled=False)})
+
+    route_stage(EXTRACTION_TASK, run)
+
+    assert stage_models(EXTRACTION_TASK) == [default]
+    assert calls == [default]
+    assert ROUTE_STATS.summary()[EXTRACTION_TASK]["escalation_rate"] == 0.0
@@ -0,0 +1,140 @@
+import random
+
+import numpy as np
+import pytest
+
+from legal_contract_analyzer.prompts import EXTRACTION_PROMPT, PROMPT_STATS
+from legal_contract_analyzer.shared_libraries.near_duplicates import MinHasher, NearDuplicateIndex, lsh_bands
+from legal_contract_analyzer.shared_libraries.pdf_stream import PageSpool
+from legal_contract_analyzer.tools import tools
+
+_WORDS = ("client", "provider", "shall", "pay", "fee", "notice", "term", "breach", "days", "written")
+
+
+def _clause(number, rng, words=40):
+    return f"{number}. " + " ".join(rng.choice(_WORDS) for _ in range(words)) + ".\n\n"
+
+
+def _template(rng, clauses=30):
+    return [_clause(number, rng) for number in range(1, clauses + 1)]
+
+
+def test_signature_of_pages_matches_whole_text_signature():
+    rng = random.Random(0)
+    text = "".join(_template(rng))
+    cuts = sorted(rng.sample(range(len(text)), 40)) # Mid-word cuts included
+    pages = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+    hasher = MinHasher()
+
+    assert np.array_equal(hasher.signature_of_pages(pages), hasher.signature(text))
+    assert np.array_equal(hasher.signature_of_pages(["two", " words"]), hasher.signature("two words"))
+    assert hasher.signature_of_pages(["", " \n"]) is None
+
+
+def test_only_near_duplicates_are_held_in_full(tmp_path, monkeypatch):
+    rng = random.Random(1)
+    clauses = _template(rng)
+    original = tmp_path / "original.txt"
+    original.write_text("".join(clauses), encoding="utf-8")
+    amended = tmp_path / "amended.txt"
+    amended.write_text("".join(clauses[:-1] + [_clause(30, rng)]), encoding="utf-8")
+    unrelated = tmp_path / "unrelated.txt"
+    unrelated.write_text("".join(_template(random.Random(2))), encoding="utf-8")
+
+    full_reads = []
+    read_in_full = PageSpool.text
+    monkeypatch.setattr(PageSpool, "text", lambda pages: full_reads.append(pages) or read_in_full(pages))
+
+    assert "near_duplicate" not in tools.process_contract_document(str(original))
+    assert "near_duplicate" not in tools.process_contract_document(str(unrelated))
+    assert full_reads == []
+
+    result = tools.process_contract_document(str(amended))
+    assert len(full_reads) == 1
+    assert result["near_duplicate"]["matched_pdf_file_path"] == str(original)
+    assert result["near_duplicate"]["reextracted_clauses"] == 1
+    assert result["extracted_text"] == amended.read_text(encoding="utf-8")
+
+
+def test_savings_estimate_does_not_count_as_prompts_sent(tmp_path):
+    rng = random.Random(4)
+    clauses = _template(rng)
+    original = tmp_path / "original.txt"
+    original.write_text("".join(clauses), encoding="utf-8")
+    amended = tmp_path / "amended.txt"
+    amended.write_text("".join(clauses[:-1] + [_clause(30, rng)]), encoding="utf-8")
+    tools.process_contract_document(str(original))
+    PROMPT_STATS.reset()
+
+    result = tools.process_contract_document(str(amended))
+    assert "model_spend_avoided" in result["near_duplicate"]
+    assert PROMPT_STATS.report()[EXTRACTION_PROMPT.name]["calls"] == 1
+
+
+def test_removed_template_clause_prevents_reuse(tmp_path):
+    rng = random.Random(3)
+    clauses = _template(rng, clauses=40)
+    original = tmp_path / "original.txt"
+    original.write_text("".join(clauses), encoding="utf-8")
+    shortened = tmp_path / "shortened.txt"
+    shortened.write_text("".join(clauses[:10] + clauses[11:]), encoding="utf-8")
+    tools.process_contract_document(str(original))
+
+    match = tools.get_near_duplicate_index().find(
+        shortened.read_text(encoding="utf-8"), tools.route_key(tools.EXTRACTION_TASK), tools.EXTRACTION_PROMPT_VERSION
+    )
+    assert match is not None and match.removed_clauses == 1 and not match.changed_clauses
+    result = tools.process_contract_document(str(shortened))
+    assert result["status"] == "success"
+    assert "near_duplicate" not in result
+
+
+def test_moved_and_rewritten_clauses_are_not_removed():
+    from legal_contract_analyzer.shared_libraries.near_duplicates import _removed_clauses
+
+    assert _removed_clauses(["a", "b", "c", "d"], ["a", "c", "b", "d"]) == 0
+    assert _removed_clauses(["a", "b", "c"], ["a", "B", "c"]) == 0
+    assert _removed_clauses(["a", "b", "c"], ["a", "c", "x"]) == 1
+
+
+def _distinct_words(count, changed_every=0):
+    """Words that are all distinct, with every `changed_every`-th one replaced."""
+    return " ".join(
+        f"changed{number}" if changed_every and number % changed_every == 0 else f"word{number}"
+        for number in range(count)
+    )
+
+
+def _jaccard(hasher, first, second):
+    a, b = set(hasher.shingles(first).tolist()), set(hasher.shingles(second).tolist())
+    return len(a & b) / len(a | b)
+
+
+def test_signature_similarity_estimates_jaccard():
+    hasher = MinHasher(num_permutations=256)
+    base = _distinct_words(3000)
+    for changed_every in (200, 40, 12):
+        other = _distinct_words(3000, changed_every)
+        estimate = float((hasher.signature(base) == hasher.signature(other)).mean())
+        assert abs(estimate - _jaccard(hasher, base, other)) < 0.08
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.8, 0.9])
+def test_lsh_bands_midpoint_is_at_or_below_threshold(threshold):
+    bands, rows = lsh_bands(threshold, 128)
+    assert bands * rows == 128
+    assert (1.0 / bands) ** (1.0 / rows) <= threshold
+
+
+def test_index_matches_only_at_or_above_threshold(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "index.sqlite3"), similarity_threshold=0.8)
+    base = _distinct_words(3000)
+    index.add("base.pdf", base, {"structured_data": {"governing_law": "X"}}, "model", "1")
+    close = _distinct_words(3000, changed_every=300) # Jaccard about 0.97
+    far = _distinct_words(3000, changed_every=10) # Jaccard about 0.3
+
+    match = index.find(close, "model", "1")
+    assert match is not None and match.similarity >= 0.8
+    assert index.find(far, "model", "1") is None
+    assert index.find(close, "other-model", "1") is None
+    assert index.find(close, "model", "2") is None
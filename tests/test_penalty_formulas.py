@@ -0,0 +1,35 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from legal_contract_analyzer.shared_libraries.penalty_formulas import FormulaError, compile_formula, evaluate_portfolio
+
+
+def test_division_by_zero_and_overflow_give_inf_without_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert compile_formula("1 / 0 + days_late")(days_late=1) == np.inf
+        assert np.isnan(compile_formula("0 / 0")())
+        assert compile_formula("10 ** 400")() == np.inf
+        assert compile_formula("1e308 * 10")() == np.inf
+        assert compile_formula("days_late ** 400")(days_late=10) == np.inf
+
+
+@pytest.mark.parametrize("source", ["(" * 5000 + "1" + ")" * 5000, "-" * 5000 + "days_late"])
+def test_deeply_nested_formula_is_a_formula_error(source):
+    with pytest.raises(FormulaError, match="nested too deeply"):
+        compile_formula(source)(days_late=1)
+
+
+def test_round_digits_must_be_a_whole_number_literal():
+    days_late = np.array([1.0, 2.0])
+    assert np.array_equal(compile_formula("round(days_late * 1.234, 2)")(days_late=days_late), [1.23, 2.47])
+    assert compile_formula("round(1234.5, -2)")() == 1200.0
+    for source in ("round(days_late, days_late)", "round(days_late, 1.5)"):
+        with pytest.raises(FormulaError, match="whole-number literal"):
+            compile_formula(source)
+
+    exposure, errors = evaluate_portfolio([{"formula": "round(days_late, days_late)", "variables": {}}],
+                                          {"days_late": days_late})
+    assert np.isnan(exposure).all() and "whole-number literal" in errors[0]
@@ -0,0 +1,54 @@
+import pytest
+
+from legal_contract_analyzer.shared_libraries.rule_engine import INSUFFICIENT_DATA, NOT_MET
+from legal_contract_analyzer.tools import pipeline
+
+CONTRACT = (
+    "1. Parties. This Agreement is made between Party A Inc. (Provider) and Party B LLC (Client).\n\n"
+    "2. Term. Effective 2024-01-01 and expiring 2026-12-31.\n\n"
+    "3. Fees. Client pays $10,000 USD monthly.\n"
+)
+
+
+@pytest.fixture
+def penalty_calls(monkeypatch):
+    """Records the breach report each penalty calculation is given."""
+    calls = []
+
+    def calculate_contract_penalties(extracted_contract_data, breach_report):
+        calls.append([dict(finding) for finding in breach_report])
+        return {"status": "success", "penalty_summary": {"penalty_summary": [], "call": len(calls)}}
+
+    monkeypatch.setattr(pipeline, "calculate_contract_penalties", calculate_contract_penalties)
+    return calls
+
+
+def _analyze(tmp_path, monkeypatch, escalated_status):
+    def resolve(extracted_contract_data, breach_report):
+        rule_id = breach_report[0]["rule_id"]
+        report = [dict(finding) for finding in breach_report]
+        report[0]["status"] = escalated_status
+        return report, [rule_id]
+
+    monkeypatch.setattr(pipeline, "_resolve_ambiguous_rules", resolve)
+    path = tmp_path / "contract.txt"
+    path.write_text(CONTRACT, encoding="utf-8")
+    return pipeline.analyze_contract(str(path))
+
+
+def test_speculative_penalties_are_kept_when_breaches_do_not_change(tmp_path, monkeypatch, penalty_calls):
+    result = _analyze(tmp_path, monkeypatch, INSUFFICIENT_DATA)
+
+    assert result["penalty_speculation"] == "accepted"
+    assert len(penalty_calls) == 1
+    assert result["penalty_summary"]["call"] == 1
+
+
+def test_speculative_penalties_are_discarded_when_a_rule_becomes_breached(tmp_path, monkeypatch, penalty_calls):
+    result = _analyze(tmp_path, monkeypatch, NOT_MET)
+
+    assert result["penalty_speculation"] == "recalculated"
+    assert len(penalty_calls) == 2
+    assert NOT_MET not in {finding["status"] for finding in penalty_calls[0]}
+    assert penalty_calls[1] == result["breach_report"]
+    assert result["penalty_summary"]["call"] == 2
@@ -0,0 +1,121 @@
+import asyncio
+import inspect
+
+from legal_contract_analyzer.shared_libraries.pdf_stream import PageSpool
+from legal_contract_analyzer.shared_libraries.result_cache import ResultCache
+from legal_contract_analyzer.tools import async_tools, tools
+
+CONTRACT = (
+    "1. Parties. This Agreement is made between Party A Inc. (Provider) and Party B LLC (Client).\n\n"
+    "2. Term. Effective 2024-01-01 and expiring 2026-12-31.\n\n"
+    "3. Fees. Client pays $10,000 USD monthly.\n"
+)
+
+
+def _contract(tmp_path, text=CONTRACT, name="contract.txt"):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_cache_write_failure_does_not_fail_processing(tmp_path, monkeypatch):
+    def put(self, key, value):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(ResultCache, "put", put)
+    path = _contract(tmp_path)
+
+    assert tools.process_contract_document(path)["status"] == "success"
+    assert asyncio.run(async_tools.process_contract_document(path))["status"] == "success"
+
+
+def test_extraction_asks_for_and_returns_every_field_the_rules_read(tmp_path):
+    from legal_contract_analyzer.config import settings
+    from legal_contract_analyzer.prompts import EXTRACTION_PROMPT
+    from legal_contract_analyzer.shared_libraries.rule_engine import load_rule_engine
+
+    rule_engine = load_rule_engine(settings.breach_rules.rules_file)
+    fields = {field for rule in rule_engine.rules for field in rule.fields}
+    fields |= {"renewal_terms", "termination_clauses", "penalty_clauses"}
+    result = tools.process_contract_document(_contract(tmp_path))
+
+    for field in fields:
+        assert f'"{field}"' in EXTRACTION_PROMPT.prefix
+        assert result["structured_data"].get(field), field
+    assert all(finding["status"] == "Met" for finding in rule_engine.evaluate(result["structured_data"]))
+
+
+def test_async_analyze_contract_matches_sync(tmp_path):
+    from legal_contract_analyzer.tools import pipeline
+
+    path = _contract(tmp_path)
+    expected = pipeline.analyze_contract(path)
+    result = asyncio.run(async_tools.analyze_contract(path))
+
+    assert result["status"] == "success"
+    for key in ("structured_data", "breach_report", "llm_escalated_rules", "penalty_summary", "penalty_speculation"):
+        assert result[key] == expected[key]
+
+
+def test_async_reanalyze_contract_document(tmp_path):
+    path = _contract(tmp_path)
+    assert asyncio.run(async_tools.reanalyze_contract_document(path, "msa"))["mode"] == "initial"
+    assert asyncio.run(async_tools.reanalyze_contract_document(path, "msa"))["mode"] == "unchanged"
+
+
+def test_agent_registers_one_variant_of_each_tool():
+    from legal_contract_analyzer import agent
+    from legal_contract_analyzer.config import settings
+
+    names = [tool.__name__ for tool in agent.root_agent.tools]
+    assert len(names) == len(set(names))
+    is_async = [asyncio.iscoroutinefunction(tool) for tool in agent.contract_tools]
+    assert all(is_async) if settings.async_tools.enabled else not any(is_async)
+
+
+def test_async_tools_run_the_streaming_sync_tools(tmp_path, monkeypatch):
+    path = _contract(tmp_path)
+    decodes = []
+    decode = tools.iter_pdf_pages
+    monkeypatch.setattr(tools, "iter_pdf_pages", lambda file_path: decodes.append(file_path) or decode(file_path))
+
+    result = asyncio.run(async_tools.process_contract_document(path, use_cache=False))
+
+    assert result["extracted_text"] == CONTRACT
+    assert decodes == [path]
+    assert inspect.signature(async_tools.process_contract_document) == inspect.signature(tools.process_contract_document)
+    assert async_tools.process_contract_document.__doc__ == tools.process_contract_document.__doc__
+
+
+def test_pdf_is_decoded_once_despite_escalation(tmp_path, monkeypatch):
+    path = _contract(tmp_path)
+    decodes = []
+    decode = tools.iter_pdf_pages
+    monkeypatch.setattr(tools, "iter_pdf_pages", lambda file_path: decodes.append(file_path) or decode(file_path))
+
+    def route_stage(task, run, judge=None):
+        run("fast") # Escalates
+        return run("strong")
+
+    monkeypatch.setattr(tools, "route_stage", route_stage)
+    result = tools.process_contract_document(path, use_cache=False)
+
+    assert decodes == [path]
+    assert result["extracted_text"] == CONTRACT
+    assert result["structured_data"]["financial_terms"]
+
+
+def test_page_spool_replays_a_partly_read_stream():
+    reads = []
+    expected = [f"{number}. Clause \udc80\n" for number in range(3)] # Lone surrogates survive the spill file
+
+    def pages():
+        for page in expected:
+            reads.append(page)
+            yield page
+
+    with PageSpool(pages()) as spool:
+        assert next(iter(spool)) == expected[0]
+        assert list(spool) == expected
+        assert spool.text() == "".join(expected)
+    assert reads == expected
@@ -0,0 +1,64 @@
+import pytest
+
+from legal_contract_analyzer.prompts import (
+    EXTRACTION_PROMPT,
+    PENALTY_PROMPT,
+    PROMPT_REGISTRY,
+    PROMPT_STATS,
+    PromptTemplate,
+    compact_json,
+    estimate_tokens,
+    get_prompt,
+    register_prompt,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    PROMPT_STATS.reset()
+    yield
+    PROMPT_STATS.reset()
+
+
+def test_contract_data_goes_after_a_fixed_prefix():
+    first = PENALTY_PROMPT.render(extracted_contract_data={"b": 1, "a": [1, 2]}, breach_report="none")
+    second = PENALTY_PROMPT.render(extracted_contract_data={"a": [1, 2], "b": 1}, breach_report="none")
+
+    assert first == second
+    assert first.startswith(PENALTY_PROMPT.prefix)
+    assert compact_json({"b": 1, "a": [1, 2]}) == '{"a":[1,2],"b":1}'
+    assert compact_json({"a": [1, 2], "b": 1}) in first
+    with pytest.raises(KeyError):
+        PENALTY_PROMPT.render(breach_report="none")
+
+
+def test_registry_looks_up_templates_by_tool_name():
+    assert get_prompt(EXTRACTION_PROMPT.name) is EXTRACTION_PROMPT
+    assert all(template.version for template in PROMPT_REGISTRY.values())
+    with pytest.raises(ValueError):
+        register_prompt(PromptTemplate(EXTRACTION_PROMPT.name, "1", "Instructions.", "{text}"))
+    with pytest.raises(ValueError):
+        PromptTemplate("formatted", "1", "Instructions.", "{amount:.2f}")
+
+
+def test_prompt_version_is_part_of_the_result_cache_key(tmp_path, monkeypatch):
+    from legal_contract_analyzer.tools import tools
+
+    path = tmp_path / "contract.txt"
+    path.write_text("1. Fees. Client pays $10,000 USD monthly.\n", encoding="utf-8")
+    key = tools._result_cache_key(str(path))
+    monkeypatch.setattr(tools, "EXTRACTION_PROMPT_VERSION", EXTRACTION_PROMPT.version + "-next")
+
+    assert tools._result_cache_key(str(path)) != key
+
+
+def test_renders_are_sized_in_prompt_stats_and_estimates_are_not():
+    text = "1. Fees. Client pays $10,000 USD monthly.\n"
+    prompt = EXTRACTION_PROMPT.render(chunk_note="", contract_text=text)
+    estimate = EXTRACTION_PROMPT.token_estimate(chunk_note="", contract_text=text)
+
+    report = PROMPT_STATS.report()[EXTRACTION_PROMPT.name]
+    assert report["calls"] == 1
+    assert report["prefix_tokens"] == EXTRACTION_PROMPT.prefix_tokens
+    assert 0 < report["cacheable_ratio"] < 1
+    assert abs(estimate - estimate_tokens(prompt)) <= 1
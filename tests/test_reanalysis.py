@@ -0,0 +1,55 @@
+from legal_contract_analyzer.tools.reanalysis import reanalyze_contract_document
+
+
+def _page(number):
+    return (f"{number}. Clause {number}. The Provider shall deliver item {number} "
+            f"within {number + 10} days of the order.\n\n")
+
+
+def _write(tmp_path, pages):
+    path = tmp_path / "msa.txt"
+    path.write_text("\f".join(pages), encoding="utf-8")
+    return str(path)
+
+
+def test_changed_pages_follow_clauses_not_page_positions(tmp_path):
+    pages = [_page(number) for number in range(1, 6)]
+    first = reanalyze_contract_document(_write(tmp_path, pages), "msa")
+    assert first["mode"] == "initial"
+    assert first["changed_pages"] == [1, 2, 3, 4, 5]
+
+    inserted = pages[:2] + ["2a. Inserted clause. Notices go to the registered address.\n\n"] + pages[2:]
+    result = reanalyze_contract_document(_write(tmp_path, inserted), "msa")
+    assert result["mode"] == "incremental"
+    assert result["changed_pages"] == [3]
+
+    deleted = inserted[:1] + inserted[2:]
+    assert reanalyze_contract_document(_write(tmp_path, deleted), "msa")["changed_pages"] == [2]
+
+
+def test_changed_pages_report_modified_clause(tmp_path):
+    pages = [_page(number) for number in range(1, 4)]
+    reanalyze_contract_document(_write(tmp_path, pages), "msa")
+    pages[1] = pages[1].replace("within 12 days", "within 20 days")
+    result = reanalyze_contract_document(_write(tmp_path, pages), "msa")
+    assert result["changed_pages"] == [2]
+
+
+def test_same_file_name_in_other_directories_is_another_contract(tmp_path):
+    first, second = tmp_path / "a", tmp_path / "b"
+    first.mkdir()
+    second.mkdir()
+    old = reanalyze_contract_document(_write(first, [_page(1), _page(2)]))
+    unrelated = reanalyze_contract_document(_write(second, [_page(3)]))
+
+    assert old["contract_id"] != unrelated["contract_id"]
+    assert unrelated["mode"] == "initial"
+
+
+def test_penalties_depend_on_every_formula_source_field():
+    from legal_contract_analyzer.shared_libraries.penalty_formulas import FORMULA_SOURCE_FIELDS, derive_formula_variables
+    from legal_contract_analyzer.tools.reanalysis import PENALTY_INPUT_FIELDS
+
+    for field in FORMULA_SOURCE_FIELDS:
+        assert field in PENALTY_INPUT_FIELDS
+        assert derive_formula_variables({field: "Client pays $10 monthly."}) == {"monthly_amount": 10.0}
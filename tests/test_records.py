@@ -0,0 +1,82 @@
+import pytest
+
+import datetime
+
+from legal_contract_analyzer.entities import BreachFinding, ContractRecord, Party, PenaltyItem
+
+STRUCTURED_DATA = {
+    "effective_date": "2024-01-01",
+    "expiration_date": "end of next year", # Unparseable; kept in extra
+    "parties": [{"name": "Party A Inc.", "role": "Provider", "address": "", "contact": ""}],
+    "financial_terms": "Client pays $10,000 USD monthly.",
+    "governing_law": "State of California",
+    "payment_schedule": ["monthly"],
+}
+
+
+def test_contract_record_round_trips_through_dict_and_bytes():
+    record = ContractRecord.from_dict(STRUCTURED_DATA, contract_id="msa")
+
+    assert record.effective_date == datetime.date(2024, 1, 1)
+    assert record.expiration_date is None
+    assert record.to_dict() == STRUCTURED_DATA
+    assert ContractRecord.from_dict(record.to_dict(), contract_id="msa") == record
+    assert ContractRecord.from_bytes(record.to_bytes()) == record
+    assert ContractRecord.from_dict(record) is record
+
+
+def test_breach_finding_round_trips_through_dict_and_bytes():
+    data = {"rule_id": "R1", "rule_description": "Term is set", "status": "Met", "details": "Clause 2."}
+    finding = BreachFinding.from_dict(data)
+
+    assert finding.to_dict() == data
+    assert BreachFinding.from_bytes(finding.to_bytes()) == finding
+    assert BreachFinding.from_dict({"rule_id": "R2"}).to_dict()["status"] == ""
+
+
+def test_penalty_item_round_trips_through_dict_and_bytes():
+    data = {
+        "breach_type_or_clause": "Late payment",
+        "penalty_description": "5% of the monthly fee",
+        "calculated_amount_formula": "0.05 * monthly_amount",
+        "conditions_for_penalty": "After 30 days",
+        "notes": "",
+        "calculated_amount": 500.0,
+    }
+    item = PenaltyItem.from_dict(data)
+
+    assert item.to_dict() == data
+    assert PenaltyItem.from_bytes(item.to_bytes()) == item
+    unpriced = PenaltyItem.from_dict({**data, "calculated_amount": "unknown"})
+    assert "calculated_amount" not in unpriced.to_dict()
+    assert PenaltyItem.from_bytes(unpriced.to_bytes()) == unpriced
+
+
+def test_mapping_view_reads_slots_without_building_the_dict(monkeypatch):
+    record = ContractRecord.from_dict(STRUCTURED_DATA)
+    expected = record.to_dict()
+
+    def to_dict(self):
+        raise AssertionError("to_dict called")
+
+    monkeypatch.setattr(ContractRecord, "to_dict", to_dict)
+    monkeypatch.setattr(Party, "to_dict", to_dict)
+
+    assert record.keys() == list(expected)
+    assert len(record) == len(expected)
+    assert record["expiration_date"] == "end of next year"
+    assert record.get("renewal_terms", "none") == "none"
+    assert "payment_schedule" in record and "renewal_terms" not in record and 1 not in record
+    with pytest.raises(KeyError):
+        record["renewal_terms"]
+    party = record["parties"][0]
+    assert dict(party.items()) == expected["parties"][0]
+    assert party["role"] == "Provider" and "nickname" not in party
+
+
+def test_records_hold_analyses_in_less_memory_than_dicts():
+    from legal_contract_analyzer.benchmarks.entity_memory import run_entity_memory_benchmark
+
+    results = run_entity_memory_benchmark(contracts=200, rules=5)
+    assert results["records_to_dicts_ratio"] < 0.6
+    assert results["binary_bytes_per_contract"] < results["records"]["bytes_per_contract"]